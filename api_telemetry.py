@@ -0,0 +1,212 @@
+"""
+API Telemetry
+エンドポイントごとのリクエスト数・レイテンシ・受信量・待機時間・429 を集計するテレメトリ
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# レイテンシヒストグラムの上限値（秒）
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class EndpointStats:
+    """1つのAPIメソッドの集計値"""
+
+    __slots__ = ('requests', 'latency_counts', 'latency_sum', 'bytes_received', 'status_codes',
+                 'throttle_seconds', 'breaker_wait_seconds', 'rate_limited', 'connection_errors')
+
+    def __init__(self):
+        self.requests = 0
+        # 各バケット（LATENCY_BUCKETS と +Inf）に入った件数
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.bytes_received = 0
+        self.status_codes: Counter = Counter()
+        self.throttle_seconds = 0.0
+        self.breaker_wait_seconds = 0.0
+        self.rate_limited: Counter = Counter()
+        self.connection_errors = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'latency_buckets': dict(zip([*map(str, LATENCY_BUCKETS), '+Inf'], self.latency_counts)),
+            'latency_sum': round(self.latency_sum, 6),
+            'latency_avg': round(self.latency_sum / self.requests, 6) if self.requests else 0.0,
+            'bytes_received': self.bytes_received,
+            'status_codes': {str(code): count for code, count in sorted(self.status_codes.items())},
+            'throttle_seconds': round(self.throttle_seconds, 6),
+            'breaker_wait_seconds': round(self.breaker_wait_seconds, 6),
+            'rate_limited': dict(self.rate_limited),
+            'connection_errors': self.connection_errors,
+        }
+
+
+class APITelemetry:
+    """
+    RiotAPIClient のリクエストを APIメソッド（'match-v5.getTimeline' など）ごとに集計するクラス
+
+    ネットワーク待ち・レート制限による待機・429 のどれが収集速度を決めているかを
+    snapshot() の辞書か Prometheus 形式（start_http_server）で確認できる。
+    """
+
+    def __init__(self):
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+        self._http_server: Optional[ThreadingHTTPServer] = None
+
+    def _stats(self, method: str) -> EndpointStats:
+        """ロック取得済みで呼ぶ"""
+        stats = self._endpoints.get(method)
+        if stats is None:
+            stats = self._endpoints[method] = EndpointStats()
+        return stats
+
+    def record_response(self, method: str, status: int, latency: float, bytes_received: int):
+        """レスポンスを1件記録"""
+        with self._lock:
+            stats = self._stats(method)
+            stats.requests += 1
+            stats.latency_counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+            stats.latency_sum += latency
+            stats.bytes_received += bytes_received
+            stats.status_codes[status] += 1
+
+    def record_connection_error(self, method: str, latency: float):
+        """接続エラー・タイムアウトを記録"""
+        with self._lock:
+            stats = self._stats(method)
+            stats.requests += 1
+            stats.latency_counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+            stats.latency_sum += latency
+            stats.connection_errors += 1
+
+    def record_throttle(self, method: str, seconds: float):
+        """レート制限による待機時間を記録"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._stats(method).throttle_seconds += seconds
+
+    def record_breaker_wait(self, method: str, seconds: float):
+        """サーキットブレーカーによる待機時間を記録"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._stats(method).breaker_wait_seconds += seconds
+
+    def record_rate_limited(self, method: str, limit_type: Optional[str]):
+        """429 を X-Rate-Limit-Type ごとに記録"""
+        with self._lock:
+            self._stats(method).rate_limited[(limit_type or 'unknown').lower()] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        集計値のスナップショット
+
+        Returns:
+            APIメソッド名 → 集計値の辞書
+        """
+        with self._lock:
+            return {method: stats.to_dict() for method, stats in sorted(self._endpoints.items())}
+
+    def prometheus_text(self) -> str:
+        """Prometheus のテキスト形式で出力"""
+        lines = []
+
+        def metric(name: str, metric_type: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+
+            metric('riot_api_requests_total', 'counter', 'Riot API requests by method and status')
+            for method, stats in endpoints:
+                for status, count in sorted(stats.status_codes.items()):
+                    lines.append(f'riot_api_requests_total{{method="{method}",status="{status}"}} {count}')
+                if stats.connection_errors:
+                    lines.append(
+                        f'riot_api_requests_total{{method="{method}",status="error"}} {stats.connection_errors}'
+                    )
+
+            metric('riot_api_request_duration_seconds', 'histogram', 'Riot API request latency')
+            for method, stats in endpoints:
+                cumulative = 0
+                for bound, count in zip([*map(str, LATENCY_BUCKETS), '+Inf'], stats.latency_counts):
+                    cumulative += count
+                    lines.append(
+                        f'riot_api_request_duration_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'riot_api_request_duration_seconds_sum{{method="{method}"}} {stats.latency_sum:.6f}')
+                lines.append(f'riot_api_request_duration_seconds_count{{method="{method}"}} {stats.requests}')
+
+            metric('riot_api_response_bytes_total', 'counter', 'Riot API response body bytes')
+            for method, stats in endpoints:
+                lines.append(f'riot_api_response_bytes_total{{method="{method}"}} {stats.bytes_received}')
+
+            metric('riot_api_throttle_seconds_total', 'counter', 'Time spent waiting for the rate limiter')
+            for method, stats in endpoints:
+                lines.append(f'riot_api_throttle_seconds_total{{method="{method}"}} {stats.throttle_seconds:.6f}')
+
+            metric('riot_api_breaker_wait_seconds_total', 'counter', 'Time spent waiting for an open circuit')
+            for method, stats in endpoints:
+                lines.append(
+                    f'riot_api_breaker_wait_seconds_total{{method="{method}"}} {stats.breaker_wait_seconds:.6f}'
+                )
+
+            metric('riot_api_rate_limited_total', 'counter', 'HTTP 429 responses by X-Rate-Limit-Type')
+            for method, stats in endpoints:
+                for limit_type, count in sorted(stats.rate_limited.items()):
+                    lines.append(f'riot_api_rate_limited_total{{method="{method}",type="{limit_type}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """
+        /metrics で Prometheus 形式を返す HTTP サーバーをバックグラウンドで起動
+
+        Args:
+            port: 待ち受けポート（0 なら空きポート）
+            host: 待ち受けアドレス
+
+        Returns:
+            起動したサーバー
+        """
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='api-telemetry-http', daemon=True).start()
+        self._http_server = server
+        logger.info(f"テレメトリを公開しました: http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+    def stop_http_server(self):
+        """HTTP サーバーを停止"""
+        if self._http_server:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
@@ -0,0 +1,389 @@
+"""
+Async Riot Games API Client
+複数リクエストを同時に送信する asyncio ベースの Riot API クライアント
+
+収集（realtime_data_collector のパイプライン・sharded_collection）はこのクライアントを使わない。
+パイプラインの取得ステージは RequestScheduler のワーカースレッドで RiotAPIClient を呼び、
+同時に送信中のリクエストはワーカー数、送信間隔はレートリミッターで決まるため、スレッドでも API の上限まで送れる。
+DB 書き込み・分析・ランクのキャッシュは同期のまま共有できる。
+
+このクライアントは、同じキーの送信枠（sync_client のレートリミッター）を共有したまま、
+asyncio のアプリケーションやスクリプトから少数のスレッドで多数のリクエストを並行して送るために残している。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+import fast_json
+from match_cache import MatchPayloadCache
+from retry_policy import (
+    CONNECTION_ERROR, RATE_LIMITED, SERVER_ERROR, RetryPolicy, parse_retry_after
+)
+from riot_api_client import RiotAPIClient, average_tier_value, resolve_endpoint_method
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRiotAPIClient:
+    """
+    asyncio ベースの Riot Games API クライアント
+
+    RiotAPIClient と同じエンドポイントメソッドをコルーチンとして提供する。
+    1つの aiohttp.ClientSession（コネクションプール）を共有し、
+    レート制限の範囲内で複数のリクエストを同時に実行する。
+
+    URL・レート制限・リトライ方針・テレメトリ・ランク索引は内部の RiotAPIClient（sync_client）のものを使う。
+    既存の同期クライアントを渡せば、同じキーの送信枠を二重に使わずに併用できる。
+
+    使用例:
+        async with AsyncRiotAPIClient(api_key, 'jp1') as client:
+            matches = await asyncio.gather(
+                *(client.get_match_by_id(match_id) for match_id in match_ids)
+            )
+    """
+
+    def __init__(self, api_key: Optional[str] = None, region: str = 'jp1',
+                 max_concurrency: int = 20, match_cache: Optional[MatchPayloadCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None, base_url_override: Optional[str] = None,
+                 rate_limit_share: float = 1.0, sync_client: Optional[RiotAPIClient] = None):
+        """
+        非同期APIクライアントを初期化
+
+        Args:
+            api_key: Riot Games API キー
+            region: 地域コード (例: 'jp1', 'kr', 'na1')
+            max_concurrency: ルーティングホストごとに同時送信できるリクエストの最大数
+            match_cache: 試合詳細・タイムラインのディスクキャッシュ（None なら無効）
+            retry_policy: 再送信の方針（None なら既定値の RetryPolicy）
+            base_url_override: 全エンドポイントの送信先を置き換えるURL（None なら本番）
+            rate_limit_share: 同じキーを複数プロセスで使う場合の、このクライアントの予算の割合
+            sync_client: 設定と送信枠を共有する RiotAPIClient（指定時は他の設定引数を使わない）
+        """
+        self.sync_client = sync_client or RiotAPIClient(
+            api_key, region, match_cache, retry_policy, base_url_override, rate_limit_share
+        )
+        client = self.sync_client
+        self.api_key = client.api_key
+        self.region = client.region
+        self.base_url = client.base_url
+        self.continental_url = client.continental_url
+        self.match_cache = client.match_cache
+        self.rank_index = client.rank_index
+        self.rate_limiters = client.rate_limiters
+        self.retry_policy = client.retry_policy
+        self.telemetry = client.telemetry
+        self.max_concurrency = max_concurrency
+        self._client_session: Optional[aiohttp.ClientSession] = None
+        # プラットフォーム/リージョナルのホストごとに同時送信数を分ける
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def rank_resolver(self):
+        """PlayerRankResolver（同期クライアントと共有）"""
+        return self.sync_client.rank_resolver
+
+    @rank_resolver.setter
+    def rank_resolver(self, resolver):
+        self.sync_client.rank_resolver = resolver
+
+    async def __aenter__(self) -> 'AsyncRiotAPIClient':
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """コネクションプールを作成（実行中のイベントループ内で呼び出す）"""
+        if self._client_session and not self._client_session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.max_concurrency)
+        self._client_session = aiohttp.ClientSession(
+            connector=connector,
+            headers=dict(self.sync_client.session.headers),
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+        self._host_semaphores = {}
+
+    async def close(self):
+        """コネクションプールを閉じる"""
+        if self._client_session and not self._client_session.closed:
+            await self._client_session.close()
+        self._client_session = None
+
+    def _semaphore_for(self, host: str) -> asyncio.Semaphore:
+        """ホストごとの同時送信数セマフォを取得"""
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _make_request_async(self, url: str, params: Dict = None) -> Optional[Dict]:
+        """
+        APIリクエストを非同期で実行
+
+        Args:
+            url: リクエストURL
+            params: クエリパラメータ
+
+        Returns:
+            APIレスポンス（JSON）
+        """
+        if self._client_session is None:
+            await self.open()
+
+        method = resolve_endpoint_method(url)
+        host = urlparse(url).netloc
+        rate_limiter = self.rate_limiters.for_host(host)
+        breaker = self.retry_policy.breaker_for(host)
+        failures = {}
+
+        while True:
+            # 障害中のホストには送信しない
+            wait = breaker.before_request()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                self.telemetry.record_breaker_wait(method, wait)
+                wait = breaker.before_request()
+
+            outcome = None
+            retry_after = None
+            started = None
+            try:
+                async with self._semaphore_for(host):
+                    # 送信枠は同時送信数の枠を得てから取る（先に取るとセマフォを待つ間に送信記録だけが古くなり、
+                    # 実際の送信がウィンドウの想定より遅れてサーバー側で超過する）
+                    self.telemetry.record_throttle(method, await rate_limiter.acquire_async(method))
+                    started = time.monotonic()
+                    async with self._client_session.get(url, params=params) as response:
+                        body = await response.read()
+                        self.telemetry.record_response(
+                            method, response.status, time.monotonic() - started, len(body)
+                        )
+                        rate_limiter.update_from_headers(method, response.headers)
+
+                        if response.status >= 500:
+                            breaker.record_failure()
+                            outcome = SERVER_ERROR
+                            retry_after = parse_retry_after(response.headers)
+                            logger.warning(f"サーバーエラー {response.status}: {url}")
+                        else:
+                            breaker.record_success()
+                            if response.status == 200:
+                                return fast_json.loads(body)
+                            elif response.status == 429:
+                                # レート制限エラー（該当スコープの Retry-After 経過後に再送信される）
+                                rate_limiter.register_rate_limited(method, response.headers)
+                                self.telemetry.record_rate_limited(
+                                    method, response.headers.get('X-Rate-Limit-Type')
+                                )
+                                outcome = RATE_LIMITED
+                            elif response.status == 404:
+                                logger.warning(f"データが見つかりません: {url}")
+                                return None
+                            else:
+                                text = body.decode('utf-8', errors='replace')
+                                logger.error(f"APIエラー: {response.status} - {text}")
+                                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if started is not None:
+                    self.telemetry.record_connection_error(method, time.monotonic() - started)
+                breaker.record_failure()
+                outcome = CONNECTION_ERROR
+                logger.warning(f"リクエストエラー: {e}")
+
+            delay = self.sync_client._next_retry_delay(failures, outcome, url, retry_after)
+            if delay is None:
+                return None
+            await asyncio.sleep(delay)
+            if outcome == RATE_LIMITED:
+                self.telemetry.record_throttle(method, delay)
+
+    async def get_league_entries_by_tier_division(self, tier: str, division: str,
+                                                  queue: str = 'RANKED_SOLO_5x5',
+                                                  page: int = 1) -> Optional[List[Dict]]:
+        """指定したtier/divisionのリーグエントリー一覧を取得"""
+        url = f"{self.base_url}/lol/league/v4/entries/{queue}/{tier}/{division}"
+        entries = await self._make_request_async(url, {'page': page})
+        self.rank_index.add_entries(entries, tier=tier, queue=queue)
+        return entries
+
+    async def get_account_by_riot_id(self, game_name: str, tag_line: str) -> Optional[Dict]:
+        """Riot IDからアカウント情報を取得"""
+        url = f"{self.continental_url}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        return await self._make_request_async(url)
+
+    async def get_summoner_by_puuid(self, puuid: str) -> Optional[Dict]:
+        """PUUIDからリーグエントリー情報を取得"""
+        url = f"{self.base_url}/lol/league/v4/entries/by-puuid/{puuid}"
+        return await self._make_request_async(url)
+
+    async def get_match_ids_by_puuid(self, puuid: str, start: int = 0, count: int = 20,
+                                     queue: Optional[int] = None, type_filter: Optional[str] = None,
+                                     start_time: Optional[int] = None,
+                                     end_time: Optional[int] = None) -> Optional[List[str]]:
+        """PUUIDから試合ID一覧を取得"""
+        url = f"{self.continental_url}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+
+        params = {
+            'start': start,
+            'count': min(count, 100)  # 最大100件
+        }
+
+        if queue:
+            params['queue'] = queue
+        if type_filter:
+            params['type'] = type_filter
+        if start_time:
+            params['startTime'] = start_time
+        if end_time:
+            params['endTime'] = end_time
+
+        return await self._make_request_async(url, params)
+
+    async def get_match_by_id(self, match_id: str) -> Optional[Dict]:
+        """試合IDから試合詳細データを取得"""
+        return await self._get_cached_payload(
+            'match', match_id, f"{self.continental_url}/lol/match/v5/matches/{match_id}"
+        )
+
+    async def get_match_data(self, match_id: str) -> Optional[Dict]:
+        """試合IDから試合詳細データを取得（get_match_by_idのエイリアス）"""
+        return await self.get_match_by_id(match_id)
+
+    async def get_match_history(self, puuid: str, start: int = 0, count: int = 20,
+                                queue: Optional[int] = None, type_filter: Optional[str] = None,
+                                start_time: Optional[int] = None,
+                                end_time: Optional[int] = None) -> Optional[List[str]]:
+        """PUUIDから試合履歴を取得（get_match_ids_by_puuidのエイリアス）"""
+        return await self.get_match_ids_by_puuid(puuid, start, count, queue, type_filter,
+                                                 start_time, end_time)
+
+    async def get_match_timeline(self, match_id: str) -> Optional[Dict]:
+        """試合IDからタイムライン詳細を取得"""
+        return await self._get_cached_payload(
+            'timeline', match_id, f"{self.continental_url}/lol/match/v5/matches/{match_id}/timeline"
+        )
+
+    async def _get_cached_payload(self, kind: str, match_id: str, url: str) -> Optional[Dict]:
+        """ディスクキャッシュを優先して試合ペイロードを取得"""
+        if self.match_cache:
+            # ディスクI/Oでイベントループを止めないようスレッドで読む
+            cached = await asyncio.to_thread(self.match_cache.get, kind, match_id)
+            if cached is not None:
+                return cached
+
+        payload = await self._make_request_async(url)
+        if payload and self.match_cache:
+            await asyncio.to_thread(self.match_cache.put, kind, match_id, payload)
+        return payload
+
+    async def get_match_with_timeline(self, match_id: str):
+        """
+        試合詳細とタイムラインを同時に取得
+
+        Args:
+            match_id: 試合ID
+
+        Returns:
+            (試合詳細データ, タイムライン詳細データ) のタプル
+        """
+        return await asyncio.gather(
+            self.get_match_by_id(match_id),
+            self.get_match_timeline(match_id)
+        )
+
+    async def get_summoner_by_id(self, summoner_id: str) -> Optional[Dict]:
+        """サモナーIDでサモナー情報を取得"""
+        url = f"{self.base_url}/lol/summoner/v4/summoners/{summoner_id}"
+        return await self._make_request_async(url)
+
+    async def get_summoner_by_name(self, summoner_name: str) -> Optional[Dict]:
+        """サモナー名でサモナー情報を取得"""
+        url = f"{self.base_url}/lol/summoner/v4/summoners/by-name/{summoner_name}"
+        return await self._make_request_async(url)
+
+    async def get_summoner_rank_tier(self, summoner_id: str) -> Optional[str]:
+        """サモナーIDのランクティア（ソロランク優先）を取得"""
+        if not summoner_id:
+            return None
+        entries = await self.get_league_entries_by_summoner(summoner_id)
+        if not entries:
+            return None
+
+        solo_entry = next((e for e in entries if e.get('queueType') == 'RANKED_SOLO_5x5'), None)
+        entry = solo_entry or entries[0]
+        tier = entry.get('tier')
+        return tier.upper() if tier else None
+
+    async def get_match_average_tier_by_match_id(self, match_data: Dict) -> Optional[int]:
+        """
+        試合参加者のソロランクを並行して取得し、平均ティアの序数を返す
+
+        戻り値は RiotAPIClient.get_match_average_tier_by_match_id と同じ
+        1（IRON）〜10（CHALLENGER）の整数。
+        """
+        participants = match_data["metadata"]["participants"]
+        if not participants:
+            return None
+
+        if self.rank_resolver:
+            # DB を引くことがあるため、イベントループを止めないようスレッドで実行する
+            cached = await asyncio.to_thread(self.rank_resolver.lookup_cached, participants)
+        else:
+            cached = {puuid: self.rank_index.get(puuid) for puuid in participants if puuid in self.rank_index}
+        missing = [puuid for puuid in participants if puuid not in cached]
+        entries_list = await asyncio.gather(
+            *(self.get_summoner_by_puuid(puuid) for puuid in missing)
+        )
+
+        if self.rank_resolver:
+            fetched = await asyncio.to_thread(self.rank_resolver.record_fetched, dict(zip(missing, entries_list)))
+            tiers = [r.tier for r in cached.values()] + [r.tier for r in fetched.values()]
+        else:
+            tiers = [r.tier for r in cached.values()] + [
+                next((e['tier'] for e in entries or [] if e.get('queueType') == 'RANKED_SOLO_5x5'), None)
+                for entries in entries_list
+            ]
+
+        return average_tier_value(tiers)
+
+    async def get_challenger_league(self, queue: str = 'RANKED_SOLO_5x5') -> Optional[Dict]:
+        """チャレンジャーリーグ情報を取得"""
+        url = f"{self.base_url}/lol/league/v4/challengerleagues/by-queue/{queue}"
+        league_data = await self._make_request_async(url)
+        self.rank_index.add_league(league_data)
+        return league_data
+
+    async def get_grandmaster_league(self, queue: str = 'RANKED_SOLO_5x5') -> Optional[Dict]:
+        """グランドマスターリーグ情報を取得"""
+        url = f"{self.base_url}/lol/league/v4/grandmasterleagues/by-queue/{queue}"
+        league_data = await self._make_request_async(url)
+        self.rank_index.add_league(league_data)
+        return league_data
+
+    async def get_master_league(self, queue: str = 'RANKED_SOLO_5x5') -> Optional[Dict]:
+        """マスターリーグ情報を取得"""
+        url = f"{self.base_url}/lol/league/v4/masterleagues/by-queue/{queue}"
+        league_data = await self._make_request_async(url)
+        self.rank_index.add_league(league_data)
+        return league_data
+
+    async def get_league_entries_by_summoner(self, summoner_id: str) -> Optional[List[Dict]]:
+        """サモナーのリーグエントリー情報を取得"""
+        url = f"{self.base_url}/lol/league/v4/entries/by-summoner/{summoner_id}"
+        return await self._make_request_async(url)
+
+    async def validate_api_key(self) -> bool:
+        """APIキーが有効かを簡易チェック（同期クライアントの検証をスレッドで実行）"""
+        return await asyncio.to_thread(self.sync_client.validate_api_key)
+
+    def get_api_key_preview(self) -> str:
+        """API キーのプレビュー（先頭4文字＋末尾4文字と出所）"""
+        return self.sync_client.get_api_key_preview()
@@ -0,0 +1,227 @@
+"""
+Collection Pipeline
+ステージごとに有界キューとワーカースレッドを持つ生産者・消費者パイプライン
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ワーカーに終了を伝える番兵
+_STOP = object()
+
+# ステージの処理関数: handler(item, emit) で emit(出力) を呼ぶと次のステージへ渡る
+StageHandler = Callable[[Any, Callable[[Any], None]], None]
+
+
+class PipelineStage:
+    """パイプラインの1段（有界キュー + ワーカープール）"""
+
+    def __init__(self, name: str, handler: StageHandler, workers: int = 1, queue_size: int = 100):
+        """
+        ステージを初期化
+
+        Args:
+            name: ステージ名（統計・ログ用）
+            handler: 1件を処理する関数 handler(item, emit)
+            workers: ワーカースレッド数
+            queue_size: 入力キューの上限（満杯なら前段の emit が待機する）
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.next_stage: Optional['PipelineStage'] = None
+        self.threads: List[threading.Thread] = []
+        self._live_workers = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'received': 0,
+            'processed': 0,
+            'failed': 0,
+            'emitted': 0,
+            'busy_seconds': 0.0,
+            'blocked_seconds': 0.0,
+        }
+
+    def _count(self, key: str, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def put(self, item: Any):
+        """入力キューに追加（満杯なら空くまで待機）"""
+        started = time.monotonic()
+        self.queue.put(item)
+        self._count('received')
+        return time.monotonic() - started
+
+    def _emit(self, item: Any):
+        """次のステージへ渡す（最終ステージでは捨てる）"""
+        self._count('emitted')
+        if self.next_stage is not None:
+            blocked = self.next_stage.put(item)
+            if blocked > 0.001:
+                self._count('blocked_seconds', blocked)
+
+    def start(self):
+        with self._lock:
+            self._live_workers = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def close(self):
+        """入力の終わりを伝える（全ワーカーが番兵を受け取ると終了する）"""
+        for _ in range(self.workers):
+            self.queue.put(_STOP)
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            started = time.monotonic()
+            try:
+                self.handler(item, self._emit)
+                self._count('processed')
+            except Exception as e:
+                logger.error(f"パイプライン処理エラー: {self.name} - {e}")
+                self._count('failed')
+            finally:
+                self._count('busy_seconds', time.monotonic() - started)
+
+        # 最後に終了したワーカーが次のステージを閉じる（以降このステージからの出力は無い）
+        with self._lock:
+            self._live_workers -= 1
+            last_worker = self._live_workers == 0
+        if last_worker and self.next_stage is not None:
+            self.next_stage.close()
+
+    def in_flight(self) -> int:
+        """受け取ったが処理を終えていない件数"""
+        with self._lock:
+            return self.stats['received'] - self.stats['processed'] - self.stats['failed']
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['busy_seconds'] = round(stats['busy_seconds'], 3)
+        stats['blocked_seconds'] = round(stats['blocked_seconds'], 3)
+        stats['queued'] = self.queue.qsize()
+        stats['workers'] = self.workers
+        return stats
+
+
+class CollectionPipeline:
+    """
+    データ収集用の多段パイプライン
+
+    例: 試合ID探索 → 取得 → タイムライン分析 → 永続化
+    - 各ステージは専用の有界キューとワーカープールを持ち、
+      ネットワーク・CPU・DB の処理が同時に進む
+    - 後段のキューが満杯になると前段の emit が待機する（バックプレッシャー）
+    - 送信間隔はAPIクライアントのレートリミッターに任せ、パイプライン側では待機しない
+    """
+
+    def __init__(self, name: str = 'collection'):
+        self.name = name
+        self.stages: List[PipelineStage] = []
+        self._started = False
+        self._closed = False
+
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1,
+                  queue_size: int = 100) -> 'CollectionPipeline':
+        """
+        ステージを末尾に追加
+
+        Args:
+            name: ステージ名
+            handler: 1件を処理する関数 handler(item, emit)
+            workers: ワーカースレッド数
+            queue_size: 入力キューの上限
+
+        Returns:
+            自身（連結して呼べる）
+        """
+        if self._started:
+            raise RuntimeError("開始後にステージは追加できません")
+        stage = PipelineStage(name, handler, workers, queue_size)
+        if self.stages:
+            self.stages[-1].next_stage = stage
+        self.stages.append(stage)
+        return self
+
+    def start(self) -> 'CollectionPipeline':
+        """全ステージのワーカーを起動"""
+        if not self.stages:
+            raise RuntimeError("ステージがありません")
+        if not self._started:
+            for stage in self.stages:
+                stage.start()
+            self._started = True
+        return self
+
+    def put(self, item: Any):
+        """先頭ステージに投入（満杯なら待機）"""
+        if self._closed:
+            raise RuntimeError("パイプラインは入力を締め切りました")
+        self.stages[0].put(item)
+
+    def close(self):
+        """入力を締め切る（処理済みのものから順に各ステージが終了する）"""
+        if not self._closed:
+            self._closed = True
+            self.stages[0].close()
+
+    def idle(self) -> bool:
+        """
+        投入済みの入力がすべて処理済みか
+
+        上流から順に確認する。前段の処理が終わっていれば、その出力は
+        すでに後段の received に数えられているため、途中の受け渡しを見落とさない。
+        """
+        return all(stage.in_flight() <= 0 for stage in self.stages)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        全ステージの終了を待機
+
+        Returns:
+            時間内に終了したか
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stage in self.stages:
+            for thread in stage.threads:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                thread.join(remaining)
+                if thread.is_alive():
+                    return False
+        return True
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict]:
+        """
+        入力をすべて流して終了まで待機
+
+        Args:
+            items: 先頭ステージへの入力
+
+        Returns:
+            ステージごとの統計
+        """
+        self.start()
+        try:
+            for item in items:
+                self.put(item)
+        finally:
+            self.close()
+        self.join()
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """ステージごとの統計（件数・処理時間・待機時間・キュー長）"""
+        return {stage.name: stage.snapshot() for stage in self.stages}
@@ -9,6 +9,10 @@ from typing import Dict
 # Riot Games API設定
 RIOT_API_KEY = os.getenv('RIOT_API_KEY', 'RGAPI-5714c655-d1b0-4db3-a295-fce12e4cbe1d')
 RIOT_REGION = os.getenv('RIOT_REGION', 'jp1')
+# シャード分割収集（sharded_collection.plan_shards）で割り当てる複数キー・複数地域（カンマ区切り）
+# 暗号化 PUUID はキーごとに異なるため、1つのシャードは1つのキーだけを使う
+RIOT_API_KEYS = [k.strip() for k in os.getenv('RIOT_API_KEYS', RIOT_API_KEY).split(',') if k.strip()]
+RIOT_REGIONS = [r.strip() for r in os.getenv('RIOT_REGIONS', RIOT_REGION).split(',') if r.strip()]
 
 # MySQL データベース設定
 MYSQL_CONFIG = {
@@ -32,6 +36,67 @@ DATA_COLLECTION_CONFIG = {
     'request_delay': 1.2,      # リクエスト間の遅延（秒）
 }
 
+# キャッシュ設定
+CACHE_CONFIG = {
+    'match_cache_dir': os.getenv('MATCH_CACHE_DIR', 'cache/matches'),  # 試合・タイムラインのキャッシュ
+    'match_cache_max_bytes': 5 * 1024 ** 3,  # キャッシュ上限（5GB）
+    'static_data_dir': os.getenv('STATIC_DATA_DIR', 'cache/ddragon'),  # DDragon の静的データ
+    'rank_ttl_seconds': 24 * 3600,  # プレイヤーランクの有効期間
+    'rank_memory_entries': 100000,  # メモリに保持するプレイヤーランク数
+    'dedup_capacity': 5_000_000,  # 処理済み試合IDの Bloom フィルターの想定件数
+    'dedup_false_positive_rate': 0.001,  # Bloom フィルターの偽陽性率
+    'payload_archive_dir': os.getenv('PAYLOAD_ARCHIVE_DIR', 'data/payload_archive'),  # 生レスポンスの追記専用アーカイブ
+    'payload_segment_bytes': 256 * 1024 ** 2,  # アーカイブの1セグメントの上限サイズ
+}
+
+# APIリトライ設定（retry_policy.RetryPolicy の引数）
+RETRY_CONFIG = {
+    'max_attempts': 5,  # 5xx・接続エラー時の最大試行回数
+    'base_delay': 1.0,  # バックオフの基準秒数
+    'max_delay': 60.0,  # バックオフの上限秒数
+    'max_rate_limit_retries': 10,  # 429 による再送信の最大回数
+    'failure_threshold': 5,  # サーキットブレーカーを開く連続失敗回数
+    'reset_timeout': 30.0,  # サーキットブレーカーを開いておく秒数
+    'retry_budget': 10000,  # 1回のクロールで許容するリトライ総数
+}
+
+# APIテレメトリ設定（metrics_port が 0 なら Prometheus 形式の公開を行わない）
+TELEMETRY_CONFIG = {
+    'metrics_host': os.getenv('METRICS_HOST', '127.0.0.1'),
+    'metrics_port': int(os.getenv('METRICS_PORT', 0)),
+}
+
+# 収集パイプライン設定（ステージごとのワーカー数とキュー上限）
+PIPELINE_CONFIG = {
+    'discovery_workers': 2,    # 試合IDの探索
+    'fetch_workers': 16,       # 試合詳細・タイムライン・ランクの取得
+    'analysis_workers': 2,     # タイムライン分析
+    'persistence_workers': 4,  # DB書き込み（コネクションプール上限 10 以下）
+    'queue_size': 64,          # 各ステージの入力キュー上限
+    'frontier_dir': os.getenv('FRONTIER_DIR', 'cache/frontier'),  # クロールフロンティアの退避先
+    'frontier_memory_entries': 100000,  # フロンティアがメモリに保持する最大件数
+    'recrawl_seconds': 6 * 3600,  # 同じプレイヤーの試合一覧を再取得するまでの秒数
+    'journal_path': os.getenv('CRAWL_JOURNAL', 'cache/crawl_journal.sqlite3'),  # 再開用の進捗ジャーナル
+    'backfill_depth': 300,  # 過去方向の取得でプレイヤーごとに遡る試合数
+    'refresh_max_pages': 10,  # 新しい試合の一覧を取得するページ数の上限（100件/ページ）
+    'write_behind_path': os.getenv('WRITE_BEHIND_PATH', 'cache/write_behind.jsonl'),  # DB書き込みバッファの退避ファイル（空なら同期書き込み）
+    'write_behind_batch_size': 50,  # 1トランザクションでまとめる最大試合数
+    'write_behind_flush_seconds': 1.0,  # 試合を書き込みバッファに留める最大秒数
+    'write_behind_max_pending': 200,  # メモリに保持する未書き込みの最大試合数（超えると永続化ステージが待つ）
+    'write_behind_close_seconds': 60.0,  # 実行の終了時に残りの書き込みを待つ最大秒数（残りは次の実行で書き込む）
+    'scheduler_workers': None,  # API呼び出しを実行するスレッド数（None なら fetch_workers + discovery_workers）
+}
+
+# シャード収集設定（sharded_collection.ShardedCollectionCoordinator）
+# シャード数 = 地域数 × (ティア数 if split_tiers else 1) × hash_shards。APIキーは RIOT_API_KEYS を順に割り当てる
+SHARD_CONFIG = {
+    'split_tiers': os.getenv('SHARD_SPLIT_TIERS', '1') == '1',  # ティアごとに別プロセスで収集
+    'hash_shards': int(os.getenv('SHARD_HASH_COUNT', 1)),  # PUUID のハッシュで分けるプロセス数
+    'coordination_path': os.getenv('SHARD_COORDINATION', 'cache/shard_claims.sqlite3'),  # シャード間の担当表
+    'db_pool_size': 6,  # シャードあたりのDBコネクション数（永続化ワーカー数 + 探索・ランク照会）
+    'setup_static_data': True,  # 各シャードで静的データを取得（親で取得済みなら False）
+}
+
 # 機械学習設定
 ML_CONFIG = {
     'model_types': ['random_forest'],  # 使用するモデルタイプ
@@ -0,0 +1,211 @@
+"""
+Crawl Frontier
+探索対象のプレイヤー（PUUID）と試合IDを優先度順に保持し、上限を超えた分をディスクへ退避するクロールフロンティア
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import fast_json
+
+logger = logging.getLogger(__name__)
+
+# 種類ごとの優先度（値が小さいほど先に取り出す）
+# 試合IDは取得すれば即データになるため、新しい試合一覧を増やすプレイヤーより先に出す
+KIND_PRIORITY = {'match': 0, 'player': 1}
+
+# 同じプレイヤーの試合一覧を再取得するまでの既定秒数
+DEFAULT_RECRAWL_SECONDS = 6 * 3600
+
+
+@dataclass
+class FrontierEntry:
+    """フロンティアの1件（プレイヤーまたは試合ID）"""
+    kind: str
+    key: str
+    name: Optional[str] = None
+    tier_value: int = 0
+    last_crawled: float = 0.0
+
+    def priority(self) -> Tuple[int, int, float]:
+        """優先度（高ティアほど、前回の探索から時間が経っているほど先）"""
+        return KIND_PRIORITY[self.kind], -self.tier_value, self.last_crawled
+
+
+class CrawlFrontier:
+    """
+    重複排除付きの優先度キュー
+
+    - リーグページで種をまき、取り込んだ試合の参加者10人で増やす（スノーボール探索）
+    - プレイヤーはティアの高い順・前回の探索が古い順に取り出す
+    - recrawl_seconds 以内に試合一覧を取得したプレイヤーは再登録しない
+    - メモリ上の件数が max_memory_entries を超えたら優先度の低い半分を
+      spill_dir に JSON Lines で退避し、メモリが空になったら読み戻す
+    """
+
+    def __init__(self, spill_dir: str, max_memory_entries: int = 100000,
+                 recrawl_seconds: float = DEFAULT_RECRAWL_SECONDS):
+        """
+        フロンティアを初期化
+
+        Args:
+            spill_dir: 退避ファイルの保存ディレクトリ
+            max_memory_entries: メモリに保持する最大件数
+            recrawl_seconds: 同じプレイヤーを再探索するまでの秒数
+        """
+        self.spill_dir = Path(spill_dir)
+        self.max_memory_entries = max(2, max_memory_entries)
+        self.recrawl_seconds = recrawl_seconds
+
+        self._heap: List[Tuple] = []
+        self._sequence = itertools.count()
+        # 登録中（メモリまたは退避ファイル）のキー
+        self._queued: Set[str] = set()
+        # PUUID → 試合一覧を最後に取得した時刻
+        self._last_crawled: Dict[str, float] = {}
+        self._spill_files: List[Tuple[Path, int]] = []
+        self._spilled_count = 0
+        self._lock = threading.Lock()
+
+        self.stats = {'added': 0, 'duplicates': 0, 'recently_crawled': 0, 'popped': 0,
+                      'spilled': 0, 'reloaded': 0}
+
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        # 前回の実行で残った退避ファイルは引き継がない
+        for stale in self.spill_dir.glob('frontier-*.jsonl'):
+            stale.unlink()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap) + self._spilled_count
+
+    def _push(self, entry: FrontierEntry):
+        """ロック取得済みで呼ぶ"""
+        heapq.heappush(self._heap, (entry.priority(), next(self._sequence), entry))
+        self._queued.add(entry.key)
+        self.stats['added'] += 1
+        if len(self._heap) > self.max_memory_entries:
+            self._spill()
+
+    def add_player(self, puuid: str, name: Optional[str] = None, tier_value: int = 0) -> bool:
+        """
+        プレイヤーを登録
+
+        Args:
+            puuid: PUUID
+            name: サモナー名（ログ用）
+            tier_value: ティアの数値（riot_api_client.TIER_TO_VALUE、不明なら 0）
+
+        Returns:
+            登録したか（登録済み・最近探索済みなら False）
+        """
+        if not puuid:
+            return False
+        with self._lock:
+            if puuid in self._queued:
+                self.stats['duplicates'] += 1
+                return False
+            if self._recently_crawled(puuid):
+                self.stats['recently_crawled'] += 1
+                return False
+            self._push(FrontierEntry('player', puuid, name, tier_value, self._last_crawled.get(puuid, 0.0)))
+            return True
+
+    def add_match(self, match_id: str) -> bool:
+        """試合IDを登録（登録済みなら False）"""
+        if not match_id:
+            return False
+        with self._lock:
+            if match_id in self._queued:
+                self.stats['duplicates'] += 1
+                return False
+            self._push(FrontierEntry('match', match_id))
+            return True
+
+    def pop(self) -> Optional[FrontierEntry]:
+        """
+        最も優先度の高い1件を取り出す
+
+        プレイヤーは取り出した時点で探索済みとして記録する。
+
+        Returns:
+            FrontierEntry。空なら None
+        """
+        with self._lock:
+            if not self._heap and self._spill_files:
+                self._reload()
+            if not self._heap:
+                return None
+            entry = heapq.heappop(self._heap)[2]
+            self._queued.discard(entry.key)
+            if entry.kind == 'player':
+                self._last_crawled[entry.key] = time.time()
+            self.stats['popped'] += 1
+            return entry
+
+    def _recently_crawled(self, puuid: str) -> bool:
+        last_crawled = self._last_crawled.get(puuid, 0.0)
+        return bool(last_crawled) and time.time() - last_crawled < self.recrawl_seconds
+
+    def recently_crawled(self, puuid: str) -> bool:
+        """recrawl_seconds 以内に試合一覧を取得したプレイヤーか"""
+        with self._lock:
+            return self._recently_crawled(puuid)
+
+    def mark_crawled(self, puuid: str, crawled_at: Optional[float] = None):
+        """フロンティア外で試合一覧を取得したプレイヤーを記録"""
+        with self._lock:
+            self._last_crawled[puuid] = crawled_at or time.time()
+
+    def _spill(self):
+        """優先度の低い半分を退避ファイルへ書き出す（ロック取得済みで呼ぶ）"""
+        keep = len(self._heap) // 2
+        self._heap.sort()
+        spilled = self._heap[keep:]
+        del self._heap[keep:]
+        # ソート済みの配列はヒープ条件を満たす
+
+        path = self.spill_dir / f"frontier-{next(self._sequence):012d}.jsonl"
+        with open(path, 'wb') as f:
+            for _, _, entry in spilled:
+                f.write(fast_json.dumps([entry.kind, entry.key, entry.name, entry.tier_value, entry.last_crawled]))
+                f.write(b'\n')
+        self._spill_files.append((path, len(spilled)))
+        self._spilled_count += len(spilled)
+        self.stats['spilled'] += len(spilled)
+        logger.debug(f"フロンティアを退避しました: {len(spilled)}件 -> {path.name}")
+
+    def _reload(self):
+        """最も古い退避ファイルを読み戻す（ロック取得済みで呼ぶ）"""
+        path, count = self._spill_files.pop(0)
+        self._spilled_count -= count
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    kind, key, name, tier_value, last_crawled = fast_json.loads(line)
+                    entry = FrontierEntry(kind, key, name, tier_value, last_crawled)
+                    heapq.heappush(self._heap, (entry.priority(), next(self._sequence), entry))
+                    self.stats['reloaded'] += 1
+        except Exception as e:
+            logger.error(f"フロンティアの読み戻しエラー: {path} - {e}")
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def snapshot(self) -> Dict:
+        """件数と統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_memory'] = len(self._heap)
+            stats['spilled_pending'] = self._spilled_count
+            stats['known_players'] = len(self._last_crawled)
+            return stats
@@ -0,0 +1,213 @@
+"""
+Crawl Journal
+長時間のクロールの進捗を SQLite に記録し、中断した位置から再開するためのジャーナル
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    puuid TEXT PRIMARY KEY,
+    name TEXT,
+    tier_value INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    last_crawled REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_players_status ON players (status);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    puuid TEXT,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_status ON matches (status);
+
+CREATE TABLE IF NOT EXISTS seeded_tiers (
+    tier TEXT PRIMARY KEY,
+    seeded_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# 状態
+PENDING = 'pending'
+DONE = 'done'
+
+
+class CrawlJournal:
+    """
+    クロールの進捗ジャーナル（SQLite）
+
+    - プレイヤー: フロンティアに登録済み（pending）/ 試合一覧を取得済み（done）と最終探索時刻
+    - 試合ID: 取得待ち（pending）/ 保存済み（done）。取得に失敗した試合は pending のまま残し、再開時に再試行する
+    - 種にしたティア（再開時にリーグページを再取得しない）と収集統計のカウンター
+
+    書き込みはメモリに溜めて batch_size 件ごと・flush_interval 秒ごとに1トランザクションで反映する。
+    溜めた順に反映するため、プレイヤーの done は同じプレイヤーの試合IDの pending より先には書かれない。
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 5.0):
+        """
+        ジャーナルを開く（無ければ作成）
+
+        Args:
+            path: SQLite ファイルのパス
+            batch_size: まとめて反映する書き込み件数
+            flush_interval: 最後の反映からこの秒数が経ったら件数に関係なく反映する
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        self._pending_writes: List[Tuple[str, tuple]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'CrawlJournal':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock:
+            self._pending_writes.append((sql, params))
+            if (len(self._pending_writes) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        writes, self._pending_writes = self._pending_writes, []
+        self._last_flush = time.monotonic()
+        if not writes:
+            return
+        try:
+            self._conn.execute('BEGIN')
+            for sql, params in writes:
+                self._conn.execute(sql, params)
+            self._conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            self._conn.execute('ROLLBACK')
+            logger.error(f"クロールジャーナルの書き込みエラー: {e}")
+
+    def flush(self):
+        """溜めている書き込みを反映"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """反映して閉じる"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """溜めている書き込みを反映してから読む"""
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(sql, params).fetchall()
+
+    # プレイヤー
+
+    def record_player_pending(self, puuid: str, name: Optional[str] = None, tier_value: int = 0):
+        """フロンティアに登録したプレイヤーを記録（探索済みなら pending に戻し、最終探索時刻は残す）"""
+        self._write(
+            "INSERT INTO players (puuid, name, tier_value, status, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(puuid) DO UPDATE SET status = excluded.status, tier_value = excluded.tier_value, "
+            "updated_at = excluded.updated_at WHERE players.status != ?",
+            (puuid, name, tier_value, PENDING, time.time(), PENDING)
+        )
+
+    def record_player_done(self, puuid: str, crawled_at: Optional[float] = None):
+        """試合一覧を取得したプレイヤーを記録"""
+        crawled_at = crawled_at or time.time()
+        self._write(
+            "INSERT INTO players (puuid, status, last_crawled, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(puuid) DO UPDATE SET status = excluded.status, last_crawled = excluded.last_crawled, "
+            "updated_at = excluded.updated_at",
+            (puuid, DONE, crawled_at, crawled_at)
+        )
+
+    def pending_players(self) -> List[Tuple[str, Optional[str], int, float]]:
+        """未探索のプレイヤー (puuid, name, tier_value, last_crawled) の一覧"""
+        return self._query(
+            "SELECT puuid, name, tier_value, last_crawled FROM players WHERE status = ?", (PENDING,)
+        )
+
+    def crawled_players(self, since: float = 0.0) -> Dict[str, float]:
+        """since 以降に試合一覧を取得したプレイヤー → 最終探索時刻"""
+        return dict(self._query(
+            "SELECT puuid, last_crawled FROM players WHERE last_crawled > ?", (since,)
+        ))
+
+    # 試合
+
+    def record_matches_pending(self, match_ids: List[str], puuid: Optional[str] = None):
+        """取得を始める試合IDを記録（保存済みの記録は上書きしない）"""
+        now = time.time()
+        for match_id in match_ids:
+            self._write(
+                "INSERT OR IGNORE INTO matches (match_id, puuid, status, updated_at) VALUES (?, ?, ?, ?)",
+                (match_id, puuid, PENDING, now)
+            )
+
+    def record_match_done(self, match_id: str):
+        """保存した試合IDを記録"""
+        self._write(
+            "INSERT INTO matches (match_id, status, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(match_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+            (match_id, DONE, time.time())
+        )
+
+    def pending_matches(self) -> List[str]:
+        """取得待ちのまま中断した試合IDの一覧"""
+        return [row[0] for row in self._query("SELECT match_id FROM matches WHERE status = ?", (PENDING,))]
+
+    # 種・カウンター
+
+    def record_seeded_tier(self, tier: str):
+        """リーグページから種をまいたティアを記録"""
+        self._write("INSERT OR REPLACE INTO seeded_tiers (tier, seeded_at) VALUES (?, ?)", (tier, time.time()))
+
+    def seeded_tiers(self, since: float = 0.0) -> Set[str]:
+        """since 以降に種をまき終えたティア"""
+        return {row[0] for row in self._query("SELECT tier FROM seeded_tiers WHERE seeded_at > ?", (since,))}
+
+    def save_counters(self, counters: Dict[str, int]):
+        """収集統計のカウンターを保存"""
+        for name, value in counters.items():
+            self._write("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, int(value)))
+
+    def load_counters(self) -> Dict[str, int]:
+        """保存済みのカウンター"""
+        return dict(self._query("SELECT name, value FROM counters"))
+
+    def summary(self) -> Dict[str, int]:
+        """状態ごとの件数"""
+        summary = {}
+        for table in ('players', 'matches'):
+            for status, count in self._query(f"SELECT status, COUNT(*) FROM {table} GROUP BY status"):
+                summary[f"{table}_{status}"] = count
+        return summary
@@ -11,8 +11,37 @@ import json
 from datetime import datetime
 from contextlib import contextmanager
 
+from match_row_writer import (
+    KILL_ITEM_COLUMNS, MATCHUP_COLUMNS, MATCHUP_SOLO_KILL_COLUMNS, SOLO_KILL_COLUMNS, SOLO_KILL_STATS_TRIGGER,
+    SOLO_KILL_STATS_TRIGGER_NAME, MatchRowWriter, kill_item_values
+)
+from match_rows import STATS_COUNTER_FIELDS, MatchWrite, MatchWriteBatch
+
 logger = logging.getLogger(__name__)
 
+# 再分析で作り直す派生テーブル（外部キーの参照順）
+REBUILD_TABLES = ('matchups', 'solo_kills', 'kill_items')
+
+# 作り直し用テーブルに読み込んだ試合ID（<名前><接尾辞>）。ここに無い試合の行は入れ替え前に本番から写す
+REBUILD_MATCHES_TABLE = 'reanalyzed_matches'
+
+# 作り直したテーブルに付け直す外部キー: テーブル → [(列, 参照テーブル, 参照列)]
+# 参照先が作り直すテーブルなら同じ接尾辞のテーブルを参照し、入れ替え時に一緒に名前が変わる
+REBUILD_FOREIGN_KEYS = {
+    'matchups': [('match_id', 'matches', 'match_id'), ('player1_champion_id', 'champions', 'id'),
+                 ('player2_champion_id', 'champions', 'id')],
+    'solo_kills': [('match_id', 'matches', 'match_id'), ('matchup_id', 'matchups', 'id'),
+                   ('killer_champion_id', 'champions', 'id'), ('victim_champion_id', 'champions', 'id')],
+    'kill_items': [('solo_kill_id', 'solo_kills', 'id')],
+}
+
+STATS_COLUMNS = (
+    'champion1_id', 'champion2_id', 'lane', 'game_version',
+    'total_matchups', 'champion1_wins', 'champion2_wins', 'champion1_winrate', 'champion2_winrate',
+    'total_solo_kills', 'first_kill_time_sum', 'first_kill_count', 'avg_first_kill_time',
+)
+
+
 class RealtimeDatabaseManager:
     def get_1v1_matchup_features(self, limit: int = 10000) -> List[Dict]:
         """
@@ -64,10 +93,15 @@ class RealtimeDatabaseManager:
         データベース管理クラスを初期化
         
         Args:
-            **mysql_config: MySQL接続設定
+            **mysql_config: MySQL接続設定（pool_name / pool_size を含めるとコネクションプールの名前・上限を変更）
         """
+        mysql_config = dict(mysql_config)
+        self.pool_name = mysql_config.pop('pool_name', 'realtime_pool')
+        self.pool_size = mysql_config.pop('pool_size', 10)
         self.config = mysql_config
         self.connection_pool = None
+        # 派生テーブルの行のまとめ挿入（AUTO_INCREMENT の刻み幅を覚える）
+        self.row_writer = MatchRowWriter()
         self._init_connection_pool()
         
         logger.info("リアルタイムデータベース管理クラスを初期化しました")
@@ -76,8 +110,8 @@ class RealtimeDatabaseManager:
         """コネクションプールを初期化"""
         try:
             self.connection_pool = mysql.connector.pooling.MySQLConnectionPool(
-                pool_name="realtime_pool",
-                pool_size=10,
+                pool_name=self.pool_name,
+                pool_size=self.pool_size,
                 pool_reset_session=True,
                 **self.config
             )
@@ -102,30 +136,32 @@ class RealtimeDatabaseManager:
             if connection and connection.is_connected():
                 connection.close()
     
+    def _insert_game_version(self, cursor, version: str, release_date: str = None, is_active: bool = True):
+        """ゲームバージョンを挿入（呼び出し側のトランザクション内で実行）"""
+        query = """
+        INSERT IGNORE INTO game_versions (version, release_date, is_active)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        release_date = VALUES(release_date),
+        is_active = VALUES(is_active)
+        """
+        cursor.execute(query, (version, release_date, is_active))
+
     def insert_game_version(self, version: str, release_date: str = None, is_active: bool = True) -> bool:
         """ゲームバージョンを挿入"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                query = """
-                INSERT IGNORE INTO game_versions (version, release_date, is_active)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                release_date = VALUES(release_date),
-                is_active = VALUES(is_active)
-                """
-                
-                cursor.execute(query, (version, release_date, is_active))
+                self._insert_game_version(cursor, version, release_date, is_active)
                 conn.commit()
-                
+
                 logger.info(f"ゲームバージョンを挿入: {version}")
                 return True
-                
+
         except Error as e:
             logger.error(f"ゲームバージョン挿入エラー: {e}")
             return False
-    
+
     def insert_champion(self, champion_id: int, key_name: str, name: str, 
                        title: str = None, tags: List[str] = None, version: str = None) -> bool:
         """チャンピオン情報を挿入"""
@@ -191,365 +227,405 @@ class RealtimeDatabaseManager:
             logger.error(f"アイテム挿入エラー: {e}")
             return False
     
+    def _insert_match(self, cursor, match_data: Dict, tier: Optional[int], has_timeline: bool = False):
+        """試合情報を挿入（呼び出し側のトランザクション内で実行）"""
+        info = match_data.get('info', {})
+
+        query = """
+        INSERT INTO matches (
+            match_id, game_creation, game_duration, game_end_timestamp,
+            game_mode, game_type, game_version, map_id, platform_id,
+            queue_id, tournament_code, has_timeline, tier
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        game_duration = VALUES(game_duration),
+        has_timeline = VALUES(has_timeline)
+        """
+
+        values = (
+            match_data.get('metadata', {}).get('matchId'),
+            info.get('gameCreation', 0),
+            info.get('gameDuration', 0),
+            info.get('gameEndTimestamp', 0),
+            info.get('gameMode'),
+            info.get('gameType'),
+            info.get('gameVersion'),
+            info.get('mapId'),
+            info.get('platformId'),
+            info.get('queueId'),
+            info.get('tournamentCode'),
+            int(has_timeline),
+            tier,
+        )
+
+        cursor.execute(query, values)
+
     def insert_match(self, match_data: Dict, tier: int) -> bool:
-        game_version = match_data.get('info', {}).get('gameVersion')
-        self.insert_game_version(game_version)
         """試合情報を挿入"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                info = match_data.get('info', {})
-                match_id = match_data.get('metadata', {}).get('matchId')
-                
-                query = """
-                INSERT INTO matches (
-                    match_id, game_creation, game_duration, game_end_timestamp,
-                    game_mode, game_type, game_version, map_id, platform_id,
-                    queue_id, tournament_code, has_timeline, tier
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                game_duration = VALUES(game_duration),
-                has_timeline = VALUES(has_timeline)
-                """
-                
-                values = (
-                    match_id,
-                    info.get('gameCreation', 0),
-                    info.get('gameDuration', 0),
-                    info.get('gameEndTimestamp', 0),
-                    info.get('gameMode'),
-                    info.get('gameType'),
-                    info.get('gameVersion'),
-                    info.get('mapId'),
-                    info.get('platformId'),
-                    info.get('queueId'),
-                    info.get('tournamentCode'),
-                    0,  # has_timeline は後で更新
-                    tier,
-                )
-                
-                cursor.execute(query, values)
+                self._insert_game_version(cursor, match_data.get('info', {}).get('gameVersion'))
+                self._insert_match(cursor, match_data, tier)
                 conn.commit()
-                
-                logger.debug(f"試合情報を挿入: {match_id}")
+
+                logger.debug(f"試合情報を挿入: {match_data.get('metadata', {}).get('matchId')}")
                 return True
-                
+
         except Error as e:
             logger.error(f"試合挿入エラー: {e}")
             return False
-    
-    def insert_participant(self, match_id: str, participant_data: Dict) -> bool:
-        """参加者情報を挿入"""
+
+    @staticmethod
+    def _participant_values(match_id: str, participant_data: Dict) -> Tuple:
+        """参加者データを participants の列順の値に変換"""
+        return (
+            match_id,
+            participant_data.get('puuid'),
+            participant_data.get('participantId'),
+            participant_data.get('championId'),
+            participant_data.get('championName'),
+            participant_data.get('champLevel', 1),
+            participant_data.get('lane'),
+            participant_data.get('teamPosition'),
+            participant_data.get('teamId'),
+            participant_data.get('item0', 0),
+            participant_data.get('item1', 0),
+            participant_data.get('item2', 0),
+            participant_data.get('item3', 0),
+            participant_data.get('item4', 0),
+            participant_data.get('item5', 0),
+            participant_data.get('item6', 0),
+            participant_data.get('goldEarned', 0),
+            participant_data.get('goldSpent', 0),
+            participant_data.get('kills', 0),
+            participant_data.get('deaths', 0),
+            participant_data.get('assists', 0),
+            participant_data.get('win', False),
+            participant_data.get('totalDamageDealt', 0),
+            participant_data.get('totalDamageDealtToChampions', 0),
+            participant_data.get('totalDamageTaken', 0),
+            participant_data.get('magicDamageDealt', 0),
+            participant_data.get('physicalDamageDealt', 0),
+            participant_data.get('trueDamageDealt', 0),
+            participant_data.get('totalMinionsKilled', 0),
+            participant_data.get('neutralMinionsKilled', 0),
+            participant_data.get('visionScore', 0),
+            participant_data.get('wardsPlaced', 0),
+            participant_data.get('wardsKilled', 0),
+            participant_data.get('largestKillingSpree', 0),
+            participant_data.get('largestMultiKill', 0),
+            participant_data.get('longestTimeSpentLiving', 0)
+        )
+
+    def _insert_participants(self, cursor, match_id: str, participants: List[Dict]):
+        """参加者情報をまとめて挿入（呼び出し側のトランザクション内で実行）"""
+        if not participants:
+            return
+        query = """
+        INSERT INTO participants (
+            match_id, puuid, participant_id, champion_id, champion_name,
+            champion_level, lane, team_position, team_id,
+            item0, item1, item2, item3, item4, item5, item6,
+            gold_earned, gold_spent, kills, deaths, assists, win,
+            total_damage_dealt, total_damage_dealt_to_champions, total_damage_taken,
+            magic_damage_dealt, physical_damage_dealt, true_damage_dealt,
+            total_minions_killed, neutral_minions_killed,
+            vision_score, wards_placed, wards_killed,
+            largest_killing_spree, largest_multi_kill, longest_time_spent_living
+        ) VALUES (
+            %s, %s, %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s, %s, %s,
+            %s, %s, %s, %s, %s, %s, %s, %s
+        )
+        ON DUPLICATE KEY UPDATE
+        champion_level = VALUES(champion_level),
+        gold_earned = VALUES(gold_earned),
+        kills = VALUES(kills),
+        deaths = VALUES(deaths),
+        assists = VALUES(assists)
+        """
+        # executemany は INSERT ... VALUES を複数行の VALUES 1文に書き換えて送る
+        cursor.executemany(query, [self._participant_values(match_id, participant) for participant in participants])
+
+    def insert_participants(self, match_id: str, participants: List[Dict]) -> bool:
+        """試合の参加者情報をまとめて挿入"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                query = """
-                INSERT INTO participants (
-                    match_id, puuid, participant_id, champion_id, champion_name,
-                    champion_level, lane, team_position, team_id,
-                    item0, item1, item2, item3, item4, item5, item6,
-                    gold_earned, gold_spent, kills, deaths, assists, win,
-                    total_damage_dealt, total_damage_dealt_to_champions, total_damage_taken,
-                    magic_damage_dealt, physical_damage_dealt, true_damage_dealt,
-                    total_minions_killed, neutral_minions_killed,
-                    vision_score, wards_placed, wards_killed,
-                    largest_killing_spree, largest_multi_kill, longest_time_spent_living
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                ON DUPLICATE KEY UPDATE
-                champion_level = VALUES(champion_level),
-                gold_earned = VALUES(gold_earned),
-                kills = VALUES(kills),
-                deaths = VALUES(deaths),
-                assists = VALUES(assists)
-                """
-                
-                values = (
-                    match_id,
-                    participant_data.get('puuid'),
-                    participant_data.get('participantId'),
-                    participant_data.get('championId'),
-                    participant_data.get('championName'),
-                    participant_data.get('champLevel', 1),
-                    participant_data.get('lane'),
-                    participant_data.get('teamPosition'),
-                    participant_data.get('teamId'),
-                    participant_data.get('item0', 0),
-                    participant_data.get('item1', 0),
-                    participant_data.get('item2', 0),
-                    participant_data.get('item3', 0),
-                    participant_data.get('item4', 0),
-                    participant_data.get('item5', 0),
-                    participant_data.get('item6', 0),
-                    participant_data.get('goldEarned', 0),
-                    participant_data.get('goldSpent', 0),
-                    participant_data.get('kills', 0),
-                    participant_data.get('deaths', 0),
-                    participant_data.get('assists', 0),
-                    participant_data.get('win', False),
-                    participant_data.get('totalDamageDealt', 0),
-                    participant_data.get('totalDamageDealtToChampions', 0),
-                    participant_data.get('totalDamageTaken', 0),
-                    participant_data.get('magicDamageDealt', 0),
-                    participant_data.get('physicalDamageDealt', 0),
-                    participant_data.get('trueDamageDealt', 0),
-                    participant_data.get('totalMinionsKilled', 0),
-                    participant_data.get('neutralMinionsKilled', 0),
-                    participant_data.get('visionScore', 0),
-                    participant_data.get('wardsPlaced', 0),
-                    participant_data.get('wardsKilled', 0),
-                    participant_data.get('largestKillingSpree', 0),
-                    participant_data.get('largestMultiKill', 0),
-                    participant_data.get('longestTimeSpentLiving', 0)
-                )
-                
-                cursor.execute(query, values)
+                self._insert_participants(cursor, match_id, participants)
                 conn.commit()
-                
-                logger.debug(f"参加者情報を挿入: {participant_data.get('championName')} (ID: {participant_data.get('participantId')})")
+
+                logger.debug(f"参加者情報を挿入: {match_id} - {len(participants)}人")
                 return True
-                
+
         except Error as e:
             logger.error(f"参加者挿入エラー: {e}")
             return False
-    
-    def insert_matchup(self, matchup_data: Dict) -> Optional[int]:
-        """対面データを挿入"""
+
+    def insert_participant(self, match_id: str, participant_data: Dict) -> bool:
+        """参加者情報を挿入"""
+        return self.insert_participants(match_id, [participant_data])
+
+    def insert_matchups(self, matchups: List[Dict]) -> Optional[List[int]]:
+        """対面データをまとめて挿入（ID は入力順）"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                query = """
-                INSERT INTO matchups (
-                    match_id, lane,
-                    player1_puuid, player1_participant_id, player1_champion_id, player1_champion_name,
-                    player1_level, player1_team_id,
-                    player2_puuid, player2_participant_id, player2_champion_id, player2_champion_name,
-                    player2_level, player2_team_id,
-                    player3_puuid, player3_participant_id, player3_champion_id, player3_champion_name,
-                    player3_level, player3_team_id,
-                    player4_puuid, player4_participant_id, player4_champion_id, player4_champion_name,
-                    player4_level, player4_team_id,
-                    level_diff, gold_diff, item_gold_diff, cs_diff, kda_diff,
-                    player1_win, player2_win, game_duration, game_version, game_creation
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                """
-                
-                values = (
-                    matchup_data.get('match_id'),
-                    matchup_data.get('lane'),
-                    matchup_data.get('player1_puuid'),
-                    matchup_data.get('player1_participant_id'),
-                    matchup_data.get('player1_champion_id'),
-                    matchup_data.get('player1_champion_name'),
-                    matchup_data.get('player1_level'),
-                    matchup_data.get('player1_team_id'),
-                    matchup_data.get('player2_puuid'),
-                    matchup_data.get('player2_participant_id'),
-                    matchup_data.get('player2_champion_id'),
-                    matchup_data.get('player2_champion_name'),
-                    matchup_data.get('player2_level'),
-                    matchup_data.get('player2_team_id'),
-                    matchup_data.get('player3_puuid'),
-                    matchup_data.get('player3_participant_id'),
-                    matchup_data.get('player3_champion_id'),
-                    matchup_data.get('player3_champion_name'),
-                    matchup_data.get('player3_level'),
-                    matchup_data.get('player3_team_id'),
-                    matchup_data.get('player4_puuid'),
-                    matchup_data.get('player4_participant_id'),
-                    matchup_data.get('player4_champion_id'),
-                    matchup_data.get('player4_champion_name'),
-                    matchup_data.get('player4_level'),
-                    matchup_data.get('player4_team_id'),
-                    matchup_data.get('level_diff'),
-                    matchup_data.get('gold_diff'),
-                    matchup_data.get('item_gold_diff'),
-                    matchup_data.get('cs_diff'),
-                    matchup_data.get('kda_diff'),
-                    matchup_data.get('player1_win'),
-                    matchup_data.get('player2_win'),
-                    matchup_data.get('game_duration'),
-                    matchup_data.get('game_version'),
-                    matchup_data.get('game_creation')
-                )
-                
-                cursor.execute(query, values)
-                matchup_id = cursor.lastrowid
+                matchup_ids = self.row_writer.insert_matchups(cursor, matchups)
                 conn.commit()
-                
-                logger.debug(f"対面データを挿入: {matchup_data.get('lane')} (ID: {matchup_id})")
-                return matchup_id
-                
-        except Error as e:
+
+                logger.debug(f"対面データを挿入: {len(matchup_ids)}件")
+                return matchup_ids
+
+        except (Error, RuntimeError) as e:
             logger.error(f"対面データ挿入エラー: {e}")
             return None
-    
-    def insert_solo_kill(self, solo_kill_data: Dict) -> Optional[int]:
-        """ソロキル情報を挿入"""
+
+    def insert_matchup(self, matchup_data: Dict) -> Optional[int]:
+        """対面データを挿入"""
+        matchup_ids = self.insert_matchups([matchup_data])
+        return matchup_ids[0] if matchup_ids else None
+
+    def insert_solo_kills(self, solo_kills: List[Dict]) -> Optional[List[int]]:
+        """ソロキル情報をまとめて挿入（ID は入力順、kill_items の solo_kill_id に使う）"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                query = """
-                INSERT INTO solo_kills (
-                    match_id, matchup_id, timestamp_ms, game_time_seconds,
-                    killer_participant_id, killer_champion_id, killer_champion_name,
-                    killer_level, killer_gold, killer_position_x, killer_position_y,
-                    victim_participant_id, victim_champion_id, victim_champion_name,
-                    victim_level, victim_gold, victim_position_x, victim_position_y,
-                    level_diff, gold_diff, is_first_blood, is_shutdown, bounty_gold
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                """
-                
-                values = (
-                    solo_kill_data.get('match_id'),
-                    solo_kill_data.get('matchup_id'),
-                    solo_kill_data.get('timestamp_ms'),
-                    solo_kill_data.get('game_time_seconds'),
-                    solo_kill_data.get('killer_participant_id'),
-                    solo_kill_data.get('killer_champion_id'),
-                    solo_kill_data.get('killer_champion_name'),
-                    solo_kill_data.get('killer_level'),
-                    solo_kill_data.get('killer_gold'),
-                    solo_kill_data.get('killer_position_x'),
-                    solo_kill_data.get('killer_position_y'),
-                    solo_kill_data.get('victim_participant_id'),
-                    solo_kill_data.get('victim_champion_id'),
-                    solo_kill_data.get('victim_champion_name'),
-                    solo_kill_data.get('victim_level'),
-                    solo_kill_data.get('victim_gold'),
-                    solo_kill_data.get('victim_position_x'),
-                    solo_kill_data.get('victim_position_y'),
-                    solo_kill_data.get('level_diff'),
-                    solo_kill_data.get('gold_diff'),
-                    solo_kill_data.get('is_first_blood'),
-                    solo_kill_data.get('is_shutdown'),
-                    solo_kill_data.get('bounty_gold')
-                )
-                
-                cursor.execute(query, values)
-                solo_kill_id = cursor.lastrowid
+                solo_kill_ids = self.row_writer.insert_solo_kills(cursor, solo_kills)
                 conn.commit()
-                
-                logger.debug(f"ソロキル情報を挿入: ID {solo_kill_id}")
-                return solo_kill_id
-                
-        except Error as e:
+
+                logger.debug(f"ソロキル情報を挿入: {len(solo_kill_ids)}件")
+                return solo_kill_ids
+
+        except (Error, RuntimeError) as e:
             logger.error(f"ソロキル挿入エラー: {e}")
             return None
-    
-    def insert_kill_items(self, solo_kill_id: int, participant_id: int, 
-                         participant_type: str, items: List[int], total_value: int = 0) -> bool:
-        """キル時アイテム情報を挿入"""
+
+    def insert_solo_kill(self, solo_kill_data: Dict) -> Optional[int]:
+        """ソロキル情報を挿入"""
+        solo_kill_ids = self.insert_solo_kills([solo_kill_data])
+        return solo_kill_ids[0] if solo_kill_ids else None
+
+    def insert_kill_item_rows(self, kill_items: List[Dict]) -> bool:
+        """
+        キル時アイテム情報をまとめて挿入
+
+        Args:
+            kill_items: solo_kill_id / participant_id / participant_type / items / total_item_value の辞書
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                query = """
-                INSERT INTO kill_items (
-                    solo_kill_id, participant_id, participant_type,
-                    item0, item1, item2, item3, item4, item5, item6, total_item_value
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                # アイテムリストを7個に調整
-                items_padded = (items + [0] * 7)[:7]
-                
-                values = (
-                    solo_kill_id, participant_id, participant_type,
-                    *items_padded, total_value
-                )
-                
-                cursor.execute(query, values)
+                self.row_writer.insert_kill_item_rows(cursor, kill_items)
                 conn.commit()
-                
-                logger.debug(f"キル時アイテム情報を挿入: ソロキルID {solo_kill_id}, 参加者 {participant_id}")
+
+                logger.debug(f"キル時アイテム情報を挿入: {len(kill_items)}件")
                 return True
-                
+
         except Error as e:
             logger.error(f"キル時アイテム挿入エラー: {e}")
             return False
-    
-    def update_realtime_stats(self, champion1_id: int, champion2_id: int, 
-                            lane: str, game_version: str) -> bool:
-        """リアルタイム統計を更新"""
+
+    def insert_kill_items(self, solo_kill_id: int, participant_id: int,
+                         participant_type: str, items: List[int], total_value: int = 0) -> bool:
+        """キル時アイテム情報を挿入"""
+        return self.insert_kill_item_rows([{
+            'solo_kill_id': solo_kill_id,
+            'participant_id': participant_id,
+            'participant_type': participant_type,
+            'items': items,
+            'total_item_value': total_value,
+        }])
+
+    @staticmethod
+    def _stats_values(key: Tuple, counters: Dict) -> Tuple:
+        """集計値を realtime_winrate_stats の列順（STATS_COLUMNS）の値に変換（勝率・平均も計算）"""
+        total = counters['total_matchups']
+        return (
+            *key,
+            total,
+            counters['champion1_wins'],
+            counters['champion2_wins'],
+            round(counters['champion1_wins'] * 100 / total, 2) if total else 0,
+            round(counters['champion2_wins'] * 100 / total, 2) if total else 0,
+            counters['total_solo_kills'],
+            counters['first_kill_time_sum'],
+            counters['first_kill_count'],
+            counters['first_kill_time_sum'] // counters['first_kill_count'] if counters['first_kill_count'] else 0,
+        )
+
+    def _apply_stats_deltas(self, cursor, deltas: List[Dict]):
+        """
+        realtime_winrate_stats に差分を加算（呼び出し側のトランザクション内で実行）
+
+        勝率・平均は加算後のカウンターから計算する。ON DUPLICATE KEY UPDATE の代入は左から順に
+        評価され、後の式は更新後の値を参照する。1試合あたりの処理量は履歴の件数に依らない。
+        """
+        if not deltas:
+            return
+        query = f"""
+        INSERT INTO realtime_winrate_stats ({', '.join(STATS_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(STATS_COLUMNS))})
+        ON DUPLICATE KEY UPDATE
+            total_matchups = total_matchups + VALUES(total_matchups),
+            champion1_wins = champion1_wins + VALUES(champion1_wins),
+            champion2_wins = champion2_wins + VALUES(champion2_wins),
+            champion1_winrate = ROUND(champion1_wins * 100 / total_matchups, 2),
+            champion2_winrate = ROUND(champion2_wins * 100 / total_matchups, 2),
+            total_solo_kills = total_solo_kills + VALUES(total_solo_kills),
+            first_kill_time_sum = first_kill_time_sum + VALUES(first_kill_time_sum),
+            first_kill_count = first_kill_count + VALUES(first_kill_count),
+            avg_first_kill_time = IF(first_kill_count > 0, first_kill_time_sum DIV first_kill_count, 0)
+        """
+        cursor.executemany(query, [self._stats_values(delta['key'], delta) for delta in deltas])
+
+    def recompute_realtime_stats(self, repair: bool = True, game_version: str = None) -> Optional[Dict[str, int]]:
+        """
+        matchups から realtime_winrate_stats を集計し直し、差分更新で保守した値と突き合わせる（オフライン処理）
+
+        集計中に書き込まれた差分との整合は取らないため、repair する場合は収集を止めてから実行する。
+
+        Args:
+            repair: 一致しない行を集計値で上書きし、対面データのない行を削除するか
+            game_version: 対象のゲームバージョン（None なら全バージョン）
+
+        Returns:
+            keys（集計したキー数）/ mismatched / missing / stale の件数と repaired。失敗したら None
+        """
+        where = "WHERE game_version = %s" if game_version else ""
+        params = (game_version,) if game_version else ()
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                # 統計を再計算
-                stats_query = """
-                SELECT 
-                    COUNT(*) as total_matchups,
-                    SUM(CASE WHEN player1_win = 1 THEN 1 ELSE 0 END) as champion1_wins,
-                    SUM(CASE WHEN player2_win = 1 THEN 1 ELSE 0 END) as champion2_wins,
-                    COALESCE(SUM(total_solo_kills), 0) as total_solo_kills,
-                    AVG(CASE WHEN first_blood_time > 0 THEN first_blood_time ELSE NULL END) as avg_first_kill_time
-                FROM matchups 
-                WHERE (player1_champion_id = %s AND player2_champion_id = %s)
-                   OR (player1_champion_id = %s AND player2_champion_id = %s)
-                   AND lane = %s AND game_version = %s
-                """
-                
-                cursor.execute(stats_query, (champion1_id, champion2_id, champion2_id, champion1_id, lane, game_version))
-                stats = cursor.fetchone()
-                
-                if stats and stats[0] > 0:
-                    total_matchups, champion1_wins, champion2_wins, total_solo_kills, avg_first_kill_time = stats
-                    
-                    champion1_winrate = (champion1_wins / total_matchups) * 100
-                    champion2_winrate = (champion2_wins / total_matchups) * 100
-                    
-                    # 統計を更新
-                    update_query = """
-                    INSERT INTO realtime_winrate_stats (
-                        champion1_id, champion2_id, lane, game_version,
-                        total_matchups, champion1_wins, champion2_wins,
-                        champion1_winrate, champion2_winrate, total_solo_kills,
-                        avg_first_kill_time
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        total_matchups = VALUES(total_matchups),
-                        champion1_wins = VALUES(champion1_wins),
-                        champion2_wins = VALUES(champion2_wins),
-                        champion1_winrate = VALUES(champion1_winrate),
-                        champion2_winrate = VALUES(champion2_winrate),
-                        total_solo_kills = VALUES(total_solo_kills),
-                        avg_first_kill_time = VALUES(avg_first_kill_time)
-                    """
-                    
-                    cursor.execute(update_query, (
-                        champion1_id, champion2_id, lane, game_version,
-                        total_matchups, champion1_wins, champion2_wins,
-                        champion1_winrate, champion2_winrate, total_solo_kills,
-                        avg_first_kill_time or 0
-                    ))
-                    
+                cursor.execute(f"""
+                SELECT player1_champion_id, player2_champion_id, lane, game_version,
+                       COUNT(*),
+                       SUM(player1_win = 1),
+                       SUM(player2_win = 1),
+                       COALESCE(SUM(total_solo_kills), 0),
+                       COALESCE(SUM(CASE WHEN first_blood_time > 0 THEN first_blood_time ELSE 0 END), 0),
+                       SUM(first_blood_time > 0)
+                FROM matchups
+                {where}
+                GROUP BY player1_champion_id, player2_champion_id, lane, game_version
+                """, params)
+                expected = {
+                    tuple(row[:4]): dict(zip(STATS_COUNTER_FIELDS, (int(value or 0) for value in row[4:])))
+                    for row in cursor.fetchall()
+                }
+
+                cursor.execute(f"""
+                SELECT champion1_id, champion2_id, lane, game_version, {', '.join(STATS_COUNTER_FIELDS)}
+                FROM realtime_winrate_stats
+                {where}
+                """, params)
+                current = {
+                    tuple(row[:4]): dict(zip(STATS_COUNTER_FIELDS, (int(value or 0) for value in row[4:])))
+                    for row in cursor.fetchall()
+                }
+
+                mismatched = [key for key, counters in expected.items() if key in current and current[key] != counters]
+                missing = [key for key in expected if key not in current]
+                stale = [key for key in current if key not in expected]
+                result = {
+                    'keys': len(expected),
+                    'mismatched': len(mismatched),
+                    'missing': len(missing),
+                    'stale': len(stale),
+                    'repaired': False,
+                }
+                if mismatched or missing or stale:
+                    logger.warning(f"リアルタイム統計の不一致: {result}")
+
+                if repair and (mismatched or missing or stale):
+                    assignments = ', '.join(f"{column} = VALUES({column})" for column in STATS_COLUMNS[4:])
+                    cursor.executemany(f"""
+                    INSERT INTO realtime_winrate_stats ({', '.join(STATS_COLUMNS)})
+                    VALUES ({', '.join(['%s'] * len(STATS_COLUMNS))})
+                    ON DUPLICATE KEY UPDATE {assignments}
+                    """, [self._stats_values(key, expected[key]) for key in sorted(mismatched + missing)])
+                    if stale:
+                        cursor.executemany("""
+                        DELETE FROM realtime_winrate_stats
+                        WHERE champion1_id = %s AND champion2_id = %s AND lane = %s AND game_version = %s
+                        """, sorted(stale))
                     conn.commit()
-                    logger.debug(f"リアルタイム統計を更新: {champion1_id} vs {champion2_id} ({lane})")
-                    return True
-                
-                return False
-                
+                    result['repaired'] = True
+
+                logger.info(f"リアルタイム統計の再集計: {result}")
+                return result
+
         except Error as e:
-            logger.error(f"リアルタイム統計更新エラー: {e}")
-            return False
-    
+            logger.error(f"リアルタイム統計再集計エラー: {e}")
+            return None
+
+    def _write_match(self, cursor, match_write: MatchWrite) -> Dict[str, int]:
+        """1試合分の行をテーブルごとにまとめて挿入して件数を返す（呼び出し側のトランザクション内で実行）"""
+        self._insert_match(cursor, match_write.match_data, match_write.tier, match_write.has_timeline)
+        self._insert_participants(cursor, match_write.match_id, match_write.participants)
+        return self.row_writer.write_matchup_rows(cursor, match_write.matchup_rows)
+
+    def write_match_batch(self, batch: MatchWriteBatch) -> Optional[Dict[str, Optional[Dict[str, int]]]]:
+        """
+        MatchWriteBatch の全試合を1つのコネクション・1トランザクションで書き込む
+
+        試合ごとに SAVEPOINT を置き、失敗した試合の行だけを巻き戻す（試合単位で原子的）。
+        リアルタイム統計は書き込めた試合の差分をキーごとにまとめ、同じトランザクションで加算する。
+
+        対面データが既にある試合（コミット直後に落ちて退避ファイルから読み直した・再取得と重複した再送）は
+        行も統計の差分も入れ直さず、挿入件数 0 の書き込み済みとして返す。
+
+        Args:
+            batch: 書き込む試合
+
+        Returns:
+            試合ID → 挿入件数（matchups / solo_kills / kill_items）。書き込めなかった試合は None。
+            接続・統計の加算・コミットに失敗してバッチ全体を書き込めなかったら None
+        """
+        if not batch:
+            return {}
+        results = {}
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                for version in batch.game_versions():
+                    self._insert_game_version(cursor, version)
+
+                stored = self.row_writer.stored_match_ids(cursor, [m.match_id for m in batch.matches])
+                written = []
+                for match_write in batch.matches:
+                    if match_write.match_id in stored:
+                        logger.debug(f"書き込み済みの試合を読み飛ばし: {match_write.match_id}")
+                        results.setdefault(match_write.match_id, {'matchups': 0, 'solo_kills': 0, 'kill_items': 0})
+                        continue
+                    cursor.execute("SAVEPOINT match_write")
+                    try:
+                        results[match_write.match_id] = self._write_match(cursor, match_write)
+                        cursor.execute("RELEASE SAVEPOINT match_write")
+                        written.append(match_write)
+                        if match_write.matchup_rows:
+                            # 同じバッチに同じ試合が2回入っていても2回目は読み飛ばす
+                            stored.add(match_write.match_id)
+                    except Exception as e:
+                        # 行の組み立てでの KeyError なども含め、その試合の行だけを巻き戻す
+                        logger.error(f"試合の書き込みエラー: {match_write.match_id} - {e}")
+                        cursor.execute("ROLLBACK TO SAVEPOINT match_write")
+                        results[match_write.match_id] = None
+
+                # 書き込めた試合の統計の差分を同じトランザクションで加算（失敗したらバッチ全体を取り消す）
+                self._apply_stats_deltas(cursor, MatchWriteBatch.stats_deltas(written))
+
+                conn.commit()
+                logger.debug(f"試合をまとめて書き込み: {len(written)}/{len(batch.matches)}試合")
+                return results
+
+        except Error as e:
+            logger.error(f"試合のまとめ書き込みエラー: {e}")
+            return None
+
     def get_realtime_winrate(self, champion1_id: int, champion2_id: int, 
                            lane: str, game_version: str = None) -> Optional[Dict]:
         """リアルタイム勝率を取得"""
@@ -584,6 +660,427 @@ class RealtimeDatabaseManager:
             logger.error(f"リアルタイム勝率取得エラー: {e}")
             return None
     
+    def get_player_ranks(self, puuids: List[str], fetched_after: datetime = None) -> List[Dict]:
+        """
+        保存済みのプレイヤーランクを取得
+        
+        Args:
+            puuids: PUUIDのリスト
+            fetched_after: この日時より後に取得したものだけを返す（TTL判定用）
+            
+        Returns:
+            player_ranks の行（辞書）のリスト
+        """
+        if not puuids:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                placeholders = ', '.join(['%s'] * len(puuids))
+                query = f"""
+                SELECT puuid, tier, rank_division, league_points, fetched_at
+                FROM player_ranks
+                WHERE puuid IN ({placeholders})
+                """
+                params = list(puuids)
+                
+                if fetched_after:
+                    query += " AND fetched_at > %s"
+                    params.append(fetched_after)
+                
+                cursor.execute(query, params)
+                return [dict(r) for r in cursor.fetchall()]
+                
+        except Error as e:
+            logger.error(f"プレイヤーランク取得エラー: {e}")
+            return []
+    
+    def upsert_player_ranks(self, ranks: List[Dict]) -> bool:
+        """
+        プレイヤーランクをまとめて保存
+        
+        Args:
+            ranks: puuid, tier, rank_division, league_points, fetched_at を持つ辞書のリスト
+            
+        Returns:
+            保存に成功したか
+        """
+        if not ranks:
+            return True
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                query = """
+                INSERT INTO player_ranks (puuid, tier, rank_division, league_points, fetched_at)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                tier = VALUES(tier),
+                rank_division = VALUES(rank_division),
+                league_points = VALUES(league_points),
+                fetched_at = VALUES(fetched_at)
+                """
+                
+                cursor.executemany(query, [
+                    (r['puuid'], r.get('tier'), r.get('rank_division'), r.get('league_points', 0), r['fetched_at'])
+                    for r in ranks
+                ])
+                conn.commit()
+                
+                logger.debug(f"プレイヤーランクを保存: {len(ranks)}件")
+                return True
+                
+        except Error as e:
+            logger.error(f"プレイヤーランク保存エラー: {e}")
+            return False
+
+    def get_player_watermarks(self, puuids: List[str]) -> List[Dict]:
+        """
+        プレイヤーの収集済み位置を取得
+        
+        Args:
+            puuids: PUUIDのリスト
+            
+        Returns:
+            player_watermarks の行（辞書）のリスト
+        """
+        if not puuids:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                placeholders = ', '.join(['%s'] * len(puuids))
+                cursor.execute(f"""
+                SELECT puuid, last_collected_game_end, backfill_anchor, backfill_depth, backfill_done
+                FROM player_watermarks
+                WHERE puuid IN ({placeholders})
+                """, list(puuids))
+                return [dict(r) for r in cursor.fetchall()]
+                
+        except Error as e:
+            logger.error(f"収集済み位置取得エラー: {e}")
+            return []
+    
+    def advance_player_watermark(self, puuid: str, game_end: int) -> bool:
+        """
+        収集済みの最新試合終了時刻を進める（既存の値より古ければ変更しない）
+        
+        Args:
+            puuid: PUUID
+            game_end: 試合終了時刻（ミリ秒）
+            
+        Returns:
+            保存に成功したか
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO player_watermarks (puuid, last_collected_game_end)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                last_collected_game_end = GREATEST(COALESCE(last_collected_game_end, 0), VALUES(last_collected_game_end))
+                """, (puuid, game_end))
+                conn.commit()
+                return True
+                
+        except Error as e:
+            logger.error(f"収集済み位置保存エラー: {e}")
+            return False
+    
+    def update_player_backfill(self, puuid: str, anchor: int, depth: int, done: bool) -> bool:
+        """
+        過去方向の取得位置を保存
+        
+        Args:
+            puuid: PUUID
+            anchor: endTime に固定する時刻（秒）
+            depth: 一覧を取得済みの件数
+            done: 設定した深さまで、または履歴の最後まで取得したか
+            
+        Returns:
+            保存に成功したか
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO player_watermarks (puuid, backfill_anchor, backfill_depth, backfill_done)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                backfill_anchor = VALUES(backfill_anchor),
+                backfill_depth = VALUES(backfill_depth),
+                backfill_done = VALUES(backfill_done)
+                """, (puuid, anchor, depth, done))
+                conn.commit()
+                return True
+                
+        except Error as e:
+            logger.error(f"過去方向の取得位置保存エラー: {e}")
+            return False
+
+    def iter_match_ids(self, batch_size: int = 50000):
+        """
+        保存済みの試合IDを順に返す（match_id 順のキーセットページング）
+
+        Args:
+            batch_size: 1回のクエリで読む件数
+
+        Yields:
+            試合ID
+        """
+        last_match_id = ''
+        while True:
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "SELECT match_id FROM matches WHERE match_id > %s ORDER BY match_id LIMIT %s",
+                        (last_match_id, batch_size)
+                    )
+                    rows = cursor.fetchall()
+            except Error as e:
+                logger.error(f"試合ID一覧取得エラー: {e}")
+                raise
+
+            for (match_id,) in rows:
+                yield match_id
+            if len(rows) < batch_size:
+                return
+            last_match_id = rows[-1][0]
+
+    def get_existing_match_ids(self, match_ids: List[str]) -> Optional[set]:
+        """
+        保存済みの試合IDを1回の IN クエリで確認
+
+        Args:
+            match_ids: 確認する試合IDのリスト
+
+        Returns:
+            保存済みの試合IDの集合。エラー時は None
+        """
+        if not match_ids:
+            return set()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                placeholders = ', '.join(['%s'] * len(match_ids))
+                cursor.execute(f"SELECT match_id FROM matches WHERE match_id IN ({placeholders})", list(match_ids))
+                return {row[0] for row in cursor.fetchall()}
+
+        except Error as e:
+            logger.error(f"保存済み試合ID確認エラー: {e}")
+            return None
+
+    def create_rebuild_tables(self, suffix: str = '_rebuild') -> bool:
+        """
+        派生テーブルと同じ定義の空の作り直し用テーブルと、読み込んだ試合IDの表を作成（前回の残りは削除）
+
+        CREATE TABLE ... LIKE は外部キーとトリガーを写さないため、外部キーは読み込み後に
+        add_rebuild_foreign_keys で付け、トリガーは入れ替え時に swap_rebuild_tables で付け直す。
+
+        Args:
+            suffix: 作り直し用テーブルの接尾辞
+
+        Returns:
+            成功したか
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                for table in reversed(REBUILD_TABLES):
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}{suffix}")
+                for table in REBUILD_TABLES:
+                    cursor.execute(f"CREATE TABLE {table}{suffix} LIKE {table}")
+                cursor.execute(f"DROP TABLE IF EXISTS {REBUILD_MATCHES_TABLE}{suffix}")
+                cursor.execute(f"""
+                CREATE TABLE {REBUILD_MATCHES_TABLE}{suffix} (
+                    match_id VARCHAR(50) NOT NULL PRIMARY KEY
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+                """)
+                conn.commit()
+                logger.info(f"作り直し用テーブルを作成しました: {[t + suffix for t in REBUILD_TABLES]}")
+                return True
+
+        except Error as e:
+            logger.error(f"作り直し用テーブル作成エラー: {e}")
+            return False
+
+    def get_derived_max_ids(self) -> Optional[Dict[str, int]]:
+        """
+        本番の matchups / solo_kills の最大 id（作り直す行の id をこれより後から採番し、写した行の id と重ねない）
+
+        Returns:
+            テーブル名 → 最大 id（空なら 0）。エラー時は None
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                max_ids = {}
+                for table in ('matchups', 'solo_kills'):
+                    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+                    max_ids[table] = int(cursor.fetchone()[0])
+                return max_ids
+
+        except Error as e:
+            logger.error(f"派生テーブルの最大ID取得エラー: {e}")
+            return None
+
+    def load_rebuild_rows(self, matchups: List[Dict], solo_kills: List[Dict], kill_items: List[Dict],
+                          suffix: str = '_rebuild', match_ids: List[str] = ()) -> bool:
+        """
+        作り直し用テーブルに行をまとめて挿入（1トランザクション）
+
+        作り直し用テーブルは他から書き込まれないため、id は呼び出し側で採番して明示する。
+        matchups のソロキル列（MATCHUP_SOLO_KILL_COLUMNS）は作り直し用テーブルにトリガーが無いため行の値を入れる。
+
+        Args:
+            matchups: id と MATCHUP_SOLO_KILL_COLUMNS を含む matchups の行
+            solo_kills: id と matchup_id を含む solo_kills の行
+            kill_items: solo_kill_id / participant_id / participant_type / items / total_item_value
+            suffix: 作り直し用テーブルの接尾辞
+            match_ids: 行を作り直した試合ID（対面データが無い試合も含む）
+
+        Returns:
+            成功したか
+        """
+        def insert_sql(table: str, columns: tuple) -> str:
+            return f"INSERT INTO {table}{suffix} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if match_ids:
+                    cursor.executemany(f"INSERT INTO {REBUILD_MATCHES_TABLE}{suffix} (match_id) VALUES (%s)",
+                                       [(match_id,) for match_id in match_ids])
+                if matchups:
+                    matchup_columns = MATCHUP_COLUMNS + MATCHUP_SOLO_KILL_COLUMNS
+                    cursor.executemany(insert_sql('matchups', ('id',) + matchup_columns), [
+                        (row['id'],) + tuple(row[column] if column in MATCHUP_SOLO_KILL_COLUMNS else row.get(column)
+                                             for column in matchup_columns)
+                        for row in matchups
+                    ])
+                if solo_kills:
+                    cursor.executemany(insert_sql('solo_kills', ('id',) + SOLO_KILL_COLUMNS), [
+                        (row['id'],) + tuple(row.get(column) for column in SOLO_KILL_COLUMNS) for row in solo_kills
+                    ])
+                if kill_items:
+                    cursor.executemany(insert_sql('kill_items', KILL_ITEM_COLUMNS),
+                                       [kill_item_values(row) for row in kill_items])
+                conn.commit()
+                return True
+
+        except Error as e:
+            logger.error(f"作り直し用テーブルへの挿入エラー: {e}")
+            return False
+
+    def copy_unrebuilt_rows(self, suffix: str = '_rebuild') -> Optional[int]:
+        """
+        作り直さなかった試合（読み込み元に無い・分析できなかった試合）の行を本番から作り直し用テーブルへ写す
+
+        入れ替えはテーブル全体を置き換えるため、写さないとその試合の対面データ・ソロキル・キル時アイテムが消える。
+        matchups / solo_kills は id をそのまま写す（作り直した行は get_derived_max_ids より後から採番済み）。
+        kill_items はどこからも参照されないため id を振り直す。
+
+        Args:
+            suffix: 作り直し用テーブルの接尾辞
+
+        Returns:
+            行を写した試合数。エラー時は None
+        """
+        rebuilt = f"{REBUILD_MATCHES_TABLE}{suffix}"
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                SELECT COUNT(DISTINCT m.match_id) FROM matchups m
+                WHERE NOT EXISTS (SELECT 1 FROM {rebuilt} r WHERE r.match_id = m.match_id)
+                """)
+                copied_matches = int(cursor.fetchone()[0])
+                cursor.execute(f"""
+                INSERT INTO matchups{suffix} SELECT m.* FROM matchups m
+                WHERE NOT EXISTS (SELECT 1 FROM {rebuilt} r WHERE r.match_id = m.match_id)
+                """)
+                cursor.execute(f"""
+                INSERT INTO solo_kills{suffix} SELECT s.* FROM solo_kills s
+                WHERE NOT EXISTS (SELECT 1 FROM {rebuilt} r WHERE r.match_id = s.match_id)
+                """)
+                cursor.execute(f"""
+                INSERT INTO kill_items{suffix} ({', '.join(KILL_ITEM_COLUMNS)})
+                SELECT {', '.join('k.' + column for column in KILL_ITEM_COLUMNS)}
+                FROM kill_items k JOIN solo_kills s ON s.id = k.solo_kill_id
+                WHERE NOT EXISTS (SELECT 1 FROM {rebuilt} r WHERE r.match_id = s.match_id)
+                """)
+                conn.commit()
+                return copied_matches
+
+        except Error as e:
+            logger.error(f"作り直さなかった試合の行のコピーエラー: {e}")
+            return None
+
+    def add_rebuild_foreign_keys(self, suffix: str = '_rebuild') -> bool:
+        """作り直し用テーブルに本番テーブルと同じ外部キーを付ける（読み込み後に1回）"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                for table in REBUILD_TABLES:
+                    clauses = []
+                    for column, ref_table, ref_column in REBUILD_FOREIGN_KEYS[table]:
+                        if ref_table in REBUILD_TABLES:
+                            ref_table = f"{ref_table}{suffix}"
+                        clauses.append(
+                            f"ADD FOREIGN KEY ({column}) REFERENCES {ref_table}({ref_column}) "
+                            f"ON DELETE CASCADE ON UPDATE CASCADE"
+                        )
+                    cursor.execute(f"ALTER TABLE {table}{suffix} {', '.join(clauses)}")
+                conn.commit()
+                return True
+
+        except Error as e:
+            logger.error(f"作り直し用テーブルの外部キー追加エラー: {e}")
+            return False
+
+    def swap_rebuild_tables(self, suffix: str = '_rebuild', keep_old: bool = False) -> bool:
+        """
+        作り直し用テーブルと本番テーブルを1回の RENAME TABLE で入れ替える
+
+        RENAME TABLE は全テーブルをまとめて原子的に入れ替えるため、読み手は
+        古いテーブル一式か新しいテーブル一式のどちらかだけを見る。
+        solo_kills のトリガーは古いテーブルと一緒に移る（削除すれば消える）ため、新しい solo_kills に付け直す。
+
+        Args:
+            suffix: 作り直し用テーブルの接尾辞
+            keep_old: 入れ替え前のテーブルを <テーブル>_old として残すか
+
+        Returns:
+            成功したか
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                for table in reversed(REBUILD_TABLES):
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}_old")
+                renames = []
+                for table in REBUILD_TABLES:
+                    renames.append(f"{table} TO {table}_old")
+                    renames.append(f"{table}{suffix} TO {table}")
+                cursor.execute(f"RENAME TABLE {', '.join(renames)}")
+                # トリガー名はスキーマで一意のため、古いテーブルに移ったものを消してから作る
+                cursor.execute(f"DROP TRIGGER IF EXISTS {SOLO_KILL_STATS_TRIGGER_NAME}")
+                cursor.execute(SOLO_KILL_STATS_TRIGGER)
+                if not keep_old:
+                    for table in reversed(REBUILD_TABLES):
+                        cursor.execute(f"DROP TABLE {table}_old")
+                cursor.execute(f"DROP TABLE IF EXISTS {REBUILD_MATCHES_TABLE}{suffix}")
+                conn.commit()
+                logger.info(f"派生テーブルを入れ替えました: {list(REBUILD_TABLES)}")
+                return True
+
+        except Error as e:
+            logger.error(f"派生テーブル入れ替えエラー: {e}")
+            return False
+
     def get_database_stats(self) -> Dict[str, int]:
         """データベース統計を取得"""
         try:
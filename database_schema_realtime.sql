@@ -332,6 +332,8 @@ CREATE TABLE realtime_winrate_stats (
     
     -- 時間別統計
     avg_first_kill_time INT DEFAULT 0, -- 平均ファーストキル時間
+    first_kill_time_sum BIGINT DEFAULT 0, -- 最初のソロキル時間の合計（平均の分子、差分更新で加算）
+    first_kill_count INT DEFAULT 0,       -- ソロキルがあった対面数（平均の分母）
     early_game_kills INT DEFAULT 0,    -- 序盤キル数（0-15分）
     mid_game_kills INT DEFAULT 0,      -- 中盤キル数（15-25分）
     late_game_kills INT DEFAULT 0,     -- 終盤キル数（25分以降）
@@ -352,6 +354,26 @@ CREATE TABLE realtime_winrate_stats (
     FOREIGN KEY (game_version) REFERENCES game_versions(version) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- プレイヤーランクキャッシュテーブル（新規）
+CREATE TABLE player_ranks (
+    puuid VARCHAR(100) PRIMARY KEY,
+    tier VARCHAR(20) NULL, -- NULL はソロランク未参加
+    rank_division VARCHAR(5),
+    league_points INT DEFAULT 0,
+    fetched_at TIMESTAMP NOT NULL,
+    INDEX idx_player_ranks_fetched_at (fetched_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- プレイヤーごとの収集済み位置（新規）
+CREATE TABLE player_watermarks (
+    puuid VARCHAR(100) PRIMARY KEY,
+    last_collected_game_end BIGINT NULL, -- 収集済みの最も新しい試合の終了時刻（ミリ秒）
+    backfill_anchor INT NULL, -- 過去方向の取得で endTime に固定する時刻（秒）
+    backfill_depth INT DEFAULT 0, -- backfill_anchor 以前で一覧を取得済みの件数（次の start）
+    backfill_done BOOLEAN DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- 機械学習モデル情報テーブル（拡張）
 CREATE TABLE ml_models (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -442,21 +464,22 @@ BEGIN
 END$$
 
 -- ソロキルが挿入された時にmatchupsテーブルの統計を更新
+-- （match_row_writer.SOLO_KILL_STATS_TRIGGER と同じ定義。代入は左から評価されるためキラーを先に更新する）
 CREATE TRIGGER update_matchup_solo_kill_stats
 AFTER INSERT ON solo_kills
 FOR EACH ROW
 BEGIN
     UPDATE matchups 
     SET total_solo_kills = total_solo_kills + 1,
-        first_blood_time = CASE 
-            WHEN first_blood_time = 0 OR NEW.timestamp_ms < first_blood_time 
-            THEN NEW.timestamp_ms 
-            ELSE first_blood_time 
-        END,
         first_blood_killer_participant_id = CASE 
             WHEN first_blood_time = 0 OR NEW.timestamp_ms < first_blood_time 
             THEN NEW.killer_participant_id 
             ELSE first_blood_killer_participant_id 
+        END,
+        first_blood_time = CASE 
+            WHEN first_blood_time = 0 OR NEW.timestamp_ms < first_blood_time 
+            THEN NEW.timestamp_ms 
+            ELSE first_blood_time 
         END
     WHERE id = NEW.matchup_id;
 END$$
@@ -0,0 +1,45 @@
+"""
+Fast JSON
+orjson がインストールされていれば使い、無ければ標準の json にフォールバックする JSON 変換
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    JSON を解析
+
+    タイムラインは数百KBあるため、レスポンスのバイト列を
+    文字列に変換せずにそのまま解析する。
+
+    Args:
+        data: JSON のバイト列または文字列
+
+    Returns:
+        解析結果
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    UTF-8 の JSON バイト列に変換（空白なし）
+
+    Args:
+        obj: 変換するオブジェクト
+
+    Returns:
+        JSON のバイト列
+    """
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
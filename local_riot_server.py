@@ -0,0 +1,604 @@
+"""
+Local Riot API Stand-in Server
+ネットワーク無しで収集処理を計測するための Riot API 互換ローカルサーバー
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import fast_json
+from match_cache import MatchPayloadCache
+from rate_limiter import DEFAULT_APP_RATE_LIMITS, SlidingWindowBucket
+from riot_api_client import TIER_ORDER, resolve_endpoint_method
+
+logger = logging.getLogger(__name__)
+
+# メソッド単位の既定制限（本番の開発用キーに近い値）
+DEFAULT_METHOD_RATE_LIMITS: Dict[str, List[Tuple[int, int]]] = {
+    'match-v5.getMatch': [(2000, 10)],
+    'match-v5.getTimeline': [(2000, 10)],
+    'match-v5.getMatchIdsByPUUID': [(2000, 10)],
+    'league-v4.getLeagueEntries': [(50, 10)],
+    'league-v4.getLeagueEntriesByPUUID': [(20000, 10)],
+    'league-v4.getChallengerLeague': [(30, 10), (500, 600)],
+    'league-v4.getGrandmasterLeague': [(30, 10), (500, 600)],
+    'league-v4.getMasterLeague': [(30, 10), (500, 600)],
+}
+
+APEX_TIERS = ['CHALLENGER', 'GRANDMASTER', 'MASTER']
+DIVISIONS = ['I', 'II', 'III', 'IV']
+POSITIONS = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+LEAGUE_PAGE_SIZE = 205
+# 合成試合の開始時刻（2024-01-01 UTC、ミリ秒）と試合間隔
+SYNTHETIC_EPOCH_MS = 1704067200000
+SYNTHETIC_MATCH_INTERVAL_MS = 60 * 1000
+
+
+class SyntheticFixtures:
+    """
+    決定的に生成する合成データ
+
+    プレイヤー i は rounds × 10 試合に参加し、試合 k の参加者は
+    (k × step + j × stride) mod players（j = 0..9）で決まる。
+    逆算できるため、どのプレイヤーの試合履歴と試合参加者も互いに整合する。
+    """
+
+    def __init__(self, platform: str = 'jp1', players: int = 5000, rounds: int = 10, seed: int = 0):
+        """
+        Args:
+            platform: 試合IDのプレフィックスに使う地域
+            players: プレイヤー数
+            rounds: プレイヤーあたりの試合数 / 10
+            seed: 乱数シード
+        """
+        if players < 10:
+            raise ValueError("プレイヤー数は10以上が必要です")
+        self.platform = platform.upper()
+        self.players = players
+        self.rounds = rounds
+        self.seed = seed
+        self.stride = players // 10
+        # players と互いに素な刻み幅（逆元で参加試合を逆算する）
+        self.step = next(s for s in range(7, players * 2) if math.gcd(s, players) == 1)
+        self.step_inverse = pow(self.step, -1, players)
+
+    @property
+    def total_matches(self) -> int:
+        return self.players * self.rounds
+
+    @staticmethod
+    def puuid(index: int) -> str:
+        return f"synthetic-puuid-{index:07d}"
+
+    @staticmethod
+    def player_index(puuid: str) -> Optional[int]:
+        match = re.fullmatch(r'synthetic-puuid-(\d+)', puuid)
+        return int(match.group(1)) if match else None
+
+    def match_id(self, k: int) -> str:
+        return f"{self.platform}_{k + 1}"
+
+    def match_number(self, match_id: str) -> Optional[int]:
+        prefix, _, number = match_id.partition('_')
+        if prefix != self.platform or not number.isdigit():
+            return None
+        k = int(number) - 1
+        return k if 0 <= k < self.total_matches else None
+
+    def participants(self, k: int) -> List[int]:
+        return [(k * self.step + j * self.stride) % self.players for j in range(10)]
+
+    def tier_of(self, index: int) -> Tuple[str, str]:
+        """プレイヤーのティアとディビジョン（序数の高いティアほど番号が小さい）"""
+        per_tier = max(1, self.players // len(TIER_ORDER))
+        tier = list(reversed(TIER_ORDER))[min(index // per_tier, len(TIER_ORDER) - 1)]
+        if tier in APEX_TIERS:
+            return tier, 'I'
+        return tier, DIVISIONS[(index % per_tier) * len(DIVISIONS) // per_tier]
+
+    def _rng(self, *key) -> random.Random:
+        # 文字列シードはプロセスをまたいでも同じ乱数列になる
+        return random.Random(':'.join(str(part) for part in (self.seed,) + key))
+
+    def league_entry(self, index: int) -> Dict:
+        tier, division = self.tier_of(index)
+        return {
+            'leagueId': f"synthetic-{tier.lower()}",
+            'queueType': 'RANKED_SOLO_5x5',
+            'tier': tier,
+            'rank': division,
+            'puuid': self.puuid(index),
+            'summonerId': f"synthetic-summoner-{index:07d}",
+            'leaguePoints': self._rng('lp', index).randint(0, 99 if tier not in APEX_TIERS else 1500),
+            'wins': 50 + index % 50,
+            'losses': 50 + index % 37,
+            'veteran': False,
+            'inactive': False,
+            'freshBlood': False,
+            'hotStreak': False,
+        }
+
+    def league_entries(self, tier: str, division: str, page: int) -> List[Dict]:
+        members = [i for i in range(self.players) if self.tier_of(i) == (tier, division)]
+        start = (page - 1) * LEAGUE_PAGE_SIZE
+        return [self.league_entry(i) for i in members[start:start + LEAGUE_PAGE_SIZE]]
+
+    def apex_league(self, tier: str) -> Dict:
+        entries = []
+        for i in range(self.players):
+            if self.tier_of(i)[0] == tier:
+                entry = self.league_entry(i)
+                for key in ('leagueId', 'queueType', 'tier'):
+                    del entry[key]
+                entries.append(entry)
+        return {
+            'leagueId': f"synthetic-{tier.lower()}",
+            'tier': tier,
+            'name': f"Synthetic {tier.title()}",
+            'queue': 'RANKED_SOLO_5x5',
+            'entries': entries,
+        }
+
+    def match_numbers_for(self, index: int) -> List[int]:
+        """プレイヤーが参加した試合番号（新しい順）"""
+        numbers = []
+        for j in range(10):
+            k0 = ((index - j * self.stride) * self.step_inverse) % self.players
+            numbers.extend(k0 + m * self.players for m in range(self.rounds))
+        return sorted(numbers, reverse=True)
+
+    def match_ids(self, index: int, start: int = 0, count: int = 20,
+                  start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[str]:
+        numbers = self.match_numbers_for(index)
+        if start_time is not None:
+            numbers = [k for k in numbers if self._game_creation(k) // 1000 >= start_time]
+        if end_time is not None:
+            numbers = [k for k in numbers if self._game_creation(k) // 1000 <= end_time]
+        return [self.match_id(k) for k in numbers[start:start + count]]
+
+    @staticmethod
+    def _game_creation(k: int) -> int:
+        return SYNTHETIC_EPOCH_MS + k * SYNTHETIC_MATCH_INTERVAL_MS
+
+    def match(self, k: int) -> Dict:
+        rng = self._rng('match', k)
+        duration = rng.randint(15 * 60, 40 * 60)
+        blue_wins = rng.random() < 0.5
+        participants = []
+        for j, index in enumerate(self.participants(k)):
+            team_id = 100 if j < 5 else 200
+            champion_id = rng.randint(1, 950)
+            kills, deaths, assists = rng.randint(0, 15), rng.randint(0, 12), rng.randint(0, 20)
+            participants.append({
+                'participantId': j + 1,
+                'puuid': self.puuid(index),
+                'summonerName': f"Player{index}",
+                'riotIdGameName': f"Player{index}",
+                'riotIdTagline': 'SYN',
+                'championId': champion_id,
+                'championName': f"Champion{champion_id}",
+                'champLevel': rng.randint(11, 18),
+                'teamId': team_id,
+                'teamPosition': POSITIONS[j % 5],
+                'lane': POSITIONS[j % 5] if POSITIONS[j % 5] != 'UTILITY' else 'BOTTOM',
+                'win': blue_wins == (team_id == 100),
+                'kills': kills,
+                'deaths': deaths,
+                'assists': assists,
+                'goldEarned': rng.randint(6000, 18000),
+                'goldSpent': rng.randint(5000, 17000),
+                'totalMinionsKilled': rng.randint(20, 300),
+                'neutralMinionsKilled': rng.randint(0, 200),
+                'totalDamageDealtToChampions': rng.randint(3000, 50000),
+                'totalDamageTaken': rng.randint(5000, 50000),
+                'visionScore': rng.randint(5, 90),
+                **{f"item{slot}": rng.choice([0, 1001, 3006, 3031, 3071, 3089, 3157]) for slot in range(7)},
+            })
+        return {
+            'metadata': {
+                'dataVersion': '2',
+                'matchId': self.match_id(k),
+                'participants': [p['puuid'] for p in participants],
+            },
+            'info': {
+                'gameCreation': self._game_creation(k),
+                'gameStartTimestamp': self._game_creation(k) + 30000,
+                'gameDuration': duration,
+                'gameEndTimestamp': self._game_creation(k) + 30000 + duration * 1000,
+                'gameMode': 'CLASSIC',
+                'gameVersion': '14.1.555.5555',
+                'mapId': 11,
+                'platformId': self.platform,
+                'queueId': 420,
+                'participants': participants,
+                'teams': [{'teamId': 100, 'win': blue_wins}, {'teamId': 200, 'win': not blue_wins}],
+            },
+        }
+
+    def timeline(self, k: int) -> Dict:
+        rng = self._rng('timeline', k)
+        duration = self._rng('match', k).randint(15 * 60, 40 * 60)
+        frames = []
+        levels = {pid: 1 for pid in range(1, 11)}
+        gold = {pid: 500 for pid in range(1, 11)}
+        for minute in range(duration // 60 + 1):
+            timestamp = minute * 60000
+            events = []
+            if 2 <= minute <= 20 and rng.random() < 0.25:
+                # 同じポジションの対面同士のキル
+                lane = rng.randrange(5)
+                killer, victim = (lane + 1, lane + 6) if rng.random() < 0.5 else (lane + 6, lane + 1)
+                events.append({
+                    'type': 'CHAMPION_KILL',
+                    'timestamp': timestamp + rng.randint(1000, 59000),
+                    'killerId': killer,
+                    'victimId': victim,
+                    'assistingParticipantIds': [],
+                    'bounty': 300,
+                    'shutdownBounty': 0,
+                    'position': {'x': rng.randint(0, 14000), 'y': rng.randint(0, 14000)},
+                })
+            participant_frames = {}
+            for pid in range(1, 11):
+                levels[pid] = min(18, 1 + minute * 2 // 3)
+                gold[pid] += rng.randint(250, 450)
+                participant_frames[str(pid)] = {
+                    'participantId': pid,
+                    'level': levels[pid],
+                    'currentGold': rng.randint(0, 1500),
+                    'totalGold': gold[pid],
+                    'xp': minute * 400,
+                    'minionsKilled': minute * 7,
+                    'jungleMinionsKilled': minute * 4 if pid in (2, 7) else 0,
+                    'position': {'x': rng.randint(0, 14000), 'y': rng.randint(0, 14000)},
+                }
+            frames.append({'timestamp': timestamp, 'participantFrames': participant_frames, 'events': events})
+        return {
+            'metadata': {'dataVersion': '2', 'matchId': self.match_id(k),
+                         'participants': [self.puuid(i) for i in self.participants(k)]},
+            'info': {'frameInterval': 60000, 'frames': frames},
+        }
+
+
+class ServerRateLimits:
+    """サーバー側のアプリ制限・メソッド制限（本番と同じく 429 の送信は数えない）"""
+
+    def __init__(self, app_limits: Optional[List[Tuple[int, int]]] = None,
+                 method_limits: Optional[Dict[str, List[Tuple[int, int]]]] = None):
+        self.app_limits = app_limits or DEFAULT_APP_RATE_LIMITS
+        self.method_limits = DEFAULT_METHOD_RATE_LIMITS if method_limits is None else method_limits
+        self.app_buckets = [SlidingWindowBucket(limit, window, margin=0) for limit, window in self.app_limits]
+        self.method_buckets: Dict[str, List[SlidingWindowBucket]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _format(limits: List[Tuple[int, int]]) -> str:
+        return ','.join(f"{limit}:{window}" for limit, window in limits)
+
+    def check(self, method: str) -> Tuple[Dict[str, str], Optional[str], float]:
+        """
+        リクエストを数え、レート制限ヘッダーを作成
+
+        Returns:
+            (ヘッダー, 超過した制限の種類（None なら許可）, Retry-After 秒数)
+        """
+        method_limits = self.method_limits.get(method, [])
+        with self._lock:
+            now = time.monotonic()
+            buckets = self.method_buckets.setdefault(
+                method, [SlidingWindowBucket(limit, window, margin=0) for limit, window in method_limits]
+            )
+            app_wait = max((b.wait_time(now) for b in self.app_buckets), default=0.0)
+            method_wait = max((b.wait_time(now) for b in buckets), default=0.0)
+
+            limit_type = None
+            retry_after = 0.0
+            if app_wait > 0:
+                limit_type, retry_after = 'application', app_wait
+            elif method_wait > 0:
+                limit_type, retry_after = 'method', method_wait
+            else:
+                for bucket in self.app_buckets + buckets:
+                    bucket.record(now)
+
+            headers = {
+                'X-App-Rate-Limit': self._format(self.app_limits),
+                'X-App-Rate-Limit-Count': ','.join(
+                    f"{len(b.timestamps)}:{b.window}" for b in self.app_buckets
+                ),
+            }
+            if method_limits:
+                headers['X-Method-Rate-Limit'] = self._format(method_limits)
+                headers['X-Method-Rate-Limit-Count'] = ','.join(
+                    f"{len(b.timestamps)}:{b.window}" for b in buckets
+                )
+        return headers, limit_type, retry_after
+
+
+class LocalRiotServer:
+    """
+    Riot API 互換のローカルサーバー
+
+    match-v5（試合・タイムライン・試合ID）、league-v4、summoner-v4、account-v1 を
+    記録済みペイロード（MatchPayloadCache）または SyntheticFixtures から返す。
+    本番と同形式のレート制限ヘッダーと 429、遅延・5xx の注入に対応する。
+
+    使用例:
+        with LocalRiotServer(latency=0.05) as server:
+            client = RiotAPIClient('RGAPI-local', base_url_override=server.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 fixtures: Optional[SyntheticFixtures] = None,
+                 recorded: Optional[MatchPayloadCache] = None,
+                 app_limits: Optional[List[Tuple[int, int]]] = None,
+                 method_limits: Optional[Dict[str, List[Tuple[int, int]]]] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0, error_rate: float = 0.0):
+        """
+        Args:
+            host: 待ち受けアドレス
+            port: 待ち受けポート（0 なら空きポート）
+            fixtures: 合成データ（None なら既定の SyntheticFixtures）
+            recorded: 記録済みの試合・タイムライン（あれば合成データより優先）
+            app_limits: アプリ制限 [(回数, ウィンドウ秒数), ...]
+            method_limits: メソッドごとの制限（None なら DEFAULT_METHOD_RATE_LIMITS）
+            latency: 応答までの基本遅延（秒）
+            latency_jitter: 遅延に加える乱数の上限（秒）
+            error_rate: 503 を返す確率
+        """
+        self.fixtures = fixtures or SyntheticFixtures()
+        self.recorded = recorded
+        self.rate_limits = ServerRateLimits(app_limits, method_limits)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> 'LocalRiotServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """バックグラウンドスレッドで待ち受けを開始"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='local-riot-server', daemon=True)
+        self._thread.start()
+        logger.info(f"ローカル Riot API サーバーを起動しました: {self.url}")
+
+    def stop(self):
+        """待ち受けを停止"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _recorded_payload(self, kind: str, match_id: str) -> Optional[Dict]:
+        return self.recorded.get(kind, match_id) if self.recorded else None
+
+    def route(self, path: str, query: Dict[str, List[str]]) -> Optional[object]:
+        """
+        パスに対応するペイロードを返す
+
+        Returns:
+            JSON に変換するペイロード。存在しなければ None（404）
+        """
+        fixtures = self.fixtures
+
+        def param(name, default=None, cast=int):
+            values = query.get(name)
+            return cast(values[0]) if values else default
+
+        m = re.fullmatch(r'/lol/match/v5/matches/by-puuid/([^/]+)/ids', path)
+        if m:
+            index = fixtures.player_index(m.group(1))
+            if index is None or index >= fixtures.players:
+                return []
+            return fixtures.match_ids(index, param('start', 0), min(param('count', 20), 100),
+                                      param('startTime'), param('endTime'))
+
+        m = re.fullmatch(r'/lol/match/v5/matches/([^/]+)(/timeline)?', path)
+        if m:
+            match_id, kind = m.group(1), 'timeline' if m.group(2) else 'match'
+            recorded = self._recorded_payload(kind, match_id)
+            if recorded is not None:
+                return recorded
+            k = fixtures.match_number(match_id)
+            if k is None:
+                return None
+            return fixtures.timeline(k) if kind == 'timeline' else fixtures.match(k)
+
+        m = re.fullmatch(r'/lol/league/v4/entries/by-puuid/([^/]+)', path)
+        if m:
+            index = fixtures.player_index(m.group(1))
+            return [fixtures.league_entry(index)] if index is not None and index < fixtures.players else []
+
+        m = re.fullmatch(r'/lol/league/v4/entries/RANKED_SOLO_5x5/([A-Z]+)/(I|II|III|IV)', path)
+        if m:
+            return fixtures.league_entries(m.group(1), m.group(2), param('page', 1))
+
+        m = re.fullmatch(r'/lol/league/v4/(challenger|grandmaster|master)leagues/by-queue/RANKED_SOLO_5x5', path)
+        if m:
+            return fixtures.apex_league(m.group(1).upper())
+
+        m = re.fullmatch(r'/lol/summoner/v4/summoners/by-puuid/([^/]+)', path)
+        if m:
+            index = fixtures.player_index(m.group(1))
+            if index is None:
+                return None
+            return {'id': f"synthetic-summoner-{index:07d}", 'puuid': fixtures.puuid(index),
+                    'summonerLevel': 100 + index % 400, 'profileIconId': 1}
+
+        m = re.fullmatch(r'/riot/account/v1/accounts/by-riot-id/Player(\d+)/([^/]+)', path)
+        if m:
+            index = int(m.group(1))
+            return {'puuid': fixtures.puuid(index), 'gameName': f"Player{index}", 'tagLine': m.group(2)}
+
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # ヘッダーと本文を別々に書き込むため、Nagle による遅延を避ける
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, status: int, body: object, headers: Dict[str, str]):
+                data = fast_json.dumps(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json;charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                method = resolve_endpoint_method(parsed.path)
+                server._count('requests')
+
+                if server.latency or server.latency_jitter:
+                    time.sleep(server.latency + random.uniform(0, server.latency_jitter))
+
+                headers, limit_type, retry_after = server.rate_limits.check(method)
+                if limit_type:
+                    server._count('rate_limited')
+                    headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                    headers['X-Rate-Limit-Type'] = limit_type
+                    self._send(429, {'status': {'message': 'Rate limit exceeded', 'status_code': 429}}, headers)
+                    return
+
+                if server.error_rate and random.random() < server.error_rate:
+                    server._count('errors')
+                    self._send(503, {'status': {'message': 'Service unavailable', 'status_code': 503}}, headers)
+                    return
+
+                payload = server.route(parsed.path, parse_qs(parsed.query))
+                if payload is None:
+                    self._send(404, {'status': {'message': 'Data not found', 'status_code': 404}}, headers)
+                else:
+                    self._send(200, payload, headers)
+
+        return Handler
+
+
+def run_crawl_benchmark(server: LocalRiotServer, player_count: int = 20,
+                        matches_per_player: int = 10) -> Dict:
+    """
+    ローカルサーバーに対して RiotAPIClient で収集と同じ順序の呼び出しを行い、スループットを計測
+
+    Args:
+        server: 起動済みのローカルサーバー
+        player_count: 対象プレイヤー数
+        matches_per_player: プレイヤーあたりの試合数
+
+    Returns:
+        計測結果（試合数・リクエスト数・429 回数・経過秒数・試合/秒）
+    """
+    from riot_api_client import RiotAPIClient
+
+    client = RiotAPIClient('RGAPI-local', base_url_override=server.url)
+    requests_before = server.stats['requests']
+    rate_limited_before = server.stats['rate_limited']
+    started = time.monotonic()
+
+    matches = 0
+    league = client.get_challenger_league() or {}
+    for entry in league.get('entries', [])[:player_count]:
+        for match_id in client.get_match_ids_by_puuid(entry['puuid'], count=matches_per_player) or []:
+            match_data = client.get_match_by_id(match_id)
+            if match_data and client.get_match_timeline(match_id):
+                client.get_match_average_tier_by_match_id(match_data)
+                matches += 1
+
+    elapsed = time.monotonic() - started
+    return {
+        'matches': matches,
+        'requests': server.stats['requests'] - requests_before,
+        'rate_limited': server.stats['rate_limited'] - rate_limited_before,
+        'elapsed_seconds': round(elapsed, 3),
+        'matches_per_second': round(matches / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+def main():
+    """ローカルサーバーを起動して待ち受ける"""
+    parser = argparse.ArgumentParser(description='Riot API 互換のローカルサーバー')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--players', type=int, default=5000, help='合成プレイヤー数')
+    parser.add_argument('--rounds', type=int, default=10, help='プレイヤーあたりの試合数 / 10')
+    parser.add_argument('--recorded-dir', help='記録済みペイロードの MatchPayloadCache ディレクトリ')
+    parser.add_argument('--app-limits', default='20:1,100:120', help='アプリ制限（例: 500:10,30000:600）')
+    parser.add_argument('--latency', type=float, default=0.0, help='基本遅延（秒）')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='遅延の揺らぎ（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 を返す確率')
+    parser.add_argument('--benchmark', action='store_true', help='待ち受けずに収集のスループットを計測して終了')
+    parser.add_argument('--benchmark-players', type=int, default=20)
+    parser.add_argument('--benchmark-matches', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    app_limits = [tuple(int(v) for v in pair.split(':')) for pair in args.app_limits.split(',')]
+    server = LocalRiotServer(
+        host=args.host,
+        port=args.port,
+        fixtures=SyntheticFixtures(players=args.players, rounds=args.rounds),
+        recorded=MatchPayloadCache(args.recorded_dir) if args.recorded_dir else None,
+        app_limits=app_limits,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate
+    )
+    server.start()
+    if args.benchmark:
+        try:
+            result = run_crawl_benchmark(server, args.benchmark_players, args.benchmark_matches)
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        finally:
+            server.stop()
+        return
+
+    print(f"ローカル Riot API サーバー: {server.url}  (Ctrl+C で停止)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"統計: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
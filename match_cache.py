@@ -0,0 +1,259 @@
+"""
+Persistent Match Payload Cache
+試合詳細・タイムラインのレスポンスを圧縮してディスクに保存するキャッシュ
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+import fast_json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows ではプロセス間のロックを取らない（同じディレクトリを複数プロセスで共有しないこと）
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 既定の上限サイズ（5GB）
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+# キャッシュディレクトリを共有する全プロセスの合計サイズを記録するファイルと、その更新・削除を直列化するロック
+SIZE_FILE = '.size'
+LOCK_FILE = '.lock'
+
+
+class MatchPayloadCache:
+    """
+    試合IDをキーにしたディスクキャッシュ
+
+    試合終了後の match-v5 / timeline レスポンスは変化しないため、
+    一度取得したペイロードは期限なしで再利用できる。
+    zstandard がインストールされていれば zstd、無ければ gzip で圧縮し、
+    合計サイズが上限を超えたら最終アクセスが古いファイルから削除する。
+
+    シャードごとのプロセスが同じディレクトリを使うため、合計サイズはディレクトリの SIZE_FILE に
+    ファイルロックの下で加算し、どのプロセスの書き込みも上限の判定に含める。
+    削除の前にはロックを取ったままディレクトリを測り直し、記録のずれ（書き込み途中の異常終了など）を直す。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        キャッシュを初期化
+
+        Args:
+            cache_dir: キャッシュディレクトリ
+            max_bytes: キャッシュ全体の上限サイズ（バイト）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.suffix = '.json.zst' if zstandard else '.json.gz'
+        self._lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._size_path = self.cache_dir / SIZE_FILE
+        self._lock_path = self.cache_dir / LOCK_FILE
+        with self._shared_lock():
+            total = self._read_size()
+            if total is None:
+                total = self._measure()
+                self._write_size(total)
+        # 最後に SIZE_FILE から読んだ全プロセスの合計
+        self.total_bytes = total
+
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(f"試合キャッシュを初期化しました: {self.cache_dir} ({self.total_bytes / 1024 ** 2:.1f}MB)")
+
+    def _iter_files(self):
+        return (path for path in self.cache_dir.glob('*/*/*.json.*')
+                if path.is_file() and not path.name.endswith('.tmp'))
+
+    def _measure(self) -> int:
+        """ディレクトリ内のキャッシュファイルの合計サイズ"""
+        total = 0
+        for path in self._iter_files():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    @contextmanager
+    def _shared_lock(self):
+        """スレッド間とプロセス間の両方で排他するロック（SIZE_FILE の更新と削除に使う）"""
+        with self._lock, open(self._lock_path, 'ab') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_size(self) -> Optional[int]:
+        """SIZE_FILE の合計サイズ（無い・読めなければ None、ロック取得済みで呼ぶ）"""
+        try:
+            return int(self._size_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_size(self, total: int):
+        """SIZE_FILE を書き換える（ロック取得済みで呼ぶ）"""
+        tmp_path = self._size_path.with_name(f"{SIZE_FILE}.{os.getpid()}.tmp")
+        tmp_path.write_text(str(max(total, 0)))
+        os.replace(tmp_path, self._size_path)
+
+    def _add_size(self, delta: int):
+        """全プロセスの合計サイズに加算し、上限を超えたら削除する"""
+        try:
+            with self._shared_lock():
+                total = self._read_size()
+                total = self._measure() if total is None else total + delta
+                self._write_size(total)
+                self.total_bytes = total
+                if total > self.max_bytes:
+                    self._evict()
+        except OSError as e:
+            logger.warning(f"キャッシュサイズの更新エラー: {e}")
+
+    def _path_for(self, kind: str, match_id: str, suffix: str) -> Path:
+        """キャッシュファイルのパス（試合IDのハッシュで2階層に分散）"""
+        digest = hashlib.sha1(match_id.encode('utf-8')).hexdigest()
+        return self.cache_dir / kind / digest[:2] / f"{match_id}{suffix}"
+
+    @staticmethod
+    def _compress(data: bytes) -> bytes:
+        if zstandard:
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(path: Path, data: bytes) -> bytes:
+        if path.name.endswith('.zst'):
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def get(self, kind: str, match_id: str) -> Optional[Dict]:
+        """
+        キャッシュからペイロードを取得
+
+        Args:
+            kind: 'match' または 'timeline'
+            match_id: 試合ID
+
+        Returns:
+            ペイロード。キャッシュに無い場合は None
+        """
+        suffixes = ('.json.zst', '.json.gz') if zstandard else ('.json.gz',)
+        for suffix in suffixes:
+            path = self._path_for(kind, match_id, suffix)
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"キャッシュ読み込みエラー: {path} - {e}")
+                continue
+
+            try:
+                payload = fast_json.loads(self._decompress(path, data))
+            except Exception as e:
+                logger.warning(f"破損したキャッシュを削除します: {path} - {e}")
+                self._remove(path)
+                continue
+
+            # LRU 判定のために最終アクセス時刻を更新
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.hits += 1
+            return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, kind: str, match_id: str, payload: Dict) -> bool:
+        """
+        ペイロードをキャッシュに保存
+
+        Args:
+            kind: 'match' または 'timeline'
+            match_id: 試合ID
+            payload: APIレスポンス
+
+        Returns:
+            保存に成功したか
+        """
+        path = self._path_for(kind, match_id, self.suffix)
+        try:
+            data = self._compress(fast_json.dumps(payload))
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # 書き込み途中のファイルを読まないよう一時ファイル経由で置き換える
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"キャッシュ書き込みエラー: {path} - {e}")
+            return False
+
+        self._add_size(len(data) - previous_size)
+        return True
+
+    def _remove(self, path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        self._add_size(-size)
+
+    def _evict(self):
+        """
+        上限の9割になるまで最終アクセスが古いファイルから削除（_shared_lock 取得済みで呼ぶ）
+
+        ディレクトリを測り直して SIZE_FILE を実際の合計に合わせる。上限の1割を空けるため、
+        全ファイルを走査するのはキャッシュ全体で上限の1割を書き込むごとに1回になる。
+        """
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for path in self._iter_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        self.total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if self.total_bytes <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self.total_bytes -= size
+            evicted += 1
+        self._write_size(self.total_bytes)
+
+        logger.info(f"試合キャッシュから {evicted}件を削除しました ({self.total_bytes / 1024 ** 2:.1f}MB)")
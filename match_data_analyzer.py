@@ -69,6 +69,17 @@ class MatchDataAnalyzer:
     def __init__(self):
         self.champion_data = {}
         self.item_data = {}
+        self.static_data = None
+    
+    def apply_static_data(self, static_data):
+        """
+        パッチバージョンの静的データ（検索用テーブル付き）を設定
+        
+        Args:
+            static_data: static_data_cache.StaticData
+        """
+        self.static_data = static_data
+        self.set_static_data(static_data.champion_data, static_data.item_data)
     
     def set_static_data(self, champion_data: Dict, item_data: Dict):
         """
@@ -229,6 +240,9 @@ class MatchDataAnalyzer:
         Returns:
             合計ゴールド価値
         """
+        if self.static_data:
+            return self.static_data.items_value(items)
+        
         total_gold = 0
         
         if not self.item_data:
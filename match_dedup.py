@@ -0,0 +1,148 @@
+"""
+Match Dedup Index
+処理済み試合IDをメモリ上の Bloom フィルターで判定し、DB への問い合わせをまとめる重複排除インデックス
+"""
+
+import hashlib
+import logging
+import math
+import threading
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 既定の想定件数と偽陽性率（500万件・0.1% で約 8.6MB）
+DEFAULT_CAPACITY = 5_000_000
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    """
+    bytearray を使った Bloom フィルター
+
+    False なら確実に未登録、True なら登録済みの可能性がある（偽陽性あり）。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+        """
+        Bloom フィルターを初期化
+
+        Args:
+            capacity: 想定する登録件数（超えると偽陽性率が上がる）
+            false_positive_rate: 想定件数での偽陽性率
+        """
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        """ダブルハッシュ法でビット位置を計算"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class MatchDedupIndex:
+    """
+    処理済み試合IDの重複排除インデックス
+
+    - 起動時に matches テーブルの試合IDを Bloom フィルターへ読み込む
+    - 試合IDのページ（最大100件）をまとめて判定し、フィルターが陽性と答えた
+      少数のIDだけを1回の IN クエリで確認する
+    - 読み込みに失敗した場合は全件を IN クエリで確認する
+    """
+
+    def __init__(self, db_manager=None, capacity: int = DEFAULT_CAPACITY,
+                 false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+        """
+        インデックスを初期化
+
+        Args:
+            db_manager: iter_match_ids / get_existing_match_ids を持つ RealtimeDatabaseManager
+            capacity: 想定する試合数
+            false_positive_rate: Bloom フィルターの偽陽性率
+        """
+        self.db_manager = db_manager
+        self.bloom = BloomFilter(capacity, false_positive_rate)
+        self.loaded = False
+        self._lock = threading.Lock()
+        self.stats = {'checked': 0, 'filtered_new': 0, 'confirm_queries': 0, 'confirmed_existing': 0,
+                      'false_positives': 0}
+
+    def load(self) -> int:
+        """
+        DB の試合IDをすべて読み込む
+
+        Returns:
+            読み込んだ件数（失敗時は 0 で、以降は全件を DB で確認する）
+        """
+        if self.db_manager is None:
+            return 0
+        loaded = 0
+        try:
+            for match_id in self.db_manager.iter_match_ids():
+                self.add(match_id)
+                loaded += 1
+        except Exception as e:
+            logger.error(f"処理済み試合IDの読み込みに失敗: {e}")
+            return 0
+        self.loaded = True
+        logger.info(f"処理済み試合IDを読み込みました: {loaded}件 "
+                    f"(Bloom {len(self.bloom.bits) / 1024 ** 2:.1f}MB, ハッシュ{self.bloom.num_hashes}個)")
+        return loaded
+
+    def add(self, match_id: str):
+        """保存した試合IDを登録"""
+        with self._lock:
+            self.bloom.add(match_id)
+
+    def might_contain(self, match_id: str) -> bool:
+        """登録済みの可能性があるか（False なら確実に未処理）"""
+        return not self.loaded or match_id in self.bloom
+
+    def filter_new(self, match_ids: Iterable[str]) -> List[str]:
+        """
+        未処理の試合IDだけを返す（順序は維持）
+
+        Args:
+            match_ids: 試合IDのページ
+
+        Returns:
+            未処理の試合IDのリスト
+        """
+        match_ids = list(match_ids)
+        candidates = [match_id for match_id in match_ids if self.might_contain(match_id)]
+
+        existing = set()
+        if candidates and self.db_manager is not None:
+            confirmed = self.db_manager.get_existing_match_ids(candidates)
+            # 確認に失敗したら未処理として扱う（write_match_batch が書き込み済みの試合を読み飛ばす）
+            existing = confirmed or set()
+
+        with self._lock:
+            self.stats['checked'] += len(match_ids)
+            self.stats['filtered_new'] += len(match_ids) - len(candidates)
+            if candidates and self.db_manager is not None:
+                self.stats['confirm_queries'] += 1
+                self.stats['confirmed_existing'] += len(existing)
+                if self.loaded:
+                    self.stats['false_positives'] += len(candidates) - len(existing)
+
+        return [match_id for match_id in match_ids if match_id not in existing]
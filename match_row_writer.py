@@ -0,0 +1,180 @@
+"""
+Match Row Writer
+matchups / solo_kills / kill_items の行をカーソルでまとめて挿入し、採番された ID で行同士を結び付ける
+
+mysql.connector に依存しない（DB-API のカーソルだけを使う）ため、RealtimeDatabaseManager から
+呼び出し側のトランザクション内で使う。
+"""
+
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from match_rows import KILL_ITEM_SLOTS
+
+logger = logging.getLogger(__name__)
+
+MATCHUP_COLUMNS = (
+    'match_id', 'lane',
+    'player1_puuid', 'player1_participant_id', 'player1_champion_id', 'player1_champion_name',
+    'player1_level', 'player1_team_id',
+    'player2_puuid', 'player2_participant_id', 'player2_champion_id', 'player2_champion_name',
+    'player2_level', 'player2_team_id',
+    'player3_puuid', 'player3_participant_id', 'player3_champion_id', 'player3_champion_name',
+    'player3_level', 'player3_team_id',
+    'player4_puuid', 'player4_participant_id', 'player4_champion_id', 'player4_champion_name',
+    'player4_level', 'player4_team_id',
+    'level_diff', 'gold_diff', 'item_gold_diff', 'cs_diff', 'kda_diff',
+    'player1_win', 'player2_win', 'game_duration', 'game_version', 'game_creation',
+)
+
+SOLO_KILL_COLUMNS = (
+    'match_id', 'matchup_id', 'timestamp_ms', 'game_time_seconds',
+    'killer_participant_id', 'killer_champion_id', 'killer_champion_name',
+    'killer_level', 'killer_gold', 'killer_position_x', 'killer_position_y',
+    'victim_participant_id', 'victim_champion_id', 'victim_champion_name',
+    'victim_level', 'victim_gold', 'victim_position_x', 'victim_position_y',
+    'level_diff', 'gold_diff', 'is_first_blood', 'is_shutdown', 'bounty_gold',
+)
+
+# 対面データの列のうち、ソロキルから決まる列（収集時は SOLO_KILL_STATS_TRIGGER が更新し、
+# 再分析では match_rows.matchup_solo_kill_stats で計算して明示する）
+MATCHUP_SOLO_KILL_COLUMNS = ('total_solo_kills', 'first_blood_time', 'first_blood_killer_participant_id')
+
+# solo_kills の挿入で matchups のソロキル列を更新するトリガー（database_schema_realtime.sql と同じ定義）
+# UPDATE の代入は左から評価されるため、キラーを first_blood_time より先に更新する
+SOLO_KILL_STATS_TRIGGER_NAME = 'update_matchup_solo_kill_stats'
+SOLO_KILL_STATS_TRIGGER = f"""
+CREATE TRIGGER {SOLO_KILL_STATS_TRIGGER_NAME}
+AFTER INSERT ON solo_kills
+FOR EACH ROW
+BEGIN
+    UPDATE matchups 
+    SET total_solo_kills = total_solo_kills + 1,
+        first_blood_killer_participant_id = CASE 
+            WHEN first_blood_time = 0 OR NEW.timestamp_ms < first_blood_time 
+            THEN NEW.killer_participant_id 
+            ELSE first_blood_killer_participant_id 
+        END,
+        first_blood_time = CASE 
+            WHEN first_blood_time = 0 OR NEW.timestamp_ms < first_blood_time 
+            THEN NEW.timestamp_ms 
+            ELSE first_blood_time 
+        END
+    WHERE id = NEW.matchup_id;
+END"""
+
+KILL_ITEM_COLUMNS = (
+    'solo_kill_id', 'participant_id', 'participant_type',
+    'item0', 'item1', 'item2', 'item3', 'item4', 'item5', 'item6', 'total_item_value',
+)
+
+# 複数行 VALUES の INSERT 1文あたりの最大行数（max_allowed_packet を超えないように分割）
+BULK_INSERT_ROWS = 500
+
+
+def kill_item_values(row: Dict) -> Tuple:
+    """kill_items の行（match_rows.kill_item_rows + solo_kill_id）を列順の値に変換"""
+    # アイテムリストを7個に調整
+    items_padded = (list(row['items']) + [0] * KILL_ITEM_SLOTS)[:KILL_ITEM_SLOTS]
+    return (row['solo_kill_id'], row['participant_id'], row['participant_type'],
+            *items_padded, row.get('total_item_value', 0))
+
+
+class MatchRowWriter:
+    """
+    派生テーブルの行をまとめて挿入する（コミットは呼び出し側）
+
+    auto_increment_increment はサーバー設定のため、最初の挿入時に1回だけ問い合わせて覚える。
+    """
+
+    def __init__(self):
+        self._auto_increment_step: Optional[int] = None
+
+    def auto_increment_increment(self, cursor) -> int:
+        """AUTO_INCREMENT の刻み幅（サーバー設定、初回だけ問い合わせる）"""
+        if self._auto_increment_step is None:
+            cursor.execute("SELECT @@SESSION.auto_increment_increment")
+            self._auto_increment_step = int(cursor.fetchone()[0] or 1)
+        return self._auto_increment_step
+
+    def stored_match_ids(self, cursor, match_ids: List[str]) -> Set[str]:
+        """
+        対面データを書き込み済みの試合ID（1回の IN クエリ）
+
+        matchups には unique_match_lane があり、書き込み済みの試合をもう一度挿入すると重複キーで失敗する。
+        """
+        if not match_ids:
+            return set()
+        placeholders = ', '.join(['%s'] * len(match_ids))
+        cursor.execute(f"SELECT DISTINCT match_id FROM matchups WHERE match_id IN ({placeholders})", list(match_ids))
+        return {row[0] for row in cursor.fetchall()}
+
+    def insert_rows_returning_ids(self, cursor, table: str, columns: Tuple[str, ...],
+                                  rows: List[Dict]) -> List[int]:
+        """
+        複数行 VALUES の INSERT でまとめて挿入し、採番された ID を行の順に返す
+
+        行数が決まっている INSERT には InnoDB が連続した AUTO_INCREMENT 値を割り当て、
+        LAST_INSERT_ID()（cursor.lastrowid）は最初の行の値を返す。
+        そのため ID は先頭から auto_increment_increment 刻みで rowcount 個並ぶ。
+
+        Raises:
+            RuntimeError: 挿入件数が行数と一致しない（ID を決められない）
+        """
+        ids = []
+        step = self.auto_increment_increment(cursor) if rows else 1
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        for start in range(0, len(rows), BULK_INSERT_ROWS):
+            chunk = rows[start:start + BULK_INSERT_ROWS]
+            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_placeholder] * len(chunk))}"
+            cursor.execute(query, [row.get(column) for row in chunk for column in columns])
+            if cursor.rowcount != len(chunk):
+                raise RuntimeError(f"{table} の挿入件数が一致しません: {cursor.rowcount}/{len(chunk)}")
+            first_id = cursor.lastrowid
+            ids.extend(first_id + i * step for i in range(len(chunk)))
+        return ids
+
+    def insert_matchups(self, cursor, matchups: List[Dict]) -> List[int]:
+        """対面データをまとめて挿入して ID を返す"""
+        return self.insert_rows_returning_ids(cursor, 'matchups', MATCHUP_COLUMNS, matchups)
+
+    def insert_solo_kills(self, cursor, solo_kills: List[Dict]) -> List[int]:
+        """ソロキル情報をまとめて挿入して ID を返す"""
+        return self.insert_rows_returning_ids(cursor, 'solo_kills', SOLO_KILL_COLUMNS, solo_kills)
+
+    def insert_kill_item_rows(self, cursor, kill_items: List[Dict]):
+        """キル時アイテム情報をまとめて挿入"""
+        if not kill_items:
+            return
+        query = f"""
+        INSERT INTO kill_items ({', '.join(KILL_ITEM_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(KILL_ITEM_COLUMNS))})
+        """
+        cursor.executemany(query, [kill_item_values(row) for row in kill_items])
+
+    def write_matchup_rows(self, cursor, matchup_rows: List[Dict]) -> Dict[str, int]:
+        """
+        1試合分の対面データ・ソロキル・キル時アイテムをテーブルごとにまとめて挿入
+
+        対面データの ID をソロキルの matchup_id に、ソロキルの ID をキル時アイテムの solo_kill_id に入れる。
+
+        Args:
+            matchup_rows: match_rows.build_match_rows の結果
+
+        Returns:
+            テーブルごとの挿入件数（matchups / solo_kills / kill_items）
+        """
+        matchup_ids = self.insert_matchups(cursor, [rows['matchup'] for rows in matchup_rows])
+        solo_kills, kill_item_groups = [], []
+        for matchup_id, rows in zip(matchup_ids, matchup_rows):
+            for solo_kill in rows['solo_kills']:
+                solo_kills.append(dict(solo_kill['row'], matchup_id=matchup_id))
+                kill_item_groups.append(solo_kill['kill_items'])
+
+        solo_kill_ids = self.insert_solo_kills(cursor, solo_kills)
+        kill_items = [
+            dict(item_row, solo_kill_id=solo_kill_id)
+            for solo_kill_id, item_rows in zip(solo_kill_ids, kill_item_groups) for item_row in item_rows
+        ]
+        self.insert_kill_item_rows(cursor, kill_items)
+        return {'matchups': len(matchup_ids), 'solo_kills': len(solo_kill_ids), 'kill_items': len(kill_items)}
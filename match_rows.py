@@ -0,0 +1,315 @@
+"""
+Match Rows
+分析結果（対面データ・ソロキル）から matchups / solo_kills / kill_items の行を作る変換関数と、
+試合単位でまとめて書き込むための MatchWriteBatch
+
+API・DB を使わないため、収集時の永続化と再分析のワーカープロセスで共通に使う。
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from timeline_analyzer import SoloKillEvent
+
+logger = logging.getLogger(__name__)
+
+# kill_items のアイテム枠数（item0〜item6）
+KILL_ITEM_SLOTS = 7
+
+# realtime_winrate_stats の加算で保守する列（勝率・平均はこれらから計算する）
+STATS_COUNTER_FIELDS = ('total_matchups', 'champion1_wins', 'champion2_wins', 'total_solo_kills',
+                        'first_kill_time_sum', 'first_kill_count')
+
+
+def _kda_diff(player1, player2) -> float:
+    """KDA差を計算"""
+    try:
+        kda1 = (player1.kills + player1.assists) / max(player1.deaths, 1)
+        kda2 = (player2.kills + player2.assists) / max(player2.deaths, 1)
+        return round(kda1 - kda2, 3)
+    except Exception:
+        return 0.0
+
+
+def _item_gold_diff(items1: List[int], items2: List[int], timeline_analyzer) -> int:
+    """アイテムのゴールド差を計算"""
+    try:
+        return timeline_analyzer.calculate_item_value(items1) - timeline_analyzer.calculate_item_value(items2)
+    except Exception:
+        return 0
+
+
+def matchup_to_row(matchup, timeline_analyzer) -> Dict:
+    """
+    MatchupData を matchups テーブルの行に変換
+
+    Args:
+        matchup: MatchupData または変換済みの辞書
+        timeline_analyzer: アイテム価値の計算に使う TimelineAnalyzer
+
+    Returns:
+        matchups の列名 → 値。変換できなければ空の辞書
+    """
+    if not (hasattr(matchup, 'player1') and hasattr(matchup, 'player2')):
+        # 既に辞書の場合
+        return matchup
+    try:
+        player1 = matchup.player1
+        player2 = matchup.player2
+
+        # BOTレーンは2vs2だが、現在の実装では1vs1のみなので追加プレイヤーは NULL
+        row = {
+            'match_id': matchup.match_id,
+            'lane': matchup.lane,
+            'player1_puuid': player1.puuid,
+            'player1_participant_id': getattr(player1, 'participant_id', 1),
+            'player1_champion_id': player1.champion_id,
+            'player1_champion_name': player1.champion_name,
+            'player1_level': player1.champion_level,
+            'player1_team_id': player1.team_id,
+            'player2_puuid': player2.puuid,
+            'player2_participant_id': getattr(player2, 'participant_id', 2),
+            'player2_champion_id': player2.champion_id,
+            'player2_champion_name': player2.champion_name,
+            'player2_level': player2.champion_level,
+            'player2_team_id': player2.team_id,
+        }
+        for slot in (3, 4):
+            for column in ('puuid', 'participant_id', 'champion_id', 'champion_name', 'level', 'team_id'):
+                row[f'player{slot}_{column}'] = None
+        row.update({
+            'level_diff': player1.champion_level - player2.champion_level,
+            'gold_diff': player1.gold_earned - player2.gold_earned,
+            'item_gold_diff': _item_gold_diff(player1.items, player2.items, timeline_analyzer),
+            'cs_diff': player1.cs_total - player2.cs_total,
+            'kda_diff': _kda_diff(player1, player2),
+            'player1_win': player1.win,
+            'player2_win': player2.win,
+            'game_duration': matchup.game_duration,
+            'game_version': matchup.game_version,
+            'game_creation': matchup.game_creation
+        })
+        return row
+    except Exception as e:
+        logger.error(f"MatchupData変換エラー: {e}")
+        return {}
+
+
+def solo_kill_to_row(solo_kill: SoloKillEvent, match_id: str, matchup_id: Optional[int],
+                     participants: Dict) -> Dict:
+    """
+    ソロキルを solo_kills テーブルの行に変換
+
+    Args:
+        solo_kill: ソロキルイベント
+        match_id: 試合ID
+        matchup_id: 対面データのID（挿入前なら None）
+        participants: TimelineAnalyzer.analyze_timeline の participants
+
+    Returns:
+        solo_kills の列名 → 値
+    """
+    killer_info = participants.get(solo_kill.killer_participant_id, {})
+    victim_info = participants.get(solo_kill.victim_participant_id, {})
+
+    return {
+        'match_id': match_id,
+        'matchup_id': matchup_id,
+        'timestamp_ms': solo_kill.timestamp_ms,
+        'game_time_seconds': solo_kill.game_time_seconds,
+        'killer_participant_id': solo_kill.killer_participant_id,
+        'killer_champion_id': killer_info.get('champion_id'),
+        'killer_champion_name': killer_info.get('champion_name'),
+        'killer_level': solo_kill.killer_level,
+        'killer_gold': solo_kill.killer_gold,
+        'killer_position_x': solo_kill.killer_position[0],
+        'killer_position_y': solo_kill.killer_position[1],
+        'victim_participant_id': solo_kill.victim_participant_id,
+        'victim_champion_id': victim_info.get('champion_id'),
+        'victim_champion_name': victim_info.get('champion_name'),
+        'victim_level': solo_kill.victim_level,
+        'victim_gold': solo_kill.victim_gold,
+        'victim_position_x': solo_kill.victim_position[0],
+        'victim_position_y': solo_kill.victim_position[1],
+        'level_diff': solo_kill.killer_level - solo_kill.victim_level,
+        'gold_diff': solo_kill.killer_gold - solo_kill.victim_gold,
+        'is_first_blood': solo_kill.is_first_blood,
+        'is_shutdown': solo_kill.is_shutdown,
+        'bounty_gold': solo_kill.bounty_gold
+    }
+
+
+def kill_item_rows(solo_kill: SoloKillEvent, timeline_analyzer) -> List[Dict]:
+    """
+    キラー・被キル者のキル時アイテムを kill_items テーブルの行に変換（solo_kill_id は含まない）
+
+    Returns:
+        participant_id / participant_type / items（7枠）/ total_item_value の辞書のリスト
+    """
+    rows = []
+    for participant_id, participant_type, items in (
+        (solo_kill.killer_participant_id, 'killer', solo_kill.killer_items),
+        (solo_kill.victim_participant_id, 'victim', solo_kill.victim_items),
+    ):
+        items = list(items or [])
+        rows.append({
+            'participant_id': participant_id,
+            'participant_type': participant_type,
+            'items': (items + [0] * KILL_ITEM_SLOTS)[:KILL_ITEM_SLOTS],
+            'total_item_value': timeline_analyzer.calculate_item_value(items),
+        })
+    return rows
+
+
+def matchup_solo_kill_stats(solo_kill_rows: List[Dict]) -> Dict:
+    """
+    対面のソロキルから matchups の total_solo_kills / first_blood_time / first_blood_killer_participant_id を計算
+
+    収集時に solo_kills のトリガーが挿入順に更新した結果と同じ値（同時刻なら先の行）。
+
+    Args:
+        solo_kill_rows: solo_kill_to_row の行
+
+    Returns:
+        列名 → 値（ソロキルが無ければ列の既定値の 0）
+    """
+    first = None
+    for row in solo_kill_rows:
+        if first is None or row['timestamp_ms'] < first['timestamp_ms']:
+            first = row
+    return {
+        'total_solo_kills': len(solo_kill_rows),
+        'first_blood_time': first['timestamp_ms'] if first else 0,
+        'first_blood_killer_participant_id': first['killer_participant_id'] if first else 0,
+    }
+
+
+def build_match_rows(match_data: Dict, timeline_result: Dict, matchups: List,
+                     timeline_analyzer) -> List[Dict]:
+    """
+    1試合分の対面データ・ソロキル・キル時アイテムの行を作る
+
+    Args:
+        match_data: 試合詳細
+        timeline_result: TimelineAnalyzer.analyze_timeline の結果
+        matchups: MatchDataAnalyzer.extract_matchups の結果（辞書に変換済みでもよい）
+        timeline_analyzer: ソロキルの抽出・アイテム価値の計算に使う TimelineAnalyzer
+
+    Returns:
+        対面ごとの {'matchup': 行, 'solo_kills': [{'row': 行, 'kill_items': [行, ...]}, ...]}。
+        solo_kills の行の matchup_id は挿入時に決まるため None
+    """
+    match_id = match_data.get('metadata', {}).get('matchId')
+    participants = timeline_result.get('participants', {})
+    lane_solo_kills = timeline_result.get('lane_solo_kills', {})
+
+    rows = []
+    for matchup in matchups:
+        matchup_row = matchup_to_row(matchup, timeline_analyzer)
+        if not matchup_row:
+            continue
+        lane_kills = timeline_analyzer.get_matchup_solo_kills(
+            lane_solo_kills.get(matchup_row.get('lane'), []), participants
+        )
+        rows.append({
+            'matchup': matchup_row,
+            'solo_kills': [
+                {
+                    'row': solo_kill_to_row(solo_kill, match_id, None, participants),
+                    'kill_items': kill_item_rows(solo_kill, timeline_analyzer),
+                }
+                for solo_kill in lane_kills
+            ],
+        })
+    return rows
+
+
+@dataclass
+class MatchWrite:
+    """1試合分の書き込み内容"""
+    match_id: str
+    match_data: Dict
+    tier: Optional[int] = None
+    has_timeline: bool = False
+    # build_match_rows の結果
+    matchup_rows: List[Dict] = field(default_factory=list)
+
+    @property
+    def participants(self) -> List[Dict]:
+        return self.match_data.get('info', {}).get('participants', [])
+
+
+class MatchWriteBatch:
+    """
+    RealtimeDatabaseManager.write_match_batch に渡す書き込みの単位
+
+    試合・参加者・対面データ・ソロキル・キル時アイテムの行を試合ごとにまとめ、
+    1つのコネクション・1トランザクションで書き込めるようにする。
+    """
+
+    def __init__(self):
+        self.matches: List[MatchWrite] = []
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def add(self, match_data: Dict, matchup_rows: Optional[List[Dict]] = None, tier: Optional[int] = None,
+            has_timeline: bool = False) -> MatchWrite:
+        """
+        試合を追加
+
+        Args:
+            match_data: 試合詳細（参加者もここから書き込む）
+            matchup_rows: build_match_rows の結果
+            tier: 試合の平均ランク
+            has_timeline: タイムラインを分析済みか
+
+        Returns:
+            追加した MatchWrite
+        """
+        match_write = MatchWrite(
+            match_id=match_data.get('metadata', {}).get('matchId'),
+            match_data=match_data,
+            tier=tier,
+            has_timeline=has_timeline,
+            matchup_rows=list(matchup_rows or []),
+        )
+        self.matches.append(match_write)
+        return match_write
+
+    def game_versions(self) -> List[str]:
+        """試合のゲームバージョン（重複なし）"""
+        versions = (m.match_data.get('info', {}).get('gameVersion') for m in self.matches)
+        return list(dict.fromkeys(version for version in versions if version))
+
+    @staticmethod
+    def stats_deltas(matches: List[MatchWrite]) -> List[Dict]:
+        """
+        realtime_winrate_stats に加算する差分を (チャンピオン1, チャンピオン2, レーン, バージョン) ごとに集計
+
+        チャンピオン1は対面データの player1 側。キー順に並べるため、複数の書き込みが同じ行を
+        更新しても行ロックを取る順番が揃う。
+
+        Returns:
+            key と STATS_COUNTER_FIELDS の値を持つ辞書のリスト（キー順）
+        """
+        deltas: Dict[Tuple, Dict] = {}
+        for match_write in matches:
+            for matchup_rows in match_write.matchup_rows:
+                matchup = matchup_rows['matchup']
+                key = (matchup.get('player1_champion_id'), matchup.get('player2_champion_id'),
+                       matchup.get('lane'), matchup.get('game_version'))
+                if None in key:
+                    continue
+                delta = deltas.setdefault(key, dict.fromkeys(STATS_COUNTER_FIELDS, 0))
+                delta['total_matchups'] += 1
+                delta['champion1_wins'] += int(bool(matchup.get('player1_win')))
+                delta['champion2_wins'] += int(bool(matchup.get('player2_win')))
+                solo_kills = matchup_rows['solo_kills']
+                delta['total_solo_kills'] += len(solo_kills)
+                if solo_kills:
+                    # matchups.first_blood_time（トリガーが入れる最初のソロキル時刻）と同じ値
+                    delta['first_kill_time_sum'] += min(solo_kill['row']['timestamp_ms'] for solo_kill in solo_kills)
+                    delta['first_kill_count'] += 1
+        return [dict(delta, key=key) for key, delta in sorted(deltas.items())]
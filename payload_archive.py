@@ -0,0 +1,422 @@
+"""
+Payload Archive
+試合詳細・タイムラインの生レスポンスを圧縮して追記専用のセグメントファイルに保存するアーカイブ
+"""
+
+import gzip
+import logging
+import mmap
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import fast_json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 1セグメントの上限サイズ（超えたら次のセグメントに切り替える）
+DEFAULT_SEGMENT_BYTES = 256 * 1024 ** 2
+
+# レコードヘッダー: マジック, 圧縮方式, 種類, 試合IDの長さ, ペイロードの長さ, ペイロードの CRC32
+RECORD_HEADER = struct.Struct('<4sBBHII')
+RECORD_MAGIC = b'LPA1'
+
+CODEC_ZSTD = 1
+CODEC_GZIP = 2
+
+KIND_CODES = {'match': 1, 'timeline': 2}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    match_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_length INTEGER NOT NULL,
+    archived_at REAL NOT NULL,
+    PRIMARY KEY (match_id, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_payloads_position ON payloads (segment, offset);
+
+CREATE TABLE IF NOT EXISTS segments (
+    segment TEXT PRIMARY KEY,
+    writer TEXT NOT NULL,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    sealed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class PayloadArchive:
+    """
+    試合IDで引ける追記専用の圧縮アーカイブ
+
+    - 各レコードは「ヘッダー + 試合ID + 圧縮したJSON」で、セグメントファイルの末尾に追記するだけ
+    - 試合ID・種類 → (セグメント, オフセット, 長さ) の索引を SQLite に持つ
+    - 読み込みはセグメントを mmap して該当範囲だけを展開する
+    - セグメント名に書き込み元（シャードID）を含めるため、複数プロセスが同じディレクトリに追記できる
+    - 索引に反映する前に中断したレコードは、次回の起動時にセグメントを走査して索引に戻す
+
+    MatchPayloadCache と違い削除はしない。分析ロジックを変えたときに
+    API を呼ばずに solo_kills などを作り直すための元データとして使う。
+    """
+
+    def __init__(self, archive_dir: str, writer_id: Optional[str] = 'main',
+                 segment_max_bytes: int = DEFAULT_SEGMENT_BYTES, compression_level: int = 10):
+        """
+        アーカイブを開く（無ければ作成）
+
+        Args:
+            archive_dir: セグメントと索引の保存ディレクトリ
+            writer_id: 書き込み元のID（セグメント名に使う。プロセスごとに別の値にする）。
+                       None なら読み込み専用（再分析のワーカーなど）
+            segment_max_bytes: 1セグメントの上限サイズ
+            compression_level: zstd の圧縮レベル（gzip では 1〜9 に丸める）
+        """
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.writer_id = writer_id
+        self.segment_max_bytes = segment_max_bytes
+        self.compression_level = compression_level
+        self.codec = CODEC_ZSTD if zstandard else CODEC_GZIP
+
+        self._conn = sqlite3.connect(str(self.archive_dir / 'index.sqlite3'), timeout=30.0,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(INDEX_SCHEMA)
+
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Tuple[mmap.mmap, int]] = {}
+        self._segment: Optional[str] = None
+        self._segment_file = None
+        self._segment_size = 0
+
+        self.stats = {'appended': 0, 'skipped': 0, 'bytes_written': 0, 'raw_bytes': 0, 'recovered': 0}
+        if writer_id is not None:
+            self._open_segment()
+
+    def __enter__(self) -> 'PayloadArchive':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # 書き込み
+
+    def _segment_path(self, segment: str) -> Path:
+        return self.archive_dir / segment
+
+    def _open_segment(self):
+        """自分の最後のセグメントを開く（封印済み・上限超えなら次を作る）"""
+        row = self._conn.execute(
+            "SELECT segment, sealed FROM segments WHERE writer = ? ORDER BY segment DESC LIMIT 1",
+            (self.writer_id,)
+        ).fetchone()
+        if row and not row[1]:
+            self._recover(row[0])
+            self._segment = row[0]
+        else:
+            sequence = int(row[0].rsplit('-', 1)[1].split('.')[0]) + 1 if row else 1
+            self._segment = f"segment-{self.writer_id}-{sequence:06d}.lpa"
+            self._conn.execute("INSERT OR IGNORE INTO segments (segment, writer) VALUES (?, ?)",
+                               (self._segment, self.writer_id))
+        self._segment_file = open(self._segment_path(self._segment), 'ab')
+        self._segment_size = self._segment_file.tell()
+
+    def _roll_segment(self):
+        """現在のセグメントを封印して次へ切り替える（ロック取得済みで呼ぶ）"""
+        self._segment_file.close()
+        self._conn.execute("UPDATE segments SET sealed = 1 WHERE segment = ?", (self._segment,))
+        logger.info(f"アーカイブセグメントを封印しました: {self._segment} ({self._segment_size / 1024 ** 2:.1f}MB)")
+        self._open_segment()
+
+    def _recover(self, segment: str):
+        """索引に反映されていない末尾のレコードを索引に戻し、書きかけのレコードを切り詰める"""
+        path = self._segment_path(segment)
+        if not path.exists():
+            return
+        indexed_bytes = self._conn.execute(
+            "SELECT indexed_bytes FROM segments WHERE segment = ?", (segment,)
+        ).fetchone()[0]
+        size = path.stat().st_size
+        if size <= indexed_bytes:
+            return
+
+        valid_end = indexed_bytes
+        entries = []
+        with open(path, 'rb') as f:
+            data = f.read()
+        for record in self._scan(memoryview(data), indexed_bytes):
+            match_id, kind, offset, length, end = record
+            entries.append((match_id, kind, segment, offset, length, 0, time.time()))
+            valid_end = end
+        self._conn.execute('BEGIN')
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO payloads (match_id, kind, segment, offset, length, raw_length, archived_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", entries
+        )
+        self._conn.execute("UPDATE segments SET indexed_bytes = ? WHERE segment = ?", (valid_end, segment))
+        self._conn.execute('COMMIT')
+        if valid_end < size:
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+        self.stats['recovered'] += len(entries)
+        logger.warning(f"アーカイブの未索引レコードを復旧しました: {segment} - {len(entries)}件, "
+                       f"{size - valid_end}バイトを切り詰め")
+
+    @staticmethod
+    def _scan(data: memoryview, start: int = 0) -> Iterator[Tuple[str, str, int, int, int]]:
+        """
+        セグメントのレコードを先頭から走査
+
+        Yields:
+            (試合ID, 種類, レコードの開始位置, レコード長, 次のレコードの開始位置)。壊れたレコードで止まる
+        """
+        offset = start
+        while offset + RECORD_HEADER.size <= len(data):
+            magic, _, kind_code, id_length, payload_length, crc = RECORD_HEADER.unpack_from(data, offset)
+            end = offset + RECORD_HEADER.size + id_length + payload_length
+            if magic != RECORD_MAGIC or kind_code not in KIND_NAMES or end > len(data):
+                return
+            payload_start = offset + RECORD_HEADER.size + id_length
+            if zlib.crc32(data[payload_start:end]) != crc:
+                return
+            match_id = bytes(data[offset + RECORD_HEADER.size:payload_start]).decode('utf-8')
+            yield match_id, KIND_NAMES[kind_code], offset, end - offset, end
+            offset = end
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        return gzip.compress(data, compresslevel=min(9, max(1, self.compression_level)))
+
+    @staticmethod
+    def _decompress(codec: int, data: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstd で圧縮されたレコードの展開には zstandard が必要です")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def append(self, match_id: str, match_data: Optional[Dict] = None,
+               timeline_data: Optional[Dict] = None) -> int:
+        """
+        試合詳細・タイムラインを追記（保存済みの種類は書かない）
+
+        Args:
+            match_id: 試合ID
+            match_data: 試合詳細のレスポンス
+            timeline_data: タイムラインのレスポンス
+
+        Returns:
+            追記したレコード数
+        """
+        payloads = [(kind, payload) for kind, payload in (('match', match_data), ('timeline', timeline_data))
+                    if payload]
+        if not payloads:
+            return 0
+        if self._segment_file is None:
+            logger.warning(f"読み込み専用のアーカイブには追記できません: {match_id}")
+            return 0
+
+        # 圧縮はロックの外で行う
+        records = []
+        for kind, payload in payloads:
+            raw = fast_json.dumps(payload)
+            compressed = self._compress(raw)
+            encoded_id = match_id.encode('utf-8')
+            header = RECORD_HEADER.pack(RECORD_MAGIC, self.codec, KIND_CODES[kind], len(encoded_id),
+                                        len(compressed), zlib.crc32(compressed))
+            records.append((kind, header + encoded_id + compressed, len(raw)))
+
+        with self._lock:
+            try:
+                existing = {row[0] for row in self._conn.execute(
+                    "SELECT kind FROM payloads WHERE match_id = ?", (match_id,)
+                )}
+                records = [record for record in records if record[0] not in existing]
+                self.stats['skipped'] += len(payloads) - len(records)
+                if not records:
+                    return 0
+
+                if self._segment_size and self._segment_size + sum(len(r[1]) for r in records) > self.segment_max_bytes:
+                    self._roll_segment()
+
+                entries = []
+                for kind, record, raw_length in records:
+                    entries.append((match_id, kind, self._segment, self._segment_size, len(record),
+                                    raw_length, time.time()))
+                    self._segment_file.write(record)
+                    self._segment_size += len(record)
+                    self.stats['bytes_written'] += len(record)
+                    self.stats['raw_bytes'] += raw_length
+                # 索引より先にセグメントを書き出す（索引が指す位置は必ずファイルにある）
+                self._segment_file.flush()
+
+                self._conn.execute('BEGIN')
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO payloads (match_id, kind, segment, offset, length, raw_length, archived_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", entries
+                )
+                self._conn.execute("UPDATE segments SET indexed_bytes = ? WHERE segment = ?",
+                                   (self._segment_size, self._segment))
+                self._conn.execute('COMMIT')
+                self.stats['appended'] += len(entries)
+                return len(entries)
+            except (OSError, sqlite3.Error) as e:
+                if self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
+                logger.error(f"アーカイブ書き込みエラー: {match_id} - {e}")
+                return 0
+
+    # 読み込み
+
+    def _mapping(self, segment: str, end: int) -> mmap.mmap:
+        """セグメントの mmap（end まで含まれていなければ作り直す。ロック取得済みで呼ぶ）"""
+        cached = self._maps.get(segment)
+        if cached and cached[1] >= end:
+            return cached[0]
+        if cached:
+            cached[0].close()
+        with open(self._segment_path(segment), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[segment] = (mapped, len(mapped))
+        return mapped
+
+    def _read_record(self, segment: str, offset: int, length: int) -> Dict:
+        """索引が指すレコードを展開（ロック取得済みで呼ぶ）"""
+        mapped = self._mapping(segment, offset + length)
+        magic, codec, _, id_length, payload_length, crc = RECORD_HEADER.unpack_from(mapped, offset)
+        payload_start = offset + RECORD_HEADER.size + id_length
+        compressed = mapped[payload_start:payload_start + payload_length]
+        if magic != RECORD_MAGIC or zlib.crc32(compressed) != crc:
+            raise ValueError(f"破損したレコードです: {segment}@{offset}")
+        return fast_json.loads(self._decompress(codec, compressed))
+
+    def get(self, kind: str, match_id: str) -> Optional[Dict]:
+        """
+        アーカイブからペイロードを取得
+
+        Args:
+            kind: 'match' または 'timeline'
+            match_id: 試合ID
+
+        Returns:
+            ペイロード。無い場合・読めない場合は None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length FROM payloads WHERE match_id = ? AND kind = ?", (match_id, kind)
+            ).fetchone()
+            if not row:
+                return None
+            try:
+                return self._read_record(*row)
+            except Exception as e:
+                logger.error(f"アーカイブ読み込みエラー: {kind} {match_id} - {e}")
+                return None
+
+    def contains(self, match_id: str, kind: str = 'match') -> bool:
+        """保存済みか"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM payloads WHERE match_id = ? AND kind = ?", (match_id, kind)
+            ).fetchone() is not None
+
+    def match_ids(self) -> List[str]:
+        """試合詳細を保存済みの試合ID（書き込み順）"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT match_id FROM payloads WHERE kind = 'match' ORDER BY segment, offset"
+            )]
+
+    def iter_matches(self, match_ids: Optional[List[str]] = None) -> Iterator[Tuple[str, Dict, Optional[Dict]]]:
+        """
+        試合詳細とタイムラインを組にして順に読む（再分析用）
+
+        Args:
+            match_ids: 読む試合ID（None なら全件）
+
+        Yields:
+            (試合ID, 試合詳細, タイムライン)。タイムラインが無ければ None
+        """
+        for match_id in (match_ids if match_ids is not None else self.match_ids()):
+            match_data = self.get('match', match_id)
+            if match_data is None:
+                continue
+            yield match_id, match_data, self.get('timeline', match_id)
+
+    def rebuild_index(self) -> int:
+        """
+        全セグメントを走査して索引を作り直す（索引ファイルを失った場合など）
+
+        Returns:
+            索引に登録したレコード数
+        """
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.flush()
+            total = 0
+            for path in sorted(self.archive_dir.glob('segment-*.lpa')):
+                writer = path.name[len('segment-'):].rsplit('-', 1)[0]
+                with open(path, 'rb') as f:
+                    data = f.read()
+                entries = []
+                end_offset = 0
+                for match_id, kind, offset, length, end in self._scan(memoryview(data)):
+                    entries.append((match_id, kind, path.name, offset, length, 0, time.time()))
+                    end_offset = end
+                self._conn.execute('BEGIN')
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO payloads (match_id, kind, segment, offset, length, raw_length, archived_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", entries
+                )
+                self._conn.execute(
+                    "INSERT INTO segments (segment, writer, indexed_bytes, sealed) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(segment) DO UPDATE SET indexed_bytes = excluded.indexed_bytes",
+                    (path.name, writer, end_offset, int(path.name != self._segment))
+                )
+                self._conn.execute('COMMIT')
+                total += len(entries)
+            logger.info(f"アーカイブの索引を再構築しました: {total}件")
+            return total
+
+    def snapshot(self) -> Dict:
+        """件数・サイズ・圧縮率"""
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT kind, COUNT(*) FROM payloads GROUP BY kind").fetchall())
+            segments = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(indexed_bytes), 0) FROM segments").fetchone()
+            stats = dict(self.stats)
+        stats.update({
+            'matches': rows.get('match', 0),
+            'timelines': rows.get('timeline', 0),
+            'segments': segments[0],
+            'archive_bytes': segments[1],
+            'compression_ratio': round(stats['raw_bytes'] / stats['bytes_written'], 2) if stats['bytes_written'] else None,
+        })
+        return stats
+
+    def close(self):
+        """セグメントと索引を閉じる"""
+        with self._lock:
+            for mapped, _ in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,233 @@
+"""
+Player Watermarks
+プレイヤーごとの収集済み位置（最新の試合終了時刻・過去方向の取得深さ）を管理するストア
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 1回の一覧取得の上限（match-v5 の count の最大値）
+MATCH_LIST_PAGE_SIZE = 100
+
+
+@dataclass
+class PlayerWatermark:
+    """1人分の収集済み位置"""
+    puuid: str
+    # 収集済みの最も新しい試合の終了時刻（ミリ秒）
+    last_collected_game_end: Optional[int] = None
+    # 過去方向の取得で endTime に固定する時刻（秒）。固定しないと新しい試合で start がずれる
+    backfill_anchor: Optional[int] = None
+    # backfill_anchor 以前で一覧を取得済みの件数（次の start）
+    backfill_depth: int = 0
+    backfill_done: bool = False
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'PlayerWatermark':
+        """player_watermarks の行から作成"""
+        return cls(
+            row['puuid'],
+            row.get('last_collected_game_end'),
+            row.get('backfill_anchor'),
+            row.get('backfill_depth') or 0,
+            bool(row.get('backfill_done')),
+        )
+
+    @property
+    def refresh_start_time(self) -> Optional[int]:
+        """新しい試合だけを取得するための startTime（秒）"""
+        if not self.last_collected_game_end:
+            return None
+        return self.last_collected_game_end // 1000
+
+
+def match_game_end(match_data: Dict) -> Optional[int]:
+    """
+    試合の終了時刻（ミリ秒）
+
+    gameEndTimestamp が無い古い形式では開始時刻 + 試合時間から求める。
+    """
+    info = match_data.get('info', {})
+    if info.get('gameEndTimestamp'):
+        return int(info['gameEndTimestamp'])
+    started = info.get('gameStartTimestamp') or info.get('gameCreation')
+    if not started:
+        return None
+    return int(started) + int(info.get('gameDuration', 0)) * 1000
+
+
+class PlayerWatermarkStore:
+    """
+    player_watermarks テーブルの読み書きとメモリキャッシュ
+
+    - 更新（refresh）: last_collected_game_end 以降の試合だけを一覧取得する
+    - 過去方向（backfill）: backfill_anchor を endTime に固定し、start を進めながら max_depth まで取得する
+    """
+
+    def __init__(self, db_manager=None):
+        """
+        ストアを初期化
+
+        Args:
+            db_manager: get_player_watermarks / advance_player_watermark / update_player_backfill を持つ
+                        RealtimeDatabaseManager（None ならメモリのみ）
+        """
+        self.db_manager = db_manager
+        self._cache: Dict[str, PlayerWatermark] = {}
+        self._lock = threading.Lock()
+
+    def get(self, puuid: str) -> PlayerWatermark:
+        """収集済み位置を取得（未登録なら空の位置）"""
+        with self._lock:
+            watermark = self._cache.get(puuid)
+        if watermark:
+            return watermark
+
+        watermark = PlayerWatermark(puuid)
+        if self.db_manager is not None:
+            rows = self.db_manager.get_player_watermarks([puuid])
+            if rows:
+                watermark = PlayerWatermark.from_row(rows[0])
+        with self._lock:
+            return self._cache.setdefault(puuid, watermark)
+
+    def advance(self, puuid: str, game_end: Optional[int]):
+        """保存した試合の終了時刻で収集済み位置を進める"""
+        if not puuid or not game_end:
+            return
+        watermark = self.get(puuid)
+        with self._lock:
+            if watermark.last_collected_game_end and watermark.last_collected_game_end >= game_end:
+                return
+            watermark.last_collected_game_end = game_end
+        if self.db_manager is not None:
+            self.db_manager.advance_player_watermark(puuid, game_end)
+
+    def next_backfill_page(self, puuid: str, max_depth: int) -> Optional[Dict]:
+        """
+        過去方向の次の一覧取得の引数
+
+        Returns:
+            get_match_history に渡す start / count / end_time。max_depth まで取得済みなら None
+        """
+        watermark = self.get(puuid)
+        if watermark.backfill_done or watermark.backfill_depth >= max_depth:
+            return None
+        anchor = watermark.backfill_anchor or int(time.time())
+        return {
+            'start': watermark.backfill_depth,
+            'count': min(MATCH_LIST_PAGE_SIZE, max_depth - watermark.backfill_depth),
+            'end_time': anchor,
+        }
+
+    def record_backfill_page(self, puuid: str, page: Dict, listed: int, max_depth: int):
+        """
+        過去方向の一覧取得結果を記録
+
+        Args:
+            puuid: PUUID
+            page: next_backfill_page の戻り値
+            listed: 取得できた試合ID数
+            max_depth: 取得する深さの上限
+        """
+        watermark = self.get(puuid)
+        with self._lock:
+            watermark.backfill_anchor = page['end_time']
+            watermark.backfill_depth = page['start'] + listed
+            # 要求より少なければ履歴の最後まで取得した
+            watermark.backfill_done = listed < page['count'] or watermark.backfill_depth >= max_depth
+            anchor, depth, done = watermark.backfill_anchor, watermark.backfill_depth, watermark.backfill_done
+        if self.db_manager is not None:
+            self.db_manager.update_player_backfill(puuid, anchor, depth, done)
+
+    def preload(self, puuids: List[str]) -> int:
+        """複数人の収集済み位置を1回のクエリで読み込む"""
+        if self.db_manager is None:
+            return 0
+        with self._lock:
+            missing = [p for p in puuids if p not in self._cache]
+        if not missing:
+            return 0
+        rows = {row['puuid']: row for row in self.db_manager.get_player_watermarks(missing)}
+        with self._lock:
+            for puuid in missing:
+                row = rows.get(puuid)
+                # 行が無いプレイヤーも空の位置として覚え、get で個別に問い合わせない
+                self._cache.setdefault(puuid, PlayerWatermark.from_row(row) if row else PlayerWatermark(puuid))
+        return len(rows)
+
+
+class ListingProgress:
+    """
+    一覧を取得したプレイヤーごとに、一覧中の試合がすべて保存されるまで収集済み位置を進めない
+
+    次の更新は収集済み位置より後の試合しか一覧しないため、新しい試合の保存で先に位置を進めると、
+    同じ一覧の古い試合の取得・保存に失敗したときにその試合が二度と一覧に出てこない。
+    一覧中の試合が1つでも失敗したら位置を進めず、次の更新で同じ範囲を一覧し直す
+    （保存済みの試合は重複排除で除かれる）。
+    """
+
+    def __init__(self, store: PlayerWatermarkStore):
+        """
+        Args:
+            store: 位置を進める PlayerWatermarkStore
+        """
+        self.store = store
+        # PUUID → 一覧中の未処理の試合ID・保存した試合の最新の終了時刻・失敗の有無
+        self._outstanding: Dict[str, Set[str]] = {}
+        self._latest: Dict[str, int] = {}
+        self._failed: Set[str] = set()
+        # 試合ID → 一覧を取得したプレイヤー
+        self._listed_by: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, puuid: Optional[str], match_ids: List[str]):
+        """一覧から処理する試合を登録"""
+        if not puuid or not match_ids:
+            return
+        with self._lock:
+            self._outstanding.setdefault(puuid, set()).update(match_ids)
+            for match_id in match_ids:
+                self._listed_by[match_id] = puuid
+
+    def stored(self, match_id: str, game_end: Optional[int]):
+        """試合を保存できた"""
+        self._resolve(match_id, game_end, failed=False)
+
+    def failed(self, match_id: str):
+        """試合を取得・保存できなかった"""
+        self._resolve(match_id, None, failed=True)
+
+    def _resolve(self, match_id: str, game_end: Optional[int], failed: bool):
+        """一覧中の試合を処理済みにし、最後の1試合なら収集済み位置を進める"""
+        with self._lock:
+            puuid = self._listed_by.pop(match_id, None)
+            if puuid is None:
+                return
+            outstanding = self._outstanding[puuid]
+            outstanding.discard(match_id)
+            if failed:
+                self._failed.add(puuid)
+            elif game_end:
+                self._latest[puuid] = max(self._latest.get(puuid, 0), game_end)
+            if outstanding:
+                return
+            del self._outstanding[puuid]
+            latest = self._latest.pop(puuid, None)
+            any_failed = puuid in self._failed
+            self._failed.discard(puuid)
+
+        if any_failed:
+            logger.info(f"一覧の試合を保存できなかったため収集済み位置を進めません: {puuid[:8]}")
+            return
+        self.store.advance(puuid, latest)
+
+    def pending_count(self) -> int:
+        """処理が終わっていない一覧中の試合数"""
+        with self._lock:
+            return len(self._listed_by)
@@ -0,0 +1,311 @@
+"""
+Player Rank Resolver
+PUUID → ソロランクの解決をメモリ LRU・DB・API の順で行うリゾルバー
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PlayerRank:
+    """プレイヤーのソロランク情報（tier が None ならアンランク）"""
+    puuid: str
+    tier: Optional[str]
+    rank: str
+    league_points: int
+    fetched_at: datetime
+
+
+class RankIndex:
+    """
+    リーグページから作る PUUID → ソロランクの索引
+
+    プレイヤー探索で取得する league-v4 のページ（tier/division 一覧や
+    チャレンジャー〜マスターのリーグ）には各プレイヤーの PUUID・ティア・ランクが
+    含まれるため、ダウンロードのついでに索引へ登録しておけば
+    平均ティア計算で個別の API 呼び出しが不要になる。
+    ティア・ランク文字列は intern して共有し、1件あたり1つのタプルで保持する。
+    """
+
+    def __init__(self):
+        # puuid → (tier, rank, league_points, 取得時刻のUNIX秒)
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, puuid: str) -> bool:
+        return puuid in self._entries
+
+    def add_entries(self, entries: Optional[Iterable[Dict]], tier: Optional[str] = None,
+                    queue: str = 'RANKED_SOLO_5x5') -> int:
+        """
+        リーグエントリーを索引に登録
+
+        Args:
+            entries: league-v4 のエントリー一覧
+            tier: エントリーに tier が無い場合のティア（apex リーグのトップレベル値）
+            queue: 登録対象のキュー（ソロランク以外のエントリーは無視）
+
+        Returns:
+            登録した件数
+        """
+        if not entries:
+            return 0
+        fetched_at = int(time.time())
+        added = 0
+        with self._lock:
+            for entry in entries:
+                puuid = entry.get('puuid')
+                entry_tier = entry.get('tier') or tier
+                if not puuid or not entry_tier or entry.get('queueType', queue) != queue:
+                    continue
+                self._entries[puuid] = (
+                    sys.intern(entry_tier.upper()),
+                    sys.intern(entry.get('rank') or ''),
+                    entry.get('leaguePoints', 0),
+                    fetched_at
+                )
+                added += 1
+        return added
+
+    def add_league(self, league_data: Optional[Dict]) -> int:
+        """
+        チャレンジャー/グランドマスター/マスターのリーグ情報を索引に登録
+
+        Args:
+            league_data: get_challenger_league などのレスポンス
+
+        Returns:
+            登録した件数
+        """
+        if not league_data:
+            return 0
+        return self.add_entries(
+            league_data.get('entries'),
+            tier=league_data.get('tier'),
+            queue=league_data.get('queue', 'RANKED_SOLO_5x5')
+        )
+
+    def get(self, puuid: str) -> Optional[PlayerRank]:
+        """索引からランクを取得（未登録なら None）"""
+        item = self._entries.get(puuid)
+        if item is None:
+            return None
+        tier, rank, league_points, fetched_at = item
+        return PlayerRank(
+            puuid=puuid,
+            tier=tier,
+            rank=rank,
+            league_points=league_points,
+            fetched_at=datetime.fromtimestamp(fetched_at)
+        )
+
+
+class PlayerRankResolver:
+    """
+    プレイヤーランクのキャッシュ付きリゾルバー
+
+    高ランク帯では同じプレイヤーが多数の試合に登場するため、
+    取得済みのランクは TTL の間メモリ（LRU）と player_ranks テーブルで再利用し、
+    プレイヤー探索で作った RankIndex にも無い PUUID だけを API に問い合わせる。
+    scheduler を渡すと、API の問い合わせは RequestScheduler の 'rank' クラスとして送る。
+    """
+
+    def __init__(self, api_client, db_manager=None, ttl_seconds: int = 24 * 3600,
+                 max_memory_entries: int = 100000, rank_index: Optional[RankIndex] = None,
+                 scheduler=None):
+        """
+        リゾルバーを初期化
+
+        Args:
+            api_client: get_summoner_by_puuid を持つ RiotAPIClient
+            db_manager: 永続化に使う RealtimeDatabaseManager（None ならメモリのみ）
+            ttl_seconds: ランク情報の有効期間（秒）
+            max_memory_entries: メモリに保持する最大件数
+            rank_index: リーグページから作った索引（省略時は api_client.rank_index）
+            scheduler: API の問い合わせを登録する RequestScheduler（None なら api_client を直接呼ぶ）。
+                       スケジューラーのワーカー内から resolve を呼ぶと自分の完了を待って止まるため、
+                       スケジューラーの外のスレッドからだけ呼ぶこと
+        """
+        self.api_client = api_client
+        self.db_manager = db_manager
+        self.rank_index = rank_index if rank_index is not None else getattr(api_client, 'rank_index', None)
+        self.scheduler = scheduler
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_memory_entries = max_memory_entries
+        self._cache: 'OrderedDict[str, PlayerRank]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {'memory_hits': 0, 'index_hits': 0, 'db_hits': 0, 'api_calls': 0}
+
+    def _count(self, name: str, count: int):
+        """統計を加算（取得ワーカーのスレッドから同時に呼ばれる）"""
+        with self._lock:
+            self.stats[name] += count
+
+    def _is_fresh(self, player_rank: PlayerRank, now: datetime) -> bool:
+        return now - player_rank.fetched_at < self.ttl
+
+    def _remember(self, player_rank: PlayerRank):
+        """メモリ LRU に登録（上限を超えたら最も古いものを破棄）"""
+        with self._lock:
+            self._cache[player_rank.puuid] = player_rank
+            self._cache.move_to_end(player_rank.puuid)
+            while len(self._cache) > self.max_memory_entries:
+                self._cache.popitem(last=False)
+
+    def _lookup_memory(self, puuids: Iterable[str], now: datetime) -> Dict[str, PlayerRank]:
+        found = {}
+        with self._lock:
+            for puuid in puuids:
+                player_rank = self._cache.get(puuid)
+                if player_rank and self._is_fresh(player_rank, now):
+                    self._cache.move_to_end(puuid)
+                    found[puuid] = player_rank
+        self._count('memory_hits', len(found))
+        return found
+
+    def _lookup_index(self, puuids: Iterable[str], now: datetime) -> Dict[str, PlayerRank]:
+        if self.rank_index is None:
+            return {}
+        found = {}
+        for puuid in puuids:
+            player_rank = self.rank_index.get(puuid)
+            if player_rank and self._is_fresh(player_rank, now):
+                found[puuid] = player_rank
+        self._count('index_hits', len(found))
+        return found
+
+    def _lookup_db(self, puuids: List[str], now: datetime) -> Dict[str, PlayerRank]:
+        if not self.db_manager or not puuids:
+            return {}
+        found = {}
+        for row in self.db_manager.get_player_ranks(puuids, fetched_after=now - self.ttl):
+            player_rank = PlayerRank(
+                puuid=row['puuid'],
+                tier=row.get('tier'),
+                rank=row.get('rank_division') or '',
+                league_points=row.get('league_points') or 0,
+                fetched_at=row['fetched_at']
+            )
+            found[player_rank.puuid] = player_rank
+            self._remember(player_rank)
+        self._count('db_hits', len(found))
+        return found
+
+    @staticmethod
+    def parse_league_entries(puuid: str, entries: List[Dict], now: datetime) -> PlayerRank:
+        """league-v4 のエントリー一覧からソロランク情報を作成"""
+        solo_entry = next((e for e in entries if e.get('queueType') == 'RANKED_SOLO_5x5'), None)
+        return PlayerRank(
+            puuid=puuid,
+            tier=solo_entry.get('tier') if solo_entry else None,
+            rank=solo_entry.get('rank', '') if solo_entry else '',
+            league_points=solo_entry.get('leaguePoints', 0) if solo_entry else 0,
+            fetched_at=now
+        )
+
+    def lookup_cached(self, puuids: List[str]) -> Dict[str, PlayerRank]:
+        """
+        メモリ・索引・DB から有効期限内のランクを取得（API は呼ばない）
+
+        Args:
+            puuids: PUUIDのリスト
+
+        Returns:
+            PUUID → PlayerRank の辞書（見つかったものだけ）
+        """
+        now = datetime.now()
+        resolved = self._lookup_memory(puuids, now)
+        resolved.update(self._lookup_index([p for p in puuids if p not in resolved], now))
+        resolved.update(self._lookup_db([p for p in puuids if p not in resolved], now))
+        return resolved
+
+    def record_fetched(self, fetched: Dict[str, List[Dict]]) -> Dict[str, PlayerRank]:
+        """
+        API から取得したリーグエントリーをキャッシュに登録
+
+        Args:
+            fetched: PUUID → league-v4 エントリー一覧（取得失敗の None は無視）
+
+        Returns:
+            PUUID → PlayerRank の辞書
+        """
+        now = datetime.now()
+        ranks = {}
+        for puuid, entries in fetched.items():
+            if entries is None:
+                # 取得失敗はキャッシュしない（次回再取得する）
+                continue
+            ranks[puuid] = self.parse_league_entries(puuid, entries, now)
+            self._remember(ranks[puuid])
+
+        if ranks and self.db_manager:
+            self.db_manager.upsert_player_ranks([
+                {
+                    'puuid': r.puuid,
+                    'tier': r.tier,
+                    'rank_division': r.rank,
+                    'league_points': r.league_points,
+                    'fetched_at': r.fetched_at
+                }
+                for r in ranks.values()
+            ])
+        return ranks
+
+    def resolve(self, puuids: List[str]) -> Dict[str, PlayerRank]:
+        """
+        複数プレイヤーのランクを解決（キャッシュに無いPUUIDだけ API から取得）
+
+        Args:
+            puuids: PUUIDのリスト
+
+        Returns:
+            PUUID → PlayerRank の辞書（取得できなかったPUUIDは含まない）
+        """
+        resolved = self.lookup_cached(puuids)
+        missing = [puuid for puuid in dict.fromkeys(puuids) if puuid not in resolved]
+        self._count('api_calls', len(missing))
+        resolved.update(self.record_fetched(self._fetch_entries(missing)))
+        return resolved
+
+    def _fetch_entries(self, puuids: List[str]) -> Dict[str, Optional[List[Dict]]]:
+        """
+        API から league-v4 エントリーを取得
+
+        スケジューラーがあれば全員分をまとめて登録し、優先度・同時実行数の制御の下で並行に取得する。
+
+        Returns:
+            PUUID → エントリー一覧（取得失敗は None）
+        """
+        if self.scheduler is None:
+            return {puuid: self.api_client.get_summoner_by_puuid(puuid) for puuid in puuids}
+        futures = {puuid: self.scheduler.submit('rank', 'get_summoner_by_puuid', puuid) for puuid in puuids}
+        fetched = {}
+        for puuid, future in futures.items():
+            try:
+                fetched[puuid] = future.result()
+            except Exception as e:
+                logger.error(f"ランク取得エラー: {puuid} - {e}")
+                fetched[puuid] = None
+        return fetched
+
+    def resolve_tiers(self, puuids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        複数プレイヤーのソロランクティアを解決
+
+        Returns:
+            PUUID → ティア名（アンランクは None）
+        """
+        return {puuid: player_rank.tier for puuid, player_rank in self.resolve(puuids).items()}
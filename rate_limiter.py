@@ -0,0 +1,309 @@
+"""
+Adaptive Rate Limiter for Riot Games API
+レスポンスヘッダーから制限値を学習するスライディングウィンドウ方式のレート制限
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# ヘッダーを受信するまで使用するアプリ制限（開発用キーの値）
+DEFAULT_APP_RATE_LIMITS: List[Tuple[int, int]] = [(20, 1), (100, 120)]
+
+# Retry-After が付かない 429（service 由来など）の待機秒数
+DEFAULT_RETRY_AFTER = 1.0
+
+# ウィンドウに加える余裕（秒）
+# 送信記録は送信前の時刻だが、サーバーは受信時刻で数えるため、
+# 余裕が無いとサーバー側のウィンドウより先に枠が空いたと判断してしまう
+WINDOW_MARGIN = 0.1
+
+
+def parse_rate_limit_header(value: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    レート制限ヘッダーを解析
+
+    Args:
+        value: "20:1,100:120" 形式のヘッダー値（X-App-Rate-Limit など）
+
+    Returns:
+        (回数, ウィンドウ秒数) のリスト
+    """
+    pairs = []
+    if not value:
+        return pairs
+    for part in value.split(','):
+        try:
+            count, window = part.strip().split(':')
+            pairs.append((int(count), int(window)))
+        except ValueError:
+            logger.debug(f"レート制限ヘッダーを解析できません: {part}")
+    return pairs
+
+
+class SlidingWindowBucket:
+    """「window 秒あたり limit 回」の1つの制限を管理するスライディングウィンドウ"""
+
+    __slots__ = ('limit', 'window', 'margin', 'timestamps')
+
+    def __init__(self, limit: int, window: float, margin: float = WINDOW_MARGIN):
+        self.limit = limit
+        self.window = window
+        self.margin = margin
+        self.timestamps = deque()
+
+    def _purge(self, now: float):
+        """ウィンドウ外になった送信記録を削除"""
+        timestamps = self.timestamps
+        threshold = now - self.window - self.margin
+        while timestamps and timestamps[0] <= threshold:
+            timestamps.popleft()
+
+    def wait_time(self, now: float) -> float:
+        """次のリクエストを送信できるまでの秒数を計算"""
+        self._purge(now)
+        if len(self.timestamps) < self.limit:
+            return 0.0
+        # limit 件前の送信がウィンドウから外れる時刻まで待つ
+        release_at = self.timestamps[len(self.timestamps) - self.limit] + self.window + self.margin
+        return max(0.0, release_at - now)
+
+    def record(self, now: float):
+        """送信記録を追加"""
+        self.timestamps.append(now)
+
+    def sync_count(self, count: int, now: float):
+        """
+        サーバー側のカウントに合わせる
+
+        同じキーを使う別プロセスの送信分はローカルに記録されないため、
+        サーバーの方が多く数えている場合は差分を現在時刻で補う。
+        """
+        self._purge(now)
+        for _ in range(count - len(self.timestamps)):
+            self.timestamps.append(now)
+
+
+class RateLimiter:
+    """
+    Riot API のアプリ単位・メソッド単位のレート制限を管理するクラス
+
+    - アプリ制限は全メソッドで共有し、メソッド制限はメソッドごとに別バケットで管理する
+    - 制限値は X-App-Rate-Limit / X-Method-Rate-Limit ヘッダーから学習し、
+      *-Count ヘッダーで他プロセスの送信分も反映する
+    - budget_share を指定すると、同じキーを使うプロセス間で制限値を割合で分け合う
+    - 待機時間は送信記録から計算し、ポーリングはしない
+    """
+
+    def __init__(self, app_limits: Optional[List[Tuple[int, int]]] = None, budget_share: float = 1.0):
+        """
+        レートリミッターを初期化
+
+        Args:
+            app_limits: 初期アプリ制限 [(回数, ウィンドウ秒数), ...]
+            budget_share: 同じAPIキーを使うプロセス間で分け合う場合の自分の取り分（0 < share <= 1）
+        """
+        self.budget_share = min(1.0, max(0.0, budget_share)) or 1.0
+        self._lock = threading.Lock()
+        self.app_buckets: Dict[int, SlidingWindowBucket] = {}
+        self.method_buckets: Dict[str, Dict[int, SlidingWindowBucket]] = {}
+        self._app_blocked_until = 0.0
+        self._method_blocked_until: Dict[str, float] = {}
+        self._set_limits(self.app_buckets, self._share(app_limits or DEFAULT_APP_RATE_LIMITS))
+
+    def _share(self, limits: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """制限値を自分の取り分に縮める（各ウィンドウ最低1回）"""
+        if self.budget_share >= 1.0:
+            return limits
+        return [(max(1, int(limit * self.budget_share)), window) for limit, window in limits]
+
+    @staticmethod
+    def _set_limits(buckets: Dict[int, SlidingWindowBucket], limits: List[Tuple[int, int]]):
+        """バケットの制限値を更新（送信記録は引き継ぐ）"""
+        windows = {window for _, window in limits}
+        for window in list(buckets):
+            if window not in windows:
+                del buckets[window]
+        for limit, window in limits:
+            bucket = buckets.get(window)
+            if bucket:
+                bucket.limit = limit
+            else:
+                buckets[window] = SlidingWindowBucket(limit, window)
+
+    def _wait_time(self, method: str, now: float) -> float:
+        """ロック取得済みの状態で待機秒数を計算"""
+        wait = max(
+            self._app_blocked_until - now,
+            self._method_blocked_until.get(method, 0.0) - now,
+            0.0
+        )
+        for bucket in self.app_buckets.values():
+            wait = max(wait, bucket.wait_time(now))
+        for bucket in self.method_buckets.get(method, {}).values():
+            wait = max(wait, bucket.wait_time(now))
+        return wait
+
+    def try_acquire(self, method: str) -> float:
+        """
+        送信枠の取得を試みる
+
+        Args:
+            method: APIメソッド名（例: 'match-v5.getMatch'）
+
+        Returns:
+            0 なら枠を取得済み。正の値なら取得できず、その秒数後に再試行する。
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._wait_time(method, now)
+            if wait > 0:
+                return wait
+            for bucket in self.app_buckets.values():
+                bucket.record(now)
+            for bucket in self.method_buckets.get(method, {}).values():
+                bucket.record(now)
+            return 0.0
+
+    def acquire(self, method: str) -> float:
+        """
+        送信枠を取得できるまでブロックして待機
+
+        Returns:
+            待機した合計秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(method)
+            if wait <= 0:
+                return waited
+            if wait >= 1:
+                logger.info(f"レート制限により {wait:.2f}秒待機中... ({method})")
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, method: str) -> float:
+        """
+        送信枠を取得できるまで非同期で待機
+
+        Returns:
+            待機した合計秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(method)
+            if wait <= 0:
+                return waited
+            if wait >= 1:
+                logger.info(f"レート制限により {wait:.2f}秒待機中... ({method})")
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def update_from_headers(self, method: str, headers: Mapping[str, str]):
+        """
+        レスポンスヘッダーから制限値と現在のカウントを学習
+
+        Args:
+            method: APIメソッド名
+            headers: レスポンスヘッダー
+        """
+        app_limits = parse_rate_limit_header(headers.get('X-App-Rate-Limit'))
+        app_counts = parse_rate_limit_header(headers.get('X-App-Rate-Limit-Count'))
+        method_limits = parse_rate_limit_header(headers.get('X-Method-Rate-Limit'))
+        method_counts = parse_rate_limit_header(headers.get('X-Method-Rate-Limit-Count'))
+
+        with self._lock:
+            now = time.monotonic()
+            if app_limits:
+                self._set_limits(self.app_buckets, self._share(app_limits))
+            if method_limits:
+                self._set_limits(self.method_buckets.setdefault(method, {}), self._share(method_limits))
+
+            if self.budget_share < 1.0:
+                # 予算を割合で分け合っている場合、サーバーのカウントには他プロセスの取り分も含まれるため合わせない
+                return
+            for count, window in app_counts:
+                bucket = self.app_buckets.get(window)
+                if bucket:
+                    bucket.sync_count(count, now)
+            for count, window in method_counts:
+                bucket = self.method_buckets.get(method, {}).get(window)
+                if bucket:
+                    bucket.sync_count(count, now)
+
+    def register_rate_limited(self, method: str, headers: Mapping[str, str]) -> float:
+        """
+        429 レスポンスを記録し、制限の種類に応じて該当スコープだけを停止
+
+        Args:
+            method: APIメソッド名
+            headers: 429 レスポンスのヘッダー
+
+        Returns:
+            Retry-After の秒数
+        """
+        self.update_from_headers(method, headers)
+        try:
+            retry_after = float(headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+        except (TypeError, ValueError):
+            retry_after = DEFAULT_RETRY_AFTER
+        limit_type = (headers.get('X-Rate-Limit-Type') or '').lower()
+
+        with self._lock:
+            blocked_until = time.monotonic() + retry_after
+            if limit_type == 'application':
+                self._app_blocked_until = max(self._app_blocked_until, blocked_until)
+            else:
+                # method / service 由来の 429 は該当メソッドだけを止める
+                self._method_blocked_until[method] = max(
+                    self._method_blocked_until.get(method, 0.0), blocked_until
+                )
+
+        logger.warning(
+            f"レート制限に達しました ({limit_type or 'unknown'}: {method})。"
+            f"{retry_after:.0f}秒後にリトライします。"
+        )
+        return retry_after
+
+
+class HostRateLimiters:
+    """
+    ルーティングホストごとに独立した RateLimiter を保持するクラス
+
+    Riot API はプラットフォームホスト（jp1.api.riotgames.com など）と
+    リージョナルホスト（asia.api.riotgames.com など）で別々に制限を数えるため、
+    ホストごとに予算を分けて管理する。
+    """
+
+    def __init__(self, app_limits: Optional[List[Tuple[int, int]]] = None, budget_share: float = 1.0):
+        """
+        Args:
+            app_limits: 各ホストの初期アプリ制限 [(回数, ウィンドウ秒数), ...]
+            budget_share: 各ホストの予算のうち自分が使う割合（RateLimiter を参照）
+        """
+        self.app_limits = app_limits
+        self.budget_share = budget_share
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host: str) -> RateLimiter:
+        """ホストの RateLimiter を取得（無ければ作成）"""
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.setdefault(host, RateLimiter(self.app_limits, self.budget_share))
+        return limiter
+
+    def for_url(self, url: str) -> RateLimiter:
+        """リクエストURLのホストに対応する RateLimiter を取得"""
+        return self.for_host(urlparse(url).netloc)
+
+    def hosts(self) -> List[str]:
+        """予算を管理しているホスト一覧"""
+        return list(self._limiters)
@@ -4,22 +4,51 @@ Realtime Data Collector for LOL Winrate System
 """
 
 import logging
+import threading
 import time
+from concurrent.futures import Future
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
 
-from riot_api_client import RiotAPIClient
-from timeline_analyzer import TimelineAnalyzer, SoloKillEvent
+from riot_api_client import RiotAPIClient, TIER_TO_VALUE
+from collection_pipeline import CollectionPipeline
+from crawl_frontier import CrawlFrontier, FrontierEntry
+from crawl_journal import CrawlJournal
+from match_cache import MatchPayloadCache
+from match_dedup import MatchDedupIndex
+from match_rows import MatchWrite, MatchWriteBatch, build_match_rows, matchup_to_row
+from payload_archive import DEFAULT_SEGMENT_BYTES, PayloadArchive
+from player_watermarks import MATCH_LIST_PAGE_SIZE, ListingProgress, PlayerWatermarkStore, match_game_end
+from rank_resolver import PlayerRankResolver
+from retry_policy import RetryPolicy
+from shard_coordination import ShardClaims, puuid_shard
+from request_scheduler import RequestScheduler
+from static_data_cache import StaticDataCache
+from timeline_analyzer import TimelineAnalyzer
 from database_manager_realtime import RealtimeDatabaseManager
 from match_data_analyzer import MatchDataAnalyzer
+from write_behind import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
+# クロール中にフロンティアが空のとき、パイプラインの完了を確認する間隔（秒）
+FRONTIER_POLL_SECONDS = 0.1
+
+# クロールジャーナルに保存して再開時に引き継ぐ統計
+JOURNAL_COUNTERS = ('matches_processed', 'solo_kills_found', 'matchups_created', 'timeline_analyzed',
+                    'failed_requests')
+
+# 何試合保存するごとに統計をジャーナルへ保存するか
+JOURNAL_COUNTER_INTERVAL = 50
+
 class RealtimeDataCollector:
     """リアルタイム勝率予測用データ収集システム"""
     
-    def __init__(self, api_key: str, mysql_config: Dict, region: str = 'jp1'):
+    def __init__(self, api_key: str, mysql_config: Dict, region: str = 'jp1',
+                 cache_config: Optional[Dict] = None, retry_config: Optional[Dict] = None,
+                 telemetry_config: Optional[Dict] = None, pipeline_config: Optional[Dict] = None,
+                 shard_config: Optional[Dict] = None):
         """
         データ収集システムを初期化
         
@@ -27,13 +56,135 @@ class RealtimeDataCollector:
             api_key: Riot Games APIキー
             mysql_config: MySQL接続設定
             region: リージョン
+            cache_config: キャッシュ設定（config.CACHE_CONFIG 形式、None ならキャッシュ無効）
+            retry_config: リトライ設定（config.RETRY_CONFIG 形式、None なら既定値）
+            telemetry_config: テレメトリ設定（config.TELEMETRY_CONFIG 形式、None なら公開しない）
+            pipeline_config: 収集パイプライン設定（config.PIPELINE_CONFIG 形式、None なら既定値）
+            shard_config: 複数プロセスで分担する場合のシャード設定（sharded_collection.ShardSpec.shard_config、
+                          None なら単独で収集）
         """
-        self.api_client = RiotAPIClient(api_key, region)
+        # シャードID・担当する PUUID ハッシュ・APIキー予算の割合・共有の担当表
+        self.shard_config = {
+            'shard_id': 'main',
+            'hash_index': 0,
+            'hash_count': 1,
+            'rate_limit_share': 1.0,
+            'coordination_path': None,
+        }
+        self.shard_config.update(shard_config or {})
+        
+        match_cache = None
+        if cache_config and cache_config.get('match_cache_dir'):
+            match_cache = MatchPayloadCache(
+                cache_config['match_cache_dir'],
+                cache_config.get('match_cache_max_bytes', 5 * 1024 ** 3)
+            )
+        
+        self.api_client = RiotAPIClient(
+            api_key, region, match_cache=match_cache,
+            retry_policy=RetryPolicy.from_config(retry_config),
+            rate_limit_share=self.shard_config['rate_limit_share']
+        )
+        if telemetry_config and telemetry_config.get('metrics_port'):
+            # エンドポイントごとの集計を Prometheus 形式で公開
+            self.api_client.telemetry.start_http_server(
+                telemetry_config['metrics_port'], telemetry_config.get('metrics_host', '127.0.0.1')
+            )
         self.db_manager = RealtimeDatabaseManager(**mysql_config)
         self.timeline_analyzer = TimelineAnalyzer()
         self.match_analyzer = MatchDataAnalyzer()
         
-        # 統計情報
+        cache_config = cache_config or {}
+        
+        # DDragon の静的データはパッチバージョンごとにディスクへ保存して再利用する
+        self.static_data_cache = StaticDataCache(
+            cache_config.get('static_data_dir', 'cache/ddragon'), self.api_client
+        )
+        static_data = self.static_data_cache.load_latest_cached()
+        if static_data:
+            self._apply_static_data(static_data)
+        
+        # 探索 → 取得 → 分析 → 永続化 の各ステージのワーカー数とキュー上限
+        self.pipeline_config = {
+            'discovery_workers': 2,
+            'fetch_workers': 16,
+            'analysis_workers': 2,
+            'persistence_workers': 4,
+            'queue_size': 64,
+            'frontier_dir': 'cache/frontier',
+            'frontier_memory_entries': 100000,
+            'recrawl_seconds': 6 * 3600,
+            'journal_path': None,
+            'backfill_depth': 300,
+            'refresh_max_pages': 10,
+            'write_behind_path': None,
+            'write_behind_batch_size': 50,
+            'write_behind_flush_seconds': 1.0,
+            'write_behind_max_pending': 200,
+            'write_behind_close_seconds': 60.0,
+            'scheduler_workers': None,
+        }
+        self.pipeline_config.update(pipeline_config or {})
+        
+        # API呼び出しは優先度付きスケジューラー経由で送信する
+        # （取得途中の試合のタイムライン > 試合詳細 > 試合ID > ランク > リーグページ）
+        # 既定では取得・探索の全ワーカーが同時に待てる数のワーカーを持つ
+        self.scheduler = RequestScheduler(
+            self.api_client,
+            max_workers=self.pipeline_config['scheduler_workers'] or (
+                self.pipeline_config['fetch_workers'] + self.pipeline_config['discovery_workers']
+            )
+        )
+        
+        # 参加者ランクは TTL 付きキャッシュ（メモリ + player_ranks テーブル）から解決し、
+        # キャッシュに無いプレイヤーの問い合わせはスケジューラーの 'rank' クラスとして送る
+        self.api_client.rank_resolver = PlayerRankResolver(
+            self.api_client,
+            self.db_manager,
+            ttl_seconds=cache_config.get('rank_ttl_seconds', 24 * 3600),
+            max_memory_entries=cache_config.get('rank_memory_entries', 100000),
+            scheduler=self.scheduler
+        )
+        
+        # 探索対象のプレイヤー・試合ID（リーグページで種をまき、取り込んだ試合の参加者で増やす）
+        self.frontier = CrawlFrontier(
+            self.pipeline_config['frontier_dir'],
+            max_memory_entries=self.pipeline_config['frontier_memory_entries'],
+            recrawl_seconds=self.pipeline_config['recrawl_seconds']
+        )
+        
+        # 同じ実行中に複数プレイヤーの履歴に現れた試合を重複して取得しない
+        self._seen_match_ids = set()
+        self._seen_lock = threading.Lock()
+        
+        # 処理済み試合IDは起動時にメモリへ読み込み、試合IDのページ単位で判定する
+        self.match_index = MatchDedupIndex(
+            self.db_manager,
+            capacity=cache_config.get('dedup_capacity', 5_000_000),
+            false_positive_rate=cache_config.get('dedup_false_positive_rate', 0.001)
+        )
+        self.match_index.load()
+        
+        # 試合詳細・タイムラインの生レスポンスの追記専用アーカイブ（分析ロジック変更時の再処理用）
+        self.payload_archive = None
+        if cache_config.get('payload_archive_dir'):
+            self.payload_archive = PayloadArchive(
+                cache_config['payload_archive_dir'],
+                writer_id=self.shard_config['shard_id'],
+                segment_max_bytes=cache_config.get('payload_segment_bytes', DEFAULT_SEGMENT_BYTES)
+            )
+        
+        # プレイヤーごとの収集済み位置（更新時は新しい試合だけ、過去方向は start を進めて取得）
+        self.watermarks = PlayerWatermarkStore(self.db_manager)
+        # 一覧中の試合がすべて保存できてから収集済み位置を進める
+        self.listings = ListingProgress(self.watermarks)
+        
+        # 他のシャードと同じ試合・プレイヤーを同時に扱わないための共有の担当表
+        self.shard_claims = None
+        if self.shard_config.get('coordination_path'):
+            self.shard_claims = ShardClaims(self.shard_config['coordination_path'], self.shard_config['shard_id'])
+        
+        # 統計情報（パイプラインの各ワーカーから更新するためロックで保護）
         self.stats = {
             'matches_processed': 0,
             'solo_kills_found': 0,
@@ -42,6 +193,20 @@ class RealtimeDataCollector:
             'failed_requests': 0,
             'start_time': None
         }
+        self._stats_lock = threading.Lock()
+        # ジャーナルに保存済みを記録した試合数（統計を保存する間隔の判定用、_stats_lock で保護）
+        self._journal_done_count = 0
+        
+        # DB書き込みバッファ（収集の実行中だけ開く。永続化ステージは退避ファイルへの追記だけで次の試合へ進む）
+        self.write_behind = None
+        # 書き込みバッファに渡した試合の、DB にコミットできた後の処理に使う情報（_stats_lock で保護）
+        self._awaiting_write: Dict[str, Dict] = {}
+        
+        # 進捗ジャーナル（中断したクロールを同じ位置から再開する）
+        self.journal = None
+        if self.pipeline_config.get('journal_path'):
+            self.journal = CrawlJournal(self.pipeline_config['journal_path'])
+            self._restore_from_journal()
         
         logger.info("リアルタイムデータ収集システムを初期化しました")
     
@@ -50,11 +215,13 @@ class RealtimeDataCollector:
         try:
             logger.info("静的データのセットアップを開始...")
             
-            # 最新バージョンを取得
-            latest_version = self.api_client.get_latest_version()
-            if not latest_version:
-                logger.error("最新バージョンの取得に失敗")
+            # 最新バージョンの静的データを取得（保存済みならダウンロードしない）
+            static_data = self.static_data_cache.load_latest()
+            if not static_data:
+                logger.error("最新バージョンの静的データの取得に失敗")
                 return False
+            latest_version = static_data.version
+            self._apply_static_data(static_data)
             
             # ゲームバージョンを挿入
             if not self.db_manager.insert_game_version(latest_version, is_active=True):
@@ -62,7 +229,7 @@ class RealtimeDataCollector:
                 return False
             
             # チャンピオンデータを取得・挿入
-            champion_data = self.api_client.get_champion_data(latest_version)
+            champion_data = static_data.champion_data
             if champion_data:
                 champions_inserted = 0
                 for champion_key, champion_info in champion_data.get('data', {}).items():
@@ -80,7 +247,7 @@ class RealtimeDataCollector:
                 logger.info(f"チャンピオンデータを挿入: {champions_inserted}体")
             
             # アイテムデータを取得・挿入
-            item_data = self.api_client.get_item_data(latest_version)
+            item_data = static_data.item_data
             if item_data:
                 items_inserted = 0
                 for item_id, item_info in item_data.get('data', {}).items():
@@ -108,331 +275,614 @@ class RealtimeDataCollector:
             logger.error(f"静的データセットアップエラー: {e}")
             return False
     
-    def collect_match_with_timeline(self, match_id: str) -> bool:
-        """試合データとタイムラインを収集・分析"""
-        try:
-            logger.info(f"試合データ収集開始: {match_id}")
+    def _restore_from_journal(self):
+        """ジャーナルから探索済みプレイヤーと統計を復元"""
+        recrawl_since = time.time() - self.pipeline_config['recrawl_seconds']
+        crawled = self.journal.crawled_players(since=recrawl_since)
+        for puuid, crawled_at in crawled.items():
+            self.frontier.mark_crawled(puuid, crawled_at)
+        
+        counters = self.journal.load_counters()
+        for key in JOURNAL_COUNTERS:
+            self.stats[key] = counters.get(key, self.stats[key])
+        
+        logger.info(f"クロールジャーナルから復元しました: 探索済み{len(crawled)}人, {self.journal.summary()}")
+    
+    def _save_journal_counters(self):
+        if self.journal:
+            with self._stats_lock:
+                counters = {key: self.stats[key] for key in JOURNAL_COUNTERS}
+            self.journal.save_counters(counters)
+    
+    def _record_journal_match_done(self, match_id: str):
+        """ジャーナルに保存済みを記録し、JOURNAL_COUNTER_INTERVAL 試合ごとに統計も保存"""
+        if not self.journal:
+            return
+        self.journal.record_match_done(match_id)
+        with self._stats_lock:
+            self._journal_done_count += 1
+            save_counters = self._journal_done_count % JOURNAL_COUNTER_INTERVAL == 0
+        if save_counters:
+            self._save_journal_counters()
+    
+    def _resume_entries(self) -> List[FrontierEntry]:
+        """前回中断した時点で取得待ちだった試合"""
+        if not self.journal:
+            return []
+        match_ids = self.journal.pending_matches()
+        if match_ids:
+            logger.info(f"前回の取得待ち試合から再開します: {len(match_ids)}試合")
+        return [FrontierEntry('match', match_id) for match_id in match_ids]
+    
+    def _count(self, key: str, value: int = 1):
+        """統計情報を加算（スレッドセーフ）"""
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + value
+    
+    def _apply_static_data(self, static_data):
+        """静的データの検索用テーブルを分析器に設定"""
+        self.timeline_analyzer.apply_static_data(static_data)
+        self.match_analyzer.apply_static_data(static_data)
+        logger.info(f"静的データを適用しました: {static_data.version}")
+    
+    def _prefetch_match(self, match_id: str) -> Future:
+        """
+        試合詳細とタイムラインの取得をスケジューラーに登録
 
-            # 試合データを取得
-            match_data = self.api_client.get_match_data(match_id)
+        タイムラインは試合詳細の取得に成功してから高優先度で登録するため、
+        取得を始めた試合が新しい試合より先に揃う。
+
+        Returns:
+            (試合詳細データ, タイムライン詳細データ) を結果に持つ Future
+        """
+        result = Future()
+
+        def on_timeline(timeline_future: Future, match_data: Dict):
+            timeline_data = timeline_future.result() if not timeline_future.exception() else None
+            result.set_result((match_data, timeline_data))
+
+        def on_match(match_future: Future):
+            match_data = match_future.result() if not match_future.exception() else None
             if not match_data:
-                logger.warning(f"試合データの取得に失敗: {match_id}")
-                self.stats['failed_requests'] += 1
-                return False
-            
-            # タイムラインデータを取得
-            timeline_data = self.api_client.get_match_timeline(match_id)
-            if not timeline_data:
-                logger.warning(f"タイムラインデータの取得に失敗: {match_id}")
-                # タイムラインなしでも基本データは保存
-                return self._process_match_without_timeline(match_data)
-            
-            # 試合の平均ランクを取得
-            average_rank = self.api_client.get_match_average_tier_by_match_id(match_data)
-            if not self.db_manager.insert_match(match_data, average_rank):
-                logger.error(f"試合データの挿入に失敗: {match_id}")
-                return False
-            
-            # 参加者データを挿入
-            participants = match_data.get('info', {}).get('participants', [])
-            for participant in participants:
-                if not self.db_manager.insert_participant(match_id, participant):
-                    logger.warning(f"参加者データの挿入に失敗: {participant.get('participantId')}")
-            
-            # タイムライン分析
-            timeline_result = self.timeline_analyzer.analyze_timeline(timeline_data, match_data)
-            if not timeline_result:
-                logger.warning(f"タイムライン分析に失敗: {match_id}")
+                result.set_result((None, None))
+                return
+            try:
+                self.scheduler.submit('timeline', 'get_match_timeline', match_id).add_done_callback(
+                    lambda f: on_timeline(f, match_data)
+                )
+            except Exception as e:
+                logger.error(f"タイムライン取得の登録に失敗: {match_id} - {e}")
+                result.set_result((match_data, None))
+
+        self.scheduler.submit('match', 'get_match_data', match_id).add_done_callback(on_match)
+        return result
+
+    def collect_match_with_timeline(self, match_id: str, prefetched: Optional[Future] = None) -> bool:
+        """
+        試合データとタイムラインを収集・分析
+        
+        パイプラインの 取得 → 分析 → 永続化 を1試合分だけ順に実行する。
+        
+        Args:
+            match_id: 試合ID
+            prefetched: _prefetch_match で登録済みの取得結果（None ならここで取得する）
+        """
+        try:
+            logger.info(f"試合データ収集開始: {match_id}")
+            bundle = self._fetch_match_bundle(match_id, prefetched)
+            if not bundle:
                 return False
-            
-            self.stats['timeline_analyzed'] += 1
-            
-            # 対面データとソロキルを処理
-            success = self._process_matchups_and_solo_kills(match_data, timeline_result)
-            
-            if success:
-                self.stats['matches_processed'] += 1
-                logger.info(f"試合データ処理完了: {match_id}")
-            
-            return success
+            return self._persist_match_bundle(self._analyze_match_bundle(bundle))
             
         except Exception as e:
             logger.error(f"試合データ収集エラー: {match_id} - {e}")
-            self.stats['failed_requests'] += 1
+            self._count('failed_requests')
             return False
     
-    def _process_match_without_timeline(self, match_data: Dict) -> bool:
-        """タイムラインなしで試合データを処理"""
-        try:
-            match_id = match_data.get('metadata', {}).get('matchId')
-            
-            # 試合データを挿入
-            if not self.db_manager.insert_match(match_data):
-                return False
-            
-            # 参加者データを挿入
-            participants = match_data.get('info', {}).get('participants', [])
-            for participant in participants:
-                self.db_manager.insert_participant(match_id, participant)
-            
-            # 基本的な対面データを作成（ソロキル情報なし）
-            matchups = self.match_analyzer.extract_matchups(match_data)
-            for matchup in matchups:
-                self.db_manager.insert_matchup(matchup)
-                self.stats['matchups_created'] += 1
-            
-            self.stats['matches_processed'] += 1
-            return True
-            
-        except Exception as e:
-            logger.error(f"タイムラインなし試合処理エラー: {e}")
-            return False
+    def _fetch_match_bundle(self, match_id: str, prefetched: Optional[Future] = None) -> Optional[Dict]:
+        """
+        試合詳細・タイムライン・平均ランクを取得（ネットワーク処理）
+        
+        Returns:
+            match_id, match_data, timeline_data, average_rank を持つ辞書。試合詳細が取れなければ None
+        """
+        match_data, timeline_data = (prefetched or self._prefetch_match(match_id)).result()
+        if not match_data:
+            logger.warning(f"試合データの取得に失敗: {match_id}")
+            self._count('failed_requests')
+            return None
+        
+        if not timeline_data:
+            logger.warning(f"タイムラインデータの取得に失敗: {match_id}")
+        
+        return {
+            'match_id': match_id,
+            'match_data': match_data,
+            'timeline_data': timeline_data,
+            # 試合の平均ランク（タイムラインなしの試合は従来どおり平均ランクなしで保存）
+            'average_rank': (self.api_client.get_match_average_tier_by_match_id(match_data)
+                             if timeline_data else None),
+        }
     
-    def _process_matchups_and_solo_kills(self, match_data: Dict, timeline_result: Dict) -> bool:
-        """対面データとソロキル情報を処理"""
-        try:
-            match_id = match_data.get('metadata', {}).get('matchId')
-            participants = timeline_result.get('participants', {})
-            lane_solo_kills = timeline_result.get('lane_solo_kills', {})
-            
-            # 対面データを作成
+    def _analyze_match_bundle(self, bundle: Dict) -> Dict:
+        """
+        タイムライン分析と対面データの抽出（CPU処理）
+        
+        Returns:
+            timeline_result と matchups を追加した bundle
+        """
+        match_data = bundle['match_data']
+        matchups = self.match_analyzer.extract_matchups(match_data)
+        bundle['matchups'] = matchups
+        bundle['timeline_result'] = None
+        
+        if bundle['timeline_data']:
+            timeline_result = self.timeline_analyzer.analyze_timeline(bundle['timeline_data'], match_data)
+            if timeline_result:
+                bundle['timeline_result'] = timeline_result
+                bundle['matchups'] = [
+                    self._convert_matchup_to_dict(matchup) if hasattr(matchup, '__dict__') else matchup
+                    for matchup in matchups
+                ]
+            else:
+                logger.warning(f"タイムライン分析に失敗: {bundle['match_id']}")
+        return bundle
+    
+    def _persist_match_bundle(self, bundle: Dict, expand_frontier: bool = False) -> bool:
+        """
+        分析済みの試合をDBへ保存（DB処理、1試合を1トランザクション。書き込みバッファがあれば退避ファイルへの追記だけ）
+        
+        重複排除・ジャーナル・収集済み位置・フロンティアの更新は、DB にコミットできてから
+        _on_match_stored で行う（書き込みバッファ経由なら書き込みスレッドから呼ばれる）。
+        
+        Args:
+            bundle: 分析済みの試合
+            expand_frontier: 保存した試合の参加者をフロンティアに追加するか
+        
+        Returns:
+            保存したか（書き込みバッファなら受け付けたか）。タイムライン分析に失敗した試合は False
+        """
+        match_id = bundle['match_id']
+        match_data = bundle['match_data']
+        timeline_result = bundle['timeline_result']
+        
+        if self.payload_archive:
+            # 派生データより先に生データを残す（DB への保存に失敗しても再処理できる）
+            self.payload_archive.append(match_id, match_data, bundle['timeline_data'])
+        
+        # 対面データを作成（分析ステージで作成済みならそれを使う）
+        matchups = bundle.get('matchups')
+        if matchups is None:
             matchups = self.match_analyzer.extract_matchups(match_data)
-            
-            for matchup in matchups:
-                # MatchupDataオブジェクトを辞書に変換
-                if hasattr(matchup, '__dict__'):
-                    matchup_dict = self._convert_matchup_to_dict(matchup)
-                else:
-                    matchup_dict = matchup
-                
-                lane = matchup_dict['lane'] if isinstance(matchup_dict, dict) else getattr(matchup_dict, 'lane', None)
-                
-                # 対面データを挿入
-                matchup_id = self.db_manager.insert_matchup(matchup_dict)
-                if not matchup_id:
-                    continue
-                
-                self.stats['matchups_created'] += 1
-                
-                # このレーンのソロキルを取得
-                lane_kills = self.timeline_analyzer.get_matchup_solo_kills(
-                    lane_solo_kills.get(lane, []), participants
-                )
-                
-                # ソロキルデータを挿入
-                for solo_kill in lane_kills:
-                    solo_kill_data = self._prepare_solo_kill_data(
-                        solo_kill, match_id, matchup_id, participants
-                    )
-                    
-                    solo_kill_id = self.db_manager.insert_solo_kill(solo_kill_data)
-                    if solo_kill_id:
-                        # キル時アイテム情報を挿入
-                        self._insert_kill_items(solo_kill, solo_kill_id)
-                        self.stats['solo_kills_found'] += 1
-                
-                # リアルタイム統計を更新
-                self._update_realtime_stats(matchup_dict)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"対面・ソロキル処理エラー: {e}")
+        
+        batch = MatchWriteBatch()
+        if not bundle['timeline_data']:
+            # タイムラインなしでも基本データと対面データ（ソロキル情報なし）は保存
+            batch.add(match_data, build_match_rows(match_data, {}, matchups, self.timeline_analyzer),
+                      bundle['average_rank'])
+        elif timeline_result:
+            batch.add(match_data, build_match_rows(match_data, timeline_result, matchups, self.timeline_analyzer),
+                      bundle['average_rank'], has_timeline=True)
+        else:
+            # タイムライン分析に失敗した試合は試合・参加者データだけを保存
+            batch.add(match_data, [], bundle['average_rank'])
+        
+        match_write = batch.matches[0]
+        context = {
+            # タイムライン分析に失敗した試合は収集済みとして扱わない
+            'collected': not (bundle['timeline_data'] and not timeline_result),
+            'expand_frontier': expand_frontier,
+        }
+        if self.write_behind:
+            # コミット後の処理が先に呼ばれても情報が揃っているように、追加する前に登録する
+            with self._stats_lock:
+                self._awaiting_write[match_id] = context
+            if not self.write_behind.enqueue(match_write):
+                with self._stats_lock:
+                    self._awaiting_write.pop(match_id, None)
+                logger.error(f"書き込みバッファに追加できません: {match_id}")
+                self._match_failed(match_id)
+                return False
+            return context['collected']
+        
+        results = self.db_manager.write_match_batch(batch)
+        counts = results.get(match_id) if results else None
+        if counts is None:
+            logger.error(f"試合データの書き込みに失敗: {match_id}")
+            self._match_failed(match_id)
             return False
+        self._on_match_stored(match_write, counts, context)
+        return context['collected']
+    
+    def _on_match_stored(self, match_write: MatchWrite, counts: Dict[str, int], context: Optional[Dict] = None):
+        """
+        DB にコミットできた試合を統計・重複排除・ジャーナル・収集済み位置・フロンティアに反映
+        
+        Args:
+            match_write: 書き込んだ試合
+            counts: write_match_batch が返した件数
+            context: _persist_match_bundle で作った情報（None なら書き込みバッファに登録した分）
+        """
+        match_id = match_write.match_id
+        if context is None:
+            with self._stats_lock:
+                context = self._awaiting_write.pop(match_id, None)
+        if context is None:
+            # 前回の実行から読み直した試合（一覧を取得したプレイヤーは分からない）
+            context = {'collected': True, 'expand_frontier': False}
+        
+        if match_write.has_timeline:
+            self._count('timeline_analyzed')
+        self._count('matchups_created', counts['matchups'])
+        self._count('solo_kills_found', counts['solo_kills'])
+        self._count('matches_processed')
+        self.match_index.add(match_id)
+        logger.info(f"試合データ処理完了: {match_id}")
+        
+        if not context['collected']:
+            self.listings.failed(match_id)
+            return
+        # 一覧を取得したプレイヤーの収集済み位置を進める（一覧の試合がすべて保存できたとき）
+        self.listings.stored(match_id, match_game_end(match_write.match_data))
+        if context['expand_frontier']:
+            self._expand_frontier(match_write.match_data)
+        self._record_journal_match_done(match_id)
+    
+    def _on_match_write_failed(self, match_write: MatchWrite):
+        """書き込みバッファが書き込めなかった試合（次の実行で書き込み直すまで保存済みとして扱わない）"""
+        with self._stats_lock:
+            self._awaiting_write.pop(match_write.match_id, None)
+        self._count('failed_writes')
+        self._match_failed(match_write.match_id)
+    
+    def _open_write_behind(self):
+        """実行の開始時に書き込みバッファを開く（前回の未書き込みの分・書き込めなかった分も書き込む）"""
+        if self.write_behind or not self.pipeline_config.get('write_behind_path'):
+            return
+        self.write_behind = WriteBehindBuffer(
+            self.db_manager,
+            self.pipeline_config['write_behind_path'],
+            batch_size=self.pipeline_config['write_behind_batch_size'],
+            flush_seconds=self.pipeline_config['write_behind_flush_seconds'],
+            max_pending=self.pipeline_config['write_behind_max_pending'],
+            on_written=self._on_match_stored,
+            on_failed=self._on_match_write_failed
+        ).start()
+        self.write_behind.replay_failed()
+    
+    def _close_write_behind(self):
+        """実行の終了時に残りを書き込んで書き込みバッファを閉じる（統計を確定させる）"""
+        if not self.write_behind:
+            return
+        if not self.write_behind.close(self.pipeline_config['write_behind_close_seconds']):
+            logger.warning("書き込みバッファに未書き込みの試合が残りました（次の実行で書き込みます）")
+        with self._stats_lock:
+            self.stats['write_behind'] = self.write_behind.snapshot()
+        self.write_behind = None
     
     def _convert_matchup_to_dict(self, matchup) -> Dict:
         """MatchupDataオブジェクトを辞書に変換"""
-        try:
-            if hasattr(matchup, 'player1') and hasattr(matchup, 'player2'):
-                # MatchupDataオブジェクトの場合
-                player1 = matchup.player1
-                player2 = matchup.player2
-                
-                # BOTレーンの場合、追加プレイヤーを探す
-                player3_data = None
-                player4_data = None
-                
-                if matchup.lane == 'BOTTOM':
-                    # BOTレーンの場合は2vs2なので、追加のプレイヤーデータが必要
-                    # 現在の実装では1vs1のみなので、NULLで設定
-                    pass
-                
-                matchup_dict = {
-                    'match_id': matchup.match_id,
-                    'lane': matchup.lane,
-                    'player1_puuid': player1.puuid,
-                    'player1_participant_id': getattr(player1, 'participant_id', 1),
-                    'player1_champion_id': player1.champion_id,
-                    'player1_champion_name': player1.champion_name,
-                    'player1_level': player1.champion_level,
-                    'player1_team_id': player1.team_id,
-                    'player2_puuid': player2.puuid,
-                    'player2_participant_id': getattr(player2, 'participant_id', 2),
-                    'player2_champion_id': player2.champion_id,
-                    'player2_champion_name': player2.champion_name,
-                    'player2_level': player2.champion_level,
-                    'player2_team_id': player2.team_id,
-                    'player3_puuid': None,
-                    'player3_participant_id': None,
-                    'player3_champion_id': None,
-                    'player3_champion_name': None,
-                    'player3_level': None,
-                    'player3_team_id': None,
-                    'player4_puuid': None,
-                    'player4_participant_id': None,
-                    'player4_champion_id': None,
-                    'player4_champion_name': None,
-                    'player4_level': None,
-                    'player4_team_id': None,
-                    'level_diff': player1.champion_level - player2.champion_level,
-                    'gold_diff': player1.gold_earned - player2.gold_earned,
-                    'item_gold_diff': self._calculate_item_gold_diff(player1.items, player2.items),
-                    'cs_diff': player1.cs_total - player2.cs_total,
-                    'kda_diff': self._calculate_kda_diff(player1, player2),
-                    'player1_win': player1.win,
-                    'player2_win': player2.win,
-                    'game_duration': matchup.game_duration,
-                    'game_version': matchup.game_version,
-                    'game_creation': matchup.game_creation
-                }
-                
-                return matchup_dict
-            else:
-                # 既に辞書の場合
-                return matchup
-                
-        except Exception as e:
-            logger.error(f"MatchupData変換エラー: {e}")
-            return {}
+        return matchup_to_row(matchup, self.timeline_analyzer)
     
-    def _calculate_item_gold_diff(self, items1: List[int], items2: List[int]) -> int:
-        """アイテムのゴールド差を計算"""
-        try:
-            value1 = self.timeline_analyzer.calculate_item_value(items1)
-            value2 = self.timeline_analyzer.calculate_item_value(items2)
-            return value1 - value2
-        except Exception:
-            return 0
+    def build_collection_pipeline(self, match_count: int = 20, expand_frontier: bool = False,
+                                  backfill: bool = False) -> CollectionPipeline:
+        """
+        試合ID探索 → 取得 → タイムライン分析 → 永続化 のパイプラインを作成
+        
+        入力は (puuid, サモナー名) のタプルか FrontierEntry。各ステージは有界キューで繋がり、
+        取得（ネットワーク）・分析（CPU）・保存（DB）が同時に進む。
+        送信間隔はレートリミッターが制御するため固定の待機は入れない。
+        
+        Args:
+            match_count: プレイヤーあたりの試合数
+            expand_frontier: 保存した試合の参加者をフロンティアに追加するか
+            backfill: 新しい試合ではなく過去方向に履歴を取得するか
+        
+        Returns:
+            未開始のパイプライン（永続化ステージの emitted が保存できた試合数）
+        """
+        config = self.pipeline_config
+        
+        def discover(item, emit):
+            if isinstance(item, FrontierEntry):
+                if item.kind == 'match':
+                    claimed = self._claim_matches([item.key])
+                    if not claimed and self.journal:
+                        # 保存済み（前回の done が反映される前に中断した）
+                        self.journal.record_match_done(item.key)
+                    for match_id in claimed:
+                        emit((match_id, None))
+                    return
+                puuid, summoner_name = item.key, item.name or item.key[:8]
+            else:
+                puuid, summoner_name = item
+                self.frontier.mark_crawled(puuid)
+            if not self._claim_player(puuid):
+                logger.debug(f"他のシャードが担当するプレイヤーをスキップ: {summoner_name}")
+                return
+            match_ids = self._list_player_matches(puuid, match_count, backfill)
+            if match_ids is None:
+                logger.warning(f"試合履歴の取得に失敗: {summoner_name}")
+                return
+            new_match_ids = self._claim_matches(match_ids)
+            self.listings.begin(puuid, new_match_ids)
+            if self.journal:
+                # 試合IDを先に記録するため、プレイヤーが done なら試合IDは必ずジャーナルにある
+                self.journal.record_matches_pending(new_match_ids, puuid)
+                self.journal.record_player_done(puuid)
+            logger.info(f"プレイヤー試合探索: {summoner_name} - {len(new_match_ids)}/{len(match_ids)}試合が未処理")
+            for match_id in new_match_ids:
+                emit((match_id, puuid))
+        
+        def fetch(item, emit):
+            # 一覧を取得したプレイヤーは ListingProgress が試合IDから引く
+            match_id, _ = item
+            try:
+                bundle = self._fetch_match_bundle(match_id)
+            except Exception as e:
+                logger.error(f"試合データ取得エラー: {match_id} - {e}")
+                self._count('failed_requests')
+                self._match_failed(match_id)
+                raise
+            if bundle:
+                emit(bundle)
+            else:
+                self._match_failed(match_id)
+        
+        def analyze(bundle, emit):
+            try:
+                bundle = self._analyze_match_bundle(bundle)
+            except Exception:
+                self._match_failed(bundle['match_id'])
+                raise
+            emit(bundle)
+        
+        def persist(bundle, emit):
+            try:
+                accepted = self._persist_match_bundle(bundle, expand_frontier)
+            except Exception:
+                self._match_failed(bundle['match_id'])
+                raise
+            if accepted:
+                emit(bundle['match_id'])
+        
+        return (CollectionPipeline('realtime_collection')
+                .add_stage('discovery', discover, config['discovery_workers'], config['queue_size'])
+                .add_stage('fetch', fetch, config['fetch_workers'], config['queue_size'])
+                .add_stage('analysis', analyze, config['analysis_workers'], config['queue_size'])
+                .add_stage('persistence', persist, config['persistence_workers'], config['queue_size']))
     
-    def _calculate_kda_diff(self, player1, player2) -> float:
-        """KDA差を計算"""
-        try:
-            kda1 = (player1.kills + player1.assists) / max(player1.deaths, 1)
-            kda2 = (player2.kills + player2.assists) / max(player2.deaths, 1)
-            return round(kda1 - kda2, 3)
-        except Exception:
-            return 0.0
-    
-    def _prepare_solo_kill_data(self, solo_kill: SoloKillEvent, match_id: str, 
-                               matchup_id: int, participants: Dict) -> Dict:
-        """ソロキルデータを準備"""
-        killer_info = participants.get(solo_kill.killer_participant_id, {})
-        victim_info = participants.get(solo_kill.victim_participant_id, {})
+    def run_collection_pipeline(self, players: List, match_count: int = 20,
+                                backfill: bool = False) -> Dict[str, Dict]:
+        """
+        プレイヤー一覧をパイプラインに流して収集
         
-        return {
-            'match_id': match_id,
-            'matchup_id': matchup_id,
-            'timestamp_ms': solo_kill.timestamp_ms,
-            'game_time_seconds': solo_kill.game_time_seconds,
-            'killer_participant_id': solo_kill.killer_participant_id,
-            'killer_champion_id': killer_info.get('champion_id'),
-            'killer_champion_name': killer_info.get('champion_name'),
-            'killer_level': solo_kill.killer_level,
-            'killer_gold': solo_kill.killer_gold,
-            'killer_position_x': solo_kill.killer_position[0],
-            'killer_position_y': solo_kill.killer_position[1],
-            'victim_participant_id': solo_kill.victim_participant_id,
-            'victim_champion_id': victim_info.get('champion_id'),
-            'victim_champion_name': victim_info.get('champion_name'),
-            'victim_level': solo_kill.victim_level,
-            'victim_gold': solo_kill.victim_gold,
-            'victim_position_x': solo_kill.victim_position[0],
-            'victim_position_y': solo_kill.victim_position[1],
-            'level_diff': solo_kill.killer_level - solo_kill.victim_level,
-            'gold_diff': solo_kill.killer_gold - solo_kill.victim_gold,
-            'is_first_blood': solo_kill.is_first_blood,
-            'is_shutdown': solo_kill.is_shutdown,
-            'bounty_gold': solo_kill.bounty_gold
-        }
+        Args:
+            players: (puuid, サモナー名) のリスト
+            match_count: プレイヤーあたりの試合数（収集済み位置が無いプレイヤーのみ）
+            backfill: 過去方向に履歴を取得するか
+        
+        Returns:
+            ステージごとの統計
+        """
+        players = list(players)
+        self.watermarks.preload([player[0] for player in players if isinstance(player, tuple)])
+        self._open_write_behind()
+        # 前回中断した時点で取得待ちだった試合を先に流す
+        pipeline = self.build_collection_pipeline(match_count, backfill=backfill)
+        pipeline_stats = pipeline.run(self._resume_entries() + players)
+        self._close_write_behind()
+        with self._stats_lock:
+            self.stats['pipeline'] = pipeline_stats
+        self._save_journal_counters()
+        if self.journal:
+            self.journal.flush()
+        return pipeline_stats
     
-    def _insert_kill_items(self, solo_kill: SoloKillEvent, solo_kill_id: int):
-        """キル時アイテム情報を挿入"""
+    def collect_player_matches_with_timeline(self, puuid: str, summoner_name: str, 
+                                           match_count: int = 20, backfill: bool = False) -> int:
+        """プレイヤーの試合データをタイムライン付きで収集"""
         try:
-            # キラーのアイテム
-            killer_item_value = self.timeline_analyzer.calculate_item_value(solo_kill.killer_items)
-            self.db_manager.insert_kill_items(
-                solo_kill_id, solo_kill.killer_participant_id, 'killer',
-                solo_kill.killer_items, killer_item_value
-            )
-            
-            # 被害者のアイテム
-            victim_item_value = self.timeline_analyzer.calculate_item_value(solo_kill.victim_items)
-            self.db_manager.insert_kill_items(
-                solo_kill_id, solo_kill.victim_participant_id, 'victim',
-                solo_kill.victim_items, victim_item_value
-            )
+            logger.info(f"プレイヤー試合収集開始: {summoner_name} ({match_count}試合)")
+            pipeline_stats = self.run_collection_pipeline([(puuid, summoner_name)], match_count, backfill)
+            collected_count = pipeline_stats['persistence']['emitted']
+            logger.info(f"プレイヤー試合収集完了: {summoner_name} - {collected_count}試合")
+            return collected_count
             
         except Exception as e:
-            logger.error(f"キル時アイテム挿入エラー: {e}")
+            logger.error(f"プレイヤー試合収集エラー: {summoner_name} - {e}")
+            return 0
     
-    def _update_realtime_stats(self, matchup: Dict):
-        """リアルタイム統計を更新"""
-        try:
-            self.db_manager.update_realtime_stats(
-                champion1_id=matchup.get('player1_champion_id'),
-                champion2_id=matchup.get('player2_champion_id'),
-                lane=matchup.get('lane'),
-                game_version=matchup.get('game_version')
+    def _list_player_matches(self, puuid: str, match_count: int, backfill: bool = False) -> Optional[List[str]]:
+        """
+        プレイヤーの試合ID一覧を収集済み位置に応じて取得
+        
+        - 過去方向: 固定した endTime 以前を start から1ページ、backfill_depth まで
+        - 収集済み位置あり: 最新の収集済み試合より後の試合だけ（通常は1回の一覧取得）
+        - 収集済み位置なし: 最新 match_count 件
+        
+        Returns:
+            試合IDのリスト。取得に失敗したら None
+        """
+        if backfill:
+            max_depth = self.pipeline_config['backfill_depth']
+            page = self.watermarks.next_backfill_page(puuid, max_depth)
+            if page is None:
+                return []
+            match_ids = self.scheduler.call('match_ids', 'get_match_history', puuid, queue=420, **page)
+            if match_ids is not None:
+                self.watermarks.record_backfill_page(puuid, page, len(match_ids), max_depth)
+            return match_ids
+        
+        start_time = self.watermarks.get(puuid).refresh_start_time
+        if start_time is None:
+            return self.scheduler.call(
+                'match_ids', 'get_match_history', puuid, count=match_count, queue=420  # ランクソロ
             )
-        except Exception as e:
-            logger.error(f"リアルタイム統計更新エラー: {e}")
+        
+        match_ids = []
+        for page_number in range(self.pipeline_config['refresh_max_pages']):
+            page = self.scheduler.call(
+                'match_ids', 'get_match_history', puuid, start=page_number * MATCH_LIST_PAGE_SIZE,
+                count=MATCH_LIST_PAGE_SIZE, queue=420, start_time=start_time
+            )
+            if page is None:
+                return match_ids or None
+            match_ids.extend(page)
+            if len(page) < MATCH_LIST_PAGE_SIZE:
+                break
+        return match_ids
     
-    def collect_player_matches_with_timeline(self, puuid: str, summoner_name: str, 
-                                           match_count: int = 20) -> int:
-        """プレイヤーの試合データをタイムライン付きで収集"""
+    def _expand_frontier(self, match_data: Dict) -> int:
+        """
+        取り込んだ試合の参加者をフロンティアに追加
+        
+        Returns:
+            新たに追加したプレイヤー数
+        """
+        participants = match_data.get('metadata', {}).get('participants', [])
+        ranks = self.api_client.rank_resolver.lookup_cached(participants) if self.api_client.rank_resolver else {}
+        added = 0
+        for puuid in participants:
+            if not self._owns_player(puuid):
+                continue
+            rank = ranks.get(puuid)
+            tier_value = TIER_TO_VALUE.get(rank.tier, 0) if rank and rank.tier else 0
+            if self.frontier.add_player(puuid, tier_value=tier_value):
+                if self.journal:
+                    self.journal.record_player_pending(puuid, tier_value=tier_value)
+                added += 1
+        return added
+    
+    def crawl(self, tiers: List[str], seed_players_per_tier: int = 200, max_players: int = 1000,
+              matches_per_player: int = 20, backfill: bool = False) -> Dict:
+        """
+        リーグページを種にして、取り込んだ試合の参加者へ広げながら収集（スノーボール探索）
+        
+        フロンティアからティアの高い順・前回の探索が古い順にプレイヤーを取り出して
+        パイプラインに流し、保存した試合の参加者をフロンティアへ戻す。
+        
+        Args:
+            tiers: 種にするティアの一覧
+            seed_players_per_tier: ティアごとに種にするプレイヤー数
+            max_players: 試合一覧を取得するプレイヤー数の上限
+            matches_per_player: プレイヤーあたりの試合数（収集済み位置が無いプレイヤーのみ）
+            backfill: 過去方向に履歴を取得するか
+        
+        Returns:
+            収集統計
+        """
         try:
-            logger.info(f"プレイヤー試合収集開始: {summoner_name} ({match_count}試合)")
+            self.stats['start_time'] = datetime.now()
+            logger.info(f"クロール開始: {tiers} - 最大{max_players}人, {matches_per_player}試合/人")
             
-            # 試合履歴を取得
-            match_ids = self.api_client.get_match_history(
-                puuid, count=match_count, queue=420  # ランクソロ
-            )
-            if not match_ids:
-                logger.warning(f"試合履歴の取得に失敗: {summoner_name}")
-                return 0
+            seeded_tiers = set()
+            if self.journal:
+                # 前回のフロンティアを復元し、種まき済みのティアはリーグページを取り直さない
+                seeded_tiers = self.journal.seeded_tiers(since=time.time() - self.pipeline_config['recrawl_seconds'])
+                for puuid, name, tier_value, _ in self.journal.pending_players():
+                    self.frontier.add_player(puuid, name, tier_value)
+                for entry in self._resume_entries():
+                    self.frontier.add_match(entry.key)
             
-            collected_count = 0
-            for i, match_id in enumerate(match_ids):
-                logger.info(f"試合処理中: {i+1}/{len(match_ids)} - {match_id}")
-                
-                # 既に処理済みかチェック
-                if self._is_match_processed(match_id):
-                    logger.info(f"試合は既に処理済み: {match_id}")
+            for tier in tiers:
+                if tier in seeded_tiers:
+                    logger.info(f"種まき済みのティアをスキップ: {tier}")
                     continue
-                
-                # 試合データを収集
-                if self.collect_match_with_timeline(match_id):
-                    collected_count += 1
-                
-                # レート制限対応
-                time.sleep(1.2)
+                for entry in self.get_high_rank_players(tier, seed_players_per_tier):
+                    if not self._owns_player(entry.get('puuid')):
+                        continue
+                    tier_value = TIER_TO_VALUE.get(entry.get('tier', tier), 0)
+                    if self.frontier.add_player(entry.get('puuid'), entry.get('summonerName'), tier_value):
+                        if self.journal:
+                            self.journal.record_player_pending(entry['puuid'], entry.get('summonerName'), tier_value)
+                if self.journal:
+                    self.journal.record_seeded_tier(tier)
             
-            logger.info(f"プレイヤー試合収集完了: {summoner_name} - {collected_count}試合")
-            return collected_count
+            self._open_write_behind()
+            pipeline = self.build_collection_pipeline(matches_per_player, expand_frontier=True,
+                                                      backfill=backfill).start()
+            crawled_players = 0
+            try:
+                while crawled_players < max_players:
+                    entry = self.frontier.pop()
+                    if entry is None:
+                        # 処理中の試合が参加者を追加する可能性があるため、パイプラインが空になるまで待つ
+                        if pipeline.idle() and not len(self.frontier):
+                            # 参加者の追加は DB に書き込めてからなので、書き込みバッファも空になるまで待つ
+                            if self.write_behind:
+                                self.write_behind.flush()
+                            if pipeline.idle() and not len(self.frontier):
+                                break
+                        time.sleep(FRONTIER_POLL_SECONDS)
+                        continue
+                    pipeline.put(entry)
+                    if entry.kind == 'player':
+                        crawled_players += 1
+            finally:
+                pipeline.close()
+            pipeline.join()
+            self._close_write_behind()
+            self._save_journal_counters()
+            if self.journal:
+                self.journal.flush()
+            
+            pipeline_stats = pipeline.snapshot()
+            with self._stats_lock:
+                self.stats['pipeline'] = pipeline_stats
+                self.stats['frontier'] = self.frontier.snapshot()
+                self.stats['end_time'] = datetime.now()
+                self.stats['total_players_processed'] = crawled_players
+                self.stats['total_matches_collected'] = pipeline_stats['persistence']['emitted']
+                self.stats['duration_seconds'] = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
+            
+            logger.info(f"クロール完了: {crawled_players}人, {self.stats['total_matches_collected']}試合, "
+                        f"フロンティア残り{len(self.frontier)}件")
+            return self.stats
             
         except Exception as e:
-            logger.error(f"プレイヤー試合収集エラー: {summoner_name} - {e}")
-            return 0
+            logger.error(f"クロールエラー: {e}")
+            self._close_write_behind()
+            return self.stats
+    
+    def _claim_matches(self, match_ids: List[str]) -> List[str]:
+        """未処理かつ今回の実行でまだ扱っていない試合IDを返す（返したIDは以降重複扱い）"""
+        with self._seen_lock:
+            unseen = [match_id for match_id in dict.fromkeys(match_ids) if match_id not in self._seen_match_ids]
+            self._seen_match_ids.update(unseen)
+        new_match_ids = self.match_index.filter_new(unseen)
+        if self.shard_claims and new_match_ids:
+            # 同じ試合が別シャードのプレイヤーの履歴にも現れるため、先に登録したシャードだけが取得する
+            new_match_ids = self.shard_claims.claim('match', new_match_ids)
+        return new_match_ids
+    
+    def _match_failed(self, match_id: str):
+        """
+        保存できなかった試合を一覧の未完了として記録し、担当を外す
+
+        この実行中に再び一覧に現れたら、このシャードでも他のシャードでも取得し直せる。
+        """
+        self.listings.failed(match_id)
+        with self._seen_lock:
+            self._seen_match_ids.discard(match_id)
+        if self.shard_claims:
+            self.shard_claims.release('match', [match_id])
+    
+    def _owns_player(self, puuid: Optional[str]) -> bool:
+        """PUUID のハッシュでこのシャードが担当するプレイヤーか"""
+        if not puuid:
+            return False
+        return puuid_shard(puuid, self.shard_config['hash_count']) == self.shard_config['hash_index']
+    
+    def _claim_player(self, puuid: str) -> bool:
+        """今回の実行でこのシャードが試合一覧を取得してよいプレイヤーか"""
+        if not self._owns_player(puuid):
+            return False
+        return not self.shard_claims or bool(self.shard_claims.claim('player', [puuid]))
     
     def _is_match_processed(self, match_id: str) -> bool:
         """試合が既に処理済みかチェック"""
-        try:
-            with self.db_manager.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1 FROM matches WHERE match_id = %s", (match_id,))
-                return cursor.fetchone() is not None
-        except Exception:
-            return False
+        return not self.match_index.filter_new([match_id])
     
     def get_high_rank_players(self, tier: str = 'GRANDMASTER', count: int = 50) -> List[Dict]:
         """高ランクプレイヤーを取得"""
@@ -440,11 +890,11 @@ class RealtimeDataCollector:
             logger.info(f"{tier}ティアのプレイヤーを取得中...")
             
             if tier == 'CHALLENGER':
-                league_data = self.api_client.get_challenger_league()
+                league_data = self.scheduler.call('league', 'get_challenger_league')
             elif tier == 'GRANDMASTER':
-                league_data = self.api_client.get_grandmaster_league()
+                league_data = self.scheduler.call('league', 'get_grandmaster_league')
             elif tier == 'MASTER':
-                league_data = self.api_client.get_master_league()
+                league_data = self.scheduler.call('league', 'get_master_league')
             elif tier in ['DIAMOND', 'PLATINUM', 'GOLD', 'SILVER', 'BRONZE', 'IRON']:
                 # divisionはI, II, III, IVでページ分割されている
                 entries = []
@@ -452,7 +902,8 @@ class RealtimeDataCollector:
                 for division in divisions:
                     page = 1
                     while True:
-                        league_page = self.api_client.get_league_entries_by_tier_division(
+                        league_page = self.scheduler.call(
+                            'league', 'get_league_entries_by_tier_division',
                             tier=tier, division=division, queue='RANKED_SOLO_5x5', page=page
                         )
                         if not league_page:
@@ -484,7 +935,8 @@ class RealtimeDataCollector:
             return []
     
     def collect_from_high_rank_players(self, tier: str = 'GRANDMASTER', 
-                                     player_count: int = 20, matches_per_player: int = 15) -> Dict:
+                                     player_count: int = 20, matches_per_player: int = 15,
+                                     backfill: bool = False) -> Dict:
         """高ランクプレイヤーからデータを収集"""
         try:
             self.stats['start_time'] = datetime.now()
@@ -495,47 +947,25 @@ class RealtimeDataCollector:
             if not players:
                 return self.stats
             
-            total_collected = 0
-            processed_players = 0
-            
+            # 全プレイヤーを1本のパイプラインに流す（プレイヤー間の待機は不要）
+            targets = []
             for i, player in enumerate(players):
-                # summoner_id = player.get('summonerId')
                 summoner_puuid = player.get('puuid')
                 summoner_name = player.get('summonerName', f'Player_{i+1}')
-                
-                # if not summoner_id:
-                #     continue
-                
-                logger.info(f"プレイヤー処理中: {i+1}/{len(players)} - {summoner_name}")
-                
-                try:
-                    # サモナー情報を取得してPUUIDを取得
-                    # summoner_data = self.api_client.get_summoner_by_id(summoner_id)
-                    # if not summoner_data:
-                    #     logger.warning(f"サモナー情報の取得に失敗: {summoner_name}")
-                    #     continue
-                    
-                    # puuid = summoner_data.get('puuid')
-                    # if not puuid:
-                    #     logger.warning(f"PUUIDが見つかりません: {summoner_name}")
-                    #     continue
-                    
-                    # 試合データを収集
-                    collected = self.collect_player_matches_with_timeline(
-                        summoner_puuid, summoner_name, matches_per_player
-                    )
-                    
-                    total_collected += collected
-                    processed_players += 1
-                    
-                    logger.info(f"プレイヤー完了: {summoner_name} - {collected}試合収集")
-                    
-                    # プレイヤー間の間隔
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    logger.error(f"プレイヤー処理エラー: {summoner_name} - {e}")
+                if not summoner_puuid:
+                    logger.warning(f"PUUIDが見つかりません: {summoner_name}")
                     continue
+                if not self._owns_player(summoner_puuid):
+                    continue
+                if not backfill and self.frontier.recently_crawled(summoner_puuid):
+                    # 中断前の実行で試合一覧を取得済み
+                    logger.debug(f"探索済みのプレイヤーをスキップ: {summoner_name}")
+                    continue
+                targets.append((summoner_puuid, summoner_name))
+            
+            pipeline_stats = self.run_collection_pipeline(targets, matches_per_player, backfill)
+            processed_players = len(targets)
+            total_collected = pipeline_stats['persistence']['emitted']
             
             # 結果をまとめ
             self.stats['end_time'] = datetime.now()
@@ -554,18 +984,27 @@ class RealtimeDataCollector:
     
     def get_collection_stats(self) -> Dict:
         """収集統計を取得"""
-        stats = self.stats.copy()
+        with self._stats_lock:
+            stats = self.stats.copy()
         
         # データベース統計を追加
         db_stats = self.db_manager.get_database_stats()
         stats.update(db_stats)
         
+        # APIテレメトリを追加
+        stats['api_telemetry'] = self.api_client.telemetry.snapshot()
+        stats['match_dedup'] = dict(self.match_index.stats)
+        if self.payload_archive:
+            stats['payload_archive'] = self.payload_archive.snapshot()
+        
         return stats
 
 def main():
     """テスト用のメイン関数"""
     import logging
-    from config import MYSQL_CONFIG, RIOT_API_KEY, RIOT_REGION
+    from config import (MYSQL_CONFIG, RIOT_API_KEYS, RIOT_REGIONS, CACHE_CONFIG, RETRY_CONFIG, TELEMETRY_CONFIG,
+                        PIPELINE_CONFIG, SHARD_CONFIG)
+    from sharded_collection import ShardedCollectionCoordinator, plan_shards
     
     # ログ設定
     logging.basicConfig(
@@ -574,26 +1013,24 @@ def main():
     )
     
     try:
-        # データ収集システムを初期化
-        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION)
-        
-        # # 静的データをセットアップ
-        # if not collector.setup_static_data():
-        #     logger.error("静的データのセットアップに失敗")
-        #     return
-        
-        # 各ランクごとにデータ収集
+        # 各ランクのリーグページを種にして、取り込んだ試合の参加者へ広げながら収集
+        # 地域・ティア・PUUID ハッシュごとのシャードを別プロセスで並行に実行する
         tiers = ['CHALLENGER', 'GRANDMASTER', 'MASTER', 'DIAMOND', 'PLATINUM', 'GOLD', 'SILVER', 'BRONZE', 'IRON']
-        for tier in tiers:
-            logger.info(f"{tier}ランクのデータ収集を開始...")
-            results = collector.collect_from_high_rank_players(
-                tier=tier,
-                player_count=10000,  # 必要に応じて調整
-                matches_per_player=50  # 必要に応じて調整
-            )
-            print(f"\n=== {tier} 収集結果 ===")
-            for key, value in results.items():
-                print(f"{key}: {value}")
+        shards = plan_shards(tiers, RIOT_API_KEYS, RIOT_REGIONS, SHARD_CONFIG['split_tiers'],
+                             SHARD_CONFIG['hash_shards'])
+        coordinator = ShardedCollectionCoordinator(
+            shards, MYSQL_CONFIG, CACHE_CONFIG, RETRY_CONFIG, TELEMETRY_CONFIG, PIPELINE_CONFIG,
+            dict(SHARD_CONFIG, setup_static_data=False)  # 静的データはディスクキャッシュから読み込む
+        )
+        results = coordinator.run(
+            'crawl',
+            seed_players_per_tier=200,  # 必要に応じて調整
+            max_players=max(1, 10000 // len(shards)),  # 必要に応じて調整（全シャードの合計）
+            matches_per_player=50  # 必要に応じて調整
+        )
+        print("\n=== 収集結果 ===")
+        for key, value in results.items():
+            print(f"{key}: {value}")
         
     except Exception as e:
         logger.error(f"メイン実行エラー: {e}")
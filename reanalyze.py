@@ -0,0 +1,317 @@
+"""
+Reanalyze
+保存済みの試合詳細・タイムラインをプロセスプールで再分析し、派生テーブル（matchups / solo_kills / kill_items）を
+作り直して原子的に入れ替える
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from match_cache import MatchPayloadCache
+from match_data_analyzer import MatchDataAnalyzer
+from match_rows import build_match_rows, matchup_solo_kill_stats
+from payload_archive import PayloadArchive
+from static_data_cache import StaticDataCache
+from timeline_analyzer import TimelineAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# 1回のタスクでワーカーに渡す試合数（プロセス間の受け渡し回数を減らす）
+DEFAULT_CHUNK_SIZE = 200
+
+# 読み込み元の種類
+SOURCE_ARCHIVE = 'archive'
+SOURCE_CACHE = 'cache'
+
+
+class CachePayloadSource:
+    """MatchPayloadCache のディレクトリを PayloadArchive と同じ形で読む"""
+
+    def __init__(self, cache_dir: str):
+        self.cache = MatchPayloadCache(cache_dir)
+
+    def match_ids(self) -> List[str]:
+        """試合詳細を保存済みの試合ID"""
+        return sorted({path.name.split('.json')[0] for path in (self.cache.cache_dir / 'match').glob('*/*.json.*')
+                       if not path.name.endswith('.tmp')})
+
+    def get(self, kind: str, match_id: str) -> Optional[Dict]:
+        return self.cache.get(kind, match_id)
+
+
+def open_payload_source(source: str, path: str):
+    """
+    読み込み元を開く
+
+    Args:
+        source: 'archive'（payload_archive）または 'cache'（match_cache のディレクトリ）
+        path: ディレクトリ
+
+    Returns:
+        match_ids() と get(kind, match_id) を持つオブジェクト
+    """
+    if source == SOURCE_ARCHIVE:
+        return PayloadArchive(path, writer_id=None)
+    if source == SOURCE_CACHE:
+        return CachePayloadSource(path)
+    raise ValueError(f"不明な読み込み元です: {source}")
+
+
+# ワーカープロセスごとの読み込み元と分析器（_init_worker で作る）
+_worker: Dict = {}
+
+
+def _init_worker(source: str, path: str, static_data_dir: Optional[str], log_level: int = logging.WARNING):
+    """ワーカープロセスの初期化（読み込み元を開き、静的データを分析器に設定）"""
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # 試合ごとの INFO ログは再分析では多すぎるため抑える
+    logging.getLogger('timeline_analyzer').setLevel(max(log_level, logging.WARNING))
+
+    timeline_analyzer = TimelineAnalyzer()
+    match_analyzer = MatchDataAnalyzer()
+    if static_data_dir:
+        static_data = StaticDataCache(static_data_dir).load_latest_cached()
+        if static_data:
+            timeline_analyzer.apply_static_data(static_data)
+            match_analyzer.apply_static_data(static_data)
+    _worker.update({
+        'source': open_payload_source(source, path),
+        'timeline_analyzer': timeline_analyzer,
+        'match_analyzer': match_analyzer,
+    })
+
+
+def analyze_matches(match_ids: List[str]) -> List[Dict]:
+    """
+    試合をまとめて再分析（ワーカープロセスで実行）
+
+    Args:
+        match_ids: 試合ID
+
+    Returns:
+        試合ごとの {'match_id', 'rows'}。rows は match_rows.build_match_rows の結果で、
+        ペイロードが無い・分析に失敗した試合は None
+    """
+    source = _worker['source']
+    timeline_analyzer = _worker['timeline_analyzer']
+    match_analyzer = _worker['match_analyzer']
+
+    results = []
+    for match_id in match_ids:
+        rows = None
+        try:
+            match_data = source.get('match', match_id)
+            if match_data:
+                timeline_data = source.get('timeline', match_id)
+                # タイムラインが無い試合は収集時と同じく対面データだけを作る
+                timeline_result = timeline_analyzer.analyze_timeline(timeline_data, match_data) if timeline_data else {}
+                # analyze_timeline は失敗すると空の辞書を返す
+                if timeline_result or not timeline_data:
+                    matchups = match_analyzer.extract_matchups(match_data)
+                    rows = build_match_rows(match_data, timeline_result, matchups, timeline_analyzer)
+        except Exception as e:
+            logger.error(f"再分析エラー: {match_id} - {e}")
+        results.append({'match_id': match_id, 'rows': rows})
+    return results
+
+
+class Reanalyzer:
+    """
+    保存済みペイロードから派生テーブルを作り直すバックフィル
+
+    1. 作り直し用テーブル（<テーブル>_rebuild）を本番と同じ定義で作る
+    2. 試合IDをまとめてプロセスプールに配り、TimelineAnalyzer / MatchDataAnalyzer で分析する
+    3. 結果を受け取った順に本番の最大 id より後から採番して executemany でまとめて挿入する
+       （matchups のソロキル列はトリガーの代わりに計算して入れる）
+    4. 作り直さなかった試合（読み込み元に無い・分析できなかった試合）の行を本番から写す
+    5. 外部キーを付け、RENAME TABLE で本番テーブルと一度に入れ替える（トリガーも付け直す）
+    6. realtime_winrate_stats を新しい対面データから集計し直す
+
+    API は使わないため、処理時間は CPU コア数で決まる。入れ替えまでの間に収集プロセスが
+    本番テーブルへ書いた行は失われるため、収集を止めてから実行する。
+    """
+
+    def __init__(self, db_manager, source: str, path: str, static_data_dir: Optional[str] = None,
+                 workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, suffix: str = '_rebuild'):
+        """
+        Args:
+            db_manager: RealtimeDatabaseManager
+            source: 'archive' または 'cache'
+            path: 読み込み元のディレクトリ
+            static_data_dir: DDragon の静的データのキャッシュ（アイテム価値の計算に使う）
+            workers: ワーカープロセス数（None なら CPU コア数、0 ならこのプロセスで実行）
+            chunk_size: 1タスクあたりの試合数
+            suffix: 作り直し用テーブルの接尾辞
+        """
+        self.db_manager = db_manager
+        self.source = source
+        self.path = path
+        self.static_data_dir = static_data_dir
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = max(1, chunk_size)
+        self.suffix = suffix
+        self.stats = {
+            'matches_total': 0,
+            'matches_analyzed': 0,
+            'matches_skipped': 0,
+            'matches_missing': 0,
+            'matches_copied': 0,
+            'matchups': 0,
+            'solo_kills': 0,
+            'kill_items': 0,
+            'swapped': False,
+        }
+        self._next_matchup_id = 1
+        self._next_solo_kill_id = 1
+
+    def _analyzed_chunks(self, chunks: List[List[str]]) -> Iterator[List[Dict]]:
+        """チャンクごとの分析結果（投入順）"""
+        init_args = (self.source, self.path, self.static_data_dir, logging.getLogger().level or logging.WARNING)
+        if self.workers == 0:
+            _init_worker(*init_args)
+            for chunk in chunks:
+                yield analyze_matches(chunk)
+            return
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                 initializer=_init_worker, initargs=init_args) as executor:
+            yield from executor.map(analyze_matches, chunks)
+
+    def _load_chunk(self, results: List[Dict]) -> bool:
+        """分析結果に id を採番して作り直し用テーブルに挿入"""
+        analyzed = [result for result in results if result['rows'] is not None]
+        self.stats['matches_skipped'] += len(results) - len(analyzed)
+
+        # matches にない試合は外部キーを満たせないため読み込まない
+        existing = self.db_manager.get_existing_match_ids([result['match_id'] for result in analyzed])
+        if existing is None:
+            return False
+        self.stats['matches_missing'] += sum(1 for result in analyzed if result['match_id'] not in existing)
+
+        matchups, solo_kills, kill_items, match_ids = [], [], [], []
+        for result in analyzed:
+            if result['match_id'] not in existing:
+                continue
+            match_ids.append(result['match_id'])
+            for matchup_rows in result['rows']:
+                matchup_id = self._next_matchup_id
+                self._next_matchup_id += 1
+                solo_kill_stats = matchup_solo_kill_stats([solo_kill['row'] for solo_kill in matchup_rows['solo_kills']])
+                matchups.append(dict(matchup_rows['matchup'], id=matchup_id, **solo_kill_stats))
+                for solo_kill in matchup_rows['solo_kills']:
+                    solo_kill_id = self._next_solo_kill_id
+                    self._next_solo_kill_id += 1
+                    solo_kills.append(dict(solo_kill['row'], id=solo_kill_id, matchup_id=matchup_id))
+                    kill_items.extend(dict(item_row, solo_kill_id=solo_kill_id) for item_row in solo_kill['kill_items'])
+            self.stats['matches_analyzed'] += 1
+
+        if not self.db_manager.load_rebuild_rows(matchups, solo_kills, kill_items, self.suffix, match_ids):
+            return False
+        self.stats['matchups'] += len(matchups)
+        self.stats['solo_kills'] += len(solo_kills)
+        self.stats['kill_items'] += len(kill_items)
+        return True
+
+    def run(self, match_ids: Optional[List[str]] = None, swap: bool = True, keep_old: bool = False) -> Dict:
+        """
+        再分析して派生テーブルを作り直す
+
+        Args:
+            match_ids: 対象の試合ID（None なら読み込み元の全件）
+            swap: 作り直したテーブルを本番と入れ替えるか（False なら <テーブル>_rebuild に残す）
+            keep_old: 入れ替え前のテーブルを <テーブル>_old として残すか
+
+        Returns:
+            件数と処理時間
+        """
+        started = time.monotonic()
+        if match_ids is None:
+            match_ids = open_payload_source(self.source, self.path).match_ids()
+        self.stats['matches_total'] = len(match_ids)
+        logger.info(f"再分析開始: {len(match_ids)}試合, {self.workers}プロセス, {self.chunk_size}試合/タスク")
+
+        if not self.db_manager.create_rebuild_tables(self.suffix):
+            return self._finish(started, error='作り直し用テーブルを作成できませんでした')
+        max_ids = self.db_manager.get_derived_max_ids()
+        if max_ids is None:
+            return self._finish(started, error='派生テーブルの最大IDを取得できませんでした')
+        self._next_matchup_id = max_ids['matchups'] + 1
+        self._next_solo_kill_id = max_ids['solo_kills'] + 1
+
+        chunks = [match_ids[i:i + self.chunk_size] for i in range(0, len(match_ids), self.chunk_size)]
+        for index, results in enumerate(self._analyzed_chunks(chunks), 1):
+            if not self._load_chunk(results):
+                return self._finish(started, error='作り直し用テーブルに書き込めませんでした')
+            if index % 10 == 0 or index == len(chunks):
+                logger.info(f"再分析の進捗: {index}/{len(chunks)}タスク - {self.stats['matches_analyzed']}試合, "
+                            f"{self.stats['solo_kills']}ソロキル")
+
+        if self.stats['matches_skipped'] or self.stats['matches_missing']:
+            logger.error(f"再分析できなかった試合があります: ペイロード無し・分析失敗 {self.stats['matches_skipped']}試合, "
+                         f"matches に無い {self.stats['matches_missing']}試合")
+
+        # 入れ替えはテーブル全体を置き換えるため、作り直さなかった試合の行を本番から写しておく
+        copied = self.db_manager.copy_unrebuilt_rows(self.suffix)
+        if copied is None:
+            return self._finish(started, error='作り直さなかった試合の行を写せませんでした')
+        self.stats['matches_copied'] = copied
+        if copied:
+            logger.error(f"読み込み元で作り直せなかった {copied}試合は既存の行をそのまま残します")
+
+        if not self.db_manager.add_rebuild_foreign_keys(self.suffix):
+            return self._finish(started, error='外部キーを追加できませんでした')
+        if swap:
+            if not self.db_manager.swap_rebuild_tables(self.suffix, keep_old):
+                return self._finish(started, error='テーブルを入れ替えられませんでした')
+            self.stats['swapped'] = True
+            # 差分更新の統計は入れ替え前の対面データに基づくため集計し直す
+            self.stats['winrate_stats'] = self.db_manager.recompute_realtime_stats()
+        return self._finish(started)
+
+    def _finish(self, started: float, error: Optional[str] = None) -> Dict:
+        stats = dict(self.stats)
+        stats['duration_seconds'] = round(time.monotonic() - started, 3)
+        if error:
+            logger.error(f"再分析を中止しました: {error}")
+            stats['error'] = error
+        else:
+            logger.info(f"再分析完了: {stats}")
+        return stats
+
+
+def main():
+    """派生テーブルを保存済みペイロードから作り直す"""
+    from config import CACHE_CONFIG, MYSQL_CONFIG
+    from database_manager_realtime import RealtimeDatabaseManager
+
+    parser = argparse.ArgumentParser(description='保存済みの試合データを再分析して派生テーブルを作り直す')
+    parser.add_argument('--source', choices=[SOURCE_ARCHIVE, SOURCE_CACHE], default=SOURCE_ARCHIVE,
+                        help='読み込み元（payload_archive か match_cache）')
+    parser.add_argument('--path', type=str, help='読み込み元のディレクトリ（省略時は CACHE_CONFIG の値）')
+    parser.add_argument('--workers', type=int, default=None, help='ワーカープロセス数（既定: CPU コア数）')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='1タスクあたりの試合数')
+    parser.add_argument('--no-swap', action='store_true', help='入れ替えずに <テーブル>_rebuild に残す')
+    parser.add_argument('--keep-old', action='store_true', help='入れ替え前のテーブルを <テーブル>_old として残す')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    path = args.path or (CACHE_CONFIG['payload_archive_dir'] if args.source == SOURCE_ARCHIVE
+                         else CACHE_CONFIG['match_cache_dir'])
+    reanalyzer = Reanalyzer(
+        RealtimeDatabaseManager(**MYSQL_CONFIG), args.source, path,
+        static_data_dir=CACHE_CONFIG.get('static_data_dir'), workers=args.workers, chunk_size=args.chunk_size
+    )
+    results = reanalyzer.run(swap=not args.no_swap, keep_old=args.keep_old)
+    print("\n=== 再分析結果 ===")
+    for key, value in results.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
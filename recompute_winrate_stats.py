@@ -0,0 +1,38 @@
+"""
+Recompute Winrate Stats
+差分更新で保守している realtime_winrate_stats を matchups から集計し直して検証・修復するオフラインジョブ
+
+既存のデータベースで first_kill_time_sum / first_kill_count 列が無い場合は、
+先に setup_realtime_database.py のスキーマ再適用で列を追加する（追加時に再集計も行う）
+"""
+
+import argparse
+import logging
+
+from config import MYSQL_CONFIG
+from database_manager_realtime import RealtimeDatabaseManager
+
+
+def main():
+    """realtime_winrate_stats を再集計"""
+    parser = argparse.ArgumentParser(description='realtime_winrate_stats を matchups から集計し直して検証する')
+    parser.add_argument('--verify-only', action='store_true', help='不一致を報告するだけで上書きしない')
+    parser.add_argument('--game-version', type=str, help='対象のゲームバージョン（省略時は全バージョン）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    db_manager = RealtimeDatabaseManager(**MYSQL_CONFIG)
+    results = db_manager.recompute_realtime_stats(repair=not args.verify_only, game_version=args.game_version)
+    if results is None:
+        raise SystemExit(1)
+
+    print("\n=== 再集計結果 ===")
+    for key, value in results.items():
+        print(f"{key}: {value}")
+    if args.verify_only and (results['mismatched'] or results['missing'] or results['stale']):
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
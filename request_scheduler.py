@@ -0,0 +1,185 @@
+"""
+Priority Request Scheduler
+API呼び出しを優先度クラスごとに並べ替えて実行するスケジューラー
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 優先度クラス（値が小さいほど優先）
+# 取得途中の試合を完成させる呼び出しを先に、新しい仕事を増やす呼び出しを後に送る
+PRIORITY_CLASSES: Dict[str, int] = {
+    'timeline': 0,   # 試合詳細を取得済みの試合のタイムライン
+    'match': 1,      # 試合詳細
+    'match_ids': 2,  # 試合IDのページング
+    'rank': 3,       # ランクの更新
+    'league': 4,     # リーグページ（プレイヤー探索）
+}
+
+# クラスごとの同時実行数の既定上限
+DEFAULT_CLASS_LIMITS: Dict[str, int] = {
+    'timeline': 8,
+    'match': 8,
+    'match_ids': 4,
+    'rank': 4,
+    'league': 2,
+}
+
+
+class RequestScheduler:
+    """
+    RiotAPIClient の前段に置く優先度付きスケジューラー
+
+    - 優先度クラスごとに FIFO キューを持ち、ワーカースレッドは
+      「優先度 - 待ち時間 / aging_seconds」が最小のクラスの先頭から取り出す
+      （待ち時間が長い低優先度の呼び出しも最終的には実行される）
+    - クラスごとの同時実行数上限を超えるクラスからは取り出さない
+    - 送信間隔はクライアントのレートリミッターが制御する
+    """
+
+    def __init__(self, api_client, max_workers: int = 8,
+                 class_limits: Optional[Dict[str, int]] = None, aging_seconds: float = 10.0):
+        """
+        スケジューラーを初期化
+
+        Args:
+            api_client: RiotAPIClient
+            max_workers: ワーカースレッド数
+            class_limits: クラスごとの同時実行数上限
+            aging_seconds: 優先度を1段上げるのに必要な待ち時間（秒）
+        """
+        self.api_client = api_client
+        self.max_workers = max_workers
+        self.class_limits = dict(DEFAULT_CLASS_LIMITS)
+        if class_limits:
+            self.class_limits.update(class_limits)
+        self.aging_seconds = aging_seconds
+
+        self._queues: Dict[str, Deque[Tuple[float, Future, str, tuple, dict]]] = {
+            name: deque() for name in PRIORITY_CLASSES
+        }
+        self._in_flight: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self._condition = threading.Condition()
+        self._shutdown = False
+
+        self.stats = {
+            name: {'submitted': 0, 'completed': 0, 'failed': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+            for name in PRIORITY_CLASSES
+        }
+
+        self._workers: List[threading.Thread] = []
+        for i in range(max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"request-scheduler-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def __enter__(self) -> 'RequestScheduler':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def submit(self, request_class: str, method_name: str, *args, **kwargs) -> Future:
+        """
+        API呼び出しを登録
+
+        Args:
+            request_class: 優先度クラス（PRIORITY_CLASSES のキー）
+            method_name: api_client のメソッド名（例: 'get_match_timeline'）
+
+        Returns:
+            呼び出し結果を受け取る Future
+        """
+        if request_class not in PRIORITY_CLASSES:
+            raise ValueError(f"未知の優先度クラス: {request_class}")
+
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("スケジューラーは停止済みです")
+            self._queues[request_class].append((time.monotonic(), future, method_name, args, kwargs))
+            self.stats[request_class]['submitted'] += 1
+            self._condition.notify()
+        return future
+
+    def call(self, request_class: str, method_name: str, *args, **kwargs):
+        """API呼び出しを登録し、結果が出るまで待機"""
+        return self.submit(request_class, method_name, *args, **kwargs).result()
+
+    def _next_job(self, now: float) -> Optional[Tuple[str, tuple]]:
+        """実行するジョブを選択（ロック取得済みで呼ぶ）"""
+        best_class = None
+        best_score = None
+        for name, queue in self._queues.items():
+            if not queue or self._in_flight[name] >= self.class_limits.get(name, self.max_workers):
+                continue
+            waited = now - queue[0][0]
+            score = PRIORITY_CLASSES[name] - waited / self.aging_seconds
+            if best_score is None or score < best_score:
+                best_class, best_score = name, score
+
+        if best_class is None:
+            return None
+        self._in_flight[best_class] += 1
+        return best_class, self._queues[best_class].popleft()
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                job = self._next_job(time.monotonic())
+                while job is None:
+                    if self._shutdown and not any(self._queues.values()):
+                        return
+                    self._condition.wait()
+                    job = self._next_job(time.monotonic())
+
+            request_class, (submitted_at, future, method_name, args, kwargs) = job
+            waited = time.monotonic() - submitted_at
+            stats = self.stats[request_class]
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(getattr(self.api_client, method_name)(*args, **kwargs))
+                    succeeded = True
+                except Exception as e:
+                    logger.error(f"スケジュール済みリクエストエラー: {method_name} - {e}")
+                    future.set_exception(e)
+                    succeeded = False
+            else:
+                succeeded = None
+
+            with self._condition:
+                self._in_flight[request_class] -= 1
+                stats['total_wait'] += waited
+                stats['max_wait'] = max(stats['max_wait'], waited)
+                if succeeded is True:
+                    stats['completed'] += 1
+                elif succeeded is False:
+                    stats['failed'] += 1
+                # 上限で止まっていたクラスを取り出せるようになる
+                self._condition.notify_all()
+
+    def pending(self) -> Dict[str, int]:
+        """クラスごとの待機中の呼び出し数"""
+        with self._condition:
+            return {name: len(queue) for name, queue in self._queues.items()}
+
+    def shutdown(self, wait: bool = True):
+        """
+        新規登録を止め、登録済みの呼び出しを処理してからワーカーを終了
+
+        Args:
+            wait: ワーカーの終了を待つか
+        """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
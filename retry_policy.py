@@ -0,0 +1,222 @@
+"""
+Retry Policy for Riot Games API
+ジッター付き指数バックオフ・ホスト単位のサーキットブレーカー・リトライ予算
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# リトライ対象となる失敗の種類
+RATE_LIMITED = 'rate_limited'          # 429
+SERVER_ERROR = 'server_error'          # 5xx
+CONNECTION_ERROR = 'connection_error'  # 接続エラー・タイムアウト
+
+# half_open で試験送信の結果を待つ間の再確認間隔（秒）
+PROBE_WAIT = 0.5
+
+
+class RetryBudget:
+    """
+    クロール全体で共有するリトライ回数の上限
+
+    障害が長引いたときに全ワーカーがリトライを続けて
+    収集が進まなくなるのを防ぐ。
+    """
+
+    def __init__(self, max_retries: Optional[int] = None):
+        """
+        Args:
+            max_retries: リトライの合計上限（None なら無制限）
+        """
+        self.max_retries = max_retries
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_consume(self) -> bool:
+        """予算を1回分消費（使い切っていれば False）"""
+        with self._lock:
+            if self.max_retries is not None and self.used >= self.max_retries:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.max_retries is None:
+            return None
+        return max(0, self.max_retries - self.used)
+
+
+class CircuitBreaker:
+    """
+    ルーティングホスト単位のサーキットブレーカー
+
+    - closed: 通常どおり送信する
+    - open: 連続失敗が閾値に達したら reset_timeout 秒間送信を止める
+    - half_open: 停止時間の経過後は1リクエストだけ試験送信し、
+      成功すれば closed に戻り、失敗すれば再び open にする
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: open にする連続失敗回数
+            reset_timeout: open を維持する秒数
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> float:
+        """
+        送信してよいか確認
+
+        Returns:
+            0 なら送信可能。正の値ならその秒数後に再確認する。
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    return remaining
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            # half_open: 試験送信中は他のリクエストを待たせる
+            if self._probe_in_flight:
+                return PROBE_WAIT
+            self._probe_in_flight = True
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("サーキットブレーカーを閉じました（送信を再開します）")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"サーキットブレーカーを開きました（連続失敗 {self.consecutive_failures}回）。"
+                        f"{self.reset_timeout:.0f}秒間送信を停止します。"
+                    )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """
+    APIリクエストのリトライ方針
+
+    - 5xx と接続エラーはジッター付き指数バックオフ（full jitter）で再送信し、
+      ホストのサーキットブレーカーに失敗として記録する
+    - 429 はレートリミッターが Retry-After まで送信を止めるため、
+      ここでは複数ワーカーの再送信が揃わないよう小さなジッターだけを加える
+    - 5xx・接続エラーのリトライはクロール全体の RetryBudget を消費する
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_rate_limit_retries: int = 10, rate_limit_jitter: float = 1.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 retry_budget: Optional[int] = None):
+        """
+        Args:
+            max_attempts: 5xx・接続エラー時の最大試行回数（初回を含む）
+            base_delay: バックオフの基準秒数
+            max_delay: バックオフの上限秒数
+            max_rate_limit_retries: 429 による再送信の最大回数
+            rate_limit_jitter: 429 後の再送信に加えるジッターの上限秒数
+            failure_threshold: サーキットブレーカーを開く連続失敗回数
+            reset_timeout: サーキットブレーカーを開いておく秒数
+            retry_budget: クロール全体のリトライ上限（None なら無制限）
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.rate_limit_jitter = rate_limit_jitter
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.budget = RetryBudget(retry_budget)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, retry_config: Optional[Dict]) -> 'RetryPolicy':
+        """config.RETRY_CONFIG 形式の辞書から作成"""
+        return cls(**(retry_config or {}))
+
+    def breaker_for(self, host: str) -> CircuitBreaker:
+        """ホストのサーキットブレーカーを取得（無ければ作成）"""
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    host, CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                )
+        return breaker
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目の失敗後の待機秒数（0 から指数上限までの一様乱数）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def retry_delay(self, outcome: str, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        失敗後に再送信するまでの秒数を決める
+
+        Args:
+            outcome: RATE_LIMITED / SERVER_ERROR / CONNECTION_ERROR
+            attempt: その種類の失敗が何回目か（1 始まり）
+            retry_after: レスポンスの Retry-After 秒数（あれば）
+
+        Returns:
+            待機秒数。再送信しない場合は None
+        """
+        if outcome == RATE_LIMITED:
+            if attempt > self.max_rate_limit_retries:
+                return None
+            # 待機自体はレートリミッターが行うので、ここではジッターだけ
+            return random.uniform(0, self.rate_limit_jitter)
+
+        if attempt >= self.max_attempts:
+            return None
+        if not self.budget.try_consume():
+            logger.warning("リトライ予算を使い切ったため再送信しません")
+            return None
+
+        delay = self.backoff(attempt)
+        if outcome == SERVER_ERROR and retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Retry-After ヘッダーの秒数（無い・不正なら None）"""
+    try:
+        value = headers.get('Retry-After')
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
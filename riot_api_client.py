@@ -4,32 +4,85 @@ Riot Games API Client for League of Legends Data Collection
 """
 
 import os
+import re
 import requests
+import requests.adapters
 import time
 import json
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
 from datetime import datetime
+from urllib.parse import urlparse
 import logging
 from config import RIOT_API_KEY
+import fast_json
+from rate_limiter import HostRateLimiters
+from api_telemetry import APITelemetry
+from match_cache import MatchPayloadCache
+from rank_resolver import RankIndex
+from retry_policy import (
+    CONNECTION_ERROR, RATE_LIMITED, SERVER_ERROR, RetryPolicy, parse_retry_after
+)
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class RateLimitInfo:
-    """レート制限情報を管理するクラス"""
-    requests_per_second: int = 20
-    requests_per_two_minutes: int = 100
-    last_request_time: float = 0
-    request_count_1s: int = 0
-    request_count_2m: int = 0
-    request_times_2m: List[float] = None
-    
-    def __post_init__(self):
-        if self.request_times_2m is None:
-            self.request_times_2m = []
+# ホストごとに保持する HTTP 接続数
+HTTP_POOL_MAXSIZE = 32
+
+# URLパス → Riot APIメソッド名（メソッド単位のレート制限キー）
+ENDPOINT_METHODS = [
+    (re.compile(r'^/lol/match/v5/matches/by-puuid/[^/]+/ids$'), 'match-v5.getMatchIdsByPUUID'),
+    (re.compile(r'^/lol/match/v5/matches/[^/]+/timeline$'), 'match-v5.getTimeline'),
+    (re.compile(r'^/lol/match/v5/matches/[^/]+$'), 'match-v5.getMatch'),
+    (re.compile(r'^/lol/league/v4/entries/by-puuid/[^/]+$'), 'league-v4.getLeagueEntriesByPUUID'),
+    (re.compile(r'^/lol/league/v4/entries/by-summoner/[^/]+$'), 'league-v4.getLeagueEntriesForSummoner'),
+    (re.compile(r'^/lol/league/v4/entries/[^/]+/[^/]+/[^/]+$'), 'league-v4.getLeagueEntries'),
+    (re.compile(r'^/lol/league/v4/challengerleagues/'), 'league-v4.getChallengerLeague'),
+    (re.compile(r'^/lol/league/v4/grandmasterleagues/'), 'league-v4.getGrandmasterLeague'),
+    (re.compile(r'^/lol/league/v4/masterleagues/'), 'league-v4.getMasterLeague'),
+    (re.compile(r'^/lol/summoner/v4/summoners/by-name/'), 'summoner-v4.getBySummonerName'),
+    (re.compile(r'^/lol/summoner/v4/summoners/[^/]+$'), 'summoner-v4.getBySummonerId'),
+    (re.compile(r'^/riot/account/v1/accounts/by-riot-id/'), 'account-v1.getByRiotId'),
+    (re.compile(r'^/lol/status/v3/shard-data$'), 'lol-status-v3.getShardData'),
+]
+
+# ティアの序数（1=IRON 〜 10=CHALLENGER）
+TIER_ORDER = ['IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND', 'MASTER', 'GRANDMASTER', 'CHALLENGER']
+TIER_TO_VALUE = {t: i+1 for i, t in enumerate(TIER_ORDER)}
+
+def average_tier_value(tiers) -> Optional[int]:
+    """
+    ティア名の一覧から平均ティアの序数を求める
+
+    Args:
+        tiers: ティア名の一覧（アンランクの None は除外される）
+
+    Returns:
+        最も近い序数（1〜10）。ランク情報が1件も無ければ None
+    """
+    values = [TIER_TO_VALUE[t] for t in tiers if t in TIER_TO_VALUE]
+    if not values:
+        return None
+    # 最も近い整数に丸めて対応するティアを返す
+    rounded = int(round(sum(values) / len(values)))
+    return max(1, min(rounded, len(TIER_ORDER)))
+
+def resolve_endpoint_method(url: str) -> str:
+    """
+    リクエストURLから Riot API のメソッド名を求める
+
+    Args:
+        url: リクエストURL
+
+    Returns:
+        メソッド名（例: 'match-v5.getTimeline'）。未知のパスはパスそのもの
+    """
+    path = urlparse(url).path
+    for pattern, method in ENDPOINT_METHODS:
+        if pattern.match(path):
+            return method
+    return path
 
 class RiotAPIClient:
     """Riot Games API クライアント"""
@@ -56,13 +109,22 @@ class RiotAPIClient:
         'europe': 'https://europe.api.riotgames.com'
     }
     
-    def __init__(self, api_key: Optional[str] = None, region: str = 'jp1'):
+    def __init__(self, api_key: Optional[str] = None, region: str = 'jp1',
+                 match_cache: Optional[MatchPayloadCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 base_url_override: Optional[str] = None,
+                 rate_limit_share: float = 1.0):
         """
         APIクライアントを初期化
         
         Args:
             api_key: Riot Games API キー
             region: 地域コード (例: 'jp1', 'kr', 'na1')
+            match_cache: 試合詳細・タイムラインのディスクキャッシュ（None なら無効）
+            retry_policy: 再送信の方針（None なら既定値の RetryPolicy）
+            base_url_override: 全エンドポイントの送信先を置き換えるURL
+                （local_riot_server などのローカル環境向け。None なら本番）
+            rate_limit_share: 同じキーを複数プロセスで使う場合の、このクライアントの予算の割合
         """
         # Resolve API key priority: explicit arg -> environment variable -> config.RIOT_API_KEY
         resolved_key = api_key if api_key else os.getenv('RIOT_API_KEY')
@@ -75,22 +137,34 @@ class RiotAPIClient:
 
         self.api_key = resolved_key
         self.region = region
-        self.rate_limit = RateLimitInfo()
+        self.match_cache = match_cache
+        # PlayerRankResolver（設定されていれば平均ティア計算でランクをキャッシュから解決）
+        self.rank_resolver = None
+        # リーグページ取得時に登録される PUUID → ソロランクの索引
+        self.rank_index = RankIndex()
+        # プラットフォーム/リージョナルのホストごとに独立したレート制限
+        self.rate_limiters = HostRateLimiters(budget_share=rate_limit_share)
+        self.retry_policy = retry_policy or RetryPolicy()
+        # エンドポイントごとのリクエスト数・レイテンシ・待機時間の集計
+        self.telemetry = APITelemetry()
         
         # 地域エンドポイントを設定
         self.base_url = self.REGIONAL_ENDPOINTS.get(region, self.REGIONAL_ENDPOINTS['jp1'])
         
         # 地域に応じた大陸エンドポイントを設定
-        if region in ['na1', 'br1', 'la1', 'la2']:
-            self.continental_region = 'americas'
-        elif region in ['kr', 'jp1']:
-            self.continental_region = 'asia'
-        else:
-            self.continental_region = 'europe'
+        self.continental_region = self.continental_region_for(region)
         
         self.continental_url = self.CONTINENTAL_ENDPOINTS.get(self.continental_region)
         
+        if base_url_override:
+            # プラットフォーム・大陸のどちらの呼び出しも同じサーバーに送る
+            self.base_url = self.continental_url = base_url_override.rstrip('/')
+        
         self.session = requests.Session()
+        # 収集パイプラインの取得ワーカーとスケジューラーから同時に呼ばれるため接続を多めに保持
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         headers = {
             'User-Agent': 'LOL-Winrate-Calculator/1.0'
         }
@@ -101,6 +175,15 @@ class RiotAPIClient:
 
         self.session.headers.update(headers)
     
+    @staticmethod
+    def continental_region_for(region: str) -> str:
+        """プラットフォーム地域に対応する大陸ルーティング名（'americas' / 'asia' / 'europe'）"""
+        if region in ['na1', 'br1', 'la1', 'la2']:
+            return 'americas'
+        elif region in ['kr', 'jp1']:
+            return 'asia'
+        return 'europe'
+
     def get_league_entries_by_tier_division(self, tier: str, division: str, queue: str = 'RANKED_SOLO_5x5', page: int = 1) -> Optional[List[Dict]]:
         """
         指定したtier/divisionのリーグエントリー一覧を取得
@@ -112,48 +195,34 @@ class RiotAPIClient:
         Returns:
             プレイヤー情報リスト
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/league/v4/entries/{queue}/{tier}/{division}"
         params = {'page': page}
-        return self._make_request(url, params)
+        entries = self._make_request(url, params)
+        self.rank_index.add_entries(entries, tier=tier, queue=queue)
+        return entries
 
-    def _wait_for_rate_limit(self):
-        """レート制限に従って待機"""
-        current_time = time.time()
-        
-        # 2分間のリクエスト履歴をクリーンアップ
-        self.rate_limit.request_times_2m = [
-            t for t in self.rate_limit.request_times_2m 
-            if current_time - t < 120
-        ]
-        
-        # 1秒間のレート制限チェック
-        if current_time - self.rate_limit.last_request_time < 1:
-            if self.rate_limit.request_count_1s >= self.rate_limit.requests_per_second:
-                wait_time = 1 - (current_time - self.rate_limit.last_request_time)
-                logger.info(f"レート制限により {wait_time:.2f}秒待機中...")
-                time.sleep(wait_time)
-                self.rate_limit.request_count_1s = 0
-        else:
-            self.rate_limit.request_count_1s = 0
-        
-        # 2分間のレート制限チェック
-        if len(self.rate_limit.request_times_2m) >= self.rate_limit.requests_per_two_minutes:
-            oldest_request = min(self.rate_limit.request_times_2m)
-            wait_time = 120 - (current_time - oldest_request)
-            if wait_time > 0:
-                logger.info(f"レート制限により {wait_time:.2f}秒待機中...")
-                time.sleep(wait_time)
-        
-        # リクエスト記録を更新
-        self.rate_limit.last_request_time = current_time
-        self.rate_limit.request_count_1s += 1
-        self.rate_limit.request_times_2m.append(current_time)
+    def _wait_for_rate_limit(self, url: str) -> float:
+        """
+        レート制限に従って待機
+
+        Args:
+            url: これから送信するリクエストURL
+
+        Returns:
+            待機した秒数
+        """
+        method = resolve_endpoint_method(url)
+        waited = self.rate_limiters.for_url(url).acquire(method)
+        self.telemetry.record_throttle(method, waited)
+        return waited
     
     def _make_request(self, url: str, params: Dict = None) -> Optional[Dict]:
         """
         APIリクエストを実行
         
+        429・5xx・接続エラーは retry_policy に従って再送信する。
+        
         Args:
             url: リクエストURL
             params: クエリパラメータ
@@ -161,48 +230,111 @@ class RiotAPIClient:
         Returns:
             APIレスポンス（JSON）
         """
-        self._wait_for_rate_limit()
-        
-        try:
-            response = self.session.get(url, params=params, timeout=30)
-            
+        method = resolve_endpoint_method(url)
+        host = urlparse(url).netloc
+        rate_limiter = self.rate_limiters.for_host(host)
+        breaker = self.retry_policy.breaker_for(host)
+        failures = {}
+
+        while True:
+            # 障害中のホストには送信しない
+            wait = breaker.before_request()
+            while wait > 0:
+                time.sleep(wait)
+                self.telemetry.record_breaker_wait(method, wait)
+                wait = breaker.before_request()
+            self.telemetry.record_throttle(method, rate_limiter.acquire(method))
+
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=30)
+            except requests.exceptions.RequestException as e:
+                self.telemetry.record_connection_error(method, time.monotonic() - started)
+                breaker.record_failure()
+                delay = self._next_retry_delay(failures, CONNECTION_ERROR, url, None)
+                if delay is None:
+                    logger.error(f"リクエストエラー: {e}")
+                    return None
+                logger.warning(f"リクエストエラー: {e}（{delay:.1f}秒後に再送信）")
+                time.sleep(delay)
+                continue
+
+            self.telemetry.record_response(
+                method, response.status_code, time.monotonic() - started, len(response.content)
+            )
+            rate_limiter.update_from_headers(method, response.headers)
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+                delay = self._next_retry_delay(
+                    failures, SERVER_ERROR, url, parse_retry_after(response.headers)
+                )
+                if delay is None:
+                    logger.error(f"APIエラー: {response.status_code} - {response.text}")
+                    return None
+                logger.warning(f"サーバーエラー {response.status_code}: {url}（{delay:.1f}秒後に再送信）")
+                time.sleep(delay)
+                continue
+
+            breaker.record_success()
+
             if response.status_code == 200:
-                return response.json()
+                # 大きなタイムラインも文字列化せずバイト列から解析する
+                return fast_json.loads(response.content)
             elif response.status_code == 429:
-                # レート制限エラー
-                retry_after = int(response.headers.get('Retry-After', 60))
-                logger.warning(f"レート制限に達しました。{retry_after}秒後にリトライします。")
-                time.sleep(retry_after)
-                return self._make_request(url, params)
+                # レート制限エラー（該当スコープの Retry-After 経過後に再送信される）
+                rate_limiter.register_rate_limited(method, response.headers)
+                self.telemetry.record_rate_limited(method, response.headers.get('X-Rate-Limit-Type'))
+                delay = self._next_retry_delay(failures, RATE_LIMITED, url, None)
+                if delay is None:
+                    return None
+                time.sleep(delay)
+                self.telemetry.record_throttle(method, delay)
+                continue
             elif response.status_code == 404:
                 logger.warning(f"データが見つかりません: {url}")
                 return None
+            # 403 の場合は原因特定のためヘッダー情報（トークンはマスク）を出力
+            elif response.status_code == 403:
+                try:
+                    masked_headers = dict(self.session.headers)
+                    if 'X-Riot-Token' in masked_headers:
+                        masked_headers['X-Riot-Token'] = '<redacted>'
+                except Exception:
+                    masked_headers = '<unable to read headers>'
+                logger.error("APIエラー: %s - %s", response.status_code, response.text)
+                # マスク済みリクエストヘッダは debug 出力
+                logger.info("Request headers (masked): %s", masked_headers)
+                try:
+                    # レスポンスヘッダもデバッグ出力（Rate-Limit 系や詳細ヒントが入ることがある）
+                    logger.info("Response headers: %s", dict(response.headers))
+                except Exception:
+                    logger.info("Response headers: <unavailable>")
+                logger.info("Hint: run client.validate_api_key() to get a quick key-status check.")
+                return None
             else:
-                # 403 の場合は原因特定のためヘッダー情報（トークンはマスク）を出力
-                if response.status_code == 403:
-                    try:
-                        masked_headers = dict(self.session.headers)
-                        if 'X-Riot-Token' in masked_headers:
-                            masked_headers['X-Riot-Token'] = '<redacted>'
-                    except Exception:
-                        masked_headers = '<unable to read headers>'
-                    logger.error("APIエラー: %s - %s", response.status_code, response.text)
-                    # マスク済みリクエストヘッダは debug 出力
-                    logger.info("Request headers (masked): %s", masked_headers)
-                    try:
-                        # レスポンスヘッダもデバッグ出力（Rate-Limit 系や詳細ヒントが入ることがある）
-                        logger.info("Response headers: %s", dict(response.headers))
-                    except Exception:
-                        logger.info("Response headers: <unavailable>")
-                    logger.info("Hint: run client.validate_api_key() to get a quick key-status check.")
-                    return None
-                else:
-                    logger.error(f"APIエラー: {response.status_code} - {response.text}")
-                    return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"リクエストエラー: {e}")
-            return None
+                logger.error(f"APIエラー: {response.status_code} - {response.text}")
+                return None
+
+    def _next_retry_delay(self, failures: Dict[str, int], outcome: str, url: str,
+                          retry_after: Optional[float]) -> Optional[float]:
+        """
+        失敗を記録し、再送信までの待機秒数を retry_policy に問い合わせる
+
+        Args:
+            failures: 1リクエスト内の失敗種類ごとの回数（更新される）
+            outcome: 失敗の種類
+            url: リクエストURL（ログ用）
+            retry_after: Retry-After の秒数
+
+        Returns:
+            待機秒数。再送信しない場合は None
+        """
+        failures[outcome] = failures.get(outcome, 0) + 1
+        delay = self.retry_policy.retry_delay(outcome, failures[outcome], retry_after)
+        if delay is None:
+            logger.error(f"リトライ上限に達しました ({outcome} x{failures[outcome]}): {url}")
+        return delay
     
     def get_account_by_riot_id(self, game_name: str, tag_line: str) -> Optional[Dict]:
         """
@@ -215,7 +347,7 @@ class RiotAPIClient:
         Returns:
             アカウント情報
         """
-        base_url = self.CONTINENTAL_ENDPOINTS[self.continental_region]
+        base_url = self.continental_url
         url = f"{base_url}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
         return self._make_request(url)
     
@@ -229,7 +361,7 @@ class RiotAPIClient:
         Returns:
             サモナー情報
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/league/v4/entries/by-puuid/{puuid}"
         return self._make_request(url)
     
@@ -251,7 +383,7 @@ class RiotAPIClient:
         Returns:
             試合ID一覧
         """
-        base_url = self.CONTINENTAL_ENDPOINTS[self.continental_region]
+        base_url = self.continental_url
         url = f"{base_url}/lol/match/v5/matches/by-puuid/{puuid}/ids"
         
         params = {
@@ -280,9 +412,17 @@ class RiotAPIClient:
         Returns:
             試合詳細データ
         """
-        base_url = self.CONTINENTAL_ENDPOINTS[self.continental_region]
+        if self.match_cache:
+            cached = self.match_cache.get('match', match_id)
+            if cached is not None:
+                return cached
+        
+        base_url = self.continental_url
         url = f"{base_url}/lol/match/v5/matches/{match_id}"
-        return self._make_request(url)
+        match_data = self._make_request(url)
+        if match_data and self.match_cache:
+            self.match_cache.put('match', match_id, match_data)
+        return match_data
     
     def get_match_data(self, match_id: str) -> Optional[Dict]:
         """
@@ -326,9 +466,17 @@ class RiotAPIClient:
         Returns:
             タイムライン詳細データ
         """
-        base_url = self.CONTINENTAL_ENDPOINTS[self.continental_region]
+        if self.match_cache:
+            cached = self.match_cache.get('timeline', match_id)
+            if cached is not None:
+                return cached
+        
+        base_url = self.continental_url
         url = f"{base_url}/lol/match/v5/matches/{match_id}/timeline"
-        return self._make_request(url)
+        timeline_data = self._make_request(url)
+        if timeline_data and self.match_cache:
+            self.match_cache.put('timeline', match_id, timeline_data)
+        return timeline_data
     
     def get_champion_data(self, version: str = "13.24.1") -> Optional[Dict]:
         """
@@ -395,7 +543,7 @@ class RiotAPIClient:
         Returns:
             サモナー情報
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/summoner/v4/summoners/{summoner_id}"
         return self._make_request(url)
     
@@ -409,7 +557,7 @@ class RiotAPIClient:
         Returns:
             サモナー情報
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/summoner/v4/summoners/by-name/{summoner_name}"
         return self._make_request(url)
 
@@ -449,40 +597,29 @@ class RiotAPIClient:
           3. 各サモナーのソロランクティアを取得
           4. ティアを順序にマップして平均を計算し、最も近いティア名を返す
 
-        注意: 参加者ごとに追加の API 呼び出しが発生するため、実行は遅くなる可能性があります。
+        注意: リーグページで探索済みのプレイヤーは rank_index から解決します。
+        rank_resolver が未設定の場合、索引に無い参加者ごとに追加の API 呼び出しが発生します。
         """
         participants = match_data["metadata"]["participants"]
         if not participants:
             return None
-        tier_order = ['IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND', 'MASTER', 'GRANDMASTER', 'CHALLENGER']
-        tier_to_value = {t: i+1 for i, t in enumerate(tier_order)}
-
-        values = []
-
-        for p in participants:
-            puuid = p
-            summoner = self.get_summoner_by_puuid(puuid)
-
-            solo_tier = None  # ここで毎回初期化
-            for rank_info in summoner:
-                if rank_info['queueType'] == 'RANKED_SOLO_5x5':
-                    solo_tier = rank_info['tier']
-                    break
-                
-            if solo_tier:
-                # tier_to_value があるなら数値変換してvaluesに追加するのがよい
-                values.append(tier_to_value[solo_tier])
-            else:
-                print("RANKED_SOLO_5x5のデータがありません")
 
-        if not values:
-            return None
+        if self.rank_resolver:
+            # 索引・キャッシュ済みのプレイヤーは API を呼ばずに解決する
+            tiers = list(self.rank_resolver.resolve_tiers(participants).values())
+        else:
+            tiers = []
+            for puuid in participants:
+                indexed = self.rank_index.get(puuid)
+                if indexed:
+                    tiers.append(indexed.tier)
+                    continue
+                entries = self.get_summoner_by_puuid(puuid) or []
+                tiers.append(next(
+                    (e['tier'] for e in entries if e.get('queueType') == 'RANKED_SOLO_5x5'), None
+                ))
 
-        avg = sum(values) / len(values)
-        # 最も近い整数に丸めて対応するティアを返す
-        rounded = int(round(avg))
-        rounded = max(1, min(rounded, len(tier_order)))
-        return rounded
+        return average_tier_value(tiers)
     
     def get_challenger_league(self, queue: str = 'RANKED_SOLO_5x5') -> Optional[Dict]:
         """
@@ -494,9 +631,11 @@ class RiotAPIClient:
         Returns:
             チャレンジャーリーグ情報
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/league/v4/challengerleagues/by-queue/{queue}"
-        return self._make_request(url)
+        league_data = self._make_request(url)
+        self.rank_index.add_league(league_data)
+        return league_data
     
     def get_grandmaster_league(self, queue: str = 'RANKED_SOLO_5x5') -> Optional[Dict]:
         """
@@ -508,9 +647,11 @@ class RiotAPIClient:
         Returns:
             グランドマスターリーグ情報
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/league/v4/grandmasterleagues/by-queue/{queue}"
-        return self._make_request(url)
+        league_data = self._make_request(url)
+        self.rank_index.add_league(league_data)
+        return league_data
     
     def get_master_league(self, queue: str = 'RANKED_SOLO_5x5') -> Optional[Dict]:
         """
@@ -522,9 +663,11 @@ class RiotAPIClient:
         Returns:
             マスターリーグ情報
         """
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         url = f"{base_url}/lol/league/v4/masterleagues/by-queue/{queue}"
-        return self._make_request(url)
+        league_data = self._make_request(url)
+        self.rank_index.add_league(league_data)
+        return league_data
     
     def get_league_entries_by_summoner(self, summoner_id: str) -> Optional[List[Dict]]:
         """
@@ -538,7 +681,7 @@ class RiotAPIClient:
         """
         # ログはデバッグレベルで出力
         logger.info("get_league_entries_by_summoner called with summoner_id: %s", summoner_id)
-        base_url = self.REGIONAL_ENDPOINTS[self.region]
+        base_url = self.base_url
         # 正しいエンドポイントは v4（v5 は存在しない／誤りのため 403 等になる可能性がある）
         url = f"{base_url}/lol/league/v4/entries/by-summoner/{summoner_id}"
         logger.info("Request URL: %s", url)
@@ -551,10 +694,10 @@ class RiotAPIClient:
         ログに詳細を出力します。
         """
         try:
-            base_url = self.REGIONAL_ENDPOINTS[self.region]
+            base_url = self.base_url
             # status endpoint は軽量なのでキー検証に都合が良い
             url = f"{base_url}/lol/status/v3/shard-data"
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit(url)
             r = self.session.get(url, timeout=10)
             if r.status_code == 200:
                 logger.info("APIキー検証: OK (status endpoint returned 200)")
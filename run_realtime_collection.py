@@ -10,7 +10,9 @@ from datetime import datetime
 from pathlib import Path
 
 from realtime_data_collector import RealtimeDataCollector
-from config import MYSQL_CONFIG, RIOT_API_KEY, RIOT_REGION, DATA_COLLECTION_CONFIG
+from sharded_collection import ShardedCollectionCoordinator, plan_shards
+from config import (MYSQL_CONFIG, RIOT_API_KEY, RIOT_REGION, DATA_COLLECTION_CONFIG, CACHE_CONFIG, RETRY_CONFIG, TELEMETRY_CONFIG,
+                    PIPELINE_CONFIG, RIOT_API_KEYS, RIOT_REGIONS, SHARD_CONFIG)
 
 # ログ設定
 logging.basicConfig(
@@ -79,7 +81,8 @@ def run_small_test() -> bool:
     
     try:
         # データ収集システムを初期化
-        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION)
+        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION, CACHE_CONFIG, RETRY_CONFIG,
+                                          TELEMETRY_CONFIG, PIPELINE_CONFIG)
         
         # 静的データをセットアップ
         logger.info("静的データセットアップ中...")
@@ -116,13 +119,14 @@ def run_small_test() -> bool:
         return False
 
 def run_full_collection(tier: str = 'ALL', player_count: int = 50, 
-                       matches_per_player: int = 20) -> bool:
+                       matches_per_player: int = 20, backfill: bool = False) -> bool:
     """本格的なデータ収集を実行"""
     logger.info("本格的なデータ収集開始...")
     
     try:
         # データ収集システムを初期化
-        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION)
+        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION, CACHE_CONFIG, RETRY_CONFIG,
+                                          TELEMETRY_CONFIG, PIPELINE_CONFIG)
         
         # 静的データをセットアップ
         if not collector.setup_static_data():
@@ -137,8 +141,6 @@ def run_full_collection(tier: str = 'ALL', player_count: int = 50,
                 logger.info(f"{key}: {value}")
         
         # データ収集実行
-        all_results = {}
-        
         if tier == 'ALL':
             tiers = ['CHALLENGER', 'GRANDMASTER', 'MASTER']
             tier_player_count = player_count // len(tiers)
@@ -146,42 +148,37 @@ def run_full_collection(tier: str = 'ALL', player_count: int = 50,
             tiers = [tier]
             tier_player_count = player_count
         
+        # ティア（・地域・PUUID ハッシュ）ごとのシャードを別プロセスで並行に収集
+        shards = plan_shards(tiers, RIOT_API_KEYS, RIOT_REGIONS, SHARD_CONFIG['split_tiers'],
+                             SHARD_CONFIG['hash_shards'])
+        # 静的データは上でディスクキャッシュに保存済みのため、各シャードはそれを読み込む
+        coordinator = ShardedCollectionCoordinator(
+            shards, MYSQL_CONFIG, CACHE_CONFIG, RETRY_CONFIG, TELEMETRY_CONFIG, PIPELINE_CONFIG,
+            dict(SHARD_CONFIG, setup_static_data=False)
+        )
+        sharded_results = coordinator.run(
+            'high_rank',
+            player_count=tier_player_count,
+            matches_per_player=matches_per_player,
+            backfill=backfill
+        )
+        all_results = sharded_results['shards']
+        for shard_id, shard_results in all_results.items():
+            if 'error' in shard_results:
+                logger.error(f"シャード処理エラー: {shard_id} - {shard_results['error']}")
+            else:
+                logger.info(f"シャード処理完了: {shard_id} - {shard_results.get('matches_processed', 0)}試合")
+        
+        totals = sharded_results['totals']
         total_stats = {
-            'total_players_processed': 0,
-            'total_matches_collected': 0,
-            'total_solo_kills_found': 0,
-            'total_matchups_created': 0,
-            'total_timeline_analyzed': 0,
-            'total_failed_requests': 0
+            'total_players_processed': totals['total_players_processed'],
+            'total_matches_collected': totals['matches_processed'],
+            'total_solo_kills_found': totals['solo_kills_found'],
+            'total_matchups_created': totals['matchups_created'],
+            'total_timeline_analyzed': totals['timeline_analyzed'],
+            'total_failed_requests': totals['failed_requests']
         }
         
-        for current_tier in tiers:
-            logger.info(f"ティア処理開始: {current_tier}")
-            
-            try:
-                tier_results = collector.collect_from_high_rank_players(
-                    tier=current_tier,
-                    player_count=tier_player_count,
-                    matches_per_player=matches_per_player
-                )
-                
-                all_results[current_tier] = tier_results
-                
-                # 統計を累積
-                total_stats['total_players_processed'] += tier_results.get('total_players_processed', 0)
-                total_stats['total_matches_collected'] += tier_results.get('matches_processed', 0)
-                total_stats['total_solo_kills_found'] += tier_results.get('solo_kills_found', 0)
-                total_stats['total_matchups_created'] += tier_results.get('matchups_created', 0)
-                total_stats['total_timeline_analyzed'] += tier_results.get('timeline_analyzed', 0)
-                total_stats['total_failed_requests'] += tier_results.get('failed_requests', 0)
-                
-                logger.info(f"ティア処理完了: {current_tier}")
-                
-            except Exception as e:
-                logger.error(f"ティア処理エラー: {current_tier} - {e}")
-                all_results[current_tier] = {'error': str(e)}
-                continue
-        
         # 収集後のデータベース統計
         logger.info("\n=== 収集後のデータベース統計 ===")
         db_stats_after = collector.get_collection_stats()
@@ -215,7 +212,8 @@ def run_single_match_test(match_id: str) -> bool:
     logger.info(f"単一試合テスト開始: {match_id}")
     
     try:
-        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION)
+        collector = RealtimeDataCollector(RIOT_API_KEY, MYSQL_CONFIG, RIOT_REGION, CACHE_CONFIG, RETRY_CONFIG,
+                                          TELEMETRY_CONFIG, PIPELINE_CONFIG)
         
         # 静的データをセットアップ
         if not collector.setup_static_data():
@@ -252,6 +250,8 @@ def main():
     parser.add_argument('--players', type=int, default=50, help='プレイヤー数')
     parser.add_argument('--matches', type=int, default=20, help='プレイヤーあたりの試合数')
     parser.add_argument('--match-id', type=str, help='単一試合テスト用の試合ID')
+    parser.add_argument('--backfill', action='store_true',
+                       help='新しい試合ではなく過去方向に履歴を取得する（PIPELINE_CONFIG の backfill_depth まで）')
     
     args = parser.parse_args()
     
@@ -295,7 +295,7 @@ def main():
                     confirm = input("続行しますか？ (y/N): ").strip().lower()
                     
                     if confirm in ['y', 'yes']:
-                        if run_full_collection(args.tier, args.players, args.matches):
+                        if run_full_collection(args.tier, args.players, args.matches, args.backfill):
                             logger.info("本格的なデータ収集完了")
                         else:
                             logger.error("本格的なデータ収集失敗")
@@ -331,7 +331,7 @@ def main():
     elif args.mode == 'small':
         run_small_test()
     elif args.mode == 'full':
-        run_full_collection(args.tier, args.players, args.matches)
+        run_full_collection(args.tier, args.players, args.matches, args.backfill)
     elif args.mode == 'match':
         if args.match_id:
             run_single_match_test(args.match_id)
@@ -9,6 +9,7 @@ import logging
 import sys
 from pathlib import Path
 from config import MYSQL_CONFIG
+from match_row_writer import SOLO_KILL_STATS_TRIGGER, SOLO_KILL_STATS_TRIGGER_NAME
 
 # ログ設定
 logging.basicConfig(
@@ -17,6 +18,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 既存のデータベースに後から追加した列（テーブル, 列, 定義）
+# CREATE TABLE は既存のテーブルを変更しないため、スキーマ適用後に無い列だけを追加する
+COLUMN_MIGRATIONS = [
+    ('realtime_winrate_stats', 'first_kill_time_sum', 'BIGINT DEFAULT 0 AFTER avg_first_kill_time'),
+    ('realtime_winrate_stats', 'first_kill_count', 'INT DEFAULT 0 AFTER first_kill_time_sum'),
+]
+
+# トリガーが無い・定義が古い間に入った solo_kills から matchups のソロキル列を作り直す
+MATCHUP_SOLO_KILL_REPAIR = """
+UPDATE matchups m
+JOIN (SELECT matchup_id, COUNT(*) AS kills, MIN(timestamp_ms) AS first_time
+      FROM solo_kills GROUP BY matchup_id) s ON s.matchup_id = m.id
+SET m.total_solo_kills = s.kills,
+    m.first_blood_killer_participant_id = (
+        SELECT k.killer_participant_id FROM solo_kills k
+        WHERE k.matchup_id = m.id ORDER BY k.timestamp_ms, k.id LIMIT 1
+    ),
+    m.first_blood_time = s.first_time
+"""
+
 def create_database_if_not_exists(config: dict) -> bool:
     """データベースが存在しない場合は作成"""
     try:
@@ -141,6 +162,62 @@ def execute_sql_file(config: dict, sql_file_path: str) -> bool:
         logger.error(f"予期しないエラー: {e}")
         return False
 
+def apply_column_migrations(config: dict) -> bool:
+    """
+    既存のテーブルに不足している列を追加（追加済みの列はそのまま、何度実行してもよい）
+    
+    realtime_winrate_stats の合計列を追加したときは、既存の行の合計が 0 のままだと
+    差分更新で平均が崩れるため matchups から集計し直す
+    
+    solo_kills のトリガーが無い（再分析の入れ替えで消えた）か定義が古いときは作り直し、
+    matchups のソロキル列を solo_kills から計算し直してから統計も集計し直す
+    """
+    try:
+        connection = mysql.connector.connect(**config)
+        cursor = connection.cursor()
+        
+        added_tables = set()
+        for table, column, definition in COLUMN_MIGRATIONS:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """, (table, column))
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            added_tables.add(table)
+            logger.info(f"列を追加しました: {table}.{column}")
+        
+        cursor.execute("""
+            SELECT ACTION_STATEMENT FROM information_schema.TRIGGERS
+            WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = %s AND EVENT_OBJECT_TABLE = 'solo_kills'
+        """, (SOLO_KILL_STATS_TRIGGER_NAME,))
+        row = cursor.fetchone()
+        expected_body = SOLO_KILL_STATS_TRIGGER[SOLO_KILL_STATS_TRIGGER.index('BEGIN'):]
+        if row is None or ' '.join(row[0].split()) != ' '.join(expected_body.split()):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {SOLO_KILL_STATS_TRIGGER_NAME}")
+            cursor.execute(SOLO_KILL_STATS_TRIGGER)
+            cursor.execute(MATCHUP_SOLO_KILL_REPAIR)
+            added_tables.add('realtime_winrate_stats')
+            logger.info(f"トリガーを作り直し、matchups のソロキル列を再計算しました: {cursor.rowcount}件")
+        
+        connection.commit()
+        cursor.close()
+        connection.close()
+        
+    except Error as e:
+        logger.error(f"列の追加エラー: {e}")
+        return False
+    
+    if 'realtime_winrate_stats' in added_tables:
+        from database_manager_realtime import RealtimeDatabaseManager
+        results = RealtimeDatabaseManager(**config).recompute_realtime_stats(repair=True)
+        if results is None:
+            logger.error("realtime_winrate_stats の再集計に失敗（recompute_winrate_stats.py で再実行してください）")
+            return False
+        logger.info(f"realtime_winrate_stats を再集計しました: {results}")
+    return True
+
 def verify_database_setup(config: dict) -> bool:
     """データベースセットアップの検証"""
     try:
@@ -152,7 +229,7 @@ def verify_database_setup(config: dict) -> bool:
             'game_versions', 'champions', 'items', 'matches', 
             'participants', 'matchups', 'solo_kills', 'kill_items',
             'timeline_events', 'realtime_winrate_stats', 'ml_models',
-            'realtime_predictions'
+            'realtime_predictions', 'player_ranks', 'player_watermarks'
         ]
         
         existing_tables = []
@@ -194,7 +271,12 @@ def setup_realtime_database() -> bool:
             logger.error("スキーマ適用に失敗")
             return False
         
-        # 3. セットアップ検証
+        # 3. 既存のテーブルへの列の追加
+        if not apply_column_migrations(MYSQL_CONFIG):
+            logger.error("列の追加に失敗")
+            return False
+        
+        # 4. セットアップ検証
         if not verify_database_setup(MYSQL_CONFIG):
             logger.error("データベース検証に失敗")
             return False
@@ -271,7 +353,8 @@ def main():
                 
             elif choice == '2':
                 logger.info("スキーマ再適用を開始...")
-                if execute_sql_file(MYSQL_CONFIG, "database_schema_realtime.sql"):
+                if (execute_sql_file(MYSQL_CONFIG, "database_schema_realtime.sql")
+                        and apply_column_migrations(MYSQL_CONFIG)):
                     print("\n✅ スキーマ適用が完了しました！")
                 else:
                     print("\n❌ スキーマ適用に失敗しました")
@@ -0,0 +1,151 @@
+"""
+Shard Coordination
+複数プロセスで分担して収集するときに、試合ID・プレイヤーの担当を調整する共有ファイル
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    kind TEXT NOT NULL,
+    claim_key TEXT NOT NULL,
+    shard_id TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (kind, claim_key)
+);
+"""
+
+# 別プロセスが書き込み中のときに待つ秒数
+BUSY_TIMEOUT_SECONDS = 30.0
+
+
+def puuid_shard(puuid: str, shard_count: int) -> int:
+    """
+    PUUID の担当シャード番号（プロセスをまたいで同じ値になるハッシュ）
+
+    Args:
+        puuid: PUUID
+        shard_count: シャード数
+
+    Returns:
+        0 以上 shard_count 未満の番号
+    """
+    if shard_count <= 1:
+        return 0
+    digest = hashlib.blake2b(puuid.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+
+class ShardClaims:
+    """
+    シャード間の担当表（SQLite ファイルを全プロセスで共有）
+
+    先に登録したシャードだけが試合詳細の取得・プレイヤーの探索を行う。
+    保存済みの試合は DB の照合で除外されるため、ここでは同じ実行中に
+    複数のシャードが同時に同じ試合を取得するのを防ぐ。
+    取得・保存に失敗した試合は release で担当を外し、次に一覧に現れたシャードが取得し直す。
+    """
+
+    def __init__(self, path: str, shard_id: str):
+        """
+        担当表を開く（無ければ作成）
+
+        Args:
+            path: 共有する SQLite ファイルのパス
+            shard_id: 自分のシャードID
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.shard_id = shard_id
+        self._conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        # sqlite3 の接続はスレッド間で同時に使えないため、パイプラインのワーカーは順に使う
+        self._lock = threading.Lock()
+
+    def claim(self, kind: str, keys: Iterable[str]) -> List[str]:
+        """
+        まだどのシャードも担当していないキーを自分の担当として登録
+
+        Args:
+            kind: 'match' または 'player'
+            keys: 試合IDまたは PUUID
+
+        Returns:
+            今回自分が担当になったキー（入力順）。共有ファイルに書けなければ全件
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return []
+        now = time.time()
+        claimed = []
+        with self._lock:
+            try:
+                # BEGIN IMMEDIATE で書き込みロックを先に取り、他プロセスと交互に登録する
+                self._conn.execute('BEGIN IMMEDIATE')
+                for key in keys:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO claims (kind, claim_key, shard_id, claimed_at) VALUES (?, ?, ?, ?)",
+                        (kind, key, self.shard_id, now)
+                    )
+                    if cursor.rowcount == 1:
+                        claimed.append(key)
+                self._conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
+                # 担当表が使えなくても DB の照合で保存の重複は防げるため、取得を止めない
+                logger.warning(f"シャード担当表の書き込みエラー: {e}")
+                return keys
+        return claimed
+
+    def release(self, kind: str, keys: Iterable[str]):
+        """
+        自分の担当を外す（取得・保存に失敗した試合を、同じ実行中に他のシャードが担当し直せるようにする）
+
+        Args:
+            kind: 'match' または 'player'
+            keys: 試合IDまたは PUUID
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "DELETE FROM claims WHERE kind = ? AND claim_key = ? AND shard_id = ?",
+                    [(kind, key, self.shard_id) for key in keys]
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"シャード担当表の削除エラー: {e}")
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """シャードごとの担当件数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT shard_id, kind, COUNT(*) FROM claims GROUP BY shard_id, kind"
+            ).fetchall()
+        counts = {}
+        for shard_id, kind, count in rows:
+            counts.setdefault(shard_id, {})[kind] = count
+        return counts
+
+    def reset(self):
+        """前回の実行の担当をすべて消す（コーディネーターが開始時に呼ぶ）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM claims")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,273 @@
+"""
+Sharded Collection
+ティア・地域・PUUID ハッシュで収集をシャードに分け、シャードごとのワーカープロセスで並行に実行するコーディネーター
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from riot_api_client import RiotAPIClient
+from shard_coordination import ShardClaims
+
+logger = logging.getLogger(__name__)
+
+# シャードの結果として親プロセスへ返す統計
+SUMMARY_KEYS = ('total_players_processed', 'matches_processed', 'solo_kills_found', 'matchups_created',
+                'timeline_analyzed', 'failed_requests', 'duration_seconds')
+
+
+@dataclass
+class ShardSpec:
+    """1つのワーカープロセスが担当する範囲"""
+    shard_id: str
+    api_key: str
+    region: str
+    tiers: List[str] = field(default_factory=list)
+    # PUUID のハッシュで分ける場合の自分の番号と総数
+    hash_index: int = 0
+    hash_count: int = 1
+    # 同じAPIキー・同じルーティングホストを使うシャード間で分け合う予算の割合
+    rate_limit_share: float = 1.0
+
+    def shard_config(self, coordination_path: Optional[str]) -> Dict:
+        """RealtimeDataCollector の shard_config"""
+        return {
+            'shard_id': self.shard_id,
+            'hash_index': self.hash_index,
+            'hash_count': self.hash_count,
+            'rate_limit_share': self.rate_limit_share,
+            'coordination_path': coordination_path,
+        }
+
+
+def plan_shards(tiers: List[str], api_keys: List[str], regions: List[str],
+                split_tiers: bool = True, hash_shards: int = 1) -> List[ShardSpec]:
+    """
+    地域 × ティア × PUUID ハッシュでシャードを作り、APIキーを順に割り当てる
+
+    Riot API の制限は APIキー × ルーティングホストごとに数えるため、
+    同じキーで同じ大陸ホスト（試合詳細・タイムライン）を使うシャードの数で予算を等分する。
+    キーや地域を増やすと1シャードあたりの予算が増え、シャード数に比例してスループットが伸びる。
+
+    注意: PUUID はAPIキー（アプリケーション）ごとに異なるため、同じプレイヤーが
+    別キーのシャードでは別の PUUID になる。試合IDは共通なので試合の重複は担当表で防げる。
+
+    Args:
+        tiers: 対象ティア
+        api_keys: APIキーのリスト
+        regions: 地域コードのリスト
+        split_tiers: ティアごとに別シャードにするか（False なら全ティアを1シャードで扱う）
+        hash_shards: PUUID のハッシュで分ける数
+
+    Returns:
+        ShardSpec のリスト
+    """
+    if not api_keys:
+        raise ValueError("APIキーがありません")
+    tier_groups = [[tier] for tier in tiers] if split_tiers else [list(tiers)]
+    hash_shards = max(1, hash_shards)
+
+    shards = []
+    for region in regions:
+        for tier_group in tier_groups:
+            for hash_index in range(hash_shards):
+                api_key = api_keys[len(shards) % len(api_keys)]
+                parts = [region] + ([tier_group[0].lower()] if split_tiers else []) + (
+                    [f"h{hash_index}"] if hash_shards > 1 else [])
+                shards.append(ShardSpec('-'.join(parts), api_key, region, tier_group, hash_index, hash_shards))
+
+    # 同じ (キー, 大陸ホスト) を使うシャード数で予算を割る
+    sharing: Dict[tuple, int] = {}
+    for shard in shards:
+        budget_key = (shard.api_key, RiotAPIClient.continental_region_for(shard.region))
+        sharing[budget_key] = sharing.get(budget_key, 0) + 1
+    for shard in shards:
+        shard.rate_limit_share = 1.0 / sharing[(shard.api_key, RiotAPIClient.continental_region_for(shard.region))]
+    return shards
+
+
+def _shard_path(path: str, shard_id: str) -> str:
+    """シャードごとのファイル名（例: crawl_journal.sqlite3 → crawl_journal-jp1-master.sqlite3）"""
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}-{shard_id}{path.suffix}"))
+
+
+def _shard_settings(spec: ShardSpec, index: int, settings: Dict) -> Dict:
+    """シャードごとの接続・キャッシュ・ジャーナル設定"""
+    mysql_config = dict(settings['mysql_config'])
+    mysql_config['pool_name'] = f"realtime_pool_{spec.shard_id}"
+    mysql_config['pool_size'] = settings.get('db_pool_size', mysql_config.get('pool_size', 10))
+
+    pipeline_config = dict(settings.get('pipeline_config') or {})
+    if pipeline_config.get('journal_path'):
+        pipeline_config['journal_path'] = _shard_path(pipeline_config['journal_path'], spec.shard_id)
+    if pipeline_config.get('write_behind_path'):
+        pipeline_config['write_behind_path'] = _shard_path(pipeline_config['write_behind_path'], spec.shard_id)
+    pipeline_config['frontier_dir'] = str(Path(pipeline_config.get('frontier_dir', 'cache/frontier')) / spec.shard_id)
+
+    telemetry_config = dict(settings.get('telemetry_config') or {})
+    if telemetry_config.get('metrics_port'):
+        # 同じポートは1プロセスしか使えないため連番にする
+        telemetry_config['metrics_port'] += index
+
+    return {
+        'mysql_config': mysql_config,
+        'cache_config': settings.get('cache_config'),
+        'retry_config': settings.get('retry_config'),
+        'telemetry_config': telemetry_config,
+        'pipeline_config': pipeline_config,
+    }
+
+
+def run_shard(spec: ShardSpec, index: int, settings: Dict, mode: str, params: Dict) -> Dict:
+    """
+    1シャード分の収集を実行（ワーカープロセスのエントリポイント）
+
+    シャードごとに RealtimeDataCollector を作るため、レートリミッター・DBコネクションプール・
+    フロンティア・ジャーナルはシャード間で共有しない。
+
+    Args:
+        spec: 担当範囲
+        index: シャードの通し番号
+        settings: ShardedCollectionCoordinator の設定
+        mode: 'crawl'（RealtimeDataCollector.crawl）か 'high_rank'（collect_from_high_rank_players をティアごとに）
+        params: 収集メソッドの引数
+
+    Returns:
+        シャードの統計（SUMMARY_KEYS）。失敗したら error を含む
+    """
+    from realtime_data_collector import RealtimeDataCollector
+
+    if not logging.getLogger().handlers:
+        # spawn で起動したプロセスは親のログ設定を引き継がない
+        logging.basicConfig(
+            level=settings.get('log_level', logging.INFO),
+            format=f"%(asctime)s - [{spec.shard_id}] %(name)s - %(levelname)s - %(message)s"
+        )
+
+    try:
+        shard_settings = _shard_settings(spec, index, settings)
+        collector = RealtimeDataCollector(
+            spec.api_key, shard_settings['mysql_config'], spec.region,
+            shard_settings['cache_config'], shard_settings['retry_config'],
+            shard_settings['telemetry_config'], shard_settings['pipeline_config'],
+            spec.shard_config(settings.get('coordination_path'))
+        )
+        if settings.get('setup_static_data') and not collector.setup_static_data():
+            logger.warning(f"静的データのセットアップに失敗: {spec.shard_id}")
+
+        if mode == 'crawl':
+            results = collector.crawl(spec.tiers, **params)
+            players_processed = results.get('total_players_processed', 0)
+        elif mode == 'high_rank':
+            players_processed = 0
+            results = {}
+            for tier in spec.tiers:
+                results = collector.collect_from_high_rank_players(tier, **params)
+                # total_players_processed は呼び出しごとの値、その他の統計は累積
+                players_processed += results.get('total_players_processed', 0)
+        else:
+            raise ValueError(f"不明なモードです: {mode}")
+
+        summary = {key: results.get(key, 0) for key in SUMMARY_KEYS}
+        summary['total_players_processed'] = players_processed
+        return summary
+    except Exception as e:
+        logger.error(f"シャード実行エラー: {spec.shard_id} - {e}")
+        return {'error': str(e)}
+
+
+class ShardedCollectionCoordinator:
+    """
+    シャードごとにワーカープロセスを起動して収集し、結果を集計するコーディネーター
+
+    - シャード間の試合IDの重複は共有の担当表（shard_coordination.ShardClaims）と DB の照合で防ぐ
+    - APIキーの予算は plan_shards が割り当てた割合で各プロセスのレートリミッターが守る
+    - シャードが1つなら子プロセスを起動せずにその場で実行する
+    """
+
+    def __init__(self, shards: List[ShardSpec], mysql_config: Dict, cache_config: Optional[Dict] = None,
+                 retry_config: Optional[Dict] = None, telemetry_config: Optional[Dict] = None,
+                 pipeline_config: Optional[Dict] = None, shard_config: Optional[Dict] = None):
+        """
+        コーディネーターを初期化
+
+        Args:
+            shards: plan_shards で作ったシャード
+            mysql_config: MySQL接続設定
+            cache_config: キャッシュ設定（ディスクキャッシュは全シャードで共有）
+            retry_config: リトライ設定
+            telemetry_config: テレメトリ設定（metrics_port はシャードごとに連番）
+            pipeline_config: 収集パイプライン設定（ジャーナル・フロンティア・書き込みバッファはシャードごとに分ける）
+            shard_config: config.SHARD_CONFIG 形式（coordination_path, db_pool_size, setup_static_data）
+        """
+        if not shards:
+            raise ValueError("シャードがありません")
+        shard_config = shard_config or {}
+        self.shards = shards
+        self.settings = {
+            'mysql_config': mysql_config,
+            'cache_config': cache_config,
+            'retry_config': retry_config,
+            'telemetry_config': telemetry_config,
+            'pipeline_config': pipeline_config,
+            'coordination_path': shard_config.get('coordination_path', 'cache/shard_claims.sqlite3'),
+            'db_pool_size': shard_config.get('db_pool_size', 6),
+            'setup_static_data': shard_config.get('setup_static_data', True),
+        }
+
+    def run(self, mode: str = 'crawl', **params) -> Dict:
+        """
+        全シャードを並行に実行して終了まで待機
+
+        Args:
+            mode: 'crawl' または 'high_rank'（run_shard を参照）
+            **params: 各シャードの収集メソッドに渡す引数
+
+        Returns:
+            {'shards': シャードID → 統計, 'totals': 合計, 'claims': シャードごとの担当件数}
+        """
+        # 前回の実行の担当を消す（保存済みの試合は DB の照合で除外される）
+        claims = ShardClaims(self.settings['coordination_path'], 'coordinator')
+        claims.reset()
+
+        logger.info(f"シャード収集開始: {len(self.shards)}シャード - {[s.shard_id for s in self.shards]}")
+        results: Dict[str, Dict] = {}
+        if len(self.shards) == 1:
+            results[self.shards[0].shard_id] = run_shard(self.shards[0], 0, self.settings, mode, params)
+        else:
+            # fork ではスレッド・コネクションの状態を引き継いでしまうため spawn で起動する
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(self.shards), mp_context=context) as executor:
+                futures = {
+                    spec.shard_id: executor.submit(run_shard, spec, index, self.settings, mode, params)
+                    for index, spec in enumerate(self.shards)
+                }
+                for shard_id, future in futures.items():
+                    try:
+                        results[shard_id] = future.result()
+                    except Exception as e:
+                        logger.error(f"シャードプロセスエラー: {shard_id} - {e}")
+                        results[shard_id] = {'error': str(e)}
+
+        totals = {key: 0 for key in SUMMARY_KEYS if key != 'duration_seconds'}
+        for shard_id, summary in results.items():
+            if 'error' in summary:
+                continue
+            for key in totals:
+                totals[key] += summary.get(key, 0)
+        totals['failed_shards'] = sum(1 for summary in results.values() if 'error' in summary)
+
+        claim_counts = claims.counts()
+        claims.close()
+        logger.info(f"シャード収集完了: {totals}")
+        return {
+            'shards': results,
+            'totals': totals,
+            'claims': claim_counts,
+            'plan': [asdict(spec) | {'api_key': spec.api_key[:10] + '...'} for spec in self.shards],
+        }
@@ -0,0 +1,201 @@
+"""
+Static Data Cache
+Data Dragon のチャンピオン・アイテムデータをパッチバージョンごとにディスクへ保存するキャッシュ
+"""
+
+import logging
+import os
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import fast_json
+
+logger = logging.getLogger(__name__)
+
+# versions.json を再取得するまでの秒数
+DEFAULT_VERSIONS_TTL = 3600
+
+
+@dataclass
+class StaticData:
+    """1つのパッチバージョンの静的データと検索用テーブル"""
+    version: str
+    champion_data: Dict
+    item_data: Dict
+    # アイテムID → 合計ゴールド（IDをそのまま添字にする密な配列）
+    item_gold: array = field(default_factory=lambda: array('I'))
+    # チャンピオンID → キー名（例: 266 → 'Aatrox'）
+    champion_keys: Dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, version: str, champion_data: Dict, item_data: Dict) -> 'StaticData':
+        """DDragon の JSON から検索用テーブルを作成"""
+        gold_by_id = {}
+        for item_id, item_info in item_data.get('data', {}).items():
+            if item_id.isdigit():
+                gold_by_id[int(item_id)] = item_info.get('gold', {}).get('total', 0)
+
+        item_gold = array('I', bytes(4 * (max(gold_by_id, default=0) + 1)))
+        for item_id, gold in gold_by_id.items():
+            item_gold[item_id] = gold
+
+        champion_keys = {}
+        for champion_key, champion_info in champion_data.get('data', {}).items():
+            try:
+                champion_keys[int(champion_info.get('key'))] = champion_key
+            except (TypeError, ValueError):
+                continue
+
+        return cls(version, champion_data, item_data, item_gold, champion_keys)
+
+    def item_total_gold(self, item_id: int) -> int:
+        """アイテムの合計ゴールド（未知のIDは 0）"""
+        if 0 <= item_id < len(self.item_gold):
+            return self.item_gold[item_id]
+        return 0
+
+    def items_value(self, items: Iterable[int]) -> int:
+        """アイテム一覧の合計ゴールド"""
+        item_gold = self.item_gold
+        size = len(item_gold)
+        return sum(item_gold[item_id] for item_id in items if 0 <= item_id < size)
+
+
+class StaticDataCache:
+    """
+    パッチバージョンをキーにした Data Dragon のディスクキャッシュ
+
+    cache_dir/{version}/champion.json・item.json に保存し、
+    同じバージョンの再起動時はダウンロードせずに読み込む。
+    バージョン一覧（versions.json）も TTL 付きで保存し、取得に失敗したら保存済みの値を使う。
+    """
+
+    def __init__(self, cache_dir: str, api_client=None, versions_ttl: int = DEFAULT_VERSIONS_TTL):
+        """
+        キャッシュを初期化
+
+        Args:
+            cache_dir: キャッシュディレクトリ
+            api_client: get_latest_version / get_champion_data / get_item_data を持つ RiotAPIClient
+            versions_ttl: バージョン一覧を再取得するまでの秒数
+        """
+        self.cache_dir = Path(cache_dir)
+        self.api_client = api_client
+        self.versions_ttl = versions_ttl
+        self._loaded: Dict[str, StaticData] = {}
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _read_json(self, path: Path) -> Optional[object]:
+        try:
+            return fast_json.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"静的データキャッシュの読み込みエラー: {path} - {e}")
+            return None
+
+    def _write_json(self, path: Path, payload: object):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(fast_json.dumps(payload))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"静的データキャッシュの書き込みエラー: {path} - {e}")
+
+    def _fetch(self, fetcher_name: str, *args) -> Optional[object]:
+        if self.api_client is None:
+            return None
+        try:
+            return getattr(self.api_client, fetcher_name)(*args)
+        except Exception as e:
+            logger.error(f"静的データ取得エラー: {fetcher_name} - {e}")
+            return None
+
+    def latest_version(self) -> Optional[str]:
+        """
+        最新のゲームバージョンを取得（TTL 内なら保存済みの値）
+
+        Returns:
+            最新バージョン文字列
+        """
+        path = self.cache_dir / 'latest_version.json'
+        cached = self._read_json(path)
+        try:
+            fresh = time.time() - path.stat().st_mtime < self.versions_ttl
+        except OSError:
+            fresh = False
+        if cached and fresh:
+            return cached.get('version')
+
+        version = self._fetch('get_latest_version')
+        if version:
+            self._write_json(path, {'version': version})
+            return version
+        # 取得できなければ期限切れでも保存済みの値を使う
+        return cached.get('version') if cached else None
+
+    def cached_versions(self) -> List[str]:
+        """ディスクに保存済みのバージョン一覧（新しい順）"""
+        versions = [p.name for p in self.cache_dir.iterdir()
+                    if p.is_dir() and (p / 'champion.json').exists() and (p / 'item.json').exists()]
+
+        def version_key(version: str):
+            return [int(part) if part.isdigit() else 0 for part in version.split('.')]
+
+        return sorted(versions, key=version_key, reverse=True)
+
+    def load(self, version: str) -> Optional[StaticData]:
+        """
+        指定バージョンの静的データを取得（保存済みならダウンロードしない）
+
+        Args:
+            version: ゲームバージョン（例: '14.1.1'）
+
+        Returns:
+            StaticData。取得できなければ None
+        """
+        with self._lock:
+            static_data = self._loaded.get(version)
+            if static_data:
+                return static_data
+
+            version_dir = self.cache_dir / version
+            champion_data = self._read_json(version_dir / 'champion.json')
+            if champion_data is None:
+                champion_data = self._fetch('get_champion_data', version)
+                if champion_data:
+                    self._write_json(version_dir / 'champion.json', champion_data)
+
+            item_data = self._read_json(version_dir / 'item.json')
+            if item_data is None:
+                item_data = self._fetch('get_item_data', version)
+                if item_data:
+                    self._write_json(version_dir / 'item.json', item_data)
+
+            if not champion_data or not item_data:
+                logger.error(f"静的データを取得できません: {version}")
+                return None
+
+            static_data = StaticData.build(version, champion_data, item_data)
+            self._loaded[version] = static_data
+            logger.info(
+                f"静的データを読み込みました: {version} "
+                f"(チャンピオン{len(static_data.champion_keys)}体, アイテム{len(item_data.get('data', {}))}個)"
+            )
+            return static_data
+
+    def load_latest(self) -> Optional[StaticData]:
+        """最新バージョンの静的データを取得"""
+        version = self.latest_version()
+        return self.load(version) if version else None
+
+    def load_latest_cached(self) -> Optional[StaticData]:
+        """ネットワークを使わず、保存済みの最も新しいバージョンを読み込む"""
+        versions = self.cached_versions()
+        return self.load(versions[0]) if versions else None
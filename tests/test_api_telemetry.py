@@ -0,0 +1,41 @@
+import requests
+
+from api_telemetry import APITelemetry
+from local_riot_server import LocalRiotServer, SyntheticFixtures
+from riot_api_client import RiotAPIClient
+
+
+def test_records_latency_bytes_status_and_throttle_types():
+    telemetry = APITelemetry()
+    telemetry.record_response('match-v5.getTimeline', 200, 0.2, 300000)
+    telemetry.record_response('match-v5.getTimeline', 429, 0.01, 0)
+    telemetry.record_rate_limited('match-v5.getTimeline', 'method')
+    telemetry.record_throttle('match-v5.getTimeline', 1.5)
+
+    stats = telemetry.snapshot()['match-v5.getTimeline']
+    assert stats['requests'] == 2
+    assert stats['latency_buckets']['0.05'] == 1 and stats['latency_buckets']['0.25'] == 1
+    assert stats['bytes_received'] == 300000
+    assert stats['status_codes'] == {'200': 1, '429': 1}
+    assert stats['rate_limited'] == {'method': 1}
+    assert stats['throttle_seconds'] == 1.5
+
+    text = telemetry.prometheus_text()
+    assert 'riot_api_request_duration_seconds_bucket{method="match-v5.getTimeline",le="+Inf"} 2' in text
+    assert 'riot_api_rate_limited_total{method="match-v5.getTimeline",type="method"} 1' in text
+
+
+def test_client_requests_are_exposed_over_http():
+    with LocalRiotServer(fixtures=SyntheticFixtures(players=200, rounds=2)) as server:
+        client = RiotAPIClient('RGAPI-local', base_url_override=server.url)
+        client.get_match_by_id('JP1_1')
+        client.get_match_by_id('KR_1')
+
+    metrics_server = client.telemetry.start_http_server(0)
+    try:
+        body = requests.get(f"http://127.0.0.1:{metrics_server.server_address[1]}/metrics").text
+    finally:
+        client.telemetry.stop_http_server()
+
+    assert 'riot_api_requests_total{method="match-v5.getMatch",status="200"} 1' in body
+    assert 'riot_api_requests_total{method="match-v5.getMatch",status="404"} 1' in body
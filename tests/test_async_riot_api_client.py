@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import requests
+
+from async_riot_api_client import AsyncRiotAPIClient
+from local_riot_server import LocalRiotServer, SyntheticFixtures
+from retry_policy import RetryPolicy
+from riot_api_client import RiotAPIClient
+
+
+def make_server(**kwargs):
+    return LocalRiotServer(fixtures=SyntheticFixtures(players=200, rounds=2), **kwargs)
+
+
+def make_client(server, **kwargs):
+    policy = RetryPolicy(base_delay=0.05, rate_limit_jitter=0, failure_threshold=100)
+    return AsyncRiotAPIClient('RGAPI-local', base_url_override=server.url, retry_policy=policy, **kwargs)
+
+
+def test_requests_run_concurrently_up_to_the_host_limit():
+    async def crawl(client):
+        async with client:
+            started = time.monotonic()
+            summoners = await asyncio.gather(*[
+                client.get_summoner_by_puuid(SyntheticFixtures.puuid(i)) for i in range(8)
+            ])
+            return summoners, time.monotonic() - started
+
+    with make_server(app_limits=[(100, 1)], method_limits={}, latency=0.2) as server:
+        summoners, elapsed = asyncio.run(crawl(make_client(server, max_concurrency=4)))
+
+    assert all(summoner is not None for summoner in summoners)
+    # 直列なら 1.6 秒、同時送信4本なら2巡の 0.4 秒
+    assert 0.35 <= elapsed < 1.2
+    assert server.stats['requests'] == 8
+
+
+def test_rate_limited_request_waits_for_retry_after():
+    async def fetch(client):
+        async with client:
+            return await client.get_summoner_by_puuid(SyntheticFixtures.puuid(0))
+
+    with make_server(app_limits=[(3, 1)], method_limits={}) as server:
+        # 別のクライアントが同じキーの枠を使い切った状態
+        url = f"{server.url}/lol/summoner/v4/summoners/by-puuid/{SyntheticFixtures.puuid(1)}"
+        assert [requests.get(url).status_code for _ in range(3)] == [200, 200, 200]
+
+        client = make_client(server)
+        started = time.monotonic()
+        summoner = asyncio.run(fetch(client))
+
+    assert summoner is not None
+    assert server.stats['rate_limited'] == 1
+    assert time.monotonic() - started >= 0.9
+
+
+def test_server_errors_are_retried_until_recovery():
+    async def fetch(client, server):
+        async with client:
+            asyncio.get_running_loop().call_later(0.2, setattr, server, 'error_rate', 0.0)
+            return await client.get_summoner_by_puuid(SyntheticFixtures.puuid(0))
+
+    with make_server(app_limits=[(100, 1)], method_limits={}, error_rate=1.0) as server:
+        summoner = asyncio.run(fetch(make_client(server), server))
+
+    assert summoner is not None
+    assert server.stats['errors'] >= 1
+
+
+def test_shares_limits_and_resolver_with_sync_client():
+    sync_client = RiotAPIClient('RGAPI-local', base_url_override='http://127.0.0.1:1')
+    client = AsyncRiotAPIClient(sync_client=sync_client)
+
+    assert client.rate_limiters is sync_client.rate_limiters
+    assert client.telemetry is sync_client.telemetry
+    sync_client.rank_resolver = resolver = object()
+    assert client.rank_resolver is resolver
+    assert client.get_api_key_preview() == sync_client.get_api_key_preview()
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from collection_pipeline import CollectionPipeline
+
+
+def test_items_flow_through_all_stages_and_failures_are_counted():
+    saved = []
+    lock = threading.Lock()
+
+    def discover(player, emit):
+        for i in range(3):
+            emit(f"{player}_{i}")
+
+    def fetch(match_id, emit):
+        if match_id.endswith('_2'):
+            raise ValueError('timeline missing')
+        emit({'match_id': match_id})
+
+    def persist(bundle, emit):
+        with lock:
+            saved.append(bundle['match_id'])
+        emit(bundle['match_id'])
+
+    stats = (CollectionPipeline()
+             .add_stage('discovery', discover, workers=2)
+             .add_stage('fetch', fetch, workers=4)
+             .add_stage('persistence', persist, workers=2)
+             .run(['a', 'b']))
+
+    assert sorted(saved) == ['a_0', 'a_1', 'b_0', 'b_1']
+    assert stats['discovery']['emitted'] == 6
+    assert stats['fetch']['processed'] == 4 and stats['fetch']['failed'] == 2
+    assert stats['persistence']['emitted'] == 4
+    assert all(stage['queued'] == 0 for stage in stats.values())
+
+
+def test_full_downstream_queue_applies_backpressure():
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def produce(item, emit):
+        with lock:
+            in_flight.append(item)
+            max_in_flight.append(len(in_flight))
+        emit(item)
+
+    def slow_consume(item, emit):
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(item)
+
+    stats = (CollectionPipeline()
+             .add_stage('produce', produce, workers=1, queue_size=1)
+             .add_stage('consume', slow_consume, workers=1, queue_size=2)
+             .run(range(20)))
+
+    assert stats['consume']['processed'] == 20
+    # キュー2件 + 処理中1件 + 送信待ち1件を超えて先行しない
+    assert max(max_in_flight) <= 4
+    assert stats['produce']['blocked_seconds'] > 0
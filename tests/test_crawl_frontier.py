@@ -0,0 +1,40 @@
+from crawl_frontier import CrawlFrontier
+
+
+def test_pop_order_prefers_matches_then_higher_tiers_and_skips_duplicates(tmp_path):
+    frontier = CrawlFrontier(str(tmp_path))
+    frontier.add_player('gold-player', tier_value=4)
+    frontier.add_player('challenger-player', tier_value=10)
+    frontier.add_match('JP1_1')
+    assert not frontier.add_player('gold-player', tier_value=4)
+
+    assert [frontier.pop().key for _ in range(3)] == ['JP1_1', 'challenger-player', 'gold-player']
+    assert frontier.pop() is None
+
+    # 試合一覧を取得したばかりのプレイヤーは再登録しない
+    assert not frontier.add_player('challenger-player', tier_value=10)
+    assert frontier.snapshot()['recently_crawled'] == 1
+
+
+def test_overflow_spills_to_disk_and_is_read_back(tmp_path):
+    frontier = CrawlFrontier(str(tmp_path), max_memory_entries=10, recrawl_seconds=0)
+    for i in range(50):
+        frontier.add_player(f"p{i:02d}", tier_value=i % 5)
+
+    snapshot = frontier.snapshot()
+    assert snapshot['in_memory'] <= 10
+    assert snapshot['spilled_pending'] > 0
+    assert len(frontier) == 50
+    assert list(tmp_path.glob('frontier-*.jsonl'))
+
+    popped = []
+    while True:
+        entry = frontier.pop()
+        if entry is None:
+            break
+        popped.append(entry.key)
+
+    assert sorted(popped) == [f"p{i:02d}" for i in range(50)]
+    # メモリに残した分は最上位ティアから出る
+    assert popped[0] in {f"p{i:02d}" for i in range(4, 50, 5)}
+    assert not list(tmp_path.glob('frontier-*.jsonl'))
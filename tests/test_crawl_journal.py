@@ -0,0 +1,40 @@
+from crawl_journal import CrawlJournal
+
+
+def test_progress_survives_reopen(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    journal = CrawlJournal(str(path), batch_size=1000, flush_interval=3600)
+    journal.record_player_pending('p1', 'Alice', 10)
+    journal.record_player_pending('p2', 'Bob', 9)
+    journal.record_matches_pending(['JP1_1', 'JP1_2'], 'p1')
+    journal.record_player_done('p1', crawled_at=1000.0)
+    journal.record_match_done('JP1_1')
+    journal.record_seeded_tier('CHALLENGER')
+    journal.save_counters({'matches_processed': 1})
+    journal.close()
+
+    reopened = CrawlJournal(str(path))
+    assert reopened.pending_players() == [('p2', 'Bob', 9, 0.0)]
+    assert reopened.crawled_players() == {'p1': 1000.0}
+    assert reopened.pending_matches() == ['JP1_2']
+    assert reopened.seeded_tiers() == {'CHALLENGER'}
+    assert reopened.load_counters() == {'matches_processed': 1}
+
+    # 保存済みの試合は pending に戻らない
+    reopened.record_matches_pending(['JP1_1'])
+    assert reopened.pending_matches() == ['JP1_2']
+    reopened.close()
+
+
+def test_writes_are_batched_until_flush(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    journal = CrawlJournal(str(path), batch_size=3, flush_interval=3600)
+    journal.record_matches_pending(['JP1_1', 'JP1_2'])
+
+    other = CrawlJournal(str(path))
+    assert other.pending_matches() == []
+
+    journal.record_match_done('JP1_1')
+    assert other.pending_matches() == ['JP1_2']
+    journal.close()
+    other.close()
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+from database_manager_realtime import RealtimeDatabaseManager  # noqa: E402
+from match_row_writer import MATCHUP_COLUMNS, MatchRowWriter  # noqa: E402
+from match_rows import MatchWriteBatch  # noqa: E402
+
+
+class FakeCursor:
+    """matchups の行を覚え、unique_match_lane の重複を IntegrityError の代わりに RuntimeError で返す"""
+
+    def __init__(self, matchups):
+        self.matchups = matchups
+        self.stats_rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self._fetched = None
+
+    def execute(self, query, params=None):
+        query = query.strip()
+        if query.startswith('SELECT @@SESSION.auto_increment_increment'):
+            self._fetched = (1,)
+        elif query.startswith('SELECT DISTINCT match_id FROM matchups'):
+            self._fetched = [(match_id,) for match_id in dict.fromkeys(params) if match_id in
+                             {row[0] for row in self.matchups}]
+        elif query.startswith('INSERT INTO matchups'):
+            rows = [tuple(params[i:i + 2]) for i in range(0, len(params), len(MATCHUP_COLUMNS))]
+            if any(row in self.matchups for row in rows):
+                raise RuntimeError('Duplicate entry for key unique_match_lane')
+            self.lastrowid = len(self.matchups) + 1
+            self.matchups.extend(rows)
+            self.rowcount = len(rows)
+
+    def executemany(self, query, seq):
+        if 'realtime_winrate_stats' in query:
+            self.stats_rows.extend(seq)
+
+    def fetchone(self):
+        return self._fetched
+
+    def fetchall(self):
+        return self._fetched
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+def make_manager(cursor):
+    manager = RealtimeDatabaseManager.__new__(RealtimeDatabaseManager)
+    manager.row_writer = MatchRowWriter()
+
+    @contextmanager
+    def get_connection():
+        yield FakeConnection(cursor)
+
+    manager.get_connection = get_connection
+    return manager
+
+
+def make_batch(*match_numbers):
+    batch = MatchWriteBatch()
+    for i in match_numbers:
+        match_data = {'metadata': {'matchId': f"JP1_{i}"}, 'info': {'gameVersion': '14.1', 'participants': []}}
+        matchup = {'match_id': f"JP1_{i}", 'lane': 'MIDDLE', 'player1_champion_id': 1, 'player2_champion_id': 2,
+                   'game_version': '14.1', 'player1_win': True, 'player2_win': False}
+        batch.add(match_data, [{'matchup': matchup, 'solo_kills': []}], tier=20, has_timeline=True)
+    return batch
+
+
+def test_replayed_match_is_written_once_without_stats():
+    cursor = FakeCursor(matchups=[])
+    manager = make_manager(cursor)
+    assert manager.write_match_batch(make_batch(1))['JP1_1']['matchups'] == 1
+
+    # コミット後に落ちて退避ファイルから読み直した試合と、同じバッチ内の重複
+    results = manager.write_match_batch(make_batch(1, 2, 2))
+
+    assert results['JP1_1'] == {'matchups': 0, 'solo_kills': 0, 'kill_items': 0}
+    assert results['JP1_2']['matchups'] == 1
+    assert [row[0] for row in cursor.matchups] == ['JP1_1', 'JP1_2']
+    # 統計の差分は最初の書き込みと新しい試合の分だけ
+    assert [row[4] for row in cursor.stats_rows] == [1, 1]
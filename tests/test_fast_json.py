@@ -0,0 +1,13 @@
+import fast_json
+
+
+def test_roundtrip_with_and_without_orjson(monkeypatch):
+    payload = {'info': {'frames': [{'events': [{'type': 'CHAMPION_KILL', 'killerId': 1}]}]}, 'name': 'ソロキル'}
+    encoded = fast_json.dumps(payload)
+    assert isinstance(encoded, bytes)
+    assert fast_json.loads(encoded) == payload
+
+    # orjson が無い環境では標準の json で同じ結果になる
+    monkeypatch.setattr(fast_json, 'orjson', None)
+    assert fast_json.dumps(payload) == encoded
+    assert fast_json.loads(encoded) == payload
@@ -0,0 +1,55 @@
+import requests
+
+from local_riot_server import LocalRiotServer, SyntheticFixtures
+from riot_api_client import RiotAPIClient
+from timeline_analyzer import TimelineAnalyzer
+
+
+def make_server(**kwargs):
+    return LocalRiotServer(fixtures=SyntheticFixtures(players=200, rounds=2), **kwargs)
+
+
+def test_synthetic_histories_and_participants_agree():
+    fixtures = SyntheticFixtures(players=200, rounds=2)
+    for match_id in fixtures.match_ids(17, count=20):
+        k = fixtures.match_number(match_id)
+        assert 17 in fixtures.participants(k)
+    assert len(fixtures.match_ids(17, count=100)) == 20
+
+
+def test_client_crawls_through_base_url_override():
+    with make_server() as server:
+        client = RiotAPIClient('RGAPI-local', base_url_override=server.url)
+        league = client.get_challenger_league()
+        puuid = league['entries'][0]['puuid']
+        match_ids = client.get_match_ids_by_puuid(puuid, count=5)
+        match = client.get_match_by_id(match_ids[0])
+        timeline = client.get_match_timeline(match_ids[0])
+
+    assert puuid in client.rank_index
+    assert puuid in match['metadata']['participants']
+    assert TimelineAnalyzer().analyze_timeline(timeline, match) is not None
+
+
+def test_server_enforces_rate_limits_with_riot_headers():
+    with make_server(app_limits=[(3, 1)], method_limits={}) as server:
+        url = f"{server.url}/lol/league/v4/entries/by-puuid/{SyntheticFixtures.puuid(0)}"
+        statuses = [requests.get(url).status_code for _ in range(4)]
+        response = requests.get(url)
+
+        assert statuses[:3] == [200, 200, 200]
+        assert response.status_code == 429
+        assert response.headers['X-Rate-Limit-Type'] == 'application'
+        assert response.headers['X-App-Rate-Limit'] == '3:1'
+        assert int(response.headers['Retry-After']) >= 1
+
+
+def test_client_learns_server_limits_and_avoids_429():
+    with make_server(app_limits=[(3, 1)], method_limits={}) as server:
+        client = RiotAPIClient('RGAPI-local', base_url_override=server.url)
+        for i in range(5):
+            assert client.get_summoner_by_puuid(SyntheticFixtures.puuid(i)) is not None
+
+    limiter = client.rate_limiters.for_url(server.url)
+    assert [(b.limit, b.window) for b in limiter.app_buckets.values()] == [(3, 1)]
+    assert server.stats['rate_limited'] == 0
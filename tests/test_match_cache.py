@@ -0,0 +1,47 @@
+from match_cache import MatchPayloadCache
+
+
+def make_timeline(match_id, size=200):
+    return {"metadata": {"matchId": match_id}, "info": {"frames": [{"timestamp": i * 60000} for i in range(size)]}}
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = MatchPayloadCache(str(tmp_path))
+    payload = make_timeline("JP1_1")
+
+    assert cache.get("timeline", "JP1_1") is None
+    assert cache.put("timeline", "JP1_1", payload)
+    assert cache.get("timeline", "JP1_1") == payload
+    # 種類が違えば別エントリ
+    assert cache.get("match", "JP1_1") is None
+
+    # 再起動後も読み出せる
+    reopened = MatchPayloadCache(str(tmp_path))
+    assert reopened.total_bytes == cache.total_bytes
+    assert reopened.get("timeline", "JP1_1") == payload
+
+
+def test_size_bound_evicts_oldest_entries(tmp_path):
+    cache = MatchPayloadCache(str(tmp_path), max_bytes=1)
+    cache.put("match", "JP1_1", make_timeline("JP1_1"))
+    cache.put("match", "JP1_2", make_timeline("JP1_2"))
+
+    assert cache.total_bytes <= 1
+    assert cache.get("match", "JP1_1") is None
+
+
+def test_size_is_shared_by_caches_on_the_same_directory(tmp_path):
+    # シャードごとのプロセスが同じディレクトリを使う場合
+    shard_a = MatchPayloadCache(str(tmp_path))
+    shard_b = MatchPayloadCache(str(tmp_path))
+    shard_a.put("match", "JP1_1", make_timeline("JP1_1"))
+    one_entry = shard_a.total_bytes
+    shard_b.put("match", "JP1_2", make_timeline("JP1_2"))
+    assert shard_b.total_bytes == 2 * one_entry
+
+    # 他のプロセスの書き込みも上限の判定に含まれる
+    shard_a.max_bytes = 2 * one_entry + one_entry // 2
+    shard_a.put("match", "JP1_3", make_timeline("JP1_3"))
+    assert shard_a.total_bytes <= shard_a.max_bytes
+    assert shard_b.get("match", "JP1_1") is None
+    assert MatchPayloadCache(str(tmp_path)).total_bytes == shard_a.total_bytes
@@ -0,0 +1,43 @@
+from match_dedup import BloomFilter, MatchDedupIndex
+
+
+class FakeMatchDB:
+    def __init__(self, match_ids):
+        self.match_ids = set(match_ids)
+        self.queries = []
+
+    def iter_match_ids(self, batch_size=50000):
+        yield from sorted(self.match_ids)
+
+    def get_existing_match_ids(self, match_ids):
+        self.queries.append(list(match_ids))
+        return {match_id for match_id in match_ids if match_id in self.match_ids}
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10000, false_positive_rate=0.01)
+    for i in range(10000):
+        bloom.add(f"JP1_{i}")
+
+    assert all(f"JP1_{i}" in bloom for i in range(10000))
+    false_positives = sum(f"KR_{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_page_is_filtered_with_one_confirm_query():
+    db = FakeMatchDB(f"JP1_{i}" for i in range(0, 1000, 2))
+    index = MatchDedupIndex(db, capacity=10000)
+    assert index.load() == 500
+
+    page = [f"JP1_{i}" for i in range(100)]
+    new_ids = index.filter_new(page)
+
+    assert new_ids == [f"JP1_{i}" for i in range(1, 100, 2)]
+    # 陽性になったIDだけを1回の IN クエリで確認する
+    assert len(db.queries) == 1
+    assert set(page[::2]) <= set(db.queries[0])
+    assert len(db.queries[0]) < 60
+
+    index.add('JP1_1')
+    db.match_ids.add('JP1_1')
+    assert 'JP1_1' not in index.filter_new(['JP1_1', 'JP1_3'])
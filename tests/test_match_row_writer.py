@@ -0,0 +1,114 @@
+import pytest
+
+import match_row_writer
+from local_riot_server import SyntheticFixtures
+from match_data_analyzer import MatchDataAnalyzer
+from match_row_writer import KILL_ITEM_COLUMNS, SOLO_KILL_COLUMNS, MatchRowWriter
+from match_rows import build_match_rows
+from timeline_analyzer import TimelineAnalyzer
+
+
+class FakeCursor:
+    """
+    複数行 INSERT に InnoDB と同じ連続した AUTO_INCREMENT 値を割り当てるカーソル
+
+    short_rows を指定すると、その表の INSERT の rowcount を1件少なく返す
+    """
+
+    def __init__(self, step=1, first_id=1, short_rows=None):
+        self.step = step
+        self.next_ids = {}
+        self.first_id = first_id
+        self.short_rows = short_rows
+        self.rows = {}
+        self.queries = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self._fetched = None
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if query.startswith('SELECT @@SESSION.auto_increment_increment'):
+            self._fetched = (self.step,)
+            return
+        if query.startswith('SELECT DISTINCT match_id FROM matchups'):
+            stored = {row['match_id'] for row in self.rows.get('matchups', [])}
+            self._fetched = [(match_id,) for match_id in dict.fromkeys(params) if match_id in stored]
+            return
+        table = query.split()[2]
+        columns = query[query.index('(') + 1:query.index(')')].split(', ')
+        values = [params[i:i + len(columns)] for i in range(0, len(params), len(columns))]
+        self.lastrowid = self.next_ids.get(table, self.first_id)
+        for i, row in enumerate(values):
+            self.rows.setdefault(table, []).append(dict(zip(columns, row), id=self.lastrowid + i * self.step))
+        self.next_ids[table] = self.lastrowid + len(values) * self.step
+        self.rowcount = len(values) - (1 if table == self.short_rows else 0)
+
+    def executemany(self, query, seq):
+        table = query.split()[2]
+        self.rows.setdefault(table, []).extend(dict(zip(KILL_ITEM_COLUMNS, row)) for row in seq)
+
+    def fetchone(self):
+        return self._fetched
+
+    def fetchall(self):
+        return self._fetched
+
+
+def test_ids_follow_lastrowid_by_auto_increment_increment(monkeypatch):
+    monkeypatch.setattr(match_row_writer, 'BULK_INSERT_ROWS', 2)
+    cursor = FakeCursor(step=2, first_id=11)
+    writer = MatchRowWriter()
+    rows = [{'match_id': 'JP1_1', 'timestamp_ms': t} for t in (1000, 2000, 3000)]
+
+    ids = writer.insert_rows_returning_ids(cursor, 'solo_kills', SOLO_KILL_COLUMNS, rows)
+
+    # 2行ずつの2文に分かれ、文ごとに lastrowid から刻み幅で並ぶ
+    assert ids == [11, 13, 15]
+    assert [row['id'] for row in cursor.rows['solo_kills']] == ids
+    assert [row['timestamp_ms'] for row in cursor.rows['solo_kills']] == [1000, 2000, 3000]
+    # 刻み幅は最初の1回だけ問い合わせる
+    writer.insert_rows_returning_ids(cursor, 'solo_kills', SOLO_KILL_COLUMNS, rows[:1])
+    assert sum(query.startswith('SELECT') for query in cursor.queries) == 1
+    assert writer.insert_rows_returning_ids(cursor, 'solo_kills', SOLO_KILL_COLUMNS, []) == []
+
+
+def test_rowcount_mismatch_is_an_error():
+    cursor = FakeCursor(short_rows='matchups')
+    with pytest.raises(RuntimeError):
+        MatchRowWriter().insert_matchups(cursor, [{'match_id': 'JP1_1'}, {'match_id': 'JP1_1'}])
+
+
+def test_write_matchup_rows_links_kill_items_to_solo_kills_to_matchups():
+    fixtures = SyntheticFixtures(players=200, rounds=2)
+    timeline_analyzer = TimelineAnalyzer()
+    match_data = fixtures.match(0)
+    timeline_result = timeline_analyzer.analyze_timeline(fixtures.timeline(0), match_data)
+    matchup_rows = build_match_rows(match_data, timeline_result, MatchDataAnalyzer().extract_matchups(match_data),
+                                    timeline_analyzer)
+    cursor = FakeCursor(step=3, first_id=100)
+
+    counts = MatchRowWriter().write_matchup_rows(cursor, matchup_rows)
+
+    matchups, solo_kills, kill_items = cursor.rows['matchups'], cursor.rows['solo_kills'], cursor.rows['kill_items']
+    assert counts == {'matchups': len(matchups), 'solo_kills': len(solo_kills), 'kill_items': len(kill_items)}
+    assert [row['id'] for row in matchups] == [100 + 3 * i for i in range(len(matchup_rows))]
+    assert solo_kills, "合成データにはソロキルが含まれる"
+
+    # ソロキルは入力の対面データの ID を、キル時アイテムは入力のソロキルの ID を参照する
+    expected_matchup_ids = [matchups[i]['id'] for i, rows in enumerate(matchup_rows) for _ in rows['solo_kills']]
+    assert [row['matchup_id'] for row in solo_kills] == expected_matchup_ids
+    assert [row['timestamp_ms'] for row in solo_kills] == [
+        solo_kill['row']['timestamp_ms'] for rows in matchup_rows for solo_kill in rows['solo_kills']
+    ]
+    assert [row['solo_kill_id'] for row in kill_items] == [row['id'] for row in solo_kills for _ in range(2)]
+    assert [row['participant_type'] for row in kill_items[:2]] == ['killer', 'victim']
+
+
+def test_stored_match_ids_finds_already_written_matches():
+    cursor = FakeCursor()
+    writer = MatchRowWriter()
+    writer.insert_matchups(cursor, [{'match_id': 'JP1_1', 'lane': 'TOP'}, {'match_id': 'JP1_1', 'lane': 'MIDDLE'}])
+
+    assert writer.stored_match_ids(cursor, ['JP1_1', 'JP1_2']) == {'JP1_1'}
+    assert writer.stored_match_ids(cursor, []) == set()
@@ -0,0 +1,66 @@
+from local_riot_server import SyntheticFixtures
+from match_data_analyzer import MatchDataAnalyzer
+from match_rows import MatchWriteBatch, build_match_rows
+from timeline_analyzer import TimelineAnalyzer
+
+
+def analyzed_rows(fixtures, k):
+    timeline_analyzer = TimelineAnalyzer()
+    match_data = fixtures.match(k)
+    timeline_result = timeline_analyzer.analyze_timeline(fixtures.timeline(k), match_data)
+    matchups = MatchDataAnalyzer().extract_matchups(match_data)
+    return match_data, build_match_rows(match_data, timeline_result, matchups, timeline_analyzer)
+
+
+def test_build_match_rows_links_solo_kills_to_lanes():
+    match_data, rows = analyzed_rows(SyntheticFixtures(players=200, rounds=2), 3)
+
+    assert len(rows) == 5
+    match_id = match_data['metadata']['matchId']
+    for matchup_rows in rows:
+        assert matchup_rows['matchup']['match_id'] == match_id
+        for solo_kill in matchup_rows['solo_kills']:
+            # matchup_id は挿入時に決まる
+            assert solo_kill['row']['matchup_id'] is None
+            assert solo_kill['row']['match_id'] == match_id
+            assert [item['participant_type'] for item in solo_kill['kill_items']] == ['killer', 'victim']
+            assert all(len(item['items']) == 7 for item in solo_kill['kill_items'])
+
+    # タイムラインなしなら対面データだけ
+    no_timeline = build_match_rows(match_data, {}, MatchDataAnalyzer().extract_matchups(match_data), TimelineAnalyzer())
+    assert len(no_timeline) == 5
+    assert all(matchup_rows['solo_kills'] == [] for matchup_rows in no_timeline)
+
+
+def test_write_batch_collects_versions_and_stats_deltas():
+    fixtures = SyntheticFixtures(players=200, rounds=2)
+    batch = MatchWriteBatch()
+    for k in range(3):
+        match_data, rows = analyzed_rows(fixtures, k)
+        batch.add(match_data, rows, tier=20, has_timeline=True)
+    batch.add(fixtures.match(3), [], tier=20)
+
+    assert len(batch) == 4
+    assert [m.match_id for m in batch.matches] == [fixtures.match(k)['metadata']['matchId'] for k in range(4)]
+    assert len(batch.matches[0].participants) == 10
+    assert batch.matches[3].has_timeline is False
+    assert batch.game_versions() == list(dict.fromkeys(fixtures.match(k)['info']['gameVersion'] for k in range(4)))
+
+    deltas = MatchWriteBatch.stats_deltas(batch.matches)
+    keys = [delta['key'] for delta in deltas]
+    assert keys == sorted(set(keys))
+    assert sum(delta['total_matchups'] for delta in deltas) == 15
+    solo_kills = sum(len(rows['solo_kills']) for m in batch.matches for rows in m.matchup_rows)
+    assert sum(delta['total_solo_kills'] for delta in deltas) == solo_kills
+    for delta in deltas:
+        assert delta['champion1_wins'] + delta['champion2_wins'] == delta['total_matchups']
+        assert delta['first_kill_count'] <= delta['total_matchups']
+        assert delta['first_kill_count'] == 0 or delta['first_kill_time_sum'] > 0
+
+    # 同じ対面の組み合わせは1行に加算される
+    same = MatchWriteBatch()
+    match_data, rows = analyzed_rows(fixtures, 0)
+    same.add(match_data, rows)
+    same.add(match_data, rows)
+    doubled = MatchWriteBatch.stats_deltas(same.matches)
+    assert [d['total_matchups'] for d in doubled] == [2 * d['total_matchups'] for d in MatchWriteBatch.stats_deltas(same.matches[:1])]
@@ -0,0 +1,72 @@
+import sqlite3
+
+from payload_archive import PayloadArchive
+
+
+def make_match(match_id, n=30):
+    return {'metadata': {'matchId': match_id},
+            'info': {'gameDuration': 1800, 'participants': [{'participantId': i, 'championName': 'Ahri'} for i in range(n)]}}
+
+
+def make_timeline(match_id):
+    frames = [{'timestamp': i * 60000, 'events': [{'type': 'CHAMPION_KILL', 'killerId': i % 10}]} for i in range(30)]
+    return {'metadata': {'matchId': match_id}, 'info': {'frames': frames}}
+
+
+def test_append_roll_segments_and_read_back(tmp_path):
+    archive = PayloadArchive(str(tmp_path), writer_id='jp1-master', segment_max_bytes=2000)
+    for i in range(20):
+        assert archive.append(f"JP1_{i}", make_match(f"JP1_{i}"), make_timeline(f"JP1_{i}")) == 2
+    # 保存済みの種類は書かない
+    assert archive.append('JP1_0', make_match('JP1_0'), make_timeline('JP1_0')) == 0
+
+    assert archive.get('timeline', 'JP1_7') == make_timeline('JP1_7')
+    assert archive.get('match', 'JP1_404') is None
+    assert archive.match_ids() == [f"JP1_{i}" for i in range(20)]
+    snapshot = archive.snapshot()
+    assert snapshot['matches'] == 20 and snapshot['timelines'] == 20
+    assert snapshot['segments'] > 1
+    assert snapshot['compression_ratio'] > 3
+    archive.close()
+
+    # 再度開くと新しい書き込みは自分の最後のセグメントに続く
+    reopened = PayloadArchive(str(tmp_path), writer_id='jp1-master', segment_max_bytes=2000)
+    replayed = list(reopened.iter_matches())
+    assert [match_id for match_id, _, _ in replayed] == [f"JP1_{i}" for i in range(20)]
+    assert replayed[3][1] == make_match('JP1_3')
+    reopened.close()
+
+
+def test_unindexed_tail_is_recovered_and_partial_record_truncated(tmp_path):
+    archive = PayloadArchive(str(tmp_path), writer_id='w1')
+    archive.append('JP1_1', make_match('JP1_1'))
+    archive.append('JP1_2', make_match('JP1_2'), make_timeline('JP1_2'))
+    segment = tmp_path / archive._segment
+    archive.close()
+
+    # 索引への反映前に中断した状態と、書きかけのレコードを再現する
+    conn = sqlite3.connect(str(tmp_path / 'index.sqlite3'))
+    conn.execute("DELETE FROM payloads WHERE match_id = 'JP1_2'")
+    conn.execute("UPDATE segments SET indexed_bytes = (SELECT offset + length FROM payloads WHERE match_id = 'JP1_1')")
+    conn.commit()
+    conn.close()
+    complete_size = segment.stat().st_size
+    with open(segment, 'ab') as f:
+        f.write(b'LPA1\x01\x01partial')
+
+    recovered = PayloadArchive(str(tmp_path), writer_id='w1')
+    assert recovered.stats['recovered'] == 2
+    assert segment.stat().st_size == complete_size
+    assert recovered.get('timeline', 'JP1_2') == make_timeline('JP1_2')
+    recovered.append('JP1_3', make_match('JP1_3'))
+    assert recovered.get('match', 'JP1_3') == make_match('JP1_3')
+    recovered.close()
+
+    # 索引を失っても全セグメントから作り直せる
+    (tmp_path / 'index.sqlite3').unlink()
+    for wal in tmp_path.glob('index.sqlite3-*'):
+        wal.unlink()
+    rebuilt = PayloadArchive(str(tmp_path), writer_id='w2')
+    assert rebuilt.rebuild_index() == 4
+    assert rebuilt.get('match', 'JP1_3') == make_match('JP1_3')
+    rebuilt.close()
@@ -0,0 +1,89 @@
+from player_watermarks import ListingProgress, PlayerWatermarkStore, match_game_end
+
+
+class FakeWatermarkDB:
+    def __init__(self, rows=None):
+        self.rows = {row['puuid']: dict(row) for row in rows or []}
+        self.queries = []
+
+    def get_player_watermarks(self, puuids):
+        self.queries.append(list(puuids))
+        return [dict(self.rows[p]) for p in puuids if p in self.rows]
+
+    def advance_player_watermark(self, puuid, game_end):
+        row = self.rows.setdefault(puuid, {'puuid': puuid})
+        row['last_collected_game_end'] = max(row.get('last_collected_game_end') or 0, game_end)
+
+    def update_player_backfill(self, puuid, anchor, depth, done):
+        row = self.rows.setdefault(puuid, {'puuid': puuid})
+        row.update(backfill_anchor=anchor, backfill_depth=depth, backfill_done=done)
+
+
+def test_watermark_only_moves_forward_and_sets_refresh_start_time():
+    db = FakeWatermarkDB([{'puuid': 'p1', 'last_collected_game_end': 1_700_000_000_000}])
+    store = PlayerWatermarkStore(db)
+
+    assert store.get('p1').refresh_start_time == 1_700_000_000
+    store.advance('p1', 1_700_000_500_000)
+    store.advance('p1', 1_600_000_000_000)
+
+    assert store.get('p1').last_collected_game_end == 1_700_000_500_000
+    assert db.rows['p1']['last_collected_game_end'] == 1_700_000_500_000
+    # 未登録のプレイヤーは最新の試合から取得する
+    assert store.get('p2').refresh_start_time is None
+
+
+def test_backfill_pages_keep_anchor_until_history_ends():
+    db = FakeWatermarkDB()
+    store = PlayerWatermarkStore(db)
+
+    first = store.next_backfill_page('p1', max_depth=250)
+    assert first['start'] == 0 and first['count'] == 100
+    store.record_backfill_page('p1', first, 100, 250)
+
+    second = store.next_backfill_page('p1', max_depth=250)
+    assert second == {'start': 100, 'count': 100, 'end_time': first['end_time']}
+    # 要求より少なければ履歴の最後
+    store.record_backfill_page('p1', second, 40, 250)
+
+    assert store.next_backfill_page('p1', max_depth=250) is None
+    assert db.rows['p1']['backfill_depth'] == 140
+    assert db.rows['p1']['backfill_done'] is True
+
+    # 再起動後も DB から続きを読む
+    restarted = PlayerWatermarkStore(db)
+    assert restarted.preload(['p1', 'p2']) == 1
+    assert restarted.next_backfill_page('p1', max_depth=250) is None
+    assert restarted.next_backfill_page('p2', max_depth=250)['start'] == 0
+    assert len(db.queries) == 2
+
+
+def test_match_game_end_falls_back_to_start_plus_duration():
+    assert match_game_end({'info': {'gameEndTimestamp': 5000, 'gameStartTimestamp': 1000}}) == 5000
+    assert match_game_end({'info': {'gameStartTimestamp': 1000, 'gameDuration': 30}}) == 31000
+    assert match_game_end({'info': {}}) is None
+
+
+def test_listing_advances_only_after_every_listed_match_is_stored():
+    db = FakeWatermarkDB([{'puuid': 'p1', 'last_collected_game_end': 1_000}])
+    store = PlayerWatermarkStore(db)
+    listings = ListingProgress(store)
+
+    listings.begin('p1', ['JP1_3', 'JP1_2', 'JP1_1'])
+    # 新しい試合から保存されても、一覧の残りが終わるまで位置は動かない
+    listings.stored('JP1_3', 3_000)
+    listings.stored('JP1_2', 2_000)
+    assert store.get('p1').last_collected_game_end == 1_000
+    listings.stored('JP1_1', 1_500)
+    assert db.rows['p1']['last_collected_game_end'] == 3_000
+    assert listings.pending_count() == 0
+
+    # 古い試合の取得に失敗したら、その一覧では進めない（次の更新で同じ範囲を一覧し直す）
+    listings.begin('p1', ['JP1_5', 'JP1_4'])
+    listings.stored('JP1_5', 5_000)
+    listings.failed('JP1_4')
+    assert store.get('p1').last_collected_game_end == 3_000
+
+    # 一覧に無い試合（前回の実行から読み直した分など）は無視する
+    listings.stored('JP1_9', 9_000)
+    assert store.get('p1').last_collected_game_end == 3_000
@@ -0,0 +1,103 @@
+import threading
+from datetime import datetime, timedelta
+
+from rank_resolver import PlayerRankResolver, RankIndex
+from request_scheduler import RequestScheduler
+from riot_api_client import RiotAPIClient
+
+
+class FakeAPIClient:
+    def __init__(self):
+        self.calls = []
+
+    def get_summoner_by_puuid(self, puuid):
+        self.calls.append(puuid)
+        if puuid == 'unranked':
+            return [{'queueType': 'RANKED_FLEX_SR', 'tier': 'GOLD', 'rank': 'I'}]
+        return [{'queueType': 'RANKED_SOLO_5x5', 'tier': 'MASTER', 'rank': 'I', 'leaguePoints': 120}]
+
+
+class FakeDBManager:
+    def __init__(self):
+        self.rows = {}
+
+    def get_player_ranks(self, puuids, fetched_after=None):
+        return [r for p, r in self.rows.items() if p in puuids and r['fetched_at'] > fetched_after]
+
+    def upsert_player_ranks(self, ranks):
+        for r in ranks:
+            self.rows[r['puuid']] = r
+        return True
+
+
+def test_only_missing_puuids_are_fetched():
+    api = FakeAPIClient()
+    resolver = PlayerRankResolver(api)
+
+    assert resolver.resolve_tiers(['a', 'unranked']) == {'a': 'MASTER', 'unranked': None}
+    assert resolver.resolve_tiers(['a', 'b', 'unranked']) == {'a': 'MASTER', 'b': 'MASTER', 'unranked': None}
+    assert api.calls == ['a', 'unranked', 'b']
+
+
+def test_api_calls_go_through_the_rank_class_of_the_scheduler():
+    api = FakeAPIClient()
+    with RequestScheduler(api, max_workers=2) as scheduler:
+        resolver = PlayerRankResolver(api, scheduler=scheduler)
+        assert resolver.resolve_tiers(['a', 'b', 'a']) == {'a': 'MASTER', 'b': 'MASTER'}
+
+    assert sorted(api.calls) == ['a', 'b']
+    assert scheduler.stats['rank']['completed'] == 2
+    assert resolver.stats['api_calls'] == 2
+
+
+def test_persistent_store_respects_ttl():
+    db = FakeDBManager()
+    db.rows['fresh'] = {'puuid': 'fresh', 'tier': 'CHALLENGER', 'rank_division': 'I',
+                        'league_points': 900, 'fetched_at': datetime.now()}
+    db.rows['stale'] = {'puuid': 'stale', 'tier': 'DIAMOND', 'rank_division': 'IV',
+                        'league_points': 0, 'fetched_at': datetime.now() - timedelta(days=3)}
+    api = FakeAPIClient()
+    resolver = PlayerRankResolver(api, db, ttl_seconds=24 * 3600)
+
+    assert resolver.resolve_tiers(['fresh', 'stale']) == {'fresh': 'CHALLENGER', 'stale': 'MASTER'}
+    assert api.calls == ['stale']
+    assert db.rows['stale']['tier'] == 'MASTER'
+
+
+def test_average_tier_uses_resolver():
+    client = RiotAPIClient('RGAPI-test')
+    client.rank_resolver = PlayerRankResolver(FakeAPIClient())
+    match = {'metadata': {'participants': ['a', 'b', 'unranked']}}
+
+    assert client.get_match_average_tier_by_match_id(match) == 8
+
+
+def test_rank_index_resolves_discovered_players_without_requests():
+    api = FakeAPIClient()
+    api.rank_index = RankIndex()
+    api.rank_index.add_league({
+        'tier': 'GRANDMASTER', 'queue': 'RANKED_SOLO_5x5',
+        'entries': [{'puuid': 'gm', 'rank': 'I', 'leaguePoints': 400}],
+    })
+    api.rank_index.add_entries([
+        {'puuid': 'd1', 'tier': 'DIAMOND', 'rank': 'II', 'queueType': 'RANKED_SOLO_5x5'},
+        {'puuid': 'flex', 'tier': 'GOLD', 'rank': 'I', 'queueType': 'RANKED_FLEX_SR'},
+    ])
+    resolver = PlayerRankResolver(api)
+
+    assert resolver.resolve_tiers(['gm', 'd1', 'flex']) == {'gm': 'GRANDMASTER', 'd1': 'DIAMOND', 'flex': 'MASTER'}
+    assert api.calls == ['flex']
+    assert resolver.stats['index_hits'] == 2
+
+
+def test_stats_are_exact_under_concurrent_resolves():
+    resolver = PlayerRankResolver(FakeAPIClient())
+    resolver.resolve(['a'])
+    threads = [threading.Thread(target=lambda: [resolver.resolve(['a']) for _ in range(500)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert resolver.stats['memory_hits'] == 8 * 500
+    assert resolver.stats['api_calls'] == 1
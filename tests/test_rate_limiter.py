@@ -0,0 +1,80 @@
+import pytest
+
+from rate_limiter import (
+    WINDOW_MARGIN, HostRateLimiters, RateLimiter, SlidingWindowBucket, parse_rate_limit_header
+)
+from riot_api_client import resolve_endpoint_method
+
+
+def test_parse_rate_limit_header():
+    assert parse_rate_limit_header("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_rate_limit_header(None) == []
+
+
+def test_bucket_wait_time_is_computed_from_oldest_request():
+    bucket = SlidingWindowBucket(limit=2, window=10)
+    bucket.record(100.0)
+    bucket.record(103.0)
+    assert bucket.wait_time(104.0) == pytest.approx(6.0 + WINDOW_MARGIN)
+    # ウィンドウ外になった記録は削除される
+    assert bucket.wait_time(110.0 + WINDOW_MARGIN) == 0.0
+    assert len(bucket.timestamps) == 1
+
+
+def test_limits_are_learned_from_headers_per_method():
+    limiter = RateLimiter(app_limits=[(1000, 10)])
+    limiter.update_from_headers('match-v5.getTimeline', {
+        'X-App-Rate-Limit': '1000:10',
+        'X-Method-Rate-Limit': '2:10',
+        'X-Method-Rate-Limit-Count': '1:10',
+    })
+
+    # サーバー側で既に1回数えられているので、残りは1回
+    assert limiter.try_acquire('match-v5.getTimeline') == 0
+    assert limiter.try_acquire('match-v5.getTimeline') > 0
+    # 別メソッドはタイムラインのバケットの影響を受けない
+    assert limiter.try_acquire('match-v5.getMatch') == 0
+
+
+def test_method_429_blocks_only_that_method():
+    limiter = RateLimiter()
+    retry_after = limiter.register_rate_limited('league-v4.getLeagueEntriesByPUUID', {
+        'Retry-After': '5',
+        'X-Rate-Limit-Type': 'method',
+    })
+
+    assert retry_after == 5
+    assert limiter.try_acquire('league-v4.getLeagueEntriesByPUUID') > 4
+    assert limiter.try_acquire('match-v5.getMatch') == 0
+
+
+def test_resolve_endpoint_method():
+    base = 'https://asia.api.riotgames.com/lol/match/v5/matches'
+    assert resolve_endpoint_method(f'{base}/JP1_1/timeline') == 'match-v5.getTimeline'
+    assert resolve_endpoint_method(f'{base}/JP1_1') == 'match-v5.getMatch'
+    assert resolve_endpoint_method(f'{base}/by-puuid/abc/ids') == 'match-v5.getMatchIdsByPUUID'
+
+
+def test_platform_and_regional_hosts_have_independent_budgets():
+    limiters = HostRateLimiters(app_limits=[(1, 10)])
+    match_url = 'https://asia.api.riotgames.com/lol/match/v5/matches/JP1_1'
+    rank_url = 'https://jp1.api.riotgames.com/lol/league/v4/entries/by-puuid/abc'
+
+    assert limiters.for_url(match_url).try_acquire('match-v5.getMatch') == 0
+    assert limiters.for_url(match_url).try_acquire('match-v5.getMatch') > 0
+    # リージョナルホストの予算を使い切ってもプラットフォームホストは送信できる
+    assert limiters.for_url(rank_url).try_acquire('league-v4.getLeagueEntriesByPUUID') == 0
+
+
+def test_budget_share_scales_learned_limits():
+    limiter = RateLimiter(app_limits=[(1000, 10)], budget_share=0.5)
+    limiter.update_from_headers('match-v5.getMatch', {
+        'X-App-Rate-Limit': '1000:10',
+        'X-Method-Rate-Limit': '4:10',
+        'X-Method-Rate-Limit-Count': '3:10',
+    })
+
+    # 4回の半分が自分の取り分。サーバーのカウントは他プロセスの分も含むため合わせない
+    assert limiter.try_acquire('match-v5.getMatch') == 0
+    assert limiter.try_acquire('match-v5.getMatch') == 0
+    assert limiter.try_acquire('match-v5.getMatch') > 0
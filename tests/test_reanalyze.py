@@ -0,0 +1,140 @@
+import re
+from pathlib import Path
+
+from local_riot_server import SyntheticFixtures
+from match_row_writer import MATCHUP_COLUMNS, MATCHUP_SOLO_KILL_COLUMNS, SOLO_KILL_STATS_TRIGGER
+from payload_archive import PayloadArchive
+from reanalyze import Reanalyzer
+
+
+class FakeRebuildDB:
+    """作り直し用テーブルへの呼び出しを記録する"""
+
+    def __init__(self, existing_match_ids, fail_load=False, max_ids=None, unrebuilt_matches=0):
+        self.existing_match_ids = set(existing_match_ids)
+        self.fail_load = fail_load
+        self.max_ids = max_ids or {'matchups': 0, 'solo_kills': 0}
+        self.unrebuilt_matches = unrebuilt_matches
+        self.calls = []
+        self.matchups, self.solo_kills, self.kill_items = [], [], []
+        self.rebuilt_match_ids = []
+
+    def create_rebuild_tables(self, suffix):
+        self.calls.append(('create', suffix))
+        return True
+
+    def get_existing_match_ids(self, match_ids):
+        return {match_id for match_id in match_ids if match_id in self.existing_match_ids}
+
+    def get_derived_max_ids(self):
+        return dict(self.max_ids)
+
+    def load_rebuild_rows(self, matchups, solo_kills, kill_items, suffix, match_ids=()):
+        self.calls.append(('load', suffix))
+        if self.fail_load:
+            return False
+        self.rebuilt_match_ids += match_ids
+        self.matchups += matchups
+        self.solo_kills += solo_kills
+        self.kill_items += kill_items
+        return True
+
+    def copy_unrebuilt_rows(self, suffix):
+        self.calls.append(('copy', suffix))
+        return self.unrebuilt_matches
+
+    def add_rebuild_foreign_keys(self, suffix):
+        self.calls.append(('foreign_keys', suffix))
+        return True
+
+    def swap_rebuild_tables(self, suffix, keep_old=False):
+        self.calls.append(('swap', suffix, keep_old))
+        return True
+
+    def recompute_realtime_stats(self):
+        self.calls.append(('recompute_stats',))
+        return {'keys': 0, 'mismatched': 0, 'missing': 0, 'stale': 0, 'repaired': False}
+
+
+def write_archive(path, count):
+    fixtures = SyntheticFixtures(players=200, rounds=2)
+    archive = PayloadArchive(str(path), writer_id='test')
+    match_ids = []
+    for k in range(count):
+        match_data = fixtures.match(k)
+        match_id = match_data['metadata']['matchId']
+        archive.append(match_id, match_data, fixtures.timeline(k))
+        match_ids.append(match_id)
+    archive.close()
+    return match_ids
+
+
+def test_rebuild_assigns_linked_ids_and_swaps(tmp_path):
+    match_ids = write_archive(tmp_path / 'archive', 6)
+    # matches テーブルにない試合は外部キーを満たせないため読み込まない
+    db = FakeRebuildDB(match_ids[:5])
+
+    stats = Reanalyzer(db, 'archive', str(tmp_path / 'archive'), workers=0, chunk_size=2).run()
+
+    assert stats['matches_total'] == 6
+    assert stats['matches_analyzed'] == 5
+    assert stats['matches_missing'] == 1
+    assert stats['swapped'] is True
+    assert [call[0] for call in db.calls] == ['create', 'load', 'load', 'load', 'copy', 'foreign_keys', 'swap',
+                                              'recompute_stats']
+
+    assert [row['id'] for row in db.matchups] == list(range(1, len(db.matchups) + 1))
+    assert sorted(db.rebuilt_match_ids) == sorted(match_ids[:5])
+    assert {row['match_id'] for row in db.matchups} == set(match_ids[:5])
+    assert db.solo_kills, "合成データにはソロキルが含まれる"
+    matchups_by_id = {row['id']: row for row in db.matchups}
+    for solo_kill in db.solo_kills:
+        assert matchups_by_id[solo_kill['matchup_id']]['match_id'] == solo_kill['match_id']
+    solo_kill_ids = {row['id'] for row in db.solo_kills}
+    assert len(db.kill_items) == 2 * len(db.solo_kills)
+    assert {row['solo_kill_id'] for row in db.kill_items} == solo_kill_ids
+    assert stats['kill_items'] == len(db.kill_items)
+
+
+def test_rebuilt_matchups_carry_solo_kill_columns(tmp_path):
+    match_ids = write_archive(tmp_path / 'archive', 4)
+    # 本番に残る行の id と重ならないよう、最大 id の後から採番する
+    db = FakeRebuildDB(match_ids, max_ids={'matchups': 100, 'solo_kills': 500}, unrebuilt_matches=7)
+
+    stats = Reanalyzer(db, 'archive', str(tmp_path / 'archive'), workers=0).run()
+
+    assert min(row['id'] for row in db.matchups) == 101
+    assert min(row['id'] for row in db.solo_kills) == 501
+    assert stats['matches_copied'] == 7
+    # 作り直し用テーブルにはトリガーが無いため、ソロキル列を行に入れる
+    kills_by_matchup = {}
+    for solo_kill in db.solo_kills:
+        kills_by_matchup.setdefault(solo_kill['matchup_id'], []).append(solo_kill)
+    for row in db.matchups:
+        assert set(MATCHUP_COLUMNS + MATCHUP_SOLO_KILL_COLUMNS) <= set(row)
+        kills = kills_by_matchup.get(row['id'], [])
+        assert row['total_solo_kills'] == len(kills)
+        if kills:
+            first = min(kills, key=lambda solo_kill: solo_kill['timestamp_ms'])
+            assert row['first_blood_time'] == first['timestamp_ms']
+            assert row['first_blood_killer_participant_id'] == first['killer_participant_id']
+        else:
+            assert row['first_blood_time'] == 0 and row['first_blood_killer_participant_id'] == 0
+    assert any(row['total_solo_kills'] for row in db.matchups)
+
+
+def test_swap_trigger_matches_schema():
+    schema = (Path(__file__).resolve().parent.parent / 'database_schema_realtime.sql').read_text(encoding='utf-8')
+    trigger = re.search(r'(CREATE TRIGGER update_matchup_solo_kill_stats.*?END)\$\$', schema, re.S).group(1)
+    assert ' '.join(trigger.split()) == ' '.join(SOLO_KILL_STATS_TRIGGER.split())
+
+
+def test_failed_load_stops_before_swap(tmp_path):
+    write_archive(tmp_path / 'archive', 3)
+    db = FakeRebuildDB([], fail_load=True)
+
+    stats = Reanalyzer(db, 'archive', str(tmp_path / 'archive'), workers=0).run()
+
+    assert 'error' in stats
+    assert stats['swapped'] is False
+    assert ('swap', '_rebuild', False) not in db.calls
@@ -0,0 +1,59 @@
+import threading
+
+from request_scheduler import RequestScheduler
+
+
+class RecordingClient:
+    def __init__(self):
+        self.order = []
+        self.gate = threading.Event()
+
+    def block(self):
+        self.gate.wait(5)
+
+    def fetch(self, name):
+        self.order.append(name)
+        return name
+
+
+def test_higher_priority_classes_run_first():
+    client = RecordingClient()
+    with RequestScheduler(client, max_workers=1) as scheduler:
+        # ワーカーを塞いでいる間に登録した呼び出しは優先度順に実行される
+        scheduler.submit('league', 'block')
+        futures = [
+            scheduler.submit('rank', 'fetch', 'rank'),
+            scheduler.submit('match_ids', 'fetch', 'match_ids'),
+            scheduler.submit('match', 'fetch', 'match'),
+            scheduler.submit('timeline', 'fetch', 'timeline'),
+        ]
+        client.gate.set()
+        assert [f.result(5) for f in futures] == ['rank', 'match_ids', 'match', 'timeline']
+
+    assert client.order == ['timeline', 'match', 'match_ids', 'rank']
+    assert scheduler.stats['timeline']['completed'] == 1
+
+
+def test_aging_lets_long_waiting_class_go_first():
+    client = RecordingClient()
+    scheduler = RequestScheduler(client, max_workers=1, aging_seconds=1e-9)
+    scheduler.submit('match', 'block')
+    scheduler.submit('league', 'fetch', 'league')
+    scheduler.submit('timeline', 'fetch', 'timeline')
+    client.gate.set()
+    scheduler.shutdown()
+
+    assert client.order == ['league', 'timeline']
+
+
+def test_class_limit_leaves_workers_for_other_classes():
+    client = RecordingClient()
+    scheduler = RequestScheduler(client, max_workers=2, class_limits={'timeline': 1})
+    blocked = [scheduler.submit('timeline', 'block') for _ in range(2)]
+    # timeline の上限は1なので、もう1つのワーカーは match を処理できる
+    assert scheduler.submit('match', 'fetch', 'match').result(5) == 'match'
+    assert scheduler.pending()['timeline'] == 1
+    client.gate.set()
+    for future in blocked:
+        future.result(5)
+    scheduler.shutdown()
@@ -0,0 +1,77 @@
+import json
+
+import requests
+
+from retry_policy import CONNECTION_ERROR, RATE_LIMITED, CircuitBreaker, RetryPolicy
+from riot_api_client import RiotAPIClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.text = ''
+
+    @property
+    def content(self):
+        return json.dumps(self.payload).encode('utf-8')
+
+
+def make_client(responses, **policy_args):
+    client = RiotAPIClient('RGAPI-test', retry_policy=RetryPolicy(base_delay=0, rate_limit_jitter=0, **policy_args))
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client.session.get = fake_get
+    return client, calls
+
+
+def test_server_and_connection_errors_are_retried():
+    client, calls = make_client([
+        FakeResponse(503),
+        requests.exceptions.ConnectionError('reset'),
+        FakeResponse(200, {'metadata': {}}),
+    ])
+
+    assert client.get_match_by_id('JP1_1') == {'metadata': {}}
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_attempts_and_budget():
+    client, calls = make_client([FakeResponse(500)] * 3, max_attempts=3)
+    assert client.get_match_by_id('JP1_1') is None
+    assert len(calls) == 3
+
+    policy = RetryPolicy(retry_budget=1)
+    assert policy.retry_delay(CONNECTION_ERROR, 1) is not None
+    assert policy.retry_delay(CONNECTION_ERROR, 1) is None
+    # 429 はリトライ予算を消費しない
+    assert policy.retry_delay(RATE_LIMITED, 1) is not None
+
+
+def test_circuit_breaker_opens_and_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.before_request() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 試験送信中は他のリクエストを通さない
+    assert breaker.before_request() > 0
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_blocks_until_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.before_request() > 29
@@ -0,0 +1,67 @@
+from shard_coordination import ShardClaims, puuid_shard
+from sharded_collection import _shard_settings, plan_shards
+
+
+def test_plan_splits_budget_between_shards_sharing_a_key():
+    shards = plan_shards(['CHALLENGER', 'MASTER'], ['key-a', 'key-b'], ['jp1', 'kr', 'na1'], hash_shards=2)
+
+    assert len(shards) == 12
+    assert len({shard.shard_id for shard in shards}) == 12
+    # jp1 と kr は同じ asia ホストを使うため、同じキーの asia シャードで予算を等分する
+    asia_key_a = [s for s in shards if s.api_key == 'key-a' and s.region in ('jp1', 'kr')]
+    assert all(s.rate_limit_share == 1 / len(asia_key_a) for s in asia_key_a)
+    na_shards = [s for s in shards if s.region == 'na1']
+    assert sum(s.rate_limit_share for s in na_shards) == 2.0
+
+    single = plan_shards(['CHALLENGER'], ['key-a'], ['jp1'], split_tiers=False)
+    assert [(s.shard_id, s.rate_limit_share) for s in single] == [('jp1', 1.0)]
+
+
+def test_shard_settings_keep_journal_and_pool_per_shard():
+    shard = plan_shards(['MASTER'], ['key-a'], ['jp1'])[0]
+    settings = _shard_settings(shard, 2, {
+        'mysql_config': {'host': 'db', 'pool_size': 10},
+        'pipeline_config': {'journal_path': 'cache/crawl_journal.sqlite3', 'frontier_dir': 'cache/frontier'},
+        'telemetry_config': {'metrics_port': 9100},
+        'db_pool_size': 4,
+    })
+
+    assert settings['mysql_config'] == {'host': 'db', 'pool_size': 4, 'pool_name': 'realtime_pool_jp1-master'}
+    assert settings['pipeline_config']['journal_path'].endswith('crawl_journal-jp1-master.sqlite3')
+    assert settings['pipeline_config']['frontier_dir'].endswith('jp1-master')
+    assert settings['telemetry_config']['metrics_port'] == 9102
+
+
+def test_claims_are_exclusive_across_shards(tmp_path):
+    path = str(tmp_path / 'claims.sqlite3')
+    first = ShardClaims(path, 'jp1-challenger')
+    second = ShardClaims(path, 'jp1-master')
+
+    assert first.claim('match', ['JP1_1', 'JP1_2']) == ['JP1_1', 'JP1_2']
+    assert second.claim('match', ['JP1_2', 'JP1_3']) == ['JP1_3']
+    # 種類が違えば同じキーでも別
+    assert second.claim('player', ['JP1_1']) == ['JP1_1']
+    assert first.counts() == {'jp1-challenger': {'match': 2}, 'jp1-master': {'match': 1, 'player': 1}}
+
+    first.reset()
+    assert second.claim('match', ['JP1_1']) == ['JP1_1']
+
+    owners = {puuid_shard(f"puuid-{i}", 4) for i in range(100)}
+    assert owners == {0, 1, 2, 3}
+    assert puuid_shard('puuid-1', 4) == puuid_shard('puuid-1', 4)
+    first.close()
+    second.close()
+
+
+def test_released_claims_can_be_taken_by_another_shard(tmp_path):
+    path = str(tmp_path / 'claims.sqlite3')
+    first = ShardClaims(path, 'jp1-challenger')
+    second = ShardClaims(path, 'jp1-master')
+    assert first.claim('match', ['JP1_1', 'JP1_2']) == ['JP1_1', 'JP1_2']
+
+    # 取得に失敗した試合だけ担当を外す（他のシャードの担当は外せない）
+    first.release('match', ['JP1_1'])
+    second.release('match', ['JP1_2'])
+    assert second.claim('match', ['JP1_1', 'JP1_2']) == ['JP1_1']
+    first.close()
+    second.close()
@@ -0,0 +1,46 @@
+from match_data_analyzer import MatchDataAnalyzer
+from static_data_cache import StaticDataCache
+from timeline_analyzer import TimelineAnalyzer
+
+
+class FakeDDragonClient:
+    def __init__(self):
+        self.calls = []
+
+    def get_latest_version(self):
+        self.calls.append('versions')
+        return '14.1.1'
+
+    def get_champion_data(self, version):
+        self.calls.append('champion')
+        return {'data': {'Aatrox': {'key': '266', 'name': 'エイトロックス'}}}
+
+    def get_item_data(self, version):
+        self.calls.append('item')
+        return {'data': {'1001': {'gold': {'total': 300}}, '3031': {'gold': {'total': 3450}}}}
+
+
+def test_downloads_once_per_version(tmp_path):
+    client = FakeDDragonClient()
+    static_data = StaticDataCache(str(tmp_path), client).load_latest()
+
+    assert static_data.champion_keys == {266: 'Aatrox'}
+    assert static_data.items_value([1001, 3031, 0, 999999]) == 3750
+
+    # 別インスタンス（再起動）でも保存済みのファイルを使う
+    reopened = StaticDataCache(str(tmp_path), client)
+    assert reopened.load_latest_cached().item_total_gold(3031) == 3450
+    assert reopened.load_latest().version == '14.1.1'
+    assert client.calls == ['versions', 'champion', 'item']
+
+
+def test_analyzers_use_static_gold_table(tmp_path):
+    static_data = StaticDataCache(str(tmp_path), FakeDDragonClient()).load('14.1.1')
+    timeline_analyzer = TimelineAnalyzer()
+    match_analyzer = MatchDataAnalyzer()
+    timeline_analyzer.apply_static_data(static_data)
+    match_analyzer.apply_static_data(static_data)
+
+    # 手書きの表では 3031 は 3400、未知のアイテムは 1000 だった
+    assert timeline_analyzer.calculate_item_value([3031, 4000]) == 3450
+    assert match_analyzer.calculate_item_gold_value([1001, 3031]) == 3750
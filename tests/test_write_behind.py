@@ -0,0 +1,190 @@
+import shutil
+import threading
+import time
+
+import write_behind
+from match_rows import MatchWriteBatch
+from write_behind import WriteBehindBuffer
+
+
+class FakeBatchDB:
+    """
+    write_match_batch の呼び出しを記録する
+
+    fail_times 回はバッチ全体を失敗させ、raise_times 回は例外を出す。bad の試合だけは書き込めない
+    """
+
+    def __init__(self, fail_times=0, gate=None, bad=(), raise_times=0):
+        self.fail_times = fail_times
+        self.gate = gate
+        self.bad = set(bad)
+        self.raise_times = raise_times
+        self.batches = []
+
+    def write_match_batch(self, batch):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.raise_times:
+            self.raise_times -= 1
+            raise RuntimeError('connection reset')
+        if self.fail_times:
+            self.fail_times -= 1
+            return None
+        self.batches.append([m.match_id for m in batch.matches if m.match_id not in self.bad])
+        return {m.match_id: None if m.match_id in self.bad else
+                {'matchups': len(m.matchup_rows), 'solo_kills': 0, 'kill_items': 0} for m in batch.matches}
+
+
+def make_write(i):
+    batch = MatchWriteBatch()
+    match_data = {'metadata': {'matchId': f"JP1_{i}"}, 'info': {'gameVersion': '14.1', 'participants': []}}
+    return batch.add(match_data, [{'matchup': {'lane': 'MIDDLE'}, 'solo_kills': []}], tier=20, has_timeline=True)
+
+
+def test_flushes_by_size_and_time_then_empties_spill(tmp_path):
+    db = FakeBatchDB()
+    written = []
+    buffer = WriteBehindBuffer(db, str(tmp_path / 'wb.jsonl'), batch_size=4, flush_seconds=0.05,
+                               on_written=lambda m, counts: written.append((m.match_id, counts['matchups']))).start()
+    for i in range(10):
+        assert buffer.enqueue(make_write(i))
+    assert buffer.flush(timeout=5)
+
+    assert [match_id for batch in db.batches for match_id in batch] == [f"JP1_{i}" for i in range(10)]
+    assert max(len(batch) for batch in db.batches) <= 4
+    assert written == [(f"JP1_{i}", 1) for i in range(10)]
+    assert buffer.snapshot()['committed_seq'] == 10
+    assert (tmp_path / 'wb.jsonl').stat().st_size == 0
+    buffer.close(timeout=5)
+
+
+def test_unwritten_entries_are_replayed_after_crash(tmp_path):
+    spill = tmp_path / 'wb.jsonl'
+    # 書き込みスレッドを動かさずに受け付けだけして落ちた状態
+    crashed = WriteBehindBuffer(FakeBatchDB(), str(spill))
+    for i in range(3):
+        crashed.enqueue(make_write(i))
+    crashed._spill.close()
+    with open(spill, 'ab') as f:
+        f.write(b'{"seq": 4, "match": {"match_')
+
+    db = FakeBatchDB()
+    buffer = WriteBehindBuffer(db, str(spill), flush_seconds=0.01)
+    assert buffer.snapshot()['replayed'] == 3
+    buffer.start()
+    assert buffer.enqueue(make_write(3))
+    assert buffer.flush(timeout=5)
+    assert [match_id for batch in db.batches for match_id in batch] == ['JP1_0', 'JP1_1', 'JP1_2', 'JP1_3']
+    buffer.close(timeout=5)
+
+    # 書き込み済みの分は次の起動で読み直さない
+    assert WriteBehindBuffer(FakeBatchDB(), str(spill)).snapshot()['replayed'] == 0
+
+
+def test_backpressure_and_retry_until_db_recovers(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, 'RETRY_BASE_SECONDS', 0.01)
+    gate = threading.Event()
+    db = FakeBatchDB(fail_times=5, gate=gate)
+    buffer = WriteBehindBuffer(db, str(tmp_path / 'wb.jsonl'), batch_size=2, max_pending=2,
+                               flush_seconds=0.01).start()
+    assert buffer.enqueue(make_write(0)) and buffer.enqueue(make_write(1))
+    # DB が止まっている間は上限で待たされる
+    assert buffer.enqueue(make_write(2), timeout=0.1) is False
+    gate.set()
+    assert buffer.enqueue(make_write(2), timeout=5)
+    assert buffer.flush(timeout=5)
+
+    # 何度失敗しても捨てずに、DB が戻ってから書き込む
+    assert db.batches == [['JP1_0', 'JP1_1'], ['JP1_2']]
+    snapshot = buffer.snapshot()
+    assert snapshot['retries'] == 5
+    assert snapshot['dead_lettered'] == 0
+    assert not (tmp_path / 'wb.jsonl.failed').exists()
+    assert buffer.close(timeout=5)
+
+
+def test_partial_failure_is_dead_lettered_then_replayed(tmp_path):
+    spill = tmp_path / 'wb.jsonl'
+    db = FakeBatchDB(bad={'JP1_1'})
+    written, failed = [], []
+    buffer = WriteBehindBuffer(db, str(spill), batch_size=3, flush_seconds=0.01,
+                               on_written=lambda m, counts: written.append(m.match_id),
+                               on_failed=lambda m: failed.append(m.match_id)).start()
+    for i in range(3):
+        assert buffer.enqueue(make_write(i))
+    assert buffer.flush(timeout=5)
+
+    assert written == ['JP1_0', 'JP1_2']
+    assert failed == ['JP1_1']
+    assert buffer.snapshot()['committed_seq'] == 3
+    assert b'JP1_1' in (tmp_path / 'wb.jsonl.failed').read_bytes()
+    assert buffer.close(timeout=5)
+
+    # 次の起動で .failed の試合を書き込み直す
+    db.bad.clear()
+    written.clear()
+    restarted = WriteBehindBuffer(db, str(spill), flush_seconds=0.01,
+                                  on_written=lambda m, counts: written.append(m.match_id)).start()
+    assert restarted.replay_failed() == 1
+    assert restarted.flush(timeout=5)
+    assert written == ['JP1_1']
+    assert not (tmp_path / 'wb.jsonl.failed').exists()
+    assert restarted.close(timeout=5)
+
+
+def test_writer_thread_survives_exceptions(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, 'RETRY_BASE_SECONDS', 0.01)
+    db = FakeBatchDB(raise_times=2)
+
+    def on_written(match_write, counts):
+        raise ValueError('callback bug')
+
+    buffer = WriteBehindBuffer(db, str(tmp_path / 'wb.jsonl'), flush_seconds=0.01, on_written=on_written).start()
+    assert buffer.enqueue(make_write(0))
+    assert buffer.flush(timeout=5)
+    assert db.batches == [['JP1_0']]
+
+    # 退避ファイルの fsync が失敗しても書き込みスレッドは止まらない
+    real_fsync = write_behind.os.fsync
+    fsync_failures = [OSError('disk error')]
+
+    def flaky_fsync(fd):
+        if fsync_failures:
+            raise fsync_failures.pop()
+        real_fsync(fd)
+
+    monkeypatch.setattr(write_behind.os, 'fsync', flaky_fsync)
+    assert buffer.enqueue(make_write(1))
+    assert buffer.flush(timeout=5)
+    assert db.batches == [['JP1_0'], ['JP1_1']]
+    assert buffer.snapshot()['errors'] == 1
+    assert buffer.close(timeout=5)
+
+
+def test_spill_is_compacted_up_to_committed_seq(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, 'SPILL_COMPACT_BYTES', 1)
+    spill = tmp_path / 'wb.jsonl'
+    db = FakeBatchDB()
+    buffer = WriteBehindBuffer(db, str(spill), batch_size=2, flush_seconds=60).start()
+    for i in range(3):
+        assert buffer.enqueue(make_write(i))
+    # 件数に達した2試合だけが書き込まれ、残りの1試合だけが退避ファイルに残る
+    deadline = time.monotonic() + 5
+    while buffer.snapshot()['compactions'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert db.batches == [['JP1_0', 'JP1_1']]
+    assert len(spill.read_bytes().splitlines()) == 1
+
+    # 詰め直した後に落ちても未書き込みの分だけを読み直す
+    crashed = tmp_path / 'crashed'
+    crashed.mkdir()
+    for name in ('wb.jsonl', 'wb.jsonl.committed'):
+        shutil.copy(tmp_path / name, crashed / name)
+    restarted = WriteBehindBuffer(FakeBatchDB(), str(crashed / 'wb.jsonl'))
+    assert [match_write.match_id for _, match_write, _, _ in restarted._pending] == ['JP1_2']
+
+    # 詰め直した退避ファイルへの追記も続けて書き込める
+    assert buffer.enqueue(make_write(3))
+    assert buffer.flush(timeout=5)
+    assert db.batches == [['JP1_0', 'JP1_1'], ['JP1_2', 'JP1_3']]
+    assert buffer.close(timeout=5)
@@ -140,13 +140,29 @@ class TimelineAnalyzer:
             3364: 0,     # 遠見改良
         }
         
+        # StaticData（設定されていれば DDragon の正確なゴールドを使う）
+        self.static_data = None
+        
         logger.info("タイムライン分析器を初期化しました")
     
+    def apply_static_data(self, static_data):
+        """
+        パッチバージョンの静的データを設定
+        
+        Args:
+            static_data: static_data_cache.StaticData
+        """
+        self.static_data = static_data
+    
     def calculate_item_value(self, items: List[int]) -> int:
         """アイテムの総価値を計算"""
         if not items:
             return 0
         
+        if self.static_data:
+            # アイテムIDを添字にした配列から合計ゴールドを求める
+            return self.static_data.items_value(items)
+        
         total_value = 0
         for item_id in items:
             if item_id in self.item_values:
@@ -0,0 +1,440 @@
+"""
+Write Behind
+収集スレッドから受け取った試合の書き込みをバックグラウンドでまとめて MySQL へ流す書き込みバッファ
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fast_json
+from match_rows import MatchWrite, MatchWriteBatch
+
+logger = logging.getLogger(__name__)
+
+# 書き込みバッファの既定値
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_SECONDS = 1.0
+DEFAULT_MAX_PENDING = 200
+
+# バッチ全体の書き込みに失敗したときの再試行間隔（秒、再試行ごとに倍、DB が復旧するまで続ける）
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+# 退避ファイルの書き込み済みの先頭部分がこのバイト数を超えたら、未書き込みの末尾だけに詰め直す
+SPILL_COMPACT_BYTES = 16 * 1024 * 1024
+
+
+class WriteBehindBuffer:
+    """
+    試合の書き込みを退避ファイルに追記してすぐに返し、バックグラウンドの書き込みスレッドが
+    件数（batch_size）か経過時間（flush_seconds）のどちらかに達した分を
+    RealtimeDatabaseManager.write_match_batch でまとめて書き込む。
+
+    - 退避ファイル（JSON Lines）には受け付けた順に追記し、書き込めた位置を .committed に記録する。
+      プロセスが落ちても、再起動時に未書き込みの分を読み直して書き込む
+    - メモリに保持する件数は max_pending まで。DB が追いつかないときは enqueue が空くまで待つ
+    - バッチ全体が書き込めないとき（DB の停止など）は、書き込めるまで間隔を空けて再試行し続ける。
+      その間は max_pending で enqueue が待たされる
+    - バッチの一部の試合だけが書き込めなかったときは、その試合を .failed に移してから先へ進む。
+      .failed の試合は replay_failed で退避ファイルに戻して書き込み直す
+    """
+
+    def __init__(self, db_manager, spill_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS, max_pending: int = DEFAULT_MAX_PENDING,
+                 fsync_appends: bool = False,
+                 on_written: Optional[Callable[[MatchWrite, Dict[str, int]], None]] = None,
+                 on_failed: Optional[Callable[[MatchWrite], None]] = None):
+        """
+        Args:
+            db_manager: write_match_batch を持つ RealtimeDatabaseManager
+            spill_path: 退避ファイルのパス
+            batch_size: 1回の書き込みでまとめる最大試合数
+            flush_seconds: 最も古い未書き込みの試合を待たせる最大秒数
+            max_pending: メモリに保持する未書き込みの最大試合数
+            fsync_appends: 追記のたびに fsync するか（False なら書き込みのたびにまとめて fsync）
+            on_written: 試合を DB にコミットできたときに (MatchWrite, 件数) で呼ぶ関数（書き込みスレッドから呼ばれる）
+            on_failed: 試合を書き込めず .failed に移したときに呼ぶ関数（書き込みスレッドから呼ばれる）
+        """
+        self.db_manager = db_manager
+        self.spill_path = Path(spill_path)
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        self.committed_path = self.spill_path.with_name(self.spill_path.name + '.committed')
+        self.failed_path = self.spill_path.with_name(self.spill_path.name + '.failed')
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.max_pending = max(self.batch_size, max_pending)
+        self.fsync_appends = fsync_appends
+        self.on_written = on_written
+        self.on_failed = on_failed
+
+        # (通番, 試合, 受け付けた時刻, 退避ファイル中の行のバイト数)。書き込めるまで先頭から取り除かない
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._flush_requested = False
+        # 書き込んだ試合を取り除いてから on_written / on_failed を呼び終えるまでの間 True
+        self._settling = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            'enqueued': 0,
+            'replayed': 0,
+            'written': 0,
+            'dead_lettered': 0,
+            'requeued_failed': 0,
+            'batches': 0,
+            'retries': 0,
+            'errors': 0,
+            'compactions': 0,
+            'blocked_seconds': 0.0,
+        }
+
+        self._committed_seq = self._read_committed()
+        # 退避ファイルの先頭から、書き込み済み（または .failed に移した）行が占めるバイト数
+        self._committed_bytes = 0
+        self._next_seq = self._recover() + 1
+        self._spill = open(self.spill_path, 'ab')
+
+    def _read_committed(self) -> int:
+        """書き込み済みの通番（.committed が無ければ 0）"""
+        try:
+            return int(self.committed_path.read_text().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _recover(self) -> int:
+        """
+        退避ファイルから未書き込みの試合を読み直す（途中で途切れた最後の行は切り詰める）
+
+        Returns:
+            退避ファイル中の最大の通番
+        """
+        last_seq = self._committed_seq
+        if not self.spill_path.exists():
+            return last_seq
+
+        valid_bytes = 0
+        with open(self.spill_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = fast_json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                last_seq = max(last_seq, record['seq'])
+                if record['seq'] > self._committed_seq:
+                    self._pending.append((record['seq'], MatchWrite(**record['match']), time.monotonic(), len(line)))
+                else:
+                    self._committed_bytes += len(line)
+
+        if not self._pending:
+            # すべて書き込み済みなら空にする
+            valid_bytes = 0
+            self._committed_bytes = 0
+        elif valid_bytes < self.spill_path.stat().st_size:
+            logger.warning(f"書き込みバッファの退避ファイルの途切れた末尾を切り詰めます: {self.spill_path}")
+        if valid_bytes < self.spill_path.stat().st_size:
+            with open(self.spill_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        if self._pending:
+            self.stats['replayed'] = len(self._pending)
+            logger.info(f"書き込みバッファの未書き込み分を読み直しました: {len(self._pending)}試合")
+        return last_seq
+
+    def start(self) -> 'WriteBehindBuffer':
+        """書き込みスレッドを開始"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+        return self
+
+    def _append(self, match_write: MatchWrite) -> int:
+        """退避ファイルに追記して未書き込みに加える（呼び出し側でロックを保持）"""
+        seq = self._next_seq
+        # 試合詳細は大きいため deepcopy する asdict ではなくフィールドをそのまま書き出す
+        line = fast_json.dumps({'seq': seq, 'match': vars(match_write)}) + b'\n'
+        self._spill.write(line)
+        self._spill.flush()
+        if self.fsync_appends:
+            os.fsync(self._spill.fileno())
+        self._next_seq += 1
+        self._pending.append((seq, match_write, time.monotonic(), len(line)))
+        return seq
+
+    def enqueue(self, match_write: MatchWrite, timeout: Optional[float] = None) -> bool:
+        """
+        試合の書き込みを受け付ける（退避ファイルに追記した時点で返る）
+
+        Args:
+            match_write: 書き込む試合
+            timeout: 保持件数が上限のときに待つ最大秒数（None なら空くまで待つ）
+
+        Returns:
+            受け付けたか（待ちきれなかった・閉じた後・書き込みスレッドが止まっているなら False）
+        """
+        with self._cond:
+            started = time.monotonic()
+            while len(self._pending) >= self.max_pending and not self._closing and self._thread_alive():
+                remaining = None if timeout is None else timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self.stats['blocked_seconds'] += time.monotonic() - started
+            if self._closing or len(self._pending) >= self.max_pending:
+                return False
+            if self._thread is not None and not self._thread.is_alive():
+                logger.error("書き込みスレッドが停止しているため受け付けられません")
+                return False
+
+            try:
+                self._append(match_write)
+            except OSError as e:
+                logger.error(f"書き込みバッファの退避ファイルへの追記エラー: {match_write.match_id} - {e}")
+                return False
+            self.stats['enqueued'] += 1
+            self._cond.notify_all()
+        return True
+
+    def replay_failed(self) -> int:
+        """
+        .failed に移した試合を退避ファイルに戻し、もう一度書き込む
+
+        Returns:
+            戻した試合数
+        """
+        if not self.failed_path.exists():
+            return 0
+        records = []
+        with open(self.failed_path, 'rb') as f:
+            for line in f:
+                try:
+                    records.append(fast_json.loads(line))
+                except ValueError:
+                    continue
+
+        with self._cond:
+            # 前回の戻しの途中で落ちた場合に同じ試合を二重に戻さない
+            queued = {match_write.match_id for _, match_write, _, _ in self._pending}
+            replayed = 0
+            for record in records:
+                match_write = MatchWrite(**record['match'])
+                if match_write.match_id in queued:
+                    continue
+                self._append(match_write)
+                queued.add(match_write.match_id)
+                replayed += 1
+            # 退避ファイルに確定させてから .failed を消す
+            os.fsync(self._spill.fileno())
+            self.failed_path.unlink()
+            self.stats['requeued_failed'] += replayed
+            self._cond.notify_all()
+        if replayed:
+            logger.info(f"書き込めなかった試合を書き込みバッファに戻しました: {replayed}試合")
+        return replayed
+
+    def _thread_alive(self) -> bool:
+        return self._thread is None or self._thread.is_alive()
+
+    def _ready(self) -> bool:
+        """書き込みを始めるか（呼び出し側でロックを保持）"""
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.batch_size or self._flush_requested or self._closing:
+            return True
+        return time.monotonic() - self._pending[0][2] >= self.flush_seconds
+
+    def _run(self):
+        """書き込みスレッド（例外が出ても未書き込みの分を残したまま書き込みを続ける）"""
+        errors = 0
+        while True:
+            try:
+                if not self._write_next():
+                    return
+                errors = 0
+            except Exception as e:
+                errors += 1
+                self.stats['errors'] += 1
+                delay = min(RETRY_BASE_SECONDS * 2 ** (errors - 1), RETRY_MAX_SECONDS)
+                logger.error(f"書き込みスレッドのエラー、{delay:.1f}秒後に再開: {e}")
+                with self._cond:
+                    self._settling = False
+                    self._cond.notify_all()
+                    if self._cond.wait_for(lambda: self._closing, timeout=delay):
+                        # 書き込めなかった分は退避ファイルに残り、次回の起動時に書き込む
+                        return
+
+    def _write_next(self) -> bool:
+        """
+        次のバッチを書き込む
+
+        Returns:
+            続けるか（終了するなら False）
+        """
+        with self._cond:
+            while not self._ready() and not (self._closing and not self._pending):
+                wait = self.flush_seconds - (time.monotonic() - self._pending[0][2]) if self._pending else None
+                self._cond.wait(wait if wait is None or wait > 0 else 0)
+            if self._closing and not self._pending:
+                return False
+            entries = [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+
+        # 退避ファイルを DB より先にディスクへ確定させる
+        os.fsync(self._spill.fileno())
+
+        results = self._write(entries)
+        if results is None:
+            # 終了中に書き込めなかった分は退避ファイルに残し、次回の起動時に書き込む
+            return False
+
+        failed = [entry for entry in entries if results.get(entry[1].match_id) is None]
+        if failed:
+            # 通番を進める前に .failed へ確定させる（書き込めなかった試合を失わない）
+            self._dead_letter(failed)
+
+        with self._cond:
+            # 通番を記録できてから取り除く（記録に失敗したら同じバッチを書き込み直す）
+            self._write_committed(entries[-1][0])
+            self._committed_seq = entries[-1][0]
+            for _ in entries:
+                self._pending.popleft()
+            self._committed_bytes += sum(entry[3] for entry in entries)
+            if not self._pending:
+                # すべて書き込めたら退避ファイルを空にする
+                self._spill.truncate(0)
+                self._committed_bytes = 0
+                self._flush_requested = False
+            elif self._committed_bytes >= SPILL_COMPACT_BYTES:
+                self._compact()
+            self._settling = True
+
+        for _, match_write, _, _ in entries:
+            counts = results.get(match_write.match_id)
+            try:
+                if counts is not None and self.on_written:
+                    self.on_written(match_write, counts)
+                elif counts is None and self.on_failed:
+                    self.on_failed(match_write)
+            except Exception as e:
+                logger.error(f"書き込み完了の処理エラー: {match_write.match_id} - {e}")
+
+        with self._cond:
+            self._settling = False
+            self._cond.notify_all()
+        return True
+
+    def _write(self, entries: List[Tuple]) -> Optional[Dict[str, Optional[Dict[str, int]]]]:
+        """
+        まとめて書き込む（バッチ全体が失敗したら書き込めるまで再試行）
+
+        Returns:
+            試合ID → 件数（write_match_batch の結果）。終了中で書き込めなかったら None
+        """
+        batch = MatchWriteBatch()
+        batch.matches = [match_write for _, match_write, _, _ in entries]
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                results = self.db_manager.write_match_batch(batch)
+            except Exception as e:
+                logger.error(f"まとめ書き込みの例外: {e}")
+                results = None
+            if results is not None:
+                break
+            attempt += 1
+            if self._closing:
+                logger.warning(f"書き込めなかった{len(entries)}試合を退避ファイルに残して終了します")
+                return None
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+            logger.warning(f"まとめ書き込みに失敗、{delay:.1f}秒後に再試行 ({attempt}回目、{len(self._pending)}試合が待機中)")
+            self.stats['retries'] += 1
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing, timeout=delay)
+
+        written = sum(1 for counts in results.values() if counts is not None)
+        self.stats['batches'] += 1
+        self.stats['written'] += written
+        logger.debug(f"まとめ書き込み: {written}/{len(entries)}試合 ({time.monotonic() - started:.3f}秒)")
+        return results
+
+    def _dead_letter(self, entries: List[Tuple]):
+        """書き込めなかった試合を .failed に移す（replay_failed で書き込み直せる）"""
+        with open(self.failed_path, 'ab') as f:
+            for seq, match_write, _, _ in entries:
+                f.write(fast_json.dumps({'seq': seq, 'match': vars(match_write)}) + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.stats['dead_lettered'] += len(entries)
+        logger.error(f"書き込めなかった{len(entries)}試合を退避しました: "
+                     f"{[match_write.match_id for _, match_write, _, _ in entries]} -> {self.failed_path}")
+
+    def _write_committed(self, seq: int):
+        """書き込み済みの通番を記録（一時ファイルから置き換える）"""
+        tmp_path = self.committed_path.with_name(self.committed_path.name + '.tmp')
+        tmp_path.write_text(str(seq))
+        os.replace(tmp_path, self.committed_path)
+
+    def _compact(self):
+        """退避ファイルを未書き込みの末尾だけに詰め直す（呼び出し側でロックを保持）"""
+        tmp_path = self.spill_path.with_name(self.spill_path.name + '.tmp')
+        with open(self.spill_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            src.seek(self._committed_bytes)
+            shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        self._spill.close()
+        os.replace(tmp_path, self.spill_path)
+        self._spill = open(self.spill_path, 'ab')
+        self._committed_bytes = 0
+        self.stats['compactions'] += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        受け付け済みの試合がすべて書き込まれ、on_written / on_failed を呼び終えるまで待つ
+
+        Returns:
+            時間内に書き込み終わったか
+        """
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: (not self._pending and not self._settling)
+                                       or not self._thread_alive(), timeout) and not self._pending
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def snapshot(self) -> Dict:
+        """統計（未書き込み件数を含む）"""
+        with self._cond:
+            return dict(self.stats, pending=len(self._pending), committed_seq=self._committed_seq)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        残りを書き込んでから書き込みスレッドを止める（書き込めなかった分は退避ファイルに残る）
+
+        Args:
+            timeout: 残りの書き込みを待つ最大秒数（None なら書き込めるまで待つ）
+
+        Returns:
+            すべて書き込めたか
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            # 再試行の待機は閉じると打ち切られるため、書き込み中のバッチが終わるまで待てばよい
+            self._thread.join()
+        with self._cond:
+            if not self._spill.closed:
+                self._spill.close()
+        return flushed